@@ -18,7 +18,8 @@ CREATE (capacity_rule:GMCRule {
     project_id: 'default',
     type: 'hard_constraint', 
     description: 'Machine capacity cannot exceed available hours',
-    formula: 'sum(machine_hours) <= available_capacity'
+    formula: 'sum(machine_hours) <= available_capacity',
+    updated_at: datetime()
 });
 
 CREATE (demand_rule:GMCRule {
@@ -26,7 +27,8 @@ CREATE (demand_rule:GMCRule {
     project_id: 'default', 
     type: 'market_constraint',
     description: 'Production must meet minimum demand requirements',
-    formula: 'production_quantity >= min_demand * market_share'
+    formula: 'production_quantity >= min_demand * market_share',
+    updated_at: datetime()
 });
 
 // Parameters with project isolation
@@ -63,4 +65,8 @@ CREATE (machine_hours)-[:GENERATES {project_id: 'default', coefficient: 100.0}]-
 // Indexes for performance
 CREATE INDEX rule_project_idx IF NOT EXISTS FOR (r:GMCRule) ON (r.project_id);
 CREATE INDEX param_project_idx IF NOT EXISTS FOR (p:Parameter) ON (p.project_id);
-CREATE INDEX market_project_idx IF NOT EXISTS FOR (m:Market) ON (m.project_id);
\ No newline at end of file
+CREATE INDEX market_project_idx IF NOT EXISTS FOR (m:Market) ON (m.project_id);
+
+// Rule loaders set rule.updated_at = datetime() whenever they edit a rule or
+// its relationships; the knowledge-graph service derives the ETag of
+// /rules and /relationships from it and the rule and relationship counts
@@ -0,0 +1,306 @@
+-- GMC Dashboard: Partitioned Storage for High-Volume Log Tables
+-- Declarative partitioning for parameter_changes, api_usage_logs and audit_logs
+
+-- parameter_changes is HASH partitioned by project_id so that every
+-- project-scoped query (WHERE project_id = :project_id) prunes to a single
+-- partition. api_usage_logs and audit_logs are RANGE partitioned by month so
+-- budget checks and audit queries only touch recent partitions and expired
+-- months can be detached without DELETE/VACUUM churn.
+--
+-- Existing rows are migrated into the new partitioned tables. PostgreSQL
+-- requires the partition key in every unique constraint, so the primary keys
+-- become (change_id, project_id), (usage_id, usage_timestamp) and
+-- (audit_id, timestamp).
+
+CREATE SCHEMA IF NOT EXISTS archive;
+
+-- PARTITION RETENTION POLICIES
+CREATE TABLE partition_retention_policies (
+    parent_table VARCHAR(100) PRIMARY KEY,
+    premake_months INTEGER NOT NULL DEFAULT 3 CHECK (premake_months >= 1),
+    retention_months INTEGER CHECK (retention_months IS NULL OR retention_months >= 1), -- NULL keeps everything
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO partition_retention_policies (parent_table, premake_months, retention_months) VALUES
+    ('api_usage_logs', 3, 13),  -- Budgets need the current month; keep a year for billing review
+    ('audit_logs', 3, 84);      -- FERPA audit trail retained for seven years
+
+-- 1. PARAMETER CHANGES (hash partitioned by project)
+ALTER TABLE parameter_changes RENAME TO parameter_changes_legacy;
+ALTER INDEX idx_parameter_changes_project_id RENAME TO idx_parameter_changes_legacy_project_id;
+ALTER INDEX idx_parameter_changes_session RENAME TO idx_parameter_changes_legacy_session;
+DROP TRIGGER IF EXISTS trigger_project_isolation_parameter_changes ON parameter_changes_legacy;
+
+CREATE TABLE parameter_changes (
+    change_id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    project_id UUID NOT NULL REFERENCES projects(project_id) ON DELETE CASCADE,
+    session_id UUID NOT NULL REFERENCES analysis_sessions(session_id) ON DELETE CASCADE,
+    parameter_path VARCHAR(255) NOT NULL,
+    old_value JSONB,
+    new_value JSONB NOT NULL,
+    change_reason VARCHAR(500),
+    user_id VARCHAR(100) NOT NULL,
+    project_undo_redo_position INTEGER NOT NULL,
+    cross_project_isolation_verified BOOLEAN DEFAULT true,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (change_id, project_id)
+) PARTITION BY HASH (project_id);
+
+DO $$
+BEGIN
+    FOR i IN 0..15 LOOP
+        EXECUTE format(
+            'CREATE TABLE parameter_changes_p%s PARTITION OF parameter_changes
+             FOR VALUES WITH (MODULUS 16, REMAINDER %s)', lpad(i::text, 2, '0'), i
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO parameter_changes SELECT * FROM parameter_changes_legacy;
+DROP TABLE parameter_changes_legacy;
+
+-- Partitioned indexes (created on every partition automatically)
+CREATE INDEX idx_parameter_changes_project_id ON parameter_changes(project_id);
+CREATE INDEX idx_parameter_changes_session ON parameter_changes(session_id, project_undo_redo_position);
+CREATE INDEX idx_parameter_changes_project_timestamp ON parameter_changes(project_id, timestamp DESC);
+
+-- Row triggers on a partitioned table fire with TG_TABLE_NAME set to the
+-- partition (parameter_changes_pNN), so verify_project_data_isolation() would
+-- skip its parameter_changes branch; this table gets its own check instead.
+CREATE OR REPLACE FUNCTION verify_parameter_change_isolation()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM analysis_sessions WHERE session_id = NEW.session_id AND project_id = NEW.project_id) THEN
+        RAISE EXCEPTION 'Cross-project data contamination prevented: session_id % does not belong to project_id %', NEW.session_id, NEW.project_id;
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_project_isolation_parameter_changes
+    BEFORE INSERT OR UPDATE ON parameter_changes
+    FOR EACH ROW EXECUTE FUNCTION verify_parameter_change_isolation();
+
+-- MONTHLY PARTITION MAINTENANCE
+-- Creates partitions named <parent>_yYYYYmMM for the month containing
+-- from_date through premake_months ahead. Existing partitions are skipped.
+-- Rows that landed in the DEFAULT partition for a month being created are
+-- moved into the new partition before it is attached, since PostgreSQL
+-- refuses a partition whose range still has rows in the DEFAULT partition.
+CREATE OR REPLACE FUNCTION create_monthly_partitions(
+    p_parent_table TEXT,
+    p_from_date DATE DEFAULT CURRENT_DATE,
+    p_premake_months INTEGER DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    premake INTEGER;
+    month_start DATE;
+    month_end DATE;
+    partition_name TEXT;
+    default_partition TEXT;
+    key_column TEXT;
+    has_default_rows BOOLEAN;
+    created INTEGER := 0;
+BEGIN
+    SELECT COALESCE(p_premake_months, premake_months, 3) INTO premake
+    FROM (SELECT 1) AS defaults
+    LEFT JOIN partition_retention_policies ON parent_table = p_parent_table;
+
+    SELECT child.relname INTO default_partition
+    FROM pg_inherits
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = p_parent_table::regclass
+    AND pg_get_expr(child.relpartbound, child.oid) = 'DEFAULT';
+
+    SELECT attname INTO key_column
+    FROM pg_partitioned_table
+    JOIN pg_attribute ON attrelid = partrelid AND attnum = partattrs[0]
+    WHERE partrelid = p_parent_table::regclass;
+
+    month_start := date_trunc('month', p_from_date)::date;
+    WHILE month_start <= date_trunc('month', CURRENT_DATE + make_interval(months => premake))::date LOOP
+        month_end := (month_start + INTERVAL '1 month')::date;
+        partition_name := format('%s_y%sm%s', p_parent_table,
+                                 to_char(month_start, 'YYYY'), to_char(month_start, 'MM'));
+        IF to_regclass(partition_name) IS NULL THEN
+            has_default_rows := false;
+            IF default_partition IS NOT NULL THEN
+                EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= %L AND %I < %L)',
+                               default_partition, key_column, month_start, key_column, month_end)
+                INTO has_default_rows;
+            END IF;
+
+            IF has_default_rows THEN
+                -- Hold inserts into the DEFAULT partition until the month is attached
+                EXECUTE format('LOCK TABLE %I IN EXCLUSIVE MODE', default_partition);
+                EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                               partition_name, p_parent_table);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *)
+                     INSERT INTO %I SELECT * FROM moved',
+                    default_partition, key_column, month_start, key_column, month_end, partition_name
+                );
+                EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                               p_parent_table, partition_name, month_start, month_end);
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, p_parent_table, month_start, month_end
+                );
+            END IF;
+            created := created + 1;
+        END IF;
+        month_start := month_end;
+    END LOOP;
+
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Detaches monthly partitions older than the retention window and moves them
+-- to the archive schema for export or later DROP.
+CREATE OR REPLACE FUNCTION detach_expired_partitions(p_parent_table TEXT)
+RETURNS INTEGER AS $$
+DECLARE
+    retention INTEGER;
+    cutoff DATE;
+    part RECORD;
+    detached INTEGER := 0;
+BEGIN
+    SELECT retention_months INTO retention
+    FROM partition_retention_policies WHERE parent_table = p_parent_table;
+
+    IF retention IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    cutoff := date_trunc('month', CURRENT_DATE - make_interval(months => retention))::date;
+
+    FOR part IN
+        SELECT child.relname AS partition_name
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = p_parent_table
+        AND child.relname ~ '_y[0-9]{4}m[0-9]{2}$'
+        AND to_date(right(child.relname, 8), '"y"YYYY"m"MM') < cutoff
+    LOOP
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', p_parent_table, part.partition_name);
+        EXECUTE format('ALTER TABLE %I SET SCHEMA archive', part.partition_name);
+        detached := detached + 1;
+    END LOOP;
+
+    RETURN detached;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Runs creation and retention for every policy; scheduled below when pg_cron
+-- is available, otherwise call SELECT * FROM maintain_log_partitions() daily.
+CREATE OR REPLACE FUNCTION maintain_log_partitions()
+RETURNS TABLE (parent_table VARCHAR, partitions_created INTEGER, partitions_detached INTEGER) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT p.parent_table,
+           create_monthly_partitions(p.parent_table),
+           detach_expired_partitions(p.parent_table)
+    FROM partition_retention_policies p
+    ORDER BY p.parent_table;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Moves a legacy heap table's rows into its new monthly-partitioned parent,
+-- creating partitions back to the earliest month present.
+CREATE OR REPLACE FUNCTION migrate_to_monthly_partitions(
+    p_legacy_table TEXT, p_parent_table TEXT, p_time_column TEXT
+)
+RETURNS VOID AS $$
+DECLARE
+    earliest DATE;
+BEGIN
+    EXECUTE format('SELECT min(%I)::date FROM %I', p_time_column, p_legacy_table) INTO earliest;
+    PERFORM create_monthly_partitions(p_parent_table, COALESCE(earliest, CURRENT_DATE));
+    EXECUTE format('INSERT INTO %I SELECT * FROM %I', p_parent_table, p_legacy_table);
+END;
+$$ LANGUAGE plpgsql;
+
+-- 2. API USAGE LOGS (monthly range partitions)
+ALTER TABLE api_usage_logs RENAME TO api_usage_logs_legacy;
+ALTER INDEX idx_api_usage_logs_credential_id RENAME TO idx_api_usage_logs_legacy_credential_id;
+ALTER INDEX idx_api_usage_logs_timestamp RENAME TO idx_api_usage_logs_legacy_timestamp;
+ALTER INDEX idx_api_usage_logs_cost RENAME TO idx_api_usage_logs_legacy_cost;
+DROP TRIGGER IF EXISTS trigger_check_api_budget ON api_usage_logs_legacy;
+UPDATE api_usage_logs_legacy SET usage_timestamp = CURRENT_TIMESTAMP WHERE usage_timestamp IS NULL;
+
+CREATE TABLE api_usage_logs (
+    usage_id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    credential_id UUID NOT NULL REFERENCES user_api_credentials(credential_id) ON DELETE CASCADE,
+    user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    service_name VARCHAR(50) NOT NULL,
+    endpoint VARCHAR(255) NOT NULL,
+    tokens_used INTEGER,
+    cost_usd DECIMAL(10,4) NOT NULL,
+    project_id UUID, -- Optional project context
+    usage_timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    request_metadata JSONB, -- Additional request context
+    PRIMARY KEY (usage_id, usage_timestamp)
+) PARTITION BY RANGE (usage_timestamp);
+
+-- Catches rows outside pre-created months so inserts never fail
+CREATE TABLE api_usage_logs_default PARTITION OF api_usage_logs DEFAULT;
+
+SELECT migrate_to_monthly_partitions('api_usage_logs_legacy', 'api_usage_logs', 'usage_timestamp');
+DROP TABLE api_usage_logs_legacy;
+
+CREATE INDEX idx_api_usage_logs_credential_id ON api_usage_logs(credential_id, usage_timestamp);
+CREATE INDEX idx_api_usage_logs_timestamp ON api_usage_logs(usage_timestamp);
+CREATE INDEX idx_api_usage_logs_cost ON api_usage_logs(cost_usd);
+
+CREATE TRIGGER trigger_check_api_budget
+    BEFORE INSERT ON api_usage_logs
+    FOR EACH ROW EXECUTE FUNCTION check_api_budget();
+
+-- 3. AUDIT LOGS (monthly range partitions)
+ALTER TABLE audit_logs RENAME TO audit_logs_legacy;
+ALTER INDEX idx_audit_logs_user_id RENAME TO idx_audit_logs_legacy_user_id;
+ALTER INDEX idx_audit_logs_timestamp RENAME TO idx_audit_logs_legacy_timestamp;
+ALTER INDEX idx_audit_logs_institution RENAME TO idx_audit_logs_legacy_institution;
+UPDATE audit_logs_legacy SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL;
+
+CREATE TABLE audit_logs (
+    audit_id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    user_id UUID REFERENCES users(user_id) ON DELETE SET NULL,
+    action VARCHAR(100) NOT NULL,
+    resource_type VARCHAR(100) NOT NULL,
+    resource_id VARCHAR(255),
+    project_id UUID, -- Optional project context
+    institution_id VARCHAR(100) NOT NULL,
+    ip_address INET,
+    user_agent TEXT,
+    details JSONB,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (audit_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+
+SELECT migrate_to_monthly_partitions('audit_logs_legacy', 'audit_logs', 'timestamp');
+DROP TABLE audit_logs_legacy;
+
+CREATE INDEX idx_audit_logs_user_id ON audit_logs(user_id, timestamp);
+CREATE INDEX idx_audit_logs_timestamp ON audit_logs(timestamp);
+CREATE INDEX idx_audit_logs_institution ON audit_logs(institution_id, timestamp);
+CREATE INDEX idx_audit_logs_project_id ON audit_logs(project_id, timestamp) WHERE project_id IS NOT NULL;
+
+-- SCHEDULED MAINTENANCE
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('maintain-log-partitions', '15 0 * * *',
+                              'SELECT * FROM maintain_log_partitions()');
+    ELSE
+        RAISE NOTICE 'pg_cron not installed: schedule SELECT * FROM maintain_log_partitions() externally';
+    END IF;
+END $$;
@@ -0,0 +1,52 @@
+-- GMC Dashboard: Incremental Project Isolation Auditing
+-- High-water marks and stored per-project verification results
+
+-- The isolation auditor scans only rows written since the last run and
+-- records the outcome per project, so isolation validation no longer joins
+-- every analysis session against every parameter change.
+
+-- First transaction id not yet audited for each audited table
+CREATE TABLE isolation_audit_watermarks (
+    table_name VARCHAR(100) PRIMARY KEY,
+    high_water_mark BIGINT NOT NULL,
+    rows_scanned BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Stored per-project verification results served by validation endpoints
+CREATE TABLE project_isolation_verifications (
+    project_id UUID PRIMARY KEY REFERENCES projects(project_id) ON DELETE CASCADE,
+    session_count BIGINT NOT NULL DEFAULT 0,
+    report_count BIGINT NOT NULL DEFAULT 0,
+    parameter_change_count BIGINT NOT NULL DEFAULT 0,
+    contamination_count BIGINT NOT NULL DEFAULT 0,
+    isolation_status VARCHAR(20) NOT NULL DEFAULT 'verified' CHECK (isolation_status IN ('verified', 'contaminated')),
+    last_contamination_at TIMESTAMP,
+    last_verified_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Transaction ids of the writes the auditor scans. Timestamps are taken at
+-- transaction start, so a long transaction could commit rows behind a
+-- time-based watermark; each run instead audits the ids below the oldest
+-- transaction still in flight, which have all committed or aborted
+ALTER TABLE analysis_sessions
+    ADD COLUMN created_txid BIGINT NOT NULL DEFAULT txid_current(),
+    ADD COLUMN updated_txid BIGINT NOT NULL DEFAULT txid_current();
+ALTER TABLE gmc_reports ADD COLUMN created_txid BIGINT NOT NULL DEFAULT txid_current();
+ALTER TABLE parameter_changes ADD COLUMN created_txid BIGINT NOT NULL DEFAULT txid_current();
+
+CREATE OR REPLACE FUNCTION update_txid_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_txid = txid_current();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER update_analysis_sessions_txid BEFORE UPDATE ON analysis_sessions FOR EACH ROW EXECUTE FUNCTION update_txid_column();
+
+-- Incremental scans read by transaction id range
+CREATE INDEX idx_analysis_sessions_created_txid ON analysis_sessions(created_txid);
+CREATE INDEX idx_analysis_sessions_updated_txid ON analysis_sessions(updated_txid);
+CREATE INDEX idx_gmc_reports_created_txid ON gmc_reports(created_txid);
+CREATE INDEX idx_parameter_changes_created_txid ON parameter_changes(created_txid);
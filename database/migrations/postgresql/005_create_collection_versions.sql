@@ -0,0 +1,37 @@
+-- GMC Dashboard: Collection Versions
+-- Cheap per-project versions for ETag revalidation of polled lists
+
+-- Session and report lists answer If-None-Match from a per-project counter
+-- bumped by row triggers in the writing transaction. The bump holds the
+-- counter row lock until commit, so versions follow commit order and are
+-- visible together with the rows they count; a MAX(updated_at) version uses
+-- transaction-start timestamps and misses rows from late-committing writers.
+
+CREATE TABLE project_collection_versions (
+    project_id UUID NOT NULL REFERENCES projects(project_id) ON DELETE CASCADE,
+    resource VARCHAR(20) NOT NULL CHECK (resource IN ('sessions', 'reports')),
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, resource)
+);
+
+-- Rows deleted by a project's cascade find no project and bump nothing
+CREATE OR REPLACE FUNCTION bump_collection_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO project_collection_versions (project_id, resource, version)
+    SELECT project_id, TG_ARGV[0], 1
+    FROM projects
+    WHERE project_id = CASE WHEN TG_OP = 'DELETE' THEN OLD.project_id ELSE NEW.project_id END
+    ON CONFLICT (project_id, resource)
+    DO UPDATE SET version = project_collection_versions.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER bump_analysis_sessions_version
+    AFTER INSERT OR UPDATE OR DELETE ON analysis_sessions
+    FOR EACH ROW EXECUTE FUNCTION bump_collection_version('sessions');
+
+CREATE TRIGGER bump_gmc_reports_version
+    AFTER INSERT OR UPDATE OR DELETE ON gmc_reports
+    FOR EACH ROW EXECUTE FUNCTION bump_collection_version('reports');
@@ -0,0 +1,13 @@
+-- GMC Dashboard: Contaminated Session Tracking
+-- One row per session found referenced from another project
+
+-- The isolation auditor re-audits sessions whenever they are updated, so
+-- contamination is recorded per session and counted only the first time it
+-- is detected instead of on every later update.
+
+CREATE TABLE isolation_contaminated_sessions (
+    project_id UUID NOT NULL REFERENCES projects(project_id) ON DELETE CASCADE,
+    session_id UUID NOT NULL,
+    detected_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (project_id, session_id)
+);
@@ -10,16 +10,69 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
 import logging
 import os
+import sys
+import threading
 from datetime import datetime
+from typing import Dict, Tuple
+
+import redis
+import requests
+
+# Shared libraries live at the repository root locally and in /app/shared in images
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..")))
+
+from shared.python.observability import (  # noqa: E402
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RedisProfileStore,
+    TracingMiddleware,
+    inject_headers,
+    start_span,
+    track_llm_call,
+)
+from shared.python.ratelimit import (  # noqa: E402
+    DEFAULT_POLICIES,
+    ENDPOINT,
+    RateLimitMiddleware,
+    RateLimitPolicy,
+    create_rate_limiter,
+)
+from shared.python.responses import ResponseMiddleware  # noqa: E402
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-key")
 app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "jwt-secret-key")
 
+# OpenAI-compatible chat completions endpoint (hosted, local model or the load-test
+# stub); without it the coach answers with a placeholder
+app.config["LLM_API_BASE"] = os.environ.get("LLM_API_BASE", "")
+app.config["LLM_PROVIDER"] = os.environ.get("LLM_PROVIDER", "openai-compatible")
+app.config["LLM_MODEL"] = os.environ.get("LLM_MODEL", "gmc-coach")
+# Provider credential, sent as a bearer token; only the load-test stub may be
+# called without one (LLM_ALLOW_UNAUTHENTICATED)
+app.config["LLM_API_KEY"] = os.environ.get("LLM_API_KEY", "")
+app.config["LLM_ALLOW_UNAUTHENTICATED"] = (
+    os.environ.get("LLM_ALLOW_UNAUTHENTICATED", "false").lower() == "true"
+)
+app.config["LLM_CONNECT_TIMEOUT_SECONDS"] = float(os.environ.get("LLM_CONNECT_TIMEOUT_SECONDS", 3))
+app.config["LLM_TIMEOUT_SECONDS"] = float(os.environ.get("LLM_TIMEOUT_SECONDS", 30))
+# A provider call holds its gunicorn thread until the reply arrives, so calls
+# are capped at three quarters of the worker's threads (WEB_THREADS, set by
+# gunicorn.conf.py) to keep threads for health checks and history reads; 0
+# disables the cap for the development server
+_web_threads = int(os.environ.get("WEB_THREADS", 0))
+app.config["MAX_CONCURRENT_LLM_CALLS"] = int(
+    os.environ.get("MAX_CONCURRENT_LLM_CALLS", max(_web_threads * 3 // 4, 1) if _web_threads else 0)
+)
+
 # MongoDB configuration
 MONGODB_URL = os.environ.get("MONGODB_URL", "mongodb://localhost:27017/gmc_coaching")
 
+# Redis shares rate limit budgets between workers when configured
+REDIS_URL = os.environ.get("REDIS_URL")
+redis_client = redis.Redis.from_url(REDIS_URL) if REDIS_URL else None
+
 # Initialize extensions
 cors = CORS(app)
 jwt = JWTManager(app)
@@ -38,6 +91,28 @@ SERVICE_INFO = {
     "status": "active",
 }
 
+metrics = MetricsMiddleware(app, SERVICE_INFO["name"])
+tracing = TracingMiddleware(app, SERVICE_INFO["name"])
+# Profiles and the sample percentage are shared by all workers when Redis is configured
+profiler = ProfilingMiddleware(
+    app,
+    SERVICE_INFO["name"],
+    RedisProfileStore(redis_client, SERVICE_INFO["name"]) if redis_client is not None else None,
+)
+# Fast JSON (orjson), MessagePack on request and Brotli/gzip for large bodies
+responses = ResponseMiddleware(app)
+# Each chat is an LLM call: per-user chat budgets plus a service-wide provider budget
+rate_limits = RateLimitMiddleware(
+    app,
+    SERVICE_INFO["name"],
+    create_rate_limiter(redis_client),
+    policies=DEFAULT_POLICIES
+    + (
+        RateLimitPolicy("user-chat", limit=20, period=60, endpoints=("*/chat",)),
+        RateLimitPolicy("llm", limit=1200, period=60, scope=ENDPOINT, endpoints=("*/chat",)),
+    ),
+)
+
 
 @app.route("/health", methods=["GET"])
 def health_check():
@@ -84,6 +159,17 @@ def service_info():
                 {"path": "/health", "method": "GET", "description": "Health check"},
                 {"path": "/health/ready", "method": "GET", "description": "Readiness check"},
                 {"path": "/api/v1/info", "method": "GET", "description": "Service information"},
+                {"path": "/metrics", "method": "GET", "description": "Prometheus metrics"},
+                {
+                    "path": "/admin/profiling",
+                    "method": "GET, PUT",
+                    "description": "Profiling sample percentage and profiled routes (admin)",
+                },
+                {
+                    "path": "/admin/profiling/flamegraph",
+                    "method": "GET, DELETE",
+                    "description": "Aggregated flame-graph data by route and project (admin)",
+                },
                 {
                     "path": "/api/v1/projects/{project_id}/chat",
                     "method": "POST",
@@ -106,11 +192,72 @@ def service_info():
                 "Educational context awareness",
                 "Individual user API key management",
                 "Budget controls and usage tracking",
+                "Prometheus metrics",
+                "Distributed tracing",
+                "On-demand request profiling",
+                "Compressed JSON and MessagePack responses",
+                "Per-user chat and service-wide LLM rate limits",
             ],
         }
     )
 
 
+# Provider calls in flight in this worker
+_llm_calls = (
+    threading.BoundedSemaphore(app.config["MAX_CONCURRENT_LLM_CALLS"])
+    if app.config["MAX_CONCURRENT_LLM_CALLS"]
+    else None
+)
+
+
+def llm_headers() -> Dict[str, str]:
+    """
+    Request headers for the chat completions endpoint.
+
+    Returns:
+        Trace propagation headers plus the provider credential, when configured
+    """
+    headers = inject_headers()
+    if app.config["LLM_API_KEY"]:
+        headers["Authorization"] = f"Bearer {app.config['LLM_API_KEY']}"
+    return headers
+
+
+def complete_chat(message: str) -> Tuple[str, Dict[str, int]]:
+    """
+    Ask the configured chat completions endpoint for a coaching reply.
+
+    Args:
+        message: Student message
+
+    Returns:
+        Reply text and token usage (prompt_tokens, completion_tokens)
+
+    Raises:
+        requests.RequestException: If the provider is unreachable or returns an error
+        KeyError: If the reply is not a chat completion
+    """
+    response = requests.post(
+        f"{app.config['LLM_API_BASE'].rstrip('/')}/v1/chat/completions",
+        json={
+            "model": app.config["LLM_MODEL"],
+            "messages": [
+                {"role": "system", "content": "You are a GMC business simulation coach."},
+                {"role": "user", "content": message},
+            ],
+        },
+        headers=llm_headers(),
+        timeout=(app.config["LLM_CONNECT_TIMEOUT_SECONDS"], app.config["LLM_TIMEOUT_SECONDS"]),
+    )
+    response.raise_for_status()
+    body = response.json()
+    usage = body.get("usage") or {}
+    return body["choices"][0]["message"]["content"], {
+        "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or 0),
+    }
+
+
 @app.route("/api/v1/projects/<project_id>/chat", methods=["POST"])
 @jwt_required()
 def send_chat_message(project_id: str):
@@ -130,15 +277,63 @@ def send_chat_message(project_id: str):
     # TODO: Query user's preferred LLM provider
     # TODO: Generate AI response with educational context
 
+    provider = app.config["LLM_PROVIDER"] if app.config["LLM_API_BASE"] else "placeholder"
+    model = app.config["LLM_MODEL"] if app.config["LLM_API_BASE"] else "placeholder"
+
+    if app.config["LLM_API_BASE"] and not (
+        app.config["LLM_API_KEY"] or app.config["LLM_ALLOW_UNAUTHENTICATED"]
+    ):
+        logger.error("LLM_API_BASE is set without LLM_API_KEY; refusing unauthenticated calls")
+        return (
+            jsonify(
+                {
+                    "error": "LLM provider not configured",
+                    "message": "The provider credential (LLM_API_KEY) is missing",
+                }
+            ),
+            503,
+        )
+    limited = _llm_calls is not None and bool(app.config["LLM_API_BASE"])
+    if limited and not _llm_calls.acquire(blocking=False):
+        response = jsonify(
+            {"error": "Coach busy", "message": "Too many coaching chats in progress, retry shortly"}
+        )
+        response.headers["Retry-After"] = "5"
+        return response, 503
+
+    # Provider calls are timed, traced and their token usage counted for /metrics
+    try:
+        with (
+            track_llm_call(provider, model) as usage,
+            start_span(
+                f"llm {provider}",
+                kind="client",
+                attributes={"llm.provider": provider, "gmc.project_id": project_id},
+            ) as span,
+        ):
+            if app.config["LLM_API_BASE"]:
+                ai_response, reported = complete_chat(message)
+                usage.update(reported)
+            else:
+                ai_response = "AI coaching response - placeholder"
+            span.set_attribute("llm.prompt_tokens", usage["prompt_tokens"])
+            span.set_attribute("llm.completion_tokens", usage["completion_tokens"])
+    except (requests.RequestException, KeyError, IndexError, ValueError) as e:
+        logger.error(f"LLM provider call failed for project {project_id}: {e}")
+        return jsonify({"error": "LLM provider unavailable", "message": str(e)}), 502
+    finally:
+        if limited:
+            _llm_calls.release()
+
     # Placeholder response
     return jsonify(
         {
             "project_id": project_id,
             "user": current_user,
             "user_message": message,
-            "ai_response": "AI coaching response - placeholder",
+            "ai_response": ai_response,
             "conversation_id": f"conv_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-            "provider": "placeholder",
+            "provider": provider,
             "timestamp": datetime.utcnow().isoformat(),
             "note": "Full AI conversation to be implemented in next story",
         }
@@ -192,6 +387,20 @@ def configure_llm_provider():
     )
 
 
+def create_app() -> Flask:
+    """
+    Application factory for the WSGI server (see app/wsgi.py and gunicorn.conf.py).
+
+    Routes, extensions and middleware are registered when this module is
+    imported. The factory runs in the pre-fork master, so workers inherit
+    the imported application copy-on-write.
+
+    Returns:
+        The configured application
+    """
+    return app
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5002))
     debug = os.environ.get("FLASK_ENV") == "development"
@@ -199,4 +408,4 @@ if __name__ == "__main__":
     logger.info(f"Starting {SERVICE_INFO['name']} on port {port}")
     logger.info(f"Debug mode: {debug}")
 
-    app.run(host="0.0.0.0", port=port, debug=debug)
+    create_app().run(host="0.0.0.0", port=port, debug=debug)
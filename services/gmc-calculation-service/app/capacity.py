@@ -0,0 +1,364 @@
+"""
+Machine-Shop and Assembly Capacity Planner
+
+Capacity side of the Cost of Production sheets: machine hours per shift
+level, assembly hours including weekend overtime, materials and subcontracted
+components. Two entry points:
+
+- check_feasibility: instant headroom check of a delivery plan against a
+  cached capacity profile, used for interactive delivery edits.
+- plan_production: small linear program choosing the cheapest combination of
+  shift level, in-house machining, subcontracting and overtime that meets the
+  production target (or the largest feasible mix when it cannot be met).
+
+Capacity profiles are cached per (machines, workforce, shift) together with
+the wage rate and assembly times they are priced with.
+"""
+
+from functools import lru_cache
+import copy
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.optimize import linprog
+
+from app.quarter_model import (
+    ASSEMBLY_SATURDAY_HOURS,
+    ASSEMBLY_SUNDAY_HOURS,
+    ASSEMBLY_WEEKDAY_HOURS,
+    EMERGENCY_MATERIALS_PREMIUM,
+    EXCHANGE_RATE,
+    MACHINE_EFFICIENCY,
+    MACHINE_HOURS_PER_SHIFT,
+    MACHINE_MINUTES,
+    MACHINE_RUNNING_COST_PER_HOUR,
+    MACHINIST_WAGE_FACTOR,
+    MACHINISTS_PER_MACHINE,
+    MATERIALS_PER_UNIT,
+    PRODUCTS,
+    SATURDAY_RATE,
+    SHIFT_PREMIUM,
+    SPOT_PRICE_USD_PER_1000,
+    SUBCONTRACT_COST,
+    SUNDAY_RATE,
+    SUPERVISION_COST_PER_SHIFT,
+)
+
+# Cost per unit of target left unmet; large enough that meeting the target
+# always beats any combination of shifts, subcontracting and overtime
+UNMET_PENALTY = 1e5
+
+PROFILE_CACHE_SIZE = 1024
+PLAN_CACHE_SIZE = 4096
+
+
+class CapacityProfile:
+    """Capacity and marginal costs of one (machines, workforce, shift) setup."""
+
+    __slots__ = (
+        "machines",
+        "workers",
+        "shift_level",
+        "machine_hours",
+        "weekday_hours",
+        "saturday_hours",
+        "sunday_hours",
+        "hours_per_component",
+        "assembly_hours_per_unit",
+        "machining_cost_per_component",
+        "materials_cost_per_component",
+        "saturday_cost_per_hour",
+        "sunday_cost_per_hour",
+        "fixed_cost",
+    )
+
+    def __init__(
+        self,
+        machines: int,
+        workers: int,
+        shift_level: int,
+        wage_rate_cents: int,
+        assembly_minutes: Tuple[float, float, float],
+    ):
+        wage = wage_rate_cents / 100.0
+        shift = shift_level - 1
+        self.machines = machines
+        self.workers = workers
+        self.shift_level = shift_level
+        self.machine_hours = machines * MACHINE_HOURS_PER_SHIFT[shift]
+        self.weekday_hours = workers * ASSEMBLY_WEEKDAY_HOURS
+        self.saturday_hours = workers * ASSEMBLY_SATURDAY_HOURS
+        self.sunday_hours = workers * ASSEMBLY_SUNDAY_HOURS
+        self.hours_per_component = MACHINE_MINUTES / 60.0 / MACHINE_EFFICIENCY
+        self.assembly_hours_per_unit = np.asarray(assembly_minutes, dtype=float) / 60.0
+
+        machinist_rate = (
+            MACHINISTS_PER_MACHINE * wage * MACHINIST_WAGE_FACTOR * (1.0 + SHIFT_PREMIUM[shift])
+        )
+        self.machining_cost_per_component = self.hours_per_component * (
+            MACHINE_RUNNING_COST_PER_HOUR + machinist_rate
+        )
+        self.materials_cost_per_component = (
+            MATERIALS_PER_UNIT * SPOT_PRICE_USD_PER_1000 * EXCHANGE_RATE / 1000.0
+        )
+        self.saturday_cost_per_hour = wage * SATURDAY_RATE
+        self.sunday_cost_per_hour = wage * SUNDAY_RATE
+        # Weekday assembly wages are paid whatever the output
+        self.fixed_cost = SUPERVISION_COST_PER_SHIFT[shift] + self.weekday_hours * wage
+
+    @property
+    def assembly_hours(self) -> float:
+        """Assembly hours including all weekend overtime."""
+        return self.weekday_hours + self.saturday_hours + self.sunday_hours
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the profile for API responses."""
+        return {
+            "machines": self.machines,
+            "assembly_workers": self.workers,
+            "shift_level": self.shift_level,
+            "machine_hours": round(float(self.machine_hours), 2),
+            "assembly_hours": {
+                "weekday": round(float(self.weekday_hours), 2),
+                "saturday": round(float(self.saturday_hours), 2),
+                "sunday": round(float(self.sunday_hours), 2),
+            },
+        }
+
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def capacity_profile(
+    machines: int,
+    workers: int,
+    shift_level: int,
+    wage_rate_cents: int = 1200,
+    assembly_minutes: Tuple[float, float, float] = (115.0, 165.0, 325.0),
+) -> CapacityProfile:
+    """
+    Get the cached capacity profile for a setup.
+
+    Args:
+        machines: Machines available
+        workers: Assembly workers
+        shift_level: Shift level (1-3)
+        wage_rate_cents: Assembly wage rate in cents per hour
+        assembly_minutes: Assembly minutes per product
+
+    Returns:
+        CapacityProfile (shared; do not mutate)
+    """
+    if shift_level not in (1, 2, 3):
+        raise ValueError(f"shift_level must be 1, 2 or 3, got {shift_level}")
+    return CapacityProfile(machines, workers, shift_level, wage_rate_cents, assembly_minutes)
+
+
+def check_feasibility(
+    units: Sequence[float],
+    profile: CapacityProfile,
+    component_stock: Optional[Sequence[float]] = None,
+) -> Dict[str, Any]:
+    """
+    Check a production quantity against a capacity profile without solving.
+
+    Args:
+        units: Units to assemble per product
+        profile: Capacity profile to check against
+        component_stock: Components already available per product
+
+    Returns:
+        Hours required and available, utilisation and the largest feasible
+        uniform scaling of the requested quantities
+    """
+    units = np.maximum(np.asarray(units, dtype=float), 0.0)
+    stock = np.asarray(component_stock if component_stock is not None else np.zeros(3), dtype=float)
+    to_machine = np.maximum(units - stock, 0.0)
+
+    machine_required = float(to_machine @ profile.hours_per_component)
+    assembly_required = float(units @ profile.assembly_hours_per_unit)
+    machine_ratio = machine_required / profile.machine_hours if profile.machine_hours else np.inf
+    assembly_ratio = (
+        assembly_required / profile.assembly_hours if profile.assembly_hours else np.inf
+    )
+    limiting = max(machine_ratio, assembly_ratio)
+
+    return {
+        "feasible": bool(limiting <= 1.0),
+        "machine_hours": {
+            "required": round(machine_required, 2),
+            "available": round(float(profile.machine_hours), 2),
+            "utilisation": round(float(machine_ratio), 4),
+        },
+        "assembly_hours": {
+            "required": round(assembly_required, 2),
+            "available": round(float(profile.assembly_hours), 2),
+            "overtime": round(max(assembly_required - float(profile.weekday_hours), 0.0), 2),
+            "utilisation": round(float(assembly_ratio), 4),
+        },
+        "bottleneck": "machining" if machine_ratio >= assembly_ratio else "assembly",
+        "max_feasible_scale": round(float(1.0 / limiting), 4) if limiting > 1.0 else 1.0,
+    }
+
+
+def _solve_shift(
+    profile: CapacityProfile,
+    target: np.ndarray,
+    component_stock: np.ndarray,
+    materials_stock: float,
+    allow_subcontract: bool,
+) -> Dict[str, Any]:
+    """
+    Cheapest production plan for one shift level.
+
+    Variables: machined (3), subcontracted (3), unmet (3), Saturday hours,
+    Sunday hours, emergency materials.
+    """
+    spot = SPOT_PRICE_USD_PER_1000 * EXCHANGE_RATE / 1000.0
+    cost = np.concatenate(
+        [
+            profile.machining_cost_per_component + profile.materials_cost_per_component,
+            SUBCONTRACT_COST,
+            np.full(3, UNMET_PENALTY),
+            [profile.saturday_cost_per_hour, profile.sunday_cost_per_hour],
+            [spot * EMERGENCY_MATERIALS_PREMIUM],
+        ]
+    )
+
+    needed = np.maximum(target - component_stock, 0.0)
+    zeros = np.zeros(3)
+    eye = np.eye(3)
+    a_ub = np.vstack(
+        [
+            # machined + subcontracted + unmet >= components still needed
+            np.hstack([-eye, -eye, -eye, np.zeros((3, 3))]),
+            # machine hours
+            np.concatenate([profile.hours_per_component, zeros, zeros, [0, 0, 0]]),
+            # assembly of the met target within weekday hours plus overtime
+            np.concatenate([zeros, zeros, -profile.assembly_hours_per_unit, [-1, -1, 0]]),
+            # materials from stock plus emergency purchases
+            np.concatenate([MATERIALS_PER_UNIT, zeros, zeros, [0, 0, -1]]),
+        ]
+    )
+    b_ub = np.concatenate(
+        [
+            -needed,
+            [profile.machine_hours],
+            [profile.weekday_hours - float(target @ profile.assembly_hours_per_unit)],
+            [materials_stock],
+        ]
+    )
+    subcontract_bound = (0, None) if allow_subcontract else (0, 0)
+    bounds = (
+        [(0, None)] * 3
+        + [subcontract_bound] * 3
+        + [(0, t) for t in target]
+        + [(0, profile.saturday_hours), (0, profile.sunday_hours), (0, None)]
+    )
+
+    result = linprog(cost, A_ub=a_ub, b_ub=b_ub, bounds=bounds, method="highs")
+    if not result.success:
+        raise RuntimeError(f"Capacity LP failed for shift {profile.shift_level}: {result.message}")
+
+    x = result.x
+    machined, subcontracted, unmet = x[0:3], x[3:6], x[6:9]
+    saturday, sunday, emergency = x[9], x[10], x[11]
+    variable_cost = float(cost[:6] @ x[:6] + cost[9:] @ x[9:])
+    return {
+        "shift_level": profile.shift_level,
+        "feasible": bool(unmet.sum() < 0.5),
+        "total_cost": round(variable_cost + float(profile.fixed_cost), 2),
+        "production": {
+            product: round(float(target[j] - unmet[j]), 2) for j, product in enumerate(PRODUCTS)
+        },
+        "unmet": {product: round(float(unmet[j]), 2) for j, product in enumerate(PRODUCTS)},
+        "machined": {product: round(float(machined[j]), 2) for j, product in enumerate(PRODUCTS)},
+        "subcontracted": {
+            product: round(float(subcontracted[j]), 2) for j, product in enumerate(PRODUCTS)
+        },
+        "overtime_hours": {
+            "saturday": round(float(saturday), 2),
+            "sunday": round(float(sunday), 2),
+        },
+        "emergency_materials": round(float(emergency), 2),
+        "machine_hours_used": round(float(machined @ profile.hours_per_component), 2),
+    }
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _plan_cached(
+    machines: int,
+    workers: int,
+    shift_levels: Tuple[int, ...],
+    wage_rate_cents: int,
+    assembly_minutes: Tuple[float, float, float],
+    target: Tuple[float, float, float],
+    component_stock: Tuple[float, float, float],
+    materials_stock: float,
+    allow_subcontract: bool,
+) -> Dict[str, Any]:
+    options = [
+        _solve_shift(
+            capacity_profile(machines, workers, shift, wage_rate_cents, assembly_minutes),
+            np.asarray(target),
+            np.asarray(component_stock),
+            materials_stock,
+            allow_subcontract,
+        )
+        for shift in shift_levels
+    ]
+    # Meeting more of the target first, then cost
+    best = min(options, key=lambda option: (sum(option["unmet"].values()), option["total_cost"]))
+    return {"recommended": best, "options": options}
+
+
+def plan_production(
+    target: Sequence[float],
+    machines: int,
+    workers: int,
+    shift_level: Optional[int] = None,
+    wage_rate_cents: int = 1200,
+    assembly_minutes: Sequence[float] = (115.0, 165.0, 325.0),
+    component_stock: Optional[Sequence[float]] = None,
+    materials_stock: float = 0.0,
+    allow_subcontract: bool = True,
+) -> Dict[str, Any]:
+    """
+    Find the cheapest way to produce a target quantity.
+
+    Subcontracted components must be ordered two quarters ahead, so a plan
+    that relies on subcontracting is a recommendation for the order placed
+    now for the target quarter.
+
+    Args:
+        target: Units to produce per product
+        machines: Machines available
+        workers: Assembly workers
+        shift_level: Fixed shift level, or None to choose the cheapest
+        wage_rate_cents: Assembly wage rate in cents per hour
+        assembly_minutes: Assembly minutes per product
+        component_stock: Components already available per product
+        materials_stock: Materials in stock (units)
+        allow_subcontract: Whether subcontracting may be used
+
+    Returns:
+        Recommended plan and the plan for every shift level considered
+    """
+    plan = _plan_cached(
+        int(machines),
+        int(workers),
+        (int(shift_level),) if shift_level else (1, 2, 3),
+        int(wage_rate_cents),
+        tuple(float(m) for m in assembly_minutes),
+        tuple(float(max(t, 0.0)) for t in target),
+        tuple(float(c) for c in (component_stock if component_stock is not None else (0, 0, 0))),
+        float(materials_stock),
+        bool(allow_subcontract),
+    )
+    return copy.deepcopy(plan)
+
+
+def cache_info() -> Dict[str, Dict[str, int]]:
+    """Hit/miss statistics of the profile and plan caches."""
+    return {
+        "profiles": capacity_profile.cache_info()._asdict(),
+        "plans": _plan_cached.cache_info()._asdict(),
+    }
@@ -0,0 +1,144 @@
+"""
+Cash-Flow Timing Engine
+
+Schedules customer receipts and supplier payments across quarters by credit
+terms (Receipts & Receivables K12:T25 and Payments & Payables L1:W22).
+
+Each flow category has a term kernel: the share of a quarter's amount that
+is settled in the same quarter, the next quarter, and so on. A schedule is
+the convolution of the per-quarter flows with their kernels, so receipts,
+payments and the balances still outstanding are computed for a whole batch
+of scenarios at once instead of cell by cell. The quarter model advances the
+same kernels one quarter at a time with settle_quarter.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Receipts by market: Europe collects a third in the quarter of sale, NAFTA
+# the quarter after, Internet sales are paid on order
+RECEIPT_KERNELS = np.array(
+    [
+        [0.33, 0.67],
+        [0.0, 1.0],
+        [1.0, 0.0],
+    ]
+)
+
+# Payments by cost category
+PAYMENT_CATEGORIES = ("wages", "overheads", "materials", "development", "suppliers")
+PAYMENT_KERNELS = np.array(
+    [
+        [1.0, 0.0],  # assembly and machinist wages
+        [1.0, 0.0],  # machine running, quality control, management, fixed overheads
+        [0.5, 0.5],  # materials: half on delivery, half on credit
+        [0.0, 1.0],  # advertising, website and product development
+        [0.0, 1.0],  # maintenance, hired transport, subcontracted components
+    ]
+)
+
+# Corporation tax is assessed on a quarter's profit and paid the quarter after
+TAX_KERNEL = np.array([[0.0, 1.0]])
+
+# Quarters over which a flow is settled (all kernels share this width)
+TERM_QUARTERS = RECEIPT_KERNELS.shape[1]
+
+
+def convolve_terms(flows: np.ndarray, kernels: np.ndarray) -> np.ndarray:
+    """
+    Spread per-quarter flows over the quarters they are settled in.
+
+    Args:
+        flows: (..., T, C) amounts arising per quarter and category
+        kernels: (C, K) share of an amount settled K quarters later
+
+    Returns:
+        (..., T + K - 1, C) amounts settled per quarter and category
+    """
+    quarters = flows.shape[-2]
+    width = kernels.shape[1]
+    settled = np.zeros(flows.shape[:-2] + (quarters + width - 1, flows.shape[-1]))
+    for lag in range(width):
+        settled[..., lag : lag + quarters, :] += flows * kernels[:, lag]
+    return settled
+
+
+def settle_quarter(
+    flows: np.ndarray, kernels: np.ndarray, carried: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Advance a batch of settlement pipelines by one quarter.
+
+    Args:
+        flows: (B, C) amounts arising this quarter per category
+        kernels: (C, K) term kernels
+        carried: (B, K - 1) amounts already due in each of the coming quarters
+
+    Returns:
+        Tuple of the (B,) amount settled this quarter and the (B, K - 1)
+        amounts due in the following quarters
+    """
+    spread = flows @ kernels
+    settled = carried[:, 0] + spread[:, 0]
+    outstanding = spread[:, 1:].copy()
+    outstanding[:, :-1] += carried[:, 1:]
+    return settled, outstanding
+
+
+def cash_flow_schedule(
+    sales: np.ndarray,
+    costs: np.ndarray,
+    opening_cash: np.ndarray,
+    opening_receivables: Optional[np.ndarray] = None,
+    opening_payables: Optional[np.ndarray] = None,
+    other: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Receipts, payments, balances and cash position for a batch of scenarios.
+
+    Opening receivables and payables are collected and paid in the first
+    quarter, matching the one-quarter credit terms of the kernels.
+
+    Args:
+        sales: (S, T, 3) sales revenue per quarter and market
+        costs: (S, T, len(PAYMENT_CATEGORIES)) costs incurred per quarter
+        opening_cash: (S,) cash at the start of the first quarter
+        opening_receivables: (S,) trade receivables at the start
+        opening_payables: (S,) trade payables at the start
+        other: (S, T) other cash movements (loans, investment, dividends)
+
+    Returns:
+        Per-quarter (S, T) receipts, payments, receivables, payables and cash,
+        plus receipts by market and payments by category
+    """
+    scenarios, quarters = sales.shape[:2]
+    zeros = np.zeros(scenarios)
+    opening_receivables = zeros if opening_receivables is None else opening_receivables
+    opening_payables = zeros if opening_payables is None else opening_payables
+
+    receipts_by_market = convolve_terms(sales, RECEIPT_KERNELS)[:, :quarters]
+    payments_by_category = convolve_terms(costs, PAYMENT_KERNELS)[:, :quarters]
+    receipts = receipts_by_market.sum(axis=2)
+    payments = payments_by_category.sum(axis=2)
+    if quarters:
+        receipts[:, 0] += opening_receivables
+        payments[:, 0] += opening_payables
+
+    receivables = opening_receivables[:, None] + np.cumsum(sales.sum(axis=2) - receipts, axis=1)
+    payables = opening_payables[:, None] + np.cumsum(costs.sum(axis=2) - payments, axis=1)
+
+    movement = receipts - payments
+    if other is not None:
+        movement = movement + other
+    cash = opening_cash[:, None] + np.cumsum(movement, axis=1)
+
+    return {
+        "receipts": receipts,
+        "payments": payments,
+        "receipts_by_market": receipts_by_market,
+        "payments_by_category": payments_by_category,
+        "receivables": receivables,
+        "payables": payables,
+        "cash": cash,
+    }
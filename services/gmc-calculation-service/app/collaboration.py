@@ -0,0 +1,440 @@
+"""
+Real-Time Collaboration Gateway
+
+Fans decision parameter changes, and the key outputs recalculated from them,
+out to every teammate connected to a project.
+
+Storage follows the Redis design in
+database/migrations/redis/001_setup_redis_structures.txt:
+
+    STREAM project:{project_id}:parameter_changes   change events
+    HASH   project:{project_id}:connections         user_id -> connection id
+    SET    project:{project_id}:active_users        connected users (expires when idle)
+
+Each process runs one pump thread per project with open connections. The
+pump reads the change stream and coalesces everything that arrives within a
+frame interval: per frame, every touched session is recalculated once and a
+single message carrying only the parameters and outputs that changed is
+queued for each connection. A team dragging sliders together therefore costs
+one recalculation per session and one message per teammate per frame, not
+one per change per teammate.
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Coalescing window: at most one message per connection per frame
+DEFAULT_FRAME_SECONDS = 0.1
+
+# Approximate length the change stream is trimmed to
+STREAM_MAXLEN = 10000
+
+# Presence expiry from the Redis design (5 minutes)
+PRESENCE_TTL_SECONDS = 300
+
+# Messages buffered per connection before it is resynchronised with a snapshot
+OUTBOX_SIZE = 64
+
+# (flattened decision parameters, key outputs) of one session
+Snapshot = Tuple[Dict[str, Any], Dict[str, Any]]
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    """Compact JSON for the wire."""
+    return json.dumps(message, separators=(",", ":"), default=str)
+
+
+def delta(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Entries of current that differ from previous.
+
+    Args:
+        previous: Values last sent
+        current: Values now
+
+    Returns:
+        Changed and added entries, and None for removed ones
+    """
+    changed = {key: value for key, value in current.items() if previous.get(key) != value}
+    changed.update({key: None for key in previous if key not in current})
+    return changed
+
+
+class LocalChangeStream:
+    """Process-local change stream used when Redis is not configured."""
+
+    def __init__(self, maxlen: int = STREAM_MAXLEN):
+        self._events: List[Dict[str, Any]] = []
+        self._offset = 0  # number of events trimmed from the front
+        self._maxlen = maxlen
+        self._condition = threading.Condition()
+
+    def publish(self, event: Dict[str, Any]) -> str:
+        """Append an event and return its id."""
+        with self._condition:
+            self._events.append(event)
+            if len(self._events) > self._maxlen:
+                trimmed = len(self._events) - self._maxlen
+                del self._events[:trimmed]
+                self._offset += trimmed
+            self._condition.notify_all()
+            return str(self._offset + len(self._events))
+
+    def tail(self) -> str:
+        """Id of the latest event."""
+        with self._condition:
+            return str(self._offset + len(self._events))
+
+    def read(self, last_id: str, timeout: float) -> Tuple[str, List[Dict[str, Any]]]:
+        """Events after last_id and the new last id, waiting up to timeout seconds."""
+        with self._condition:
+            end = self._offset + len(self._events)
+            position = int(last_id)
+            if position >= end and timeout > 0:
+                self._condition.wait(timeout)
+                end = self._offset + len(self._events)
+            return str(end), self._events[max(position - self._offset, 0) :]
+
+
+class RedisChangeStream:
+    """Change stream backed by project:{project_id}:parameter_changes."""
+
+    def __init__(self, redis_client, project_id: str, maxlen: int = STREAM_MAXLEN):
+        self.redis = redis_client
+        self.key = f"project:{project_id}:parameter_changes"
+        self.maxlen = maxlen
+
+    def publish(self, event: Dict[str, Any]) -> str:
+        """Append an event (values JSON-encoded) and return its id."""
+        fields = {name: json.dumps(value, default=str) for name, value in event.items()}
+        entry_id = self.redis.xadd(self.key, fields, maxlen=self.maxlen, approximate=True)
+        return entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+
+    def tail(self) -> str:
+        """Id of the latest event ("0-0" for an empty stream)."""
+        latest = self.redis.xrevrange(self.key, count=1)
+        if not latest:
+            return "0-0"
+        entry_id = latest[0][0]
+        return entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+
+    def read(self, last_id: str, timeout: float) -> Tuple[str, List[Dict[str, Any]]]:
+        """Events after last_id and the new last id, blocking up to timeout seconds."""
+        block = max(int(timeout * 1000), 1)
+        response = self.redis.xread({self.key: last_id}, block=block, count=1000)
+        events = []
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                last_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+                events.append(
+                    {
+                        (name.decode() if isinstance(name, bytes) else name): json.loads(value)
+                        for name, value in fields.items()
+                    }
+                )
+        return last_id, events
+
+
+class Connection:
+    """One teammate's WebSocket, fed through a bounded outbox."""
+
+    def __init__(self, project_id: str, user_id: str, outbox_size: int = OUTBOX_SIZE):
+        self.id = uuid.uuid4().hex
+        self.project_id = project_id
+        self.user_id = user_id
+        self.outbox: "queue.Queue[str]" = queue.Queue(outbox_size)
+        self.resync = False
+
+    def push(self, message: str) -> None:
+        """Queue a message; a connection that falls behind is resynchronised instead."""
+        try:
+            self.outbox.put_nowait(message)
+        except queue.Full:
+            while not self.outbox.empty():
+                try:
+                    self.outbox.get_nowait()
+                except queue.Empty:
+                    break
+            self.resync = True
+
+    def next_message(self, timeout: float) -> Optional[str]:
+        """Next queued message, or None after timeout seconds."""
+        try:
+            return self.outbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ProjectChannel:
+    """Coalesces one project's change stream into per-frame delta messages."""
+
+    def __init__(
+        self,
+        project_id: str,
+        stream,
+        snapshot: Callable[[str, str], Snapshot],
+        frame_seconds: float = DEFAULT_FRAME_SECONDS,
+        threaded: bool = True,
+    ):
+        """
+        Initialize the channel.
+
+        Args:
+            project_id: Project identifier
+            stream: LocalChangeStream or RedisChangeStream
+            snapshot: Callable returning a session's parameters and key outputs
+            frame_seconds: Coalescing window
+            threaded: Run the pump in a background thread while connections are open
+        """
+        self.project_id = project_id
+        self.stream = stream
+        self.snapshot = snapshot
+        self.frame_seconds = frame_seconds
+        self.threaded = threaded
+
+        self.connections: Dict[str, Connection] = {}
+        self.sessions: Dict[str, Dict[str, Dict[str, Any]]] = {}  # last sent "p" and "o"
+        self.pending: Dict[str, Set[str]] = {}  # session -> users who changed it
+        self.sequence = 0
+        self.last_id = stream.tail()
+        self.stats = {"events": 0, "frames": 0, "recalculations": 0, "messages": 0}
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, connection: Connection) -> None:
+        """Add a connection, send it the current snapshot and start the pump."""
+        with self._lock:
+            self.connections[connection.id] = connection
+            connection.push(self._snapshot_message())
+            if self.threaded and self._thread is None:
+                self.last_id = self.stream.tail()
+                self._thread = threading.Thread(
+                    target=self._run, name=f"collaboration-{self.project_id}", daemon=True
+                )
+                self._thread.start()
+
+    def remove(self, connection: Connection) -> int:
+        """Remove a connection and return how many remain."""
+        with self._lock:
+            self.connections.pop(connection.id, None)
+            return len(self.connections)
+
+    def broadcast(self, message: Dict[str, Any]) -> None:
+        """Queue a message for every connection."""
+        encoded = encode_message(message)
+        with self._lock:
+            for connection in self.connections.values():
+                connection.push(encoded)
+
+    def pump(self, timeout: float) -> int:
+        """
+        Read change events into the pending frame.
+
+        Args:
+            timeout: Seconds to wait for new events
+
+        Returns:
+            Number of events read
+        """
+        self.last_id, events = self.stream.read(self.last_id, timeout)
+        for event in events:
+            session_id = event.get("session_id")
+            if session_id is None:
+                continue
+            self.pending.setdefault(str(session_id), set()).add(str(event.get("user_id") or ""))
+        self.stats["events"] += len(events)
+        return len(events)
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """
+        Recalculate every session touched since the last frame and send the deltas.
+
+        Returns:
+            The frame message sent, or None if nothing changed
+        """
+        pending, self.pending = self.pending, {}
+        changes = {}
+        latest = {}
+        for session_id, users in pending.items():
+            try:
+                parameters, outputs = self.snapshot(self.project_id, session_id)
+            except Exception as e:
+                logger.error(f"Recalculating session {session_id} of {self.project_id} failed: {e}")
+                continue
+            self.stats["recalculations"] += 1
+
+            previous = self.sessions.get(session_id, {"p": {}, "o": {}})
+            session_delta = {
+                "p": delta(previous["p"], parameters),
+                "o": delta(previous["o"], outputs),
+            }
+            latest[session_id] = {"p": parameters, "o": outputs}
+            if session_delta["p"] or session_delta["o"]:
+                changes[session_id] = {**session_delta, "u": sorted(user for user in users if user)}
+
+        if not changes:
+            return None
+
+        with self._lock:
+            self.sessions.update(latest)
+            self.sequence += 1
+            self.stats["frames"] += 1
+            message = {"t": "f", "n": self.sequence, "s": changes}
+            encoded = encode_message(message)
+            for connection in self.connections.values():
+                if connection.resync:
+                    connection.resync = False
+                    connection.push(self._snapshot_message())
+                else:
+                    connection.push(encoded)
+                self.stats["messages"] += 1
+        return message
+
+    def _snapshot_message(self) -> str:
+        return encode_message({"t": "s", "n": self.sequence, "s": self.sessions})
+
+    def _run(self) -> None:
+        next_frame = time.monotonic() + self.frame_seconds
+        while True:
+            with self._lock:
+                if not self.connections:
+                    self._thread = None
+                    return
+            try:
+                self.pump(max(next_frame - time.monotonic(), 0.001))
+            except Exception as e:
+                logger.error(f"Reading changes for {self.project_id} failed: {e}")
+                time.sleep(self.frame_seconds)
+
+            now = time.monotonic()
+            if now >= next_frame:
+                if self.pending:
+                    self.flush()
+                next_frame = now + self.frame_seconds
+
+
+class CollaborationHub:
+    """Project channels, change publishing and presence for one process."""
+
+    def __init__(
+        self,
+        snapshot: Callable[[str, str], Snapshot],
+        redis_client=None,
+        frame_seconds: float = DEFAULT_FRAME_SECONDS,
+        threaded: bool = True,
+    ):
+        """
+        Initialize the hub.
+
+        Args:
+            snapshot: Callable returning a session's parameters and key outputs
+            redis_client: Optional Redis client; process-local streams when None
+            frame_seconds: Coalescing window
+            threaded: Run channel pumps in background threads
+        """
+        self.snapshot = snapshot
+        self.redis = redis_client
+        self.frame_seconds = frame_seconds
+        self.threaded = threaded
+        self.channels: Dict[str, ProjectChannel] = {}
+        self._local_streams: Dict[str, LocalChangeStream] = {}
+        self._lock = threading.Lock()
+
+    def stream(self, project_id: str):
+        """Change stream of a project."""
+        if self.redis is not None:
+            return RedisChangeStream(self.redis, project_id)
+        with self._lock:
+            return self._local_streams.setdefault(project_id, LocalChangeStream())
+
+    def publish(self, project_id: str, event: Dict[str, Any]) -> None:
+        """Append a change event to the project's stream."""
+        event = {**event, "timestamp": event.get("timestamp") or datetime.utcnow().isoformat()}
+        self.stream(project_id).publish(event)
+
+    def channel(self, project_id: str) -> ProjectChannel:
+        """The project's channel, created on first use."""
+        stream = self.stream(project_id)
+        with self._lock:
+            return self._channel(project_id, stream)
+
+    def _channel(self, project_id: str, stream) -> ProjectChannel:
+        if project_id not in self.channels:
+            self.channels[project_id] = ProjectChannel(
+                project_id, stream, self.snapshot, self.frame_seconds, self.threaded
+            )
+        return self.channels[project_id]
+
+    def connect(self, project_id: str, user_id: str) -> Connection:
+        """Register a teammate's connection and announce their presence."""
+        connection = Connection(project_id, user_id)
+        stream = self.stream(project_id)
+        # Under the hub lock, so a concurrent last disconnect cannot drop the channel in between
+        with self._lock:
+            channel = self._channel(project_id, stream)
+            channel.add(connection)
+
+        if self.redis is not None:
+            pipe = self.redis.pipeline()
+            pipe.hset(f"project:{project_id}:connections", user_id, connection.id)
+            pipe.sadd(f"project:{project_id}:active_users", user_id)
+            pipe.expire(f"project:{project_id}:active_users", PRESENCE_TTL_SECONDS)
+            pipe.execute()
+
+        channel.broadcast({"t": "p", "users": self.active_users(project_id)})
+        return connection
+
+    def disconnect(self, connection: Connection) -> None:
+        """
+        Remove a connection and announce the remaining teammates.
+
+        The project's channel, with its session snapshots, is dropped with its
+        last connection; its pump thread exits on its next frame.
+        """
+        project_id = connection.project_id
+        with self._lock:
+            channel = self.channels.get(project_id)
+            if channel is None:
+                return
+            remaining = channel.remove(connection)
+            if remaining == 0:
+                del self.channels[project_id]
+            still_connected = any(
+                c.user_id == connection.user_id for c in list(channel.connections.values())
+            )
+
+        if self.redis is not None and not still_connected:
+            pipe = self.redis.pipeline()
+            pipe.hdel(f"project:{project_id}:connections", connection.user_id)
+            pipe.srem(f"project:{project_id}:active_users", connection.user_id)
+            pipe.execute()
+
+        channel.broadcast({"t": "p", "users": self.active_users(project_id)})
+
+    def heartbeat(self, connection: Connection) -> None:
+        """Keep a long-lived connection's presence from expiring."""
+        if self.redis is None:
+            return
+        pipe = self.redis.pipeline()
+        pipe.sadd(f"project:{connection.project_id}:active_users", connection.user_id)
+        pipe.expire(f"project:{connection.project_id}:active_users", PRESENCE_TTL_SECONDS)
+        pipe.execute()
+
+    def active_users(self, project_id: str) -> List[str]:
+        """Users connected to the project (across processes when Redis is configured)."""
+        if self.redis is not None:
+            members = self.redis.smembers(f"project:{project_id}:active_users")
+            return sorted(m.decode() if isinstance(m, bytes) else m for m in members)
+        channel = self.channels.get(project_id)
+        if channel is None:
+            return []
+        return sorted({c.user_id for c in channel.connections.values()})
@@ -0,0 +1,205 @@
+"""
+Demand-Response Model Fitting
+
+Estimates per-market, per-product demand elasticities from the group
+information of historical reports: every competitor's price, advertising,
+quality signal and sales units for each quarter.
+
+Each (market, product) cell is a log-linear regression of a company's sales
+relative to the group average on its relative price, advertising and quality:
+
+    log(units / mean units) = a + b_price * log(price / mean price)
+                                + b_adv * log((1 + adv) / (1 + mean adv))
+                                + b_quality * (quality - mean quality)
+
+Coefficients are ridge-regularised towards the default elasticities, so a
+project with little history forecasts like the unfitted model. The model
+keeps only the sufficient statistics (X'X, X'y) per cell: ingesting a quarter
+adds its contribution and refitting all nine cells is one batched solve.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.quarter_model import (
+    ADVERTISING_ELASTICITY,
+    MARKETS,
+    PRICE_ELASTICITY,
+    PRODUCTS,
+    parameter_array,
+)
+
+FEATURES = ("intercept", "price", "advertising", "quality")
+
+# Coefficients the regression shrinks towards
+PRIOR_COEFFICIENTS = np.array([0.0, -PRICE_ELASTICITY, ADVERTISING_ELASTICITY, 0.0])
+
+DEFAULT_RIDGE = 0.1
+
+# Minimum observations in a cell before its fit is reported as estimated
+MIN_OBSERVATIONS = 4
+
+
+def _market_product(value: Any) -> np.ndarray:
+    """Read a market x product value; per-product values apply to every market."""
+    if isinstance(value, dict) and not any(market in value for market in MARKETS):
+        return np.broadcast_to(parameter_array(value, (3,)), (3, 3)).copy()
+    if isinstance(value, (list, tuple)) and np.size(value) == len(PRODUCTS):
+        return np.broadcast_to(np.asarray(value, dtype=float), (3, 3)).copy()
+    return parameter_array(value, (3, 3))
+
+
+def quarter_design(companies: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Regression rows for one quarter of group information.
+
+    Args:
+        companies: Per company prices, advertising, sales_units and optional
+            quality, each nested by market and product (advertising and
+            quality may be per product)
+
+    Returns:
+        (3, 3, N, len(FEATURES)) design, (3, 3, N) targets and a (3, 3, N)
+        mask of companies that offered the product and sold it
+    """
+    prices = np.stack([_market_product(c.get("prices")) for c in companies], axis=-1)
+    units = np.stack([_market_product(c.get("sales_units")) for c in companies], axis=-1)
+    advertising = np.stack([_market_product(c.get("advertising")) for c in companies], axis=-1)
+    quality = np.stack([_market_product(c.get("quality")) for c in companies], axis=-1)
+
+    valid = (prices > 0) & (units > 0)
+    count = np.maximum(valid.sum(axis=-1, keepdims=True), 1)
+
+    def group_mean(values: np.ndarray) -> np.ndarray:
+        return np.where(valid, values, 0.0).sum(axis=-1, keepdims=True) / count
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        target = np.log(units / group_mean(units))
+        price = np.log(prices / group_mean(prices))
+        advert = np.log((1.0 + advertising) / (1.0 + group_mean(advertising)))
+    design = np.stack([np.ones_like(price), price, advert, quality - group_mean(quality)], axis=-1)
+
+    design = np.where(valid[..., None], design, 0.0)
+    target = np.where(valid, target, 0.0)
+    return {"design": design, "target": target, "valid": valid}
+
+
+class DemandModel:
+    """Incrementally fitted demand elasticities for one project."""
+
+    def __init__(self, ridge: float = DEFAULT_RIDGE):
+        """
+        Initialize an empty model.
+
+        Args:
+            ridge: Regularisation strength towards PRIOR_COEFFICIENTS
+        """
+        features = len(FEATURES)
+        self.ridge = ridge
+        self.xtx = np.zeros((3, 3, features, features))
+        self.xty = np.zeros((3, 3, features))
+        self.yty = np.zeros((3, 3))
+        self.observations = np.zeros((3, 3), dtype=int)
+        self.quarters: List[str] = []
+
+    def ingest(self, quarter_period: str, companies: Sequence[Dict[str, Any]]) -> bool:
+        """
+        Add one quarter of group information to the fit.
+
+        Args:
+            quarter_period: Quarter identifier (e.g. Y15Q1); each is ingested once
+            companies: Group information per company
+
+        Returns:
+            True if the quarter was added, False if it was already ingested
+        """
+        if quarter_period in self.quarters or not companies:
+            return False
+
+        rows = quarter_design(companies)
+        design, target = rows["design"], rows["target"]
+        self.xtx += np.einsum("mpnk,mpnl->mpkl", design, design)
+        self.xty += np.einsum("mpnk,mpn->mpk", design, target)
+        self.yty += (target**2).sum(axis=-1)
+        self.observations += rows["valid"].sum(axis=-1)
+        self.quarters.append(quarter_period)
+        return True
+
+    def coefficients(self) -> np.ndarray:
+        """
+        Solve the ridge regression of every cell at once.
+
+        Returns:
+            (3, 3, len(FEATURES)) coefficients
+        """
+        penalty = self.ridge * np.eye(len(FEATURES))
+        penalty[0, 0] = 1e-9  # leave the intercept free
+        rhs = self.xty + penalty @ PRIOR_COEFFICIENTS
+        return np.linalg.solve(self.xtx + penalty, rhs[..., None])[..., 0]
+
+    def elasticities(self) -> Dict[str, np.ndarray]:
+        """Price and advertising elasticities in the quarter model's convention."""
+        coefficients = self.coefficients()
+        return {
+            "price_elasticity": -coefficients[..., 1],
+            "advertising_elasticity": coefficients[..., 2],
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Fitted coefficients per market and product.
+
+        Returns:
+            Quarters ingested and, per cell, observations, coefficients,
+            elasticities, in-sample R² and whether the cell has enough data
+        """
+        coefficients = self.coefficients()
+        fitted_sse = (
+            self.yty
+            - 2 * np.einsum("mpk,mpk->mp", coefficients, self.xty)
+            + np.einsum("mpk,mpkl,mpl->mp", coefficients, self.xtx, coefficients)
+        )
+        n = np.maximum(self.observations, 1)
+        total_ss = self.yty - self.xty[..., 0] ** 2 / n
+        r_squared = np.where(total_ss > 1e-12, 1.0 - fitted_sse / np.maximum(total_ss, 1e-12), 0.0)
+
+        markets = {}
+        for i, market in enumerate(MARKETS):
+            markets[market] = {
+                product: {
+                    "observations": int(self.observations[i, j]),
+                    "estimated": bool(self.observations[i, j] >= MIN_OBSERVATIONS),
+                    "coefficients": dict(zip(FEATURES, np.round(coefficients[i, j], 4).tolist())),
+                    "price_elasticity": round(float(-coefficients[i, j, 1]), 4),
+                    "advertising_elasticity": round(float(coefficients[i, j, 2]), 4),
+                    "r_squared": round(float(r_squared[i, j]), 4),
+                }
+                for j, product in enumerate(PRODUCTS)
+            }
+        return {"quarters": list(self.quarters), "ridge": self.ridge, "markets": markets}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise the sufficient statistics for storage."""
+        return {
+            "ridge": self.ridge,
+            "xtx": self.xtx.tolist(),
+            "xty": self.xty.tolist(),
+            "yty": self.yty.tolist(),
+            "observations": self.observations.tolist(),
+            "quarters": list(self.quarters),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "DemandModel":
+        """Restore a model serialised with to_dict (an empty model for None)."""
+        model = cls()
+        if not data:
+            return model
+        model.ridge = float(data["ridge"])
+        model.xtx = np.asarray(data["xtx"], dtype=float)
+        model.xty = np.asarray(data["xty"], dtype=float)
+        model.yty = np.asarray(data["yty"], dtype=float)
+        model.observations = np.asarray(data["observations"], dtype=int)
+        model.quarters = list(data["quarters"])
+        return model
@@ -0,0 +1,440 @@
+"""
+Streaming Excel Export
+
+Writes analysis sessions as workbooks with the sheets of the analysis
+workbook (overview/gmc_analysis.xlsx): the session's decisions plus the
+computed Revenue, Cost of Production, Hired Transport, Shares & Dividend,
+Receipts & Receivables, Payments & Payables, Valuation and Investment
+Performance sheets for the decided quarter.
+
+Workbooks use openpyxl's write-only mode, which spools rows to temporary
+files instead of building a cell tree, and responses are streamed in chunks.
+A project export is a zip built one session at a time into an unseekable
+buffer that is drained after every chunk, so memory stays constant however
+many sessions a class exports.
+
+Sessions are calculated before their bytes are streamed: a single-session
+export raises before the response starts, and a project export lists
+sessions it could not calculate in export_errors.json instead of aborting.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import json
+import logging
+import re
+import tempfile
+import zipfile
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from app.capacity import capacity_profile, check_feasibility
+from app.quarter_model import (
+    MARKETS,
+    PRODUCTS,
+    REJECT_RATE,
+    investment_performance,
+    simulate_quarter,
+)
+from app.rollout import RolloutEngine
+from app.transport import allocate_transport
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Raised by the quarter model for malformed decisions or base reports
+SESSION_ERRORS = (AttributeError, TypeError, ValueError)
+
+# Zip entry listing sessions left out of a project export
+EXPORT_ERRORS_FILENAME = "export_errors.json"
+
+SHEET_NAMES = (
+    "Decision",
+    "Revenue",
+    "Cost of Production",
+    "Hired Transport",
+    "Shares & Dividend",
+    "Receipts & Receivables",
+    "Payments & Payables",
+    "Valuation",
+    "Investment Performance",
+)
+
+_MARKET_LABELS = {"europe": "Europe", "nafta": "Nafta", "internet": "Internet"}
+_PRODUCT_LABELS = ["Product 1", "Product 2", "Product 3"]
+
+
+def session_results(base_report: Dict[str, Any], decisions: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one session's decisions through the quarter model.
+
+    Args:
+        base_report: Report the decisions are made from
+        decisions: Nested decision parameters
+
+    Returns:
+        Compiled decisions, opening and closing states, outcomes and the
+        engine's report reference
+    """
+    engine = RolloutEngine(base_report or {})
+    compiled = engine.compile_plans([[decisions or {}]])[:, 0]
+    opening = engine.base_state[None]
+    closing, outcomes = simulate_quarter(opening, compiled, engine.reference)
+    return {
+        "decisions": compiled[0],
+        "opening": opening[0],
+        "closing": closing[0],
+        "outcomes": {name: values[0] for name, values in outcomes.items()},
+        "reference": engine.reference,
+    }
+
+
+def _market_rows(values: np.ndarray, digits: int = 2) -> List[List[Any]]:
+    return [
+        [_MARKET_LABELS[market]] + [round(float(v), digits) for v in values[i]]
+        for i, market in enumerate(MARKETS)
+    ]
+
+
+def session_sheets(results: Dict[str, Any]) -> Dict[str, List[List[Any]]]:
+    """
+    Rows of every sheet for one session.
+
+    Args:
+        results: Output of session_results
+
+    Returns:
+        Sheet name -> rows; a row starting with a string and no other values
+        is a section heading
+    """
+    decisions = results["decisions"]
+    opening = results["opening"]
+    closing = results["closing"]
+    outcomes = results["outcomes"]
+    reference = results["reference"]
+    header = [""] + _PRODUCT_LABELS
+
+    sheets: Dict[str, List[List[Any]]] = {}
+    sheets["Decision"] = (
+        [["Your Decisions", "Qtr", int(opening["quarter"])], ["Prices (€):"], header]
+        + _market_rows(decisions["prices"])
+        + [["Quantities to deliver to:"], header]
+        + _market_rows(decisions["deliveries"], 0)
+        + [["Advertising (€'000):"], header]
+        + [["All markets"] + decisions["advertising"].tolist()]
+        + [["Assembly times (minutes)"] + decisions["assembly_minutes"].tolist()]
+        + [["Components to order (units)"] + decisions["subcontract"].tolist()]
+        + [
+            ["Operations:"],
+            ["Materials to buy ('000)", float(decisions["materials_to_buy"])],
+            ["Maintenance hours/machine", float(decisions["maintenance_hours"])],
+            ["Shift level", int(decisions["shift_level"])],
+            ["Web-site development (€'000)", float(decisions["website_development"])],
+            ["Personnel:"],
+            ["Assembly workers to recruit", float(decisions["recruit"])],
+            ["Number to train", float(decisions["train"])],
+            ["Hourly wage rate (€.c)", float(decisions["assembly_wage_rate"]) / 100.0],
+            ["Management budget (€'000)", float(decisions["management_budget"])],
+            ["Quality:"],
+            ["Product development (€'000)", float(decisions["product_development"])],
+            ["Finance:"],
+            ["Shares to issue/repurchase", float(decisions["share_issue"])],
+            ["Dividend (% of share capital)", float(decisions["dividend"])],
+            ["Term loans (€'000)", float(decisions["additional_loan"])],
+            ["Term deposit (€'000)", float(decisions["term_deposit"])],
+            ["Machines to buy", float(decisions["machines_to_buy"])],
+        ]
+    )
+
+    orders = reference.demand(decisions["prices"], decisions["advertising"])
+    sheets["Revenue"] = (
+        [["Expected orders"], header]
+        + _market_rows(orders, 0)
+        + [["Potential revenue (€)"], header]
+        + _market_rows(orders * decisions["prices"], 0)
+        + [
+            ["Totals:"],
+            ["Units sold", round(float(outcomes["units_sold"]), 0)],
+            ["Sales revenue (€)", round(float(outcomes["revenue"]), 2)],
+            ["Profit after tax (€)", round(float(outcomes["profit"]), 2)],
+        ]
+    )
+
+    profile = capacity_profile(
+        int(opening["machines"]),
+        int(opening["assembly_workers"]),
+        int(np.clip(decisions["shift_level"], 1, 3)),
+        int(decisions["assembly_wage_rate"]),
+        tuple(decisions["assembly_minutes"].tolist()),
+    )
+    check = check_feasibility(
+        decisions["deliveries"].sum(axis=0) / (1.0 - REJECT_RATE),
+        profile,
+        opening["component_stock"],
+    )
+    sheets["Cost of Production"] = [
+        ["Machine shop:"],
+        ["Machines", int(opening["machines"])],
+        ["Shift level", profile.shift_level],
+        ["Machine hours available", check["machine_hours"]["available"]],
+        ["Machine hours required", check["machine_hours"]["required"]],
+        ["Machine hours used", round(float(outcomes["machine_hours"]), 2)],
+        ["Assembly:"],
+        ["Assembly workers", int(opening["assembly_workers"])],
+        ["Assembly hours available", check["assembly_hours"]["available"]],
+        ["Assembly hours required", check["assembly_hours"]["required"]],
+        ["Overtime hours required", check["assembly_hours"]["overtime"]],
+        ["Assembly hours used", round(float(outcomes["assembly_hours"]), 2)],
+        ["Units assembled", round(float(outcomes["units_assembled"]), 0)],
+        ["Bottleneck", check["bottleneck"]],
+        ["Deliveries feasible", "Yes" if check["feasible"] else "No *"],
+    ]
+
+    transport = allocate_transport(decisions["deliveries"])
+    sheets["Hired Transport"] = (
+        [["", "Containers", "Space used", "Utilisation", "Cost per container", "Cost (€)"]]
+        + [
+            [
+                _MARKET_LABELS[market],
+                allocation["containers"],
+                allocation["space_used"],
+                allocation["utilisation"],
+                allocation["cost_per_container"],
+                allocation["cost"],
+            ]
+            for market, allocation in transport["markets"].items()
+        ]
+        + [["Total", transport["containers"], "", "", "", transport["total_cost"]]]
+    )
+
+    def shares_row(label: str, field: str) -> List[Any]:
+        return [label, round(float(opening[field]), 2), round(float(closing[field]), 2)]
+
+    sheets["Shares & Dividend"] = [
+        ["", "Opening", "Closing"],
+        shares_row("Shares in issue", "share_capital"),
+        shares_row("Share price (cents)", "share_price"),
+        shares_row("Share premium (€)", "share_premium"),
+        shares_row("Retained earnings (€)", "retained_earnings"),
+        ["Dividend paid (€)", "", round(float(outcomes["dividend"]), 2)],
+        ["Shares issued/repurchased", "", round(float(outcomes["share_issue"]), 0)],
+    ]
+    sheets["Receipts & Receivables"] = [
+        ["", "€"],
+        ["Opening trade receivables", round(float(opening["receivables"]), 2)],
+        ["Receipts this quarter", round(float(outcomes["receipts"]), 2)],
+        ["Closing trade receivables", round(float(closing["receivables"]), 2)],
+    ]
+    sheets["Payments & Payables"] = [
+        ["", "€"],
+        ["Opening trade payables", round(float(opening["payables"]), 2)],
+        ["Opening tax due", round(float(opening["tax_due"]), 2)],
+        ["Payments this quarter", round(float(outcomes["payments"]), 2)],
+        ["Closing trade payables", round(float(closing["payables"]), 2)],
+        ["Closing tax due", round(float(closing["tax_due"]), 2)],
+        ["Closing cash (overdraft if negative)", round(float(outcomes["cash"]), 2)],
+    ]
+
+    def valuation(state: np.ndarray) -> float:
+        return round(float(state["share_capital"] * state["share_price"] / 100.0), 2)
+
+    sheets["Valuation"] = [
+        ["", "€"],
+        ["Opening market valuation", valuation(opening)],
+        ["Closing market valuation", valuation(closing)],
+    ]
+    opening_performance = float(investment_performance(opening))
+    sheets["Investment Performance"] = [
+        ["", "€"],
+        ["Opening investment performance", round(opening_performance, 2)],
+        ["Closing investment performance", round(float(outcomes["investment_performance"]), 2)],
+        [
+            "Change this quarter",
+            round(float(outcomes["investment_performance"]) - opening_performance, 2),
+        ],
+        ["Dividends paid to date", round(float(closing["dividends_total"]), 2)],
+        ["Value of shares issued to date", round(float(closing["issue_value_total"]), 2)],
+    ]
+    return sheets
+
+
+def calculate_session_sheets(session: Dict[str, Any]) -> Dict[str, List[List[Any]]]:
+    """
+    Calculate the sheet rows of one export session.
+
+    Raises:
+        AttributeError, TypeError, ValueError: If the decisions or base report are malformed
+    """
+    return session_sheets(
+        session_results(session.get("base_report") or {}, session.get("decisions") or {})
+    )
+
+
+def write_session_workbook(
+    session: Dict[str, Any], target, sheets: Optional[Dict[str, List[List[Any]]]] = None
+) -> None:
+    """
+    Write one session's workbook to a file object with the write-only writer.
+
+    Args:
+        session: session_name, base_report and decisions of an analysis session
+        target: Binary file object receiving the xlsx
+        sheets: Rows from calculate_session_sheets, calculated here when omitted
+    """
+    if sheets is None:
+        sheets = calculate_session_sheets(session)
+    workbook = Workbook(write_only=True)
+    bold = Font(bold=True)
+    for name in SHEET_NAMES:
+        worksheet = workbook.create_sheet(name)
+        title = WriteOnlyCell(worksheet, value=f"{name} - {session.get('session_name', '')}")
+        title.font = bold
+        worksheet.append([title])
+        for row in sheets[name]:
+            if len(row) == 1 and isinstance(row[0], str):
+                heading = WriteOnlyCell(worksheet, value=row[0])
+                heading.font = bold
+                worksheet.append([heading])
+            else:
+                worksheet.append(row)
+    workbook.save(target)
+
+
+def export_filename(session: Dict[str, Any], extension: str = "xlsx") -> str:
+    """Safe download file name for a session."""
+    name = session.get("session_name") or session.get("session_id") or "session"
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(name)).strip("_") or "session"
+    return f"{safe}.{extension}"
+
+
+def iter_session_workbook(session: Dict[str, Any], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream one session's workbook.
+
+    The session is calculated when this is called, so malformed input raises
+    before a response is started. The workbook is spooled to a temporary file
+    when the response starts and read back in chunks.
+
+    Raises:
+        AttributeError, TypeError, ValueError: If the decisions or base report are malformed
+    """
+    sheets = calculate_session_sheets(session)
+
+    def stream() -> Iterator[bytes]:
+        with tempfile.TemporaryFile() as spool:
+            write_session_workbook(session, spool, sheets)
+            spool.seek(0)
+            for chunk in iter(lambda: spool.read(chunk_size), b""):
+                yield chunk
+
+    return stream()
+
+
+class _DrainableBuffer:
+    """Unseekable sink for zipfile; bytes written are handed out by drain()."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buffer.extend(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def iter_project_zip(
+    sessions: Iterable[Dict[str, Any]], chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Stream a zip of session workbooks, built one session at a time.
+
+    Sessions whose decisions cannot be calculated are skipped and listed,
+    with the error, in an export_errors.json entry at the end of the zip.
+
+    Args:
+        sessions: Sessions to export (consumed lazily)
+        chunk_size: Bytes copied per step
+
+    Yields:
+        Zip file bytes
+    """
+    sink = _DrainableBuffer()
+    used: Dict[str, int] = {}
+    failures: List[Dict[str, Any]] = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for session in sessions:
+            try:
+                sheets = calculate_session_sheets(session)
+            except SESSION_ERRORS as e:
+                logger.warning(f"Skipping session {session.get('session_id')} in export: {e}")
+                failures.append(
+                    {
+                        "session_id": session.get("session_id"),
+                        "session_name": session.get("session_name"),
+                        "error": str(e),
+                    }
+                )
+                continue
+
+            filename = export_filename(session)
+            count = used.get(filename, 0)
+            used[filename] = count + 1
+            if count:
+                filename = filename.replace(".xlsx", f"_{count + 1}.xlsx")
+
+            with tempfile.TemporaryFile() as spool:
+                write_session_workbook(session, spool, sheets)
+                spool.seek(0)
+                info = zipfile.ZipInfo(filename, date_time=datetime.utcnow().timetuple()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with archive.open(info, "w", force_zip64=True) as entry:
+                    for chunk in iter(lambda: spool.read(chunk_size), b""):
+                        entry.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            data = sink.drain()
+            if data:
+                yield data
+
+        if failures:
+            archive.writestr(EXPORT_ERRORS_FILENAME, json.dumps(failures, indent=2, default=str))
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def session_from_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an analysis_sessions row to an export session."""
+    return {
+        "session_id": str(record.get("session_id", "")),
+        "session_name": record.get("session_name"),
+        "base_report": record.get("base_report_data") or {},
+        "decisions": record.get("decision_parameters") or {},
+    }
+
+
+def export_session(
+    session_id: str,
+    decisions: Dict[str, Any],
+    base_report: Optional[Dict[str, Any]] = None,
+    session_name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build an export session from request or history data."""
+    return {
+        "session_id": session_id,
+        "session_name": session_name or session_id,
+        "base_report": base_report or {},
+        "decisions": decisions or {},
+    }
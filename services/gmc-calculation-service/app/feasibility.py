@@ -0,0 +1,158 @@
+"""
+Decision Feasibility Projection
+
+Predicts which decisions the simulator will override ("*" on the management
+report) before a decision set is submitted, and the effective decisions it
+will use instead. The override rules live in quarter_model.project_decisions,
+which simulate_quarter applies too, so the projection and the simulation
+cannot disagree.
+
+Projection is vectorised over a batch of decision sets. Without the dividend
+limit it needs no simulation at all, which makes feasible_mask a cheap
+pre-filter for batch and optimiser paths.
+"""
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from app.quarter_model import (
+    DECISION_DTYPE,
+    NON_NEGATIVE_DECISIONS,
+    OVERRIDE_REASONS,
+    project_decisions,
+    simulate_quarter,
+)
+from app.rollout import RolloutEngine
+from app.sensitivity import DECISION_VARIABLES
+from app.undo_redo import unflatten_parameters
+
+REASON_MESSAGES = {
+    "negative_value": "Quantities and budgets cannot be negative",
+    "shift_level": "Shift level must be 1, 2 or 3",
+    "wage_rate": "The assembly wage rate cannot be reduced",
+    "workforce": "Cannot dismiss more assembly workers than are employed",
+    "machines": "Cannot sell more machines than the company owns",
+    "term_deposit": "Cannot withdraw more than is held on term deposit",
+    "share_capital_band": "Share issues are limited to 10% of the year's opening share capital",
+    "borrowing_power": "Additional loan exceeds the bank's borrowing power",
+    "funds": "Lack of funds for machine purchases, deposit placements or share repurchases",
+    "machine_capacity": "Insufficient machine capacity for the components required",
+    "assembly_capacity": "Insufficient assembly labour for the deliveries",
+    "distributable_profit": "Dividend exceeds distributable profit",
+}
+
+# Decision fields each override reason can change
+REASON_FIELDS = {
+    "negative_value": NON_NEGATIVE_DECISIONS,
+    "shift_level": ("shift_level",),
+    "wage_rate": ("assembly_wage_rate",),
+    "workforce": ("recruit",),
+    "machines": ("machines_to_buy",),
+    "term_deposit": ("term_deposit",),
+    "share_capital_band": ("share_issue",),
+    "borrowing_power": ("additional_loan",),
+    "funds": ("machines_to_buy", "term_deposit", "share_issue"),
+    "machine_capacity": ("deliveries",),
+    "assembly_capacity": ("deliveries",),
+    "distributable_profit": ("dividend",),
+}
+
+# Element changes smaller than this are rounding, not overrides
+_TOLERANCE = {"deliveries": 0.5, "share_issue": 0.5, "dividend": 1e-4}
+
+
+def project_batch(
+    engine: RolloutEngine, decision_sets: Sequence[Dict[str, Any]], include_dividend: bool = True
+) -> Dict[str, Any]:
+    """
+    Project a batch of decision sets for the engine's next quarter.
+
+    Args:
+        engine: Rollout engine holding the base report and last decisions
+        decision_sets: Nested decision parameters, one per set
+        include_dividend: Also apply the dividend limit, which simulates the
+            quarter for its profit (still one vectorised call)
+
+    Returns:
+        Proposed and effective (B,) decisions, (B, len(OVERRIDE_REASONS))
+        reasons and (B, len(DECISION_DTYPE.names)) adjusted flags
+    """
+    proposed = engine.compile_plans([[decisions] for decisions in decision_sets])[:, 0]
+    state = np.repeat(engine.base_state[None], len(decision_sets))
+
+    if include_dividend:
+        _, outcomes = simulate_quarter(state, proposed, engine.reference)
+        projection = {name: outcomes[name] for name in ("decisions", "reasons", "adjusted")}
+    else:
+        projection = project_decisions(state, proposed)
+    projection["proposed"] = proposed
+    return projection
+
+
+def feasible_mask(state: np.ndarray, decisions: np.ndarray) -> np.ndarray:
+    """
+    Pre-filter decision sets the simulator would not override.
+
+    The dividend limit depends on the quarter's profit and is not checked.
+
+    Args:
+        state: (B,) STATE_DTYPE records at the start of the quarter
+        decisions: (B,) DECISION_DTYPE records as proposed
+
+    Returns:
+        (B,) True where no decision would be overridden
+    """
+    return ~project_decisions(state, decisions)["adjusted"].any(axis=1)
+
+
+def describe_overrides(projection: Dict[str, Any], index: int) -> List[Dict[str, Any]]:
+    """
+    List the overridden decision values of one projected decision set.
+
+    Args:
+        projection: Output of project_batch
+        index: Decision set index within the batch
+
+    Returns:
+        Per overridden parameter, the requested and effective values and the reasons
+    """
+    proposed = projection["proposed"][index]
+    effective = projection["decisions"][index]
+    adjusted = projection["adjusted"][index]
+    active = [
+        reason for reason, flag in zip(OVERRIDE_REASONS, projection["reasons"][index]) if flag
+    ]
+    names = DECISION_DTYPE.names
+
+    overrides = []
+    for field, element, path in DECISION_VARIABLES:
+        if not adjusted[names.index(field)]:
+            continue
+        requested = float(proposed[field][element])
+        value = float(effective[field][element])
+        if abs(value - requested) <= _TOLERANCE.get(field, 1e-6):
+            continue
+        overrides.append(
+            {
+                "parameter": path,
+                "requested": round(requested, 2),
+                "effective": round(value, 2),
+                "reasons": [
+                    {"code": reason, "message": REASON_MESSAGES[reason]}
+                    for reason in active
+                    if field in REASON_FIELDS[reason]
+                ],
+            }
+        )
+    return overrides
+
+
+def decision_parameters(decisions: np.ndarray) -> Dict[str, Any]:
+    """Nested decision parameters of a 0-d DECISION_DTYPE record."""
+    return unflatten_parameters(
+        {
+            path: round(float(decisions[field][element]), 4)
+            for field, element, path in DECISION_VARIABLES
+        }
+    )
@@ -0,0 +1,125 @@
+"""
+Background Calculation Jobs
+
+Handlers for calculation work queued through shared.python.jobs: large
+rollout batches (Monte Carlo style plan sweeps) and decision sensitivity.
+Each handler is a module-level function so it can run in a worker process,
+takes fully resolved parameters (the base report is resolved at submission,
+so identical inputs hash identically) and returns the same payload as the
+matching synchronous endpoint.
+"""
+
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from app.feasibility import feasible_mask
+from app.rollout import RolloutEngine, summarize_rollout
+from app.sensitivity import decision_sensitivity, rank_by_impact
+
+# Plans rolled forward between progress reports
+ROLLOUT_CHUNK_PLANS = 500
+
+Progress = Optional[Callable[[float, Optional[str]], None]]
+
+
+def rollout_payload(
+    engine: RolloutEngine,
+    plans: list,
+    skip_infeasible: bool = False,
+    include_quarters: Optional[bool] = None,
+    top: Optional[int] = None,
+    progress: Progress = None,
+) -> Dict[str, Any]:
+    """
+    Roll plans forward in chunks and summarise them.
+
+    Args:
+        engine: Rollout engine holding the base report
+        plans: One list of per-quarter decision parameters per plan
+        skip_infeasible: Drop plans whose first quarter the simulator would override
+        include_quarters: Include per-quarter results; defaults to a single plan only
+        top: Keep only the best plans
+        progress: Optional callback receiving the share of plans done
+
+    Returns:
+        Plan count, skipped plans, quarters, base investment performance and
+        ranked plan summaries
+    """
+    compiled = engine.compile_plans(plans)
+    kept = np.arange(len(plans))
+    if skip_infeasible:
+        state = np.repeat(engine.base_state[None], len(plans))
+        kept = np.flatnonzero(feasible_mask(state, compiled[:, 0]))
+        compiled = compiled[kept]
+        if not len(kept):
+            if progress is not None:
+                progress(1.0, "No feasible plans")
+            return {
+                "plan_count": len(plans),
+                "skipped_plans": len(plans),
+                "quarters": compiled.shape[1],
+                "base_investment_performance": engine.base_investment_performance(),
+                "plans": [],
+            }
+
+    chunks = []
+    for start in range(0, max(len(compiled), 1), ROLLOUT_CHUNK_PLANS):
+        chunks.append(engine.run(compiled[start : start + ROLLOUT_CHUNK_PLANS]))
+        if progress is not None:
+            done = min(start + ROLLOUT_CHUNK_PLANS, len(compiled))
+            progress(done / max(len(compiled), 1), f"{done} of {len(compiled)} plans")
+    results = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+    if include_quarters is None:
+        include_quarters = len(plans) == 1
+    summaries = summarize_rollout(results, bool(include_quarters), top)
+    for summary in summaries:
+        summary["plan_index"] = int(kept[summary["plan_index"]])
+
+    return {
+        "plan_count": len(plans),
+        "skipped_plans": len(plans) - len(kept),
+        "quarters": results["revenue"].shape[1],
+        "base_investment_performance": engine.base_investment_performance(),
+        "plans": summaries,
+    }
+
+
+def run_rollout_job(parameters: Dict[str, Any], context) -> Dict[str, Any]:
+    """Job handler for a rollout batch."""
+    engine = RolloutEngine(parameters.get("base_report") or {}, parameters.get("base_decisions"))
+    return rollout_payload(
+        engine,
+        parameters["plans"],
+        bool(parameters.get("skip_infeasible")),
+        parameters.get("include_quarters"),
+        parameters.get("top"),
+        progress=context.progress,
+    )
+
+
+def run_sensitivity_job(parameters: Dict[str, Any], context) -> Dict[str, Any]:
+    """Job handler for decision sensitivity of a plan."""
+    engine = RolloutEngine(parameters.get("base_report") or {}, parameters.get("base_decisions"))
+    context.progress(0.0, "Differentiating decisions")
+    sensitivity = decision_sensitivity(
+        engine,
+        parameters.get("plan") or [{}],
+        quarter=int(parameters.get("quarter", 1)) - 1,
+        steps=parameters.get("steps"),
+    )
+    return {
+        "base": sensitivity["base"],
+        "variables": rank_by_impact(
+            sensitivity["variables"],
+            parameters.get("rank_by", "investment_performance"),
+            parameters.get("top"),
+        ),
+    }
+
+
+JOB_HANDLERS = {
+    "rollout": run_rollout_job,
+    "sensitivity": run_sensitivity_job,
+}
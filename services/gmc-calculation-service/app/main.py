@@ -5,30 +5,156 @@ Core mathematical engine for GMC analysis with Excel compatibility,
 real-time parameter processing, and project-scoped data isolation.
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from sqlalchemy import text
 from flask_jwt_extended import JWTManager
+from flask_sock import Sock
+from simple_websocket import ConnectionClosed
+import json
 import logging
 import os
+import sys
+import threading
+import numpy as np
+import redis
 from datetime import datetime
+from typing import Any, Callable, Tuple
+
+from app.cash_flow import PAYMENT_CATEGORIES, cash_flow_schedule
+from app.capacity import capacity_profile, check_feasibility, plan_production
+from app.collaboration import CollaborationHub
+from app.demand_model import DemandModel
+from app.excel_export import (
+    export_filename,
+    export_session,
+    iter_project_zip,
+    iter_session_workbook,
+    session_from_record,
+)
+from app.feasibility import decision_parameters, describe_overrides, project_batch
+from app.jobs import JOB_HANDLERS, rollout_payload
+from app.preload import preload_tables
+from app.quarter_model import (
+    CONTAINER_TRIP_COST,
+    DECISION_DTYPE,
+    MARKETS,
+    PRODUCTS,
+    REJECT_RATE,
+    ReportReference,
+    parameter_array,
+    transport_containers,
+)
+from app.rollout import RolloutEngine
+from app.sensitivity import decision_sensitivity, rank_by_impact
+from app.transport import allocate_transport
+from app.valuation import league_tables
+from app.undo_redo import (
+    HistoryConflictError,
+    InMemoryHistoryStore,
+    LRUResultCache,
+    RedisHistoryStore,
+    RedisResultCache,
+    SessionHistory,
+    flatten_parameters,
+    state_hash,
+)
+
+# Shared libraries live at the repository root locally and in /app/shared in images
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from shared.python.database.engine_factory import (  # noqa: E402
+    DatabaseHealthMonitor,
+    PoolMetrics,
+    configure_flask_database,
+    dispose_after_fork,
+)
+from shared.python.database.project_queries import create_project_scoped_session  # noqa: E402
+from shared.python.database.replica_routing import create_replica_router  # noqa: E402
+from shared.python.observability import (  # noqa: E402
+    MeteredCache,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RedisProfileStore,
+    TracingMiddleware,
+    instrument_sqlalchemy,
+)
+from shared.python.ratelimit import (  # noqa: E402
+    DEFAULT_POLICIES,
+    ENDPOINT,
+    RateLimitMiddleware,
+    RateLimitPolicy,
+    create_rate_limiter,
+)
+from shared.python.responses import ResponseMiddleware, conditional_get  # noqa: E402
+from shared.python.jobs import (  # noqa: E402
+    SUCCEEDED,
+    InMemoryJobQueue,
+    JobWorker,
+    RedisJobQueue,
+)
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-key")
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
-    "DATABASE_URL", "postgresql://localhost/gmc_calculations"
-)
+DATABASE_URL = os.environ.get("DATABASE_URL", "postgresql://localhost/gmc_calculations")
+configure_flask_database(app, DATABASE_URL, "gmc-calculation-service")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "jwt-secret-key")
+app.config["HISTORY_CHECKPOINT_INTERVAL"] = int(os.environ.get("HISTORY_CHECKPOINT_INTERVAL", 25))
+app.config["MAX_ROLLOUT_PLANS"] = int(os.environ.get("MAX_ROLLOUT_PLANS", 10000))
+app.config["MAX_ROLLOUT_QUARTERS"] = int(os.environ.get("MAX_ROLLOUT_QUARTERS", 12))
+app.config["MAX_EXPORT_SESSIONS"] = int(os.environ.get("MAX_EXPORT_SESSIONS", 500))
+app.config["MAX_TRANSPORT_SCENARIOS"] = int(os.environ.get("MAX_TRANSPORT_SCENARIOS", 10000))
+# Units per market and product; single allocations list every container's load
+app.config["MAX_TRANSPORT_UNITS"] = int(os.environ.get("MAX_TRANSPORT_UNITS", 100000))
+app.config["COLLABORATION_FRAME_SECONDS"] = float(
+    os.environ.get("COLLABORATION_FRAME_SECONDS", 0.1)
+)
+# Each open collaboration socket holds one gunicorn thread, so sockets are
+# capped at a quarter of the worker's threads (WEB_THREADS, set by
+# gunicorn.conf.py) to leave the rest for HTTP requests; 0 disables the cap
+# for the development server
+_web_threads = int(os.environ.get("WEB_THREADS", 0))
+app.config["MAX_COLLABORATION_SOCKETS"] = int(
+    os.environ.get("MAX_COLLABORATION_SOCKETS", max(_web_threads // 4, 1) if _web_threads else 0)
+)
+app.config["MAX_JOB_ROLLOUT_PLANS"] = int(os.environ.get("MAX_JOB_ROLLOUT_PLANS", 200000))
+app.config["JOB_RESULT_TTL_SECONDS"] = int(os.environ.get("JOB_RESULT_TTL_SECONDS", 3600))
+app.config["JOB_WORKER_PROCESSES"] = int(os.environ.get("JOB_WORKER_PROCESSES", 0))
+
+# Redis backs undo/redo history and calculation caching when configured
+REDIS_URL = os.environ.get("REDIS_URL")
+redis_client = redis.Redis.from_url(REDIS_URL) if REDIS_URL else None
 
 # Initialize extensions
 cors = CORS(app)
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 jwt = JWTManager(app)
+sock = Sock(app)
+
+with app.app_context():
+    PoolMetrics.attach(db.engine)
+    instrument_sqlalchemy(db.engine)
+    # Workers forked from a preloading server start with their own pool
+    dispose_after_fork(db.engine)
+
+# Session and report lists are read from the replicas in DATABASE_REPLICA_URLS
+# (comma-separated) when configured; writes and single-record reads stay on
+# the primary, and reads follow a project's writes there for a while
+replica_router = create_replica_router(
+    os.environ.get("DATABASE_REPLICA_URLS", "").split(","), redis_client=redis_client
+)
+if replica_router is not None:
+    for replica_engine in replica_router.replica_engines:
+        dispose_after_fork(replica_engine)
+
+# Connectivity is probed in the background; health endpoints serve the cached state
+db_health = DatabaseHealthMonitor(
+    DATABASE_URL, interval_seconds=float(os.environ.get("DB_HEALTH_INTERVAL_SECONDS", 10))
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -44,42 +170,283 @@ SERVICE_INFO = {
     "status": "active",
 }
 
+metrics = MetricsMiddleware(app, SERVICE_INFO["name"])
+tracing = TracingMiddleware(app, SERVICE_INFO["name"])
+# Profiles and the sample percentage are shared by all workers when Redis is configured
+profiler = ProfilingMiddleware(
+    app,
+    SERVICE_INFO["name"],
+    RedisProfileStore(redis_client, SERVICE_INFO["name"]) if redis_client is not None else None,
+)
+# Fast JSON (orjson), MessagePack on request and Brotli/gzip for large bodies
+responses = ResponseMiddleware(app)
+
+# Budget units per request for batch, optimizer and export calls (others cost 1);
+# the first matching pattern wins, so specific patterns come before general ones
+RATE_LIMIT_COSTS = {
+    "*/rollout": 10,
+    "*/jobs": 20,
+    "*/sensitivity": 10,
+    "*/transport/allocate": 10,
+    "*/feasibility": 5,
+    "*/capacity/plan": 5,
+    "*/cash-flow/schedule": 5,
+    "*/group/valuation": 5,
+    "*/sessions/<session_id>/export": 5,
+    "*/export": 10,
+}
+# A user's compute calls are capped well below their project's budget, and a
+# project's budget well below the service-wide compute budget, so one team's
+# sweep cannot starve the rest of the cohort
+RATE_LIMIT_POLICIES = DEFAULT_POLICIES + (
+    RateLimitPolicy("user-compute", limit=300, period=60, endpoints=tuple(RATE_LIMIT_COSTS)),
+    RateLimitPolicy(
+        "compute", limit=20000, period=60, scope=ENDPOINT, endpoints=tuple(RATE_LIMIT_COSTS)
+    ),
+)
+rate_limits = RateLimitMiddleware(
+    app,
+    SERVICE_INFO["name"],
+    create_rate_limiter(redis_client),
+    policies=RATE_LIMIT_POLICIES,
+    costs=RATE_LIMIT_COSTS,
+)
+
+# Process-local history and result caches used when Redis is not configured
+_local_histories = {}
+_local_result_caches = {}
+_local_demand_models = {}
+_local_demand_model_lock = threading.Lock()
+
+# Base reports of sessions with live collaborators; a session's base report
+# never changes after creation, so each is read once per process
+_session_base_reports = LRUResultCache(max_entries=256)
+
+# Long-running work is queued; with Redis a separate `python -m app.worker`
+# process runs it, otherwise an in-process worker pool starts on first use
+if redis_client is not None:
+    job_queue = RedisJobQueue(
+        redis_client, "calculation", result_ttl_seconds=app.config["JOB_RESULT_TTL_SECONDS"]
+    )
+else:
+    job_queue = InMemoryJobQueue(result_ttl_seconds=app.config["JOB_RESULT_TTL_SECONDS"])
+_inline_job_worker = None
+
+
+def get_result_cache(project_id: str):
+    """Get the project-scoped calculation result cache."""
+    if redis_client is not None:
+        return MeteredCache(RedisResultCache(redis_client, project_id), "calculation_results")
+    return MeteredCache(
+        _local_result_caches.setdefault(project_id, LRUResultCache()), "calculation_results"
+    )
+
+
+def get_session_history(project_id: str, session_id: str, base_parameters=None) -> SessionHistory:
+    """
+    Get the undo/redo history for a project session.
+
+    Args:
+        project_id: Project identifier
+        session_id: Analysis session identifier
+        base_parameters: Decision parameters at session creation, used the first time
+            the session's history is accessed
+
+    Returns:
+        SessionHistory bound to the project-scoped store
+    """
+    if redis_client is not None:
+        store = RedisHistoryStore(redis_client, project_id, session_id)
+    else:
+        store = _local_histories.setdefault((project_id, session_id), InMemoryHistoryStore())
+
+    return SessionHistory(
+        store,
+        base_parameters=base_parameters,
+        checkpoint_interval=app.config["HISTORY_CHECKPOINT_INTERVAL"],
+        result_cache=get_result_cache(project_id),
+    )
+
+
+def load_demand_model(project_id: str) -> DemandModel:
+    """Load the project's fitted demand model (empty if nothing was ingested)."""
+    if redis_client is not None:
+        raw = redis_client.get(f"project:{project_id}:demand_model")
+        return DemandModel.from_dict(json.loads(raw) if raw else None)
+    return DemandModel.from_dict(_local_demand_models.get(project_id))
+
+
+def update_demand_model(
+    project_id: str, update: Callable[[DemandModel], Any]
+) -> Tuple[DemandModel, Any]:
+    """
+    Apply an update to the project's demand model without losing concurrent ones.
+
+    With Redis the read-modify-write runs under WATCH/MULTI and is retried on
+    the latest statistics when another upload stored first; otherwise it runs
+    under a process lock.
+
+    Args:
+        project_id: Project identifier
+        update: Changes the model in place; the model is stored when it returns
+            a truthy value (it may be called more than once)
+
+    Returns:
+        The updated model and the update's return value
+    """
+    if redis_client is None:
+        with _local_demand_model_lock:
+            model = DemandModel.from_dict(_local_demand_models.get(project_id))
+            result = update(model)
+            if result:
+                _local_demand_models[project_id] = model.to_dict()
+            return model, result
+
+    key = f"project:{project_id}:demand_model"
+
+    def apply(pipe):
+        raw = pipe.get(key)
+        model = DemandModel.from_dict(json.loads(raw) if raw else None)
+        result = update(model)
+        if result:
+            pipe.multi()
+            pipe.set(key, json.dumps(model.to_dict()))
+        return model, result
+
+    return redis_client.transaction(apply, key, value_from_callable=True)
+
+
+def _base_report(project_id: str, data: dict) -> dict:
+    """Request base report, with the project's fitted elasticities when asked for."""
+    base_report = dict(data.get("base_report") or {})
+    if data.get("demand_model") == "fitted":
+        for name, values in load_demand_model(project_id).elasticities().items():
+            base_report.setdefault(name, values.tolist())
+    return base_report
+
+
+# Key outputs pushed to teammates after every coalesced change frame
+COLLABORATION_OUTPUTS = ("investment_performance", "profit", "revenue", "cash", "units_sold")
+
+
+def load_session_base_report(project_id: str, session_id: str) -> dict:
+    """
+    Base report stored with an analysis session.
+
+    Runs in collaboration pump threads, so it opens its own app context.
+
+    Returns:
+        The session's base report, or an empty report for sessions that only
+        exist as undo/redo history
+    """
+    key = f"{project_id}:{session_id}"
+    base_report = _session_base_reports.get(key)
+    if base_report is None:
+        with app.app_context():
+            base_report = create_project_scoped_session(
+                db.session, project_id
+            ).get_session_base_report(session_id)
+        if base_report is None:
+            return {}
+        if isinstance(base_report, str):
+            base_report = json.loads(base_report)
+        _session_base_reports.put(key, base_report)
+    return base_report
+
+
+def key_outputs(base_report: dict, parameters: dict) -> dict:
+    """Recalculate the key outputs of one quarter's decisions from a base report."""
+    results = RolloutEngine(base_report).evaluate([[parameters]])
+    outputs = {name: round(float(results[name][0, 0]), 2) for name in COLLABORATION_OUTPUTS}
+    outputs["adjusted_decisions"] = [
+        name for name, flag in zip(DECISION_DTYPE.names, results["adjusted"][0, 0]) if flag
+    ]
+    return outputs
+
+
+def session_outputs(project_id: str, session_id: str, history: SessionHistory, position: int):
+    """
+    Key outputs of a session's decisions at a history position.
+
+    Outputs are cached by base report and decision state in the project's
+    result cache, so undo/redo responses and collaboration frames for a state
+    share one recalculation across processes.
+    """
+    base_report = load_session_base_report(project_id, session_id)
+    return history.results_at(
+        position,
+        lambda parameters: key_outputs(base_report, parameters),
+        context={"base_report": base_report},
+    )
+
+
+def collaboration_snapshot(project_id: str, session_id: str):
+    """
+    Current decisions and recalculated key outputs of a session.
+
+    Args:
+        project_id: Project identifier
+        session_id: Analysis session identifier
+
+    Returns:
+        Tuple of flattened decision parameters and key outputs
+    """
+    history = get_session_history(project_id, session_id)
+    position = history.position
+    outputs = session_outputs(project_id, session_id, history, position)
+    return flatten_parameters(history.state_at(position)), outputs
+
+
+collaboration_hub = CollaborationHub(
+    collaboration_snapshot, redis_client, app.config["COLLABORATION_FRAME_SECONDS"]
+)
+
+
+def _publish_change(
+    project_id: str, session_id: str, action: str, user_id=None, change=None
+) -> None:
+    """Announce a session change on the project's parameter_changes stream."""
+    event = {"session_id": session_id, "user_id": user_id, "action": action}
+    if change is not None:
+        event.update(
+            parameter_name=change["parameter_path"],
+            old_value=change["old_value"],
+            new_value=change["new_value"],
+            timestamp=change["timestamp"],
+        )
+    try:
+        collaboration_hub.publish(project_id, event)
+    except Exception as e:
+        logger.warning(f"Publishing {action} for session {session_id} failed: {e}")
+
 
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint for Kubernetes liveness probe."""
-    try:
-        # Test database connection
-        db.session.execute(text("SELECT 1"))
-        db_status = "healthy"
-    except Exception as e:
-        logger.error(f"Database health check failed: {e}")
-        db_status = "unhealthy"
+    database = db_health.start().status()
+    db_status = "healthy" if database["healthy"] else "unhealthy"
 
     return jsonify(
         {
-            "status": "healthy" if db_status == "healthy" else "unhealthy",
+            "status": db_status,
             "service": SERVICE_INFO["name"],
             "version": SERVICE_INFO["version"],
             "timestamp": datetime.utcnow().isoformat(),
             "database": db_status,
-            "checks": {"database_connection": db_status == "healthy", "service_ready": True},
+            "checks": {"database_connection": database["healthy"], "service_ready": True},
+            "database_checked_at": database["checked_at"],
         }
-    ), (200 if db_status == "healthy" else 503)
+    ), (200 if database["healthy"] else 503)
 
 
 @app.route("/health/ready", methods=["GET"])
 def readiness_check():
     """Readiness check endpoint for Kubernetes readiness probe."""
-    try:
-        # Test database connection and basic functionality
-        db.session.execute(text("SELECT 1"))
-        ready = True
-        message = "Service ready"
-    except Exception as e:
-        logger.error(f"Readiness check failed: {e}")
-        ready = False
-        message = f"Service not ready: {str(e)}"
+    database = db_health.start().status()
+    ready = database["healthy"]
+    message = "Service ready" if ready else f"Service not ready: {database['error']}"
+
+    pool = db.engine.pool_metrics.snapshot(db.engine)
 
     return jsonify(
         {
@@ -87,6 +454,7 @@ def readiness_check():
             "service": SERVICE_INFO["name"],
             "message": message,
             "timestamp": datetime.utcnow().isoformat(),
+            "database_pool": pool,
         }
     ), (200 if ready else 503)
 
@@ -101,23 +469,173 @@ def service_info():
                 {"path": "/health", "method": "GET", "description": "Health check"},
                 {"path": "/health/ready", "method": "GET", "description": "Readiness check"},
                 {"path": "/api/v1/info", "method": "GET", "description": "Service information"},
+                {"path": "/metrics", "method": "GET", "description": "Prometheus metrics"},
+                {
+                    "path": "/admin/profiling",
+                    "method": "GET, PUT",
+                    "description": "Profiling sample percentage and profiled routes (admin)",
+                },
+                {
+                    "path": "/admin/profiling/flamegraph",
+                    "method": "GET, DELETE",
+                    "description": "Aggregated flame-graph data by route and project (admin)",
+                },
                 {"path": "/api/v1/projects", "method": "GET", "description": "List projects"},
                 {
                     "path": "/api/v1/projects/{project_id}/sessions",
                     "method": "GET",
                     "description": "List project sessions",
                 },
+                {
+                    "path": "/api/v1/projects/{project_id}/reports",
+                    "method": "GET",
+                    "description": "List project reports",
+                },
                 {
                     "path": "/api/v1/projects/{project_id}/calculate",
                     "method": "POST",
                     "description": "Calculate GMC parameters",
                 },
+                {
+                    "path": "/api/v1/projects/{project_id}/rollout",
+                    "method": "POST",
+                    "description": "Roll multi-quarter decision plans forward",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/capacity/check",
+                    "method": "POST",
+                    "description": "Check production quantities against capacity",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/capacity/plan",
+                    "method": "POST",
+                    "description": "Plan the cheapest shift, subcontract and overtime mix",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/transport/allocate",
+                    "method": "POST",
+                    "description": "Minimum-cost hired transport for delivery decisions",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/cash-flow/schedule",
+                    "method": "POST",
+                    "description": "Schedule receipts, payments and cash by credit terms",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/group/valuation",
+                    "method": "POST",
+                    "description": "Group league tables with hypothetical rival moves",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/feasibility",
+                    "method": "POST",
+                    "description": "Project simulator overrides of proposed decisions",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/sensitivity",
+                    "method": "POST",
+                    "description": "Derivatives of performance, cash and profit per decision",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/demand-model",
+                    "method": "GET",
+                    "description": "Fitted demand elasticities per market and product",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/demand-model/observations",
+                    "method": "POST",
+                    "description": "Ingest quarters of group information into the demand fit",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/demand-model/forecast",
+                    "method": "POST",
+                    "description": "Forecast sales for proposed prices and advertising",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/sessions/{session_id}/export",
+                    "method": "GET, POST",
+                    "description": "Download a session as an analysis workbook (xlsx)",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/export",
+                    "method": "GET, POST",
+                    "description": "Download all project sessions as a zip of workbooks",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/jobs",
+                    "method": "POST",
+                    "description": "Queue a long-running rollout or sensitivity job",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/jobs/{job_id}",
+                    "method": "GET",
+                    "description": "Job status and progress",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/jobs/{job_id}/result",
+                    "method": "GET",
+                    "description": "Result of a finished job",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/jobs/{job_id}",
+                    "method": "DELETE",
+                    "description": "Cancel a job",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/collaborate",
+                    "method": "WebSocket",
+                    "description": "Live parameter and result deltas for teammates",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/sessions/{session_id}/history",
+                    "method": "GET",
+                    "description": "Get session undo/redo history",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/sessions/{session_id}/changes",
+                    "method": "POST",
+                    "description": "Record a decision parameter change",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/sessions/{session_id}/undo",
+                    "method": "POST",
+                    "description": "Undo parameter changes",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/sessions/{session_id}/redo",
+                    "method": "POST",
+                    "description": "Redo parameter changes",
+                },
+                {
+                    "path": "/api/v1/projects/{project_id}/sessions/{session_id}/history/jump",
+                    "method": "POST",
+                    "description": "Jump to a history position",
+                },
             ],
             "features": [
                 "Project-scoped data isolation",
                 "Excel-compatible calculations",
                 "Real-time parameter processing",
                 "Investment performance analysis",
+                "Checkpointed undo/redo history",
+                "Batched multi-quarter plan rollout",
+                "Machine-shop and assembly capacity planning",
+                "Hired transport allocation",
+                "Batched cash-flow timing of receipts and payments",
+                "Group valuation and investment-performance league tables",
+                "Decision sensitivity analysis",
+                "Incrementally fitted demand-response model",
+                "Streaming Excel export of sessions",
+                "Decision feasibility projection",
+                "Real-time collaboration with coalesced delta frames",
+                "Background calculation jobs with progress and cancellation",
+                "Prometheus metrics",
+                "Distributed tracing",
+                "On-demand request profiling",
+                "Compressed JSON and MessagePack responses",
+                "ETag revalidation for session and report lists",
+                "Per-user, per-project and per-endpoint rate limits",
+                "Pre-fork serving with preloaded calculation tables",
             ],
         }
     )
@@ -136,17 +654,56 @@ def list_projects():
     )
 
 
+def project_list_queries(project_id: str):
+    """Project-scoped queries whose list reads may be served by a read replica."""
+    return create_project_scoped_session(db.session, project_id, replica_router)
+
+
+def record_project_write(project_id: str) -> None:
+    """Keep a project's list reads on the primary after it changes (read-your-writes)."""
+    if replica_router is not None:
+        replica_router.record_write(project_id)
+
+
+def sessions_version(project_id: str) -> str:
+    """Version of a project's session list from its collection version counter."""
+    return project_list_queries(project_id).get_collection_version("sessions")
+
+
+def reports_version(project_id: str) -> str:
+    """Version of a project's report list from its collection version counter."""
+    return project_list_queries(project_id).get_collection_version("reports")
+
+
 @app.route("/api/v1/projects/<project_id>/sessions", methods=["GET"])
+@conditional_get(sessions_version)
 def list_project_sessions(project_id: str):
-    """List analysis sessions for a specific project."""
-    # TODO: Implement project validation and session querying
-    return jsonify(
-        {
-            "project_id": project_id,
-            "sessions": [],
-            "message": "Session listing requires database models - to be implemented in next story",
-        }
-    )
+    """List analysis sessions for a specific project, newest first."""
+    limit = min(request.args.get("limit", 100, type=int), app.config["MAX_EXPORT_SESSIONS"])
+    try:
+        sessions = project_list_queries(project_id).get_project_sessions(max(limit, 1))
+    except Exception as e:
+        logger.error(f"Listing sessions for project {project_id} failed: {e}")
+        return jsonify({"error": "Sessions unavailable", "message": str(e)}), 503
+
+    return jsonify({"project_id": project_id, "sessions": sessions, "count": len(sessions)})
+
+
+@app.route("/api/v1/projects/<project_id>/reports", methods=["GET"])
+@conditional_get(reports_version)
+def list_project_reports(project_id: str):
+    """List uploaded GMC reports for a project in timeline order."""
+    report_type = request.args.get("report_type")
+    if report_type not in (None, "history", "game"):
+        return jsonify({"error": "report_type must be 'history' or 'game'"}), 400
+
+    try:
+        reports = project_list_queries(project_id).get_project_reports(report_type)
+    except Exception as e:
+        logger.error(f"Listing reports for project {project_id} failed: {e}")
+        return jsonify({"error": "Reports unavailable", "message": str(e)}), 503
+
+    return jsonify({"project_id": project_id, "reports": reports, "count": len(reports)})
 
 
 @app.route("/api/v1/projects/<project_id>/calculate", methods=["POST"])
@@ -164,22 +721,940 @@ def calculate_gmc_parameters(project_id: str):
     # TODO: Implement actual GMC calculations with Excel compatibility
     # TODO: Add project validation and database persistence
 
+    parameters = data.get("parameters", {})
+    results = {
+        "investment_performance": 0.0,
+        "message": "GMC calculation engine - placeholder response",
+        "note": "Full calculation logic to be implemented in next story",
+    }
+
+    # Placeholder results are not cached by decision state: undo/redo would
+    # serve them as real results for revisited states
+
     # Placeholder response
     return jsonify(
         {
             "project_id": project_id,
             "calculation_id": f"calc_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-            "parameters": data.get("parameters", {}),
-            "results": {
-                "investment_performance": 0.0,
-                "message": "GMC calculation engine - placeholder response",
-                "note": "Full calculation logic to be implemented in next story",
-            },
+            "parameters": parameters,
+            "results": results,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    )
+
+
+def _rollout_plans(data: dict, max_plans: int) -> list:
+    """
+    Read and validate the plans of a rollout request.
+
+    Raises:
+        ValueError: If the plans are malformed or exceed the configured limits
+    """
+    plans = data.get("plans")
+    if plans is None and "plan" in data:
+        plans = [data["plan"]]
+
+    if (
+        not plans
+        or not isinstance(plans, list)
+        or not all(
+            isinstance(plan, list) and all(isinstance(quarter, dict) for quarter in plan)
+            for plan in plans
+        )
+    ):
+        raise ValueError("plans must be a list of per-quarter decision lists")
+    if len(plans) > max_plans:
+        raise ValueError(f"At most {max_plans} plans per request")
+    if max(len(plan) for plan in plans) > app.config["MAX_ROLLOUT_QUARTERS"]:
+        raise ValueError(f"Plans may cover at most {app.config['MAX_ROLLOUT_QUARTERS']} quarters")
+    return plans
+
+
+@app.route("/api/v1/projects/<project_id>/rollout", methods=["POST"])
+def rollout_decision_plans(project_id: str):
+    """Evaluate one or more multi-quarter decision plans from a base report."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json() or {}
+    try:
+        plans = _rollout_plans(data, app.config["MAX_ROLLOUT_PLANS"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        engine = RolloutEngine(_base_report(project_id, data), data.get("base_decisions"))
+        payload = rollout_payload(
+            engine,
+            plans,
+            bool(data.get("skip_infeasible")),
+            data.get("include_quarters"),
+            data.get("top"),
+        )
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid rollout input", "message": str(e)}), 400
+
+    return jsonify(
+        {"project_id": project_id, **payload, "timestamp": datetime.utcnow().isoformat()}
+    )
+
+
+@app.route("/api/v1/projects/<project_id>/feasibility", methods=["POST"])
+def project_decision_feasibility(project_id: str):
+    """Predict which decisions the simulator will override and the values it will use."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json() or {}
+    decision_sets = data.get("decision_sets")
+    if decision_sets is None:
+        decision_sets = [data.get("decisions") or {}]
+
+    if not isinstance(decision_sets, list) or not all(isinstance(d, dict) for d in decision_sets):
+        return jsonify({"error": "decision_sets must be a list of decision parameters"}), 400
+    if not decision_sets or len(decision_sets) > app.config["MAX_ROLLOUT_PLANS"]:
+        return (
+            jsonify(
+                {"error": f"Between 1 and {app.config['MAX_ROLLOUT_PLANS']} decision sets allowed"}
+            ),
+            400,
+        )
+
+    try:
+        engine = RolloutEngine(_base_report(project_id, data), data.get("base_decisions"))
+        projection = project_batch(engine, decision_sets, bool(data.get("include_dividend", True)))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid decisions", "message": str(e)}), 400
+
+    include_decisions = bool(data.get("include_decisions", len(decision_sets) == 1))
+    feasible = ~projection["adjusted"].any(axis=1)
+    results = []
+    for index in range(len(decision_sets)):
+        result = {
+            "index": index,
+            "feasible": bool(feasible[index]),
+            "overrides": describe_overrides(projection, index),
+        }
+        if include_decisions:
+            result["effective_decisions"] = decision_parameters(projection["decisions"][index])
+        results.append(result)
+
+    return jsonify(
+        {
+            "project_id": project_id,
+            "count": len(decision_sets),
+            "feasible_count": int(feasible.sum()),
+            "results": results,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    )
+
+
+@app.route("/api/v1/projects/<project_id>/sensitivity", methods=["POST"])
+def decision_sensitivity_analysis(project_id: str):
+    """Derivatives of investment performance, cash and profit for every decision."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json() or {}
+    plan = data.get("plan")
+    if plan is None:
+        plan = [data.get("decisions") or {}]
+    if not isinstance(plan, list) or not all(isinstance(quarter, dict) for quarter in plan):
+        return jsonify({"error": "plan must be a list of per-quarter decisions"}), 400
+    if len(plan) > app.config["MAX_ROLLOUT_QUARTERS"]:
+        return (
+            jsonify(
+                {"error": f"Plans may cover at most {app.config['MAX_ROLLOUT_QUARTERS']} quarters"}
+            ),
+            400,
+        )
+
+    try:
+        engine = RolloutEngine(_base_report(project_id, data), data.get("base_decisions"))
+        sensitivity = decision_sensitivity(
+            engine, plan, quarter=int(data.get("quarter", 1)) - 1, steps=data.get("steps")
+        )
+        variables = rank_by_impact(
+            sensitivity["variables"],
+            data.get("rank_by", "investment_performance"),
+            data.get("top"),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid sensitivity input", "message": str(e)}), 400
+
+    return jsonify(
+        {
+            "project_id": project_id,
+            "base": sensitivity["base"],
+            "variables": variables,
             "timestamp": datetime.utcnow().isoformat(),
         }
     )
 
 
+def _capacity_inputs(data: dict) -> dict:
+    """Read capacity planner inputs (production quantity and setup) from a request body."""
+    if "units" in data:
+        units = parameter_array(data["units"], (3,))
+    else:
+        # Deliveries plus the quality control rejects assembled alongside them
+        deliveries = parameter_array(data.get("deliveries", {}), (3, 3)).sum(axis=0)
+        units = deliveries / (1.0 - REJECT_RATE)
+
+    return {
+        "units": units,
+        "machines": int(data.get("machines", 4)),
+        "workers": int(data.get("assembly_workers", 23)),
+        "shift_level": data.get("shift_level"),
+        "wage_rate_cents": int(data.get("assembly_wage_rate", 1200)),
+        "assembly_minutes": tuple(
+            parameter_array(data.get("assembly_minutes", [115, 165, 325]), (3,)).tolist()
+        ),
+        "component_stock": parameter_array(data.get("component_stock", {}), (3,)),
+    }
+
+
+@app.route("/api/v1/projects/<project_id>/capacity/check", methods=["POST"])
+def check_production_capacity(project_id: str):
+    """Instant feasibility check of production quantities for a capacity setup."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    try:
+        inputs = _capacity_inputs(request.get_json() or {})
+        profile = capacity_profile(
+            inputs["machines"],
+            inputs["workers"],
+            int(inputs["shift_level"] or 1),
+            inputs["wage_rate_cents"],
+            inputs["assembly_minutes"],
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid capacity input", "message": str(e)}), 400
+
+    return jsonify(
+        {
+            "project_id": project_id,
+            "capacity": profile.to_dict(),
+            "check": check_feasibility(inputs["units"], profile, inputs["component_stock"]),
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    )
+
+
+@app.route("/api/v1/projects/<project_id>/capacity/plan", methods=["POST"])
+def plan_production_capacity(project_id: str):
+    """Plan the cheapest shift/subcontract/overtime combination for a production target."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json() or {}
+    try:
+        inputs = _capacity_inputs(data)
+        plan = plan_production(
+            inputs["units"],
+            inputs["machines"],
+            inputs["workers"],
+            shift_level=inputs["shift_level"],
+            wage_rate_cents=inputs["wage_rate_cents"],
+            assembly_minutes=inputs["assembly_minutes"],
+            component_stock=inputs["component_stock"],
+            materials_stock=float(data.get("materials_stock", 0)),
+            allow_subcontract=bool(data.get("allow_subcontract", True)),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid capacity input", "message": str(e)}), 400
+    except RuntimeError as e:
+        logger.error(f"Capacity planning failed for project {project_id}: {e}")
+        return jsonify({"error": "Capacity planning failed", "message": str(e)}), 500
+
+    return jsonify(
+        {
+            "project_id": project_id,
+            "plan": plan,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    )
+
+
+def _transport_deliveries(value: dict) -> np.ndarray:
+    """Read a (3, 3) delivery decision, rejecting quantities beyond MAX_TRANSPORT_UNITS."""
+    deliveries = parameter_array(value, (3, 3))
+    limit = app.config["MAX_TRANSPORT_UNITS"]
+    if not np.all(np.isfinite(deliveries)) or np.any(deliveries > limit):
+        raise ValueError(f"Deliveries must be at most {limit} units per market and product")
+    return deliveries
+
+
+@app.route("/api/v1/projects/<project_id>/transport/allocate", methods=["POST"])
+def allocate_hired_transport(project_id: str):
+    """Allocate deliveries to hired containers, for one decision or a batch of scenarios."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json() or {}
+    scenarios = data.get("scenarios")
+    if scenarios is not None and not isinstance(scenarios, list):
+        return jsonify({"error": "scenarios must be a list of delivery decisions"}), 400
+    if scenarios and len(scenarios) > app.config["MAX_TRANSPORT_SCENARIOS"]:
+        return (
+            jsonify(
+                {"error": f"At most {app.config['MAX_TRANSPORT_SCENARIOS']} scenarios per request"}
+            ),
+            400,
+        )
+
+    try:
+        if scenarios is None:
+            allocation = allocate_transport(_transport_deliveries(data.get("deliveries", {})))
+            return jsonify(
+                {
+                    "project_id": project_id,
+                    "allocation": allocation,
+                    "timestamp": datetime.utcnow().isoformat(),
+                }
+            )
+
+        deliveries = np.array([_transport_deliveries(s) for s in scenarios]).reshape(-1, 3, 3)
+        containers = transport_containers(deliveries)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid transport input", "message": str(e)}), 400
+
+    costs = containers * CONTAINER_TRIP_COST
+    return jsonify(
+        {
+            "project_id": project_id,
+            "scenarios": [
+                {
+                    "containers": dict(zip(MARKETS, row.astype(int).tolist())),
+                    "cost": dict(zip(MARKETS, cost.tolist())),
+                    "total_cost": float(cost.sum()),
+                }
+                for row, cost in zip(containers, costs)
+            ],
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    )
+
+
+def _cash_flow_inputs(scenarios: list, opening: dict) -> dict:
+    """Stack per-quarter sales, costs and other movements of cash-flow scenarios."""
+    quarters = max((len(scenario.get("sales", [])) for scenario in scenarios), default=0)
+    quarters = max(
+        [quarters] + [len(scenario.get("costs", [])) for scenario in scenarios], default=0
+    )
+    sales = np.zeros((len(scenarios), quarters, len(MARKETS)))
+    costs = np.zeros((len(scenarios), quarters, len(PAYMENT_CATEGORIES)))
+    other = np.zeros((len(scenarios), quarters))
+    balances = np.zeros((len(scenarios), 3))
+
+    for index, scenario in enumerate(scenarios):
+        for quarter, values in enumerate(scenario.get("sales", [])):
+            sales[index, quarter] = [float(values.get(market, 0)) for market in MARKETS]
+        for quarter, values in enumerate(scenario.get("costs", [])):
+            costs[index, quarter] = [float(values.get(name, 0)) for name in PAYMENT_CATEGORIES]
+        movements = [float(value) for value in scenario.get("other", [])][:quarters]
+        other[index, : len(movements)] = movements
+        start = {**opening, **scenario.get("opening", {})}
+        balances[index] = [
+            float(start.get(name, 0)) for name in ("cash", "receivables", "payables")
+        ]
+
+    return {
+        "sales": sales,
+        "costs": costs,
+        "opening_cash": balances[:, 0],
+        "opening_receivables": balances[:, 1],
+        "opening_payables": balances[:, 2],
+        "other": other,
+    }
+
+
+@app.route("/api/v1/projects/<project_id>/cash-flow/schedule", methods=["POST"])
+def schedule_cash_flow(project_id: str):
+    """Schedule receipts and payments by credit terms for a batch of scenarios."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json() or {}
+    scenarios = data.get("scenarios")
+    if scenarios is None and ("sales" in data or "costs" in data):
+        scenarios = [data]
+    if (
+        not scenarios
+        or not isinstance(scenarios, list)
+        or not all(isinstance(scenario, dict) for scenario in scenarios)
+    ):
+        return jsonify({"error": "scenarios must be a list of cash-flow scenarios"}), 400
+    if len(scenarios) > app.config["MAX_ROLLOUT_PLANS"]:
+        return (
+            jsonify({"error": f"At most {app.config['MAX_ROLLOUT_PLANS']} scenarios per request"}),
+            400,
+        )
+
+    try:
+        inputs = _cash_flow_inputs(scenarios, data.get("opening") or {})
+        schedule = cash_flow_schedule(**inputs)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid cash-flow input", "message": str(e)}), 400
+
+    cash = schedule["cash"]
+    results = []
+    for index in range(len(scenarios)):
+        lowest = float(cash[index].min() if cash.shape[1] else inputs["opening_cash"][index])
+        results.append(
+            {
+                "quarters": [
+                    {
+                        "receipts": round(float(schedule["receipts"][index, quarter]), 2),
+                        "payments": round(float(schedule["payments"][index, quarter]), 2),
+                        "receivables": round(float(schedule["receivables"][index, quarter]), 2),
+                        "payables": round(float(schedule["payables"][index, quarter]), 2),
+                        "cash": round(float(cash[index, quarter]), 2),
+                    }
+                    for quarter in range(cash.shape[1])
+                ],
+                "lowest_cash": round(lowest, 2),
+                "overdraft_quarters": [int(q) + 1 for q in np.flatnonzero(cash[index] < 0)],
+                "funding_required": round(max(0.0, -lowest), 2),
+            }
+        )
+
+    return jsonify(
+        {
+            "project_id": project_id,
+            "scenarios": results,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    )
+
+
+@app.route("/api/v1/projects/<project_id>/group/valuation", methods=["POST"])
+def rank_group_valuation(project_id: str):
+    """League tables of valuation and investment performance for whole groups."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json() or {}
+    groups = data.get("groups")
+    if groups is None and "companies" in data:
+        groups = [data]
+    if (
+        not groups
+        or not isinstance(groups, list)
+        or not all(
+            isinstance(group, dict) and isinstance(group.get("companies"), list) for group in groups
+        )
+    ):
+        return jsonify({"error": "groups must be a list of group pages with companies"}), 400
+
+    rows = sum(1 + len(group.get("scenarios") or []) for group in groups)
+    if rows > app.config["MAX_ROLLOUT_PLANS"]:
+        return (
+            jsonify(
+                {"error": f"At most {app.config['MAX_ROLLOUT_PLANS']} group tables per request"}
+            ),
+            400,
+        )
+
+    # Identical group pages and moves are served from the project's result cache
+    cache = get_result_cache(project_id)
+    key = f"group_valuation:{state_hash({'groups': groups})}"
+    tables = cache.get(key)
+    cached = tables is not None
+    if not cached:
+        try:
+            tables = league_tables(groups)
+        except (AttributeError, TypeError, ValueError) as e:
+            return jsonify({"error": "Invalid group information", "message": str(e)}), 400
+        cache.put(key, tables)
+
+    return jsonify(
+        {
+            "project_id": project_id,
+            "groups": tables,
+            "cached": cached,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    )
+
+
+@app.route("/api/v1/projects/<project_id>/demand-model", methods=["GET"])
+def get_demand_model(project_id: str):
+    """Fitted demand elasticities for a project."""
+    return jsonify(
+        {
+            "project_id": project_id,
+            "model": load_demand_model(project_id).summary(),
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    )
+
+
+@app.route("/api/v1/projects/<project_id>/demand-model/observations", methods=["POST"])
+def ingest_demand_observations(project_id: str):
+    """Add quarters of group information to the project's demand fit."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json() or {}
+    quarters = data.get("quarters")
+    if quarters is None and "companies" in data:
+        quarters = [data]
+    if (
+        not quarters
+        or not isinstance(quarters, list)
+        or not all(
+            isinstance(quarter, dict)
+            and quarter.get("quarter_period")
+            and isinstance(quarter.get("companies"), list)
+            for quarter in quarters
+        )
+    ):
+        return (
+            jsonify({"error": "quarters must be a list of quarter_period and companies"}),
+            400,
+        )
+
+    def ingest(model: DemandModel) -> list:
+        return [
+            quarter["quarter_period"]
+            for quarter in quarters
+            if model.ingest(str(quarter["quarter_period"]), quarter["companies"])
+        ]
+
+    try:
+        model, ingested = update_demand_model(project_id, ingest)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid group information", "message": str(e)}), 400
+
+    if ingested:
+        logger.info(f"Demand model for project {project_id} updated with {ingested}")
+
+    return jsonify(
+        {
+            "project_id": project_id,
+            "ingested": ingested,
+            "model": model.summary(),
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    )
+
+
+@app.route("/api/v1/projects/<project_id>/demand-model/forecast", methods=["POST"])
+def forecast_demand(project_id: str):
+    """Forecast sales for proposed prices and advertising with the fitted elasticities."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json() or {}
+    scenarios = data.get("scenarios")
+    if scenarios is None:
+        scenarios = [data]
+    if not isinstance(scenarios, list) or not all(isinstance(s, dict) for s in scenarios):
+        return jsonify({"error": "scenarios must be a list of prices and advertising"}), 400
+    if len(scenarios) > app.config["MAX_ROLLOUT_PLANS"]:
+        return (
+            jsonify({"error": f"At most {app.config['MAX_ROLLOUT_PLANS']} scenarios per request"}),
+            400,
+        )
+
+    try:
+        reference = ReportReference(_base_report(project_id, {**data, "demand_model": "fitted"}))
+        prices = np.array(
+            [parameter_array(s.get("prices") or {}, (3, 3)) for s in scenarios]
+        ).reshape(-1, 3, 3)
+        advertising = np.array(
+            [parameter_array(s.get("advertising") or {}, (3,)) for s in scenarios]
+        ).reshape(-1, 3)
+        # Unspecified prices and advertising stay at the base report's values
+        prices = np.where(prices > 0, prices, reference.prices)
+        advertising = np.where(advertising > 0, advertising, reference.advertising)
+        forecast = reference.demand(prices, advertising)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid forecast input", "message": str(e)}), 400
+
+    return jsonify(
+        {
+            "project_id": project_id,
+            "forecasts": [
+                {
+                    market: {
+                        product: round(float(units[i, j]), 1) for j, product in enumerate(PRODUCTS)
+                    }
+                    for i, market in enumerate(MARKETS)
+                }
+                for units in forecast
+            ],
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    )
+
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@app.route("/api/v1/projects/<project_id>/sessions/<session_id>/export", methods=["GET", "POST"])
+def export_session_workbook(project_id: str, session_id: str):
+    """Stream a session's decisions and computed sheets as an xlsx workbook."""
+    data = request.get_json(silent=True) or {}
+    decisions = data.get("decisions")
+    if decisions is None:
+        decisions = get_session_history(project_id, session_id).current_state()
+    if not isinstance(decisions, dict):
+        return jsonify({"error": "decisions must be nested decision parameters"}), 400
+
+    session = export_session(
+        session_id, decisions, data.get("base_report"), data.get("session_name")
+    )
+    try:
+        workbook = iter_session_workbook(session)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid session", "message": str(e)}), 400
+
+    return Response(
+        workbook,
+        mimetype=XLSX_MIMETYPE,
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(session)}"'},
+    )
+
+
+@app.route("/api/v1/projects/<project_id>/export", methods=["GET", "POST"])
+def export_project_workbooks(project_id: str):
+    """
+    Stream a zip with one workbook per project session, built incrementally.
+
+    Sessions that cannot be calculated are listed in export_errors.json in the zip.
+    """
+    data = request.get_json(silent=True) or {}
+    limit = app.config["MAX_EXPORT_SESSIONS"]
+    sessions = data.get("sessions")
+
+    if sessions is None:
+        try:
+            queries = project_list_queries(project_id)
+            sessions = [session_from_record(r) for r in queries.get_project_sessions(limit)]
+        except Exception as e:
+            logger.error(f"Loading sessions for export of project {project_id} failed: {e}")
+            return jsonify({"error": "Sessions unavailable", "message": str(e)}), 503
+    elif not isinstance(sessions, list) or not all(isinstance(s, dict) for s in sessions):
+        return jsonify({"error": "sessions must be a list of sessions"}), 400
+    else:
+        sessions = [
+            export_session(
+                str(s.get("session_id", index + 1)),
+                s.get("decisions") or {},
+                s.get("base_report"),
+                s.get("session_name"),
+            )
+            for index, s in enumerate(sessions)
+        ]
+
+    if len(sessions) > limit:
+        return jsonify({"error": f"At most {limit} sessions per export"}), 400
+
+    return Response(
+        iter_project_zip(sessions),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="project_{project_id}.zip"'},
+    )
+
+
+def ensure_job_worker() -> None:
+    """Start the in-process worker pool when no separate worker consumes Redis."""
+    global _inline_job_worker
+    if redis_client is None and _inline_job_worker is None:
+        _inline_job_worker = JobWorker(
+            job_queue, JOB_HANDLERS, processes=app.config["JOB_WORKER_PROCESSES"] or None
+        ).start()
+
+
+def _job_parameters(job_type: str, project_id: str, parameters: dict) -> dict:
+    """
+    Validate job parameters and resolve the base report, so identical inputs hash identically.
+
+    Raises:
+        ValueError: If the job type is unknown or its parameters are invalid
+    """
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"type must be one of {', '.join(sorted(JOB_HANDLERS))}")
+    if job_type == "rollout":
+        parameters["plans"] = _rollout_plans(parameters, app.config["MAX_JOB_ROLLOUT_PLANS"])
+        parameters.pop("plan", None)
+    elif job_type == "sensitivity":
+        plan = parameters.get("plan")
+        if plan is None:
+            plan = [parameters.pop("decisions", None) or {}]
+        if not isinstance(plan, list) or not all(isinstance(q, dict) for q in plan):
+            raise ValueError("plan must be a list of per-quarter decisions")
+        parameters["plan"] = plan
+
+    parameters["base_report"] = _base_report(project_id, parameters)
+    parameters.pop("demand_model", None)
+    return parameters
+
+
+@app.route("/api/v1/projects/<project_id>/jobs", methods=["POST"])
+def submit_calculation_job(project_id: str):
+    """Queue a long-running calculation; identical queued or finished jobs are reused."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json() or {}
+    job_type = data.get("type")
+    parameters = data.get("parameters") or {}
+    if not isinstance(parameters, dict):
+        return jsonify({"error": "parameters must be an object"}), 400
+
+    try:
+        parameters = _job_parameters(job_type, project_id, dict(parameters))
+    except ValueError as e:
+        return jsonify({"error": "Invalid job", "message": str(e)}), 400
+
+    try:
+        ensure_job_worker()
+        job, deduplicated = job_queue.submit(job_type, project_id, parameters)
+    except Exception as e:
+        logger.error(f"Queueing {job_type} job for project {project_id} failed: {e}")
+        return jsonify({"error": "Job queue unavailable", "message": str(e)}), 503
+
+    return jsonify({**job, "deduplicated": deduplicated}), (200 if deduplicated else 202)
+
+
+@app.route("/api/v1/projects/<project_id>/jobs/<job_id>", methods=["GET"])
+def get_calculation_job(project_id: str, job_id: str):
+    """Job status and progress."""
+    job = job_queue.get(project_id, job_id)
+    if job is None:
+        return jsonify({"error": "Job not found", "message": "Unknown or expired job"}), 404
+    return jsonify(job)
+
+
+@app.route("/api/v1/projects/<project_id>/jobs/<job_id>/result", methods=["GET"])
+def get_calculation_job_result(project_id: str, job_id: str):
+    """Result of a finished job."""
+    job = job_queue.get(project_id, job_id)
+    if job is None:
+        return jsonify({"error": "Job not found", "message": "Unknown or expired job"}), 404
+    if job["status"] != SUCCEEDED:
+        return jsonify({"error": "Job has no result", "message": f"Job is {job['status']}"}), 409
+    return jsonify(
+        {"project_id": project_id, "job_id": job_id, "result": job_queue.result(project_id, job_id)}
+    )
+
+
+@app.route("/api/v1/projects/<project_id>/jobs/<job_id>", methods=["DELETE"])
+def cancel_calculation_job(project_id: str, job_id: str):
+    """Cancel a queued job, or stop a running one at its next progress report."""
+    job = job_queue.cancel(project_id, job_id)
+    if job is None:
+        return jsonify({"error": "Job not found", "message": "Unknown or expired job"}), 404
+    return jsonify(job)
+
+
+def _history_response(project_id: str, session_id: str, history: SessionHistory, **extra):
+    """Build the common undo/redo response body."""
+    body = {
+        "project_id": project_id,
+        "session_id": session_id,
+        "history": history.summary(),
+        "decision_parameters": history.current_state(),
+        "results": session_outputs(project_id, session_id, history, history.position),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+    body.update(extra)
+    return jsonify(body)
+
+
+@app.route("/api/v1/projects/<project_id>/sessions/<session_id>/history", methods=["GET"])
+def get_session_history_state(project_id: str, session_id: str):
+    """Get the undo/redo position and decisions for a session."""
+    history = get_session_history(project_id, session_id)
+    return _history_response(project_id, session_id, history)
+
+
+@app.route("/api/v1/projects/<project_id>/sessions/<session_id>/changes", methods=["POST"])
+def record_parameter_change(project_id: str, session_id: str):
+    """Record a decision parameter change in the session history."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json()
+    if not data or "parameter_path" not in data or "new_value" not in data:
+        return jsonify({"error": "parameter_path and new_value required"}), 400
+
+    history = get_session_history(project_id, session_id, data.get("base_parameters"))
+    try:
+        change = history.record_change(
+            data["parameter_path"],
+            data["new_value"],
+            user_id=data.get("user_id"),
+            change_reason=data.get("change_reason"),
+        )
+    except ValueError as e:
+        return jsonify({"error": "Invalid parameter change", "message": str(e)}), 400
+    except HistoryConflictError as e:
+        return jsonify({"error": "History conflict", "message": str(e)}), 409
+    record_project_write(project_id)
+    _publish_change(project_id, session_id, "change", data.get("user_id"), change)
+
+    return _history_response(project_id, session_id, history, change=change), 201
+
+
+def _history_steps(data: dict) -> int:
+    """
+    Read the number of undo/redo steps from a request body.
+
+    Raises:
+        ValueError: If steps is not a positive integer
+    """
+    steps = data.get("steps", 1)
+    if isinstance(steps, bool) or not isinstance(steps, int) or steps < 1:
+        raise ValueError("steps must be a positive integer")
+    return steps
+
+
+@app.route("/api/v1/projects/<project_id>/sessions/<session_id>/undo", methods=["POST"])
+def undo_parameter_changes(project_id: str, session_id: str):
+    """Undo one or more parameter changes."""
+    data = request.get_json(silent=True) or {}
+    try:
+        steps = _history_steps(data)
+    except ValueError as e:
+        return jsonify({"error": "Invalid steps", "message": str(e)}), 400
+
+    history = get_session_history(project_id, session_id)
+    try:
+        history.undo(steps)
+    except HistoryConflictError as e:
+        return jsonify({"error": "History conflict", "message": str(e)}), 409
+    record_project_write(project_id)
+    _publish_change(project_id, session_id, "undo", data.get("user_id"))
+    return _history_response(project_id, session_id, history)
+
+
+@app.route("/api/v1/projects/<project_id>/sessions/<session_id>/redo", methods=["POST"])
+def redo_parameter_changes(project_id: str, session_id: str):
+    """Redo one or more undone parameter changes."""
+    data = request.get_json(silent=True) or {}
+    try:
+        steps = _history_steps(data)
+    except ValueError as e:
+        return jsonify({"error": "Invalid steps", "message": str(e)}), 400
+
+    history = get_session_history(project_id, session_id)
+    try:
+        history.redo(steps)
+    except HistoryConflictError as e:
+        return jsonify({"error": "History conflict", "message": str(e)}), 409
+    record_project_write(project_id)
+    _publish_change(project_id, session_id, "redo", data.get("user_id"))
+    return _history_response(project_id, session_id, history)
+
+
+@app.route("/api/v1/projects/<project_id>/sessions/<session_id>/history/jump", methods=["POST"])
+def jump_to_history_position(project_id: str, session_id: str):
+    """Jump to any recorded history position."""
+    data = request.get_json(silent=True) or {}
+    if "position" not in data:
+        return jsonify({"error": "position required"}), 400
+
+    history = get_session_history(project_id, session_id)
+    try:
+        history.jump_to(int(data["position"]))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid history position", "message": str(e)}), 400
+    except HistoryConflictError as e:
+        return jsonify({"error": "History conflict", "message": str(e)}), 409
+
+    record_project_write(project_id)
+    _publish_change(project_id, session_id, "jump", data.get("user_id"))
+    return _history_response(project_id, session_id, history)
+
+
+def _apply_collaboration_message(project_id: str, user_id: str, raw: str) -> None:
+    """Record a parameter change sent over a collaboration socket."""
+    message = json.loads(raw)
+    session_id = str(message["session_id"])
+    history = get_session_history(project_id, session_id)
+    change = history.record_change(message["parameter_path"], message["new_value"], user_id=user_id)
+    record_project_write(project_id)
+    _publish_change(project_id, session_id, "change", user_id, change)
+
+
+_collaboration_sockets = (
+    threading.BoundedSemaphore(app.config["MAX_COLLABORATION_SOCKETS"])
+    if app.config["MAX_COLLABORATION_SOCKETS"]
+    else None
+)
+
+
+@app.before_request
+def reserve_collaboration_socket():
+    """Refuse collaboration sockets before the handshake once the worker's cap is reached."""
+    if request.endpoint != "collaborate" or _collaboration_sockets is None:
+        return None
+    if not _collaboration_sockets.acquire(blocking=False):
+        response = jsonify(
+            {
+                "error": "Collaboration capacity reached",
+                "message": "Too many open collaboration sockets on this worker; retry shortly",
+            }
+        )
+        response.status_code = 503
+        response.headers["Retry-After"] = "5"
+        return response
+    g.collaboration_socket = True
+    return None
+
+
+@app.teardown_request
+def release_collaboration_socket(error=None):
+    """Free the socket slot once the collaboration handler returns."""
+    if g.pop("collaboration_socket", False):
+        _collaboration_sockets.release()
+
+
+@sock.route("/api/v1/projects/<project_id>/collaborate")
+def collaborate(ws, project_id: str):
+    """
+    Live collaboration socket for a project.
+
+    Sends a snapshot on connect, presence updates, and one delta frame per
+    coalescing interval with the changed parameters and key outputs of every
+    edited session. Clients may send parameter changes as JSON
+    {session_id, parameter_path, new_value}.
+    """
+    user_id = request.args.get("user_id", "anonymous")
+    frame_seconds = app.config["COLLABORATION_FRAME_SECONDS"]
+    connection = collaboration_hub.connect(project_id, user_id)
+    last_heartbeat = datetime.utcnow()
+    try:
+        while True:
+            message = connection.next_message(timeout=frame_seconds)
+            if message is not None:
+                ws.send(message)
+
+            incoming = ws.receive(timeout=0)
+            while incoming is not None:
+                try:
+                    _apply_collaboration_message(project_id, user_id, incoming)
+                except (KeyError, TypeError, ValueError) as e:
+                    ws.send(json.dumps({"t": "e", "error": "Invalid change", "message": str(e)}))
+                except HistoryConflictError as e:
+                    ws.send(json.dumps({"t": "e", "error": "History conflict", "message": str(e)}))
+                incoming = ws.receive(timeout=0)
+
+            if (datetime.utcnow() - last_heartbeat).total_seconds() > 60:
+                collaboration_hub.heartbeat(connection)
+                last_heartbeat = datetime.utcnow()
+    except ConnectionClosed:
+        pass
+    finally:
+        collaboration_hub.disconnect(connection)
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
@@ -211,6 +1686,21 @@ def internal_error(error):
     )
 
 
+def create_app() -> Flask:
+    """
+    Application factory for the WSGI server (see app/wsgi.py and gunicorn.conf.py).
+
+    Routes, extensions and middleware are registered when this module is
+    imported; the factory adds the process-level startup that belongs in
+    the pre-fork master, so workers inherit it copy-on-write.
+
+    Returns:
+        The configured application with calculation tables preloaded
+    """
+    preload_tables()
+    return app
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     debug = os.environ.get("FLASK_ENV") == "development"
@@ -218,4 +1708,4 @@ if __name__ == "__main__":
     logger.info(f"Starting {SERVICE_INFO['name']} on port {port}")
     logger.info(f"Debug mode: {debug}")
 
-    app.run(host="0.0.0.0", port=port, debug=debug)
+    create_app().run(host="0.0.0.0", port=port, debug=debug)
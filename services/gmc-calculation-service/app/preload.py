@@ -0,0 +1,69 @@
+"""
+Calculation Table Preloading
+
+Builds the read-only state the calculation engines use before the service
+takes requests. Under the pre-forking server this runs once in the master,
+so every worker inherits it copy-on-write instead of building it on its
+first requests.
+
+Most tables (cost and capacity constants, decision and state dtypes,
+container trip costs, the sensitivity variable list, feasibility reason
+tables) are built when the engine modules are imported. The sample company
+is then run through each engine so lazily initialised code (SciPy's HiGHS
+solver, openpyxl's writer parts) is loaded as well, and the capacity profile
+and plan caches hold the sample setup at every shift level.
+"""
+
+from typing import Any, Dict
+import io
+import logging
+import sys
+import time
+
+from app.capacity import cache_info, plan_production
+from app.excel_export import write_session_workbook
+from app.quarter_model import SAMPLE_DECISIONS, SAMPLE_REPORT, parameter_array
+from app.rollout import RolloutEngine
+from app.sensitivity import decision_sensitivity
+from app.transport import allocate_transport
+
+logger = logging.getLogger(__name__)
+
+_summary: Dict[str, Any] = {}
+
+
+def preload_tables() -> Dict[str, Any]:
+    """
+    Warm every calculation engine on the sample company (once per process).
+
+    Returns:
+        Seconds taken, modules loaded and capacity cache sizes
+    """
+    if _summary:
+        return _summary
+
+    started = time.perf_counter()
+    engine = RolloutEngine(SAMPLE_REPORT)
+    engine.evaluate([[SAMPLE_DECISIONS]])
+    decision_sensitivity(engine, [SAMPLE_DECISIONS])
+    deliveries = parameter_array(SAMPLE_DECISIONS["deliveries"], (3, 3))
+    plan_production(
+        deliveries.sum(axis=0), SAMPLE_REPORT["machines"], SAMPLE_REPORT["assembly_workers"]
+    )
+    allocate_transport(deliveries)
+    write_session_workbook(
+        {"session_name": "preload", "base_report": SAMPLE_REPORT, "decisions": SAMPLE_DECISIONS},
+        io.BytesIO(),
+    )
+
+    caches = cache_info()
+    _summary.update(
+        {
+            "seconds": round(time.perf_counter() - started, 3),
+            "modules": len(sys.modules),
+            "capacity_profiles": caches["profiles"]["currsize"],
+            "production_plans": caches["plans"]["currsize"],
+        }
+    )
+    logger.info(f"Preloaded calculation tables: {_summary}")
+    return _summary
@@ -0,0 +1,999 @@
+"""
+GMC Quarterly Company Model
+
+Vectorised one-quarter transition of a GMC company: production (machining,
+subcontracted components, assembly), sales, costs, cash and equity. The
+state and decisions are numpy structured arrays so that a whole batch of
+alternative plans advances one quarter in a single call.
+
+Constants come from the analysis workbook (overview/gmc_analysis.xlsx). The
+simulator's demand and share price models are not published; demand uses a
+constant-elasticity response around the base report's sales, and the share
+price follows book value per share from the base report.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.cash_flow import PAYMENT_KERNELS, RECEIPT_KERNELS, TAX_KERNEL, settle_quarter
+
+MARKETS = ("europe", "nafta", "internet")
+PRODUCTS = ("product_1", "product_2", "product_3")
+
+# Machine shop (Cost of Production sheet)
+MACHINE_MINUTES = np.array([60.0, 75.0, 120.0])
+MACHINE_EFFICIENCY = 0.93
+MACHINE_HOURS_PER_SHIFT = np.array([576.0, 1068.0, 1602.0])  # per machine per quarter
+MACHINE_WEEKDAY_HOURS_PER_SHIFT = np.array([420.0, 840.0, 1260.0])  # the rest is weekend work
+MACHINE_SATURDAY_HOURS = 84.0  # per machine; machinists are paid assembly overtime rates
+SUPERVISION_COST_PER_SHIFT = np.array([12500.0, 25000.0, 37500.0])
+SHIFT_PREMIUM = np.array([0.0, 0.33, 0.67])
+PRODUCTION_OVERHEAD_PER_MACHINE = 3500.0
+MACHINE_RUNNING_COST_PER_HOUR = 8.0
+MACHINISTS_PER_MACHINE = 4
+MACHINIST_WAGE_FACTOR = 0.65  # machinist hourly wage as a share of the assembly wage
+MAINTENANCE_COST_PER_HOUR = 85.0  # €6,800 for 4 machines at 20 hours in the sample report
+PLANNING_COST_PER_UNIT = 1.0  # per unit delivered
+QUALITY_CONTROL_PER_UNIT = 1.0  # per unit assembled, rejects included
+
+# Quality control rejects are scrapped (Revenue sheet K23:M25); 2,912 units were
+# inspected for 2,825 delivered in the sample report
+REJECT_RATE = 0.03
+SCRAP_PRICE = np.array([40.0, 80.0, 120.0])
+
+# Components and materials
+MATERIALS_PER_UNIT = np.array([1.0, 2.0, 3.0])
+SPOT_PRICE_USD_PER_1000 = 78360.0
+EXCHANGE_RATE = 0.88  # € per $
+EMERGENCY_MATERIALS_PREMIUM = 0.10  # shortfalls are bought at spot plus a premium
+SUBCONTRACT_COST = np.array([128.0, 211.0, 324.0])
+SUBCONTRACT_LEAD_QUARTERS = 2
+
+# Assembly (hours per worker per quarter; weekend hours are overtime)
+ASSEMBLY_WEEKDAY_HOURS = 420.0
+ASSEMBLY_SATURDAY_HOURS = 84.0
+ASSEMBLY_SUNDAY_HOURS = 84.0
+SATURDAY_RATE = 1.5
+SUNDAY_RATE = 2.0
+
+# Hired transport (Hired Transport sheet)
+SPACE_UNITS = np.array([1.0, 2.0, 4.0])
+CONTAINER_CAPACITY = 500.0
+JOURNEY_KM = np.array([1381.0, 500.0, 300.0])
+KM_PER_DAY = 400.0
+CONTAINER_COST_PER_DAY = 650.0
+SHIPMENT_COST_PER_CONTAINER = np.array([0.0, 8000.0, 0.0])
+# Cost of one container on each market's journey (journeys are hired in whole days)
+CONTAINER_TRIP_COST = (
+    CONTAINER_COST_PER_DAY * np.ceil(JOURNEY_KM / KM_PER_DAY) + SHIPMENT_COST_PER_CONTAINER
+)
+
+# Selling and administration (Payments & Payables V9:V15, sample report)
+AGENT_COMMISSION = np.array([0.1262, 0.1262, 0.0])  # €132,430 on €1,049,285 of Europe/NAFTA sales
+GUARANTEE_COST_PER_UNIT = 3.88  # €10,890 for 2,806 units sold
+PURCHASING_COST_SHARE = 0.0236  # purchasing and warehousing, €8,021 on €340,570 of materials
+BUSINESS_INTELLIGENCE_COST = 7500.0  # market shares and corporate activity reports
+
+# Finance
+DEPRECIATION_RATE = 0.025  # machinery, per quarter
+MACHINE_PRICE = 300000.0
+LOAN_RATE = 0.10  # annual
+DEPOSIT_RATE = 0.03  # annual
+OVERDRAFT_RATE = 0.15  # annual
+TAX_RATE = 0.30
+SHARE_CAPITAL_BAND = 0.10  # issue/repurchase limit per financial year
+
+# Bank lending (manual Table 19)
+OVERDRAFT_ASSET_SHARE = 0.50  # of property and inventories
+OVERDRAFT_RECEIVABLES_SHARE = 0.90
+BORROWING_MARKET_VALUE_SHARE = 0.50  # of the company's market value
+
+# Demand response around the base report
+PRICE_ELASTICITY = 1.5
+ADVERTISING_ELASTICITY = 0.1
+
+STATE_DTYPE = np.dtype(
+    [
+        ("quarter", "i4"),  # 1-4 within the financial year
+        ("machines", "f8"),
+        ("machines_on_order", "f8"),
+        ("assembly_workers", "f8"),
+        ("wage_rate", "f8"),  # € per hour; can never decrease
+        ("product_stock", "f8", (3, 3)),  # market x product
+        ("component_stock", "f8", (3,)),
+        ("components_on_order", "f8", (SUBCONTRACT_LEAD_QUARTERS, 3)),  # by quarters to arrival
+        ("materials_stock", "f8"),
+        ("machine_value", "f8"),
+        ("property", "f8"),  # land and buildings at book value
+        ("cash", "f8"),  # negative values are a bank overdraft
+        ("term_deposit", "f8"),
+        ("loans", "f8"),
+        ("receivables", "f8"),
+        ("payables", "f8"),
+        ("tax_due", "f8"),
+        ("share_capital", "f8"),  # €1 shares, so also the share count
+        ("share_premium", "f8"),
+        ("retained_earnings", "f8"),
+        ("share_price", "f8"),  # cents
+        ("year_start_share_capital", "f8"),
+        ("issue_value_total", "f8"),
+        ("dividends_total", "f8"),
+    ]
+)
+
+DECISION_DTYPE = np.dtype(
+    [
+        ("prices", "f8", (3, 3)),
+        ("deliveries", "f8", (3, 3)),
+        ("advertising", "f8", (3,)),  # €'000 per product
+        ("assembly_minutes", "f8", (3,)),
+        ("subcontract", "f8", (3,)),
+        ("shift_level", "f8"),
+        ("materials_to_buy", "f8"),  # '000 units
+        ("machines_to_buy", "f8"),
+        ("maintenance_hours", "f8"),
+        ("recruit", "f8"),
+        ("train", "f8"),
+        ("assembly_wage_rate", "f8"),  # cents per hour
+        ("management_budget", "f8"),  # €'000
+        ("website_development", "f8"),  # €'000
+        ("product_development", "f8"),  # €'000
+        ("share_issue", "f8"),  # shares
+        ("dividend", "f8"),  # % of share capital
+        ("additional_loan", "f8"),  # €'000
+        ("term_deposit", "f8"),  # €'000 change
+    ]
+)
+
+# Decisions that default to zero each quarter; all others repeat
+NON_REPEATING_DECISIONS = (
+    "subcontract",
+    "materials_to_buy",
+    "machines_to_buy",
+    "recruit",
+    "train",
+    "share_issue",
+    "dividend",
+    "additional_loan",
+    "term_deposit",
+)
+
+# Sample company from the analysis workbook (base report defaults)
+SAMPLE_REPORT: Dict[str, Any] = {
+    "quarter": 1,
+    "machines": 4,
+    "assembly_workers": 23,
+    "assembly_wage_rate": 1200,
+    "product_stock": {},
+    "component_stock": {},
+    "components_on_order": [],
+    "materials_stock": 1357,
+    "machine_value": 1070870,
+    "property": 300000,  # land 50,000 and buildings 250,000
+    "cash": 1976635,
+    "term_deposit": 0,
+    "loans": 0,
+    "receivables": 818125,
+    "payables": 326696,
+    "tax_due": 0,
+    "share_capital": 4000000,
+    "share_premium": 0,
+    "retained_earnings": -43916,
+    "share_price": 108.01,
+    "fixed_overheads": 48736,  # overheads net of machine running and QC, plus ISP and insurance
+    "sales_units": {
+        "europe": {"product_1": 967, "product_2": 625, "product_3": 361},
+        "nafta": {"product_1": 157, "product_2": 141, "product_3": 75},
+        "internet": {"product_1": 238, "product_2": 150, "product_3": 92},
+    },
+    "prices": {
+        "europe": {"product_1": 325, "product_2": 490, "product_3": 700},
+        "nafta": {"product_1": 335, "product_2": 490, "product_3": 725},
+        "internet": {"product_1": 375, "product_2": 590, "product_3": 850},
+    },
+    "advertising": {"product_1": 25, "product_2": 25, "product_3": 25},
+}
+
+SAMPLE_DECISIONS: Dict[str, Any] = {
+    "prices": SAMPLE_REPORT["prices"],
+    "deliveries": {
+        "europe": {"product_1": 1000, "product_2": 625, "product_3": 325},
+        "nafta": {"product_1": 150, "product_2": 150, "product_3": 75},
+        "internet": {"product_1": 250, "product_2": 150, "product_3": 100},
+    },
+    "advertising": {"product_1": 25, "product_2": 25, "product_3": 25},
+    "assembly_minutes": {"product_1": 115, "product_2": 165, "product_3": 325},
+    "shift_level": 2,
+    "maintenance_hours": 20,
+    "assembly_wage_rate": 1200,
+    "management_budget": 134,  # administrative expenses beyond the itemised payments
+    "website_development": 15,
+    "product_development": 0,
+}
+
+
+def parameter_array(value: Any, shape: Tuple[int, ...]) -> np.ndarray:
+    """
+    Read a nested market x product (or per-product) parameter into an array.
+
+    Args:
+        value: Nested mapping (e.g. {"europe": {"product_1": 900}}) or list
+        shape: (3, 3) for market x product values, (3,) for per-product values
+
+    Returns:
+        Array with missing entries set to 0
+    """
+    return _merge(np.zeros(shape), value or {})
+
+
+class ReportReference:
+    """Base report figures that stay fixed over a rollout (demand anchor, overheads)."""
+
+    __slots__ = (
+        "sales_units",
+        "prices",
+        "advertising",
+        "fixed_overheads",
+        "price_elasticity",
+        "advertising_elasticity",
+    )
+
+    def __init__(self, report: Dict[str, Any]):
+        report = report or {}
+        self.sales_units = parameter_array(
+            report.get("sales_units", SAMPLE_REPORT["sales_units"]), (3, 3)
+        )
+        self.prices = parameter_array(report.get("prices", SAMPLE_REPORT["prices"]), (3, 3))
+        self.advertising = parameter_array(
+            report.get("advertising", SAMPLE_REPORT["advertising"]), (3,)
+        )
+        self.fixed_overheads = float(
+            report.get("fixed_overheads", SAMPLE_REPORT["fixed_overheads"])
+        )
+        # Per market and product; fitted values come from app.demand_model
+        self.price_elasticity = _elasticity(report.get("price_elasticity"), PRICE_ELASTICITY)
+        self.advertising_elasticity = _elasticity(
+            report.get("advertising_elasticity"), ADVERTISING_ELASTICITY
+        )
+
+    def demand(self, prices: np.ndarray, advertising: np.ndarray) -> np.ndarray:
+        """
+        Expected orders per market and product.
+
+        Args:
+            prices: (..., 3, 3) prices in €; zero withdraws the product
+            advertising: (..., 3) product advertising in €'000
+
+        Returns:
+            (..., 3, 3) expected orders
+        """
+        base_prices = np.where(self.prices > 0, self.prices, 1.0)
+        price_ratio = np.where(prices > 0, prices / base_prices, np.inf)
+        advertising_ratio = (1.0 + advertising) / (1.0 + self.advertising)
+        with np.errstate(divide="ignore"):
+            response = price_ratio**-self.price_elasticity
+        return (
+            self.sales_units
+            * response
+            * advertising_ratio[..., None, :] ** self.advertising_elasticity
+        )
+
+
+def _elasticity(value: Any, default: float) -> np.ndarray:
+    """Read a scalar or (partial) market x product elasticity, defaulting missing cells."""
+    if value is None:
+        return np.full((3, 3), default)
+    if isinstance(value, (int, float)):
+        return np.full((3, 3), float(value))
+    return _merge(np.full((3, 3), default), value)
+
+
+def state_from_report(report: Dict[str, Any]) -> np.ndarray:
+    """
+    Build a company state record from a management report.
+
+    Args:
+        report: Base report values; missing entries use the workbook sample
+
+    Returns:
+        0-d structured array of STATE_DTYPE
+    """
+    values = dict(SAMPLE_REPORT)
+    values.update(report or {})
+
+    state = np.zeros((), dtype=STATE_DTYPE)
+    state["quarter"] = int(values["quarter"])
+    state["machines"] = values["machines"]
+    state["assembly_workers"] = values["assembly_workers"]
+    state["wage_rate"] = float(values["assembly_wage_rate"]) / 100.0
+    state["product_stock"] = parameter_array(values["product_stock"], (3, 3))
+    state["component_stock"] = parameter_array(values["component_stock"], (3,))
+    if values["components_on_order"]:
+        state["components_on_order"] = np.asarray(values["components_on_order"], dtype=float)
+    for field in (
+        "materials_stock",
+        "machine_value",
+        "property",
+        "cash",
+        "term_deposit",
+        "loans",
+        "receivables",
+        "payables",
+        "tax_due",
+        "share_capital",
+        "share_premium",
+        "retained_earnings",
+        "share_price",
+    ):
+        state[field] = float(values[field])
+    state["year_start_share_capital"] = state["share_capital"]
+    return state
+
+
+def decisions_from_parameters(
+    parameters: Dict[str, Any], previous: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Build a decision record from nested decision parameters.
+
+    Decisions that are not given repeat the previous quarter's value, except
+    one-off decisions (subcontracting, purchases, finance) which default to 0.
+
+    Args:
+        parameters: Nested decision parameters (e.g. prices.europe.product_1)
+        previous: Previous quarter's decision record, if any
+
+    Returns:
+        0-d structured array of DECISION_DTYPE
+    """
+    decisions = np.zeros((), dtype=DECISION_DTYPE)
+    if previous is not None:
+        decisions[()] = previous
+        for field in NON_REPEATING_DECISIONS:
+            decisions[field] = 0
+    else:
+        decisions["shift_level"] = 1
+        decisions["assembly_minutes"] = (100, 150, 300)
+        decisions["assembly_wage_rate"] = 900
+
+    for field in DECISION_DTYPE.names:
+        if field not in parameters:
+            continue
+        if DECISION_DTYPE[field].shape:
+            decisions[field] = _merge(decisions[field], parameters[field])
+        else:
+            decisions[field] = float(parameters[field])
+    return decisions
+
+
+def _merge(current: np.ndarray, value: Any) -> np.ndarray:
+    """Apply a (possibly partial) nested market/product mapping to an array."""
+    merged = np.array(current, dtype=float)
+    if isinstance(value, (list, tuple)):
+        return np.asarray(value, dtype=float).reshape(merged.shape)
+    if merged.ndim == 1:
+        for j, product in enumerate(PRODUCTS):
+            if product in value:
+                merged[j] = float(value[product])
+        return merged
+    for i, market in enumerate(MARKETS):
+        for j, product in enumerate(PRODUCTS):
+            if product in value.get(market, {}):
+                merged[i, j] = float(value[market][product])
+    return merged
+
+
+def whole_units(deliveries: np.ndarray) -> np.ndarray:
+    """Round delivered quantities up to whole units (tolerating float noise)."""
+    return np.maximum(np.ceil(np.asarray(deliveries, dtype=float) - 1e-9), 0.0)
+
+
+def transport_containers(deliveries: np.ndarray) -> np.ndarray:
+    """
+    Containers hired per market (Hired Transport sheet).
+
+    Every unit takes whole space units, and containers are counted from the
+    space used, which is the minimum number of containers for the workbook's
+    divisible space units (see app.transport for explicit allocations).
+
+    Args:
+        deliveries: (..., 3, 3) units delivered per market and product
+
+    Returns:
+        (..., 3) containers per market
+    """
+    units = whole_units(deliveries)
+    return np.maximum(np.ceil(units @ SPACE_UNITS / CONTAINER_CAPACITY - 1e-9), 0.0)
+
+
+def transport_cost(deliveries: np.ndarray) -> np.ndarray:
+    """
+    Hired transport cost of a delivery matrix (Hired Transport sheet).
+
+    Args:
+        deliveries: (..., 3, 3) units delivered per market and product
+
+    Returns:
+        (..., 3) transport cost per market
+    """
+    return transport_containers(deliveries) * CONTAINER_TRIP_COST
+
+
+# Reasons the simulator overrides a decision (marked "*" on the management report)
+OVERRIDE_REASONS = (
+    "negative_value",  # quantities and budgets cannot be negative
+    "shift_level",  # only shift levels 1-3 exist
+    "wage_rate",  # the assembly wage rate can never decrease
+    "workforce",  # cannot dismiss more workers than are employed
+    "machines",  # cannot sell more machines than are owned
+    "term_deposit",  # cannot withdraw more than is on deposit
+    "share_capital_band",  # issues/repurchases limited to ±10% of the year's opening capital
+    "borrowing_power",  # new term loans limited to the bank's borrowing power
+    "funds",  # machines, deposits and repurchases limited by cash and credit
+    "machine_capacity",  # deliveries need more machining than the shift provides
+    "assembly_capacity",  # deliveries need more assembly hours than the workforce provides
+    "distributable_profit",  # dividends limited to retained earnings plus this quarter's profit
+)
+
+# Decisions that are quantities or budgets, floored at zero
+NON_NEGATIVE_DECISIONS = (
+    "prices",
+    "deliveries",
+    "advertising",
+    "assembly_minutes",
+    "subcontract",
+    "materials_to_buy",
+    "maintenance_hours",
+    "train",
+    "management_budget",
+    "website_development",
+    "product_development",
+    "dividend",
+)
+
+
+def inventory_value(state: np.ndarray) -> np.ndarray:
+    """
+    Value of a batch of companies' inventories.
+
+    Materials are valued at the spot price, components and products at the
+    subcontract cost.
+
+    Args:
+        state: STATE_DTYPE records
+
+    Returns:
+        Inventory value in €
+    """
+    spot_price_eur = SPOT_PRICE_USD_PER_1000 * EXCHANGE_RATE / 1000.0
+    return (
+        state["materials_stock"] * spot_price_eur
+        + state["component_stock"] @ SUBCONTRACT_COST
+        + state["product_stock"].sum(axis=-2) @ SUBCONTRACT_COST
+    )
+
+
+def financial_limits(state: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    The bank's lending limits for a batch of companies (manual Table 19).
+
+    Inventories are valued as in inventory_value. Negative limits are set to zero.
+
+    Args:
+        state: (B,) STATE_DTYPE records at the start of the quarter
+
+    Returns:
+        Dict of (B,) overdraft_limit, borrowing_power and credit_worthiness in €
+    """
+    inventories = inventory_value(state)
+    overdraft_limit = np.maximum(
+        OVERDRAFT_ASSET_SHARE * (state["property"] + inventories)
+        + OVERDRAFT_RECEIVABLES_SHARE * state["receivables"]
+        - (state["tax_due"] + state["payables"]),
+        0.0,
+    )
+    market_value = state["share_price"] / 100.0 * state["share_capital"]
+    borrowing_power = np.maximum(
+        BORROWING_MARKET_VALUE_SHARE * market_value - state["loans"] - overdraft_limit, 0.0
+    )
+    credit_worthiness = borrowing_power + np.maximum(state["cash"], 0.0) + state["term_deposit"]
+    return {
+        "overdraft_limit": overdraft_limit,
+        "borrowing_power": borrowing_power,
+        "credit_worthiness": credit_worthiness,
+    }
+
+
+def project_decisions(
+    state: np.ndarray, decisions: np.ndarray, profit_after_tax: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    Apply the simulator's override rules to a batch of proposed decisions.
+
+    Every rule except the dividend limit depends only on the opening state,
+    so a batch can be projected without simulating the quarter. The dividend
+    limit needs the quarter's profit and is applied when profit_after_tax is
+    given (simulate_quarter does so).
+
+    Args:
+        state: (B,) STATE_DTYPE records at the start of the quarter
+        decisions: (B,) DECISION_DTYPE records as proposed
+        profit_after_tax: Optional (B,) profit after tax for the quarter
+
+    Returns:
+        Effective (B,) decisions, (B, len(OVERRIDE_REASONS)) reasons and
+        (B, len(DECISION_DTYPE.names)) adjusted flags, plus the production
+        quantities behind the effective deliveries
+    """
+    effective = decisions.copy()
+    batch = state.shape[0]
+    names = DECISION_DTYPE.names
+    reasons = np.zeros((batch, len(OVERRIDE_REASONS)), dtype=bool)
+    adjusted = np.zeros((batch, len(names)), dtype=bool)
+
+    def override(field: str, value: np.ndarray, reason: str, tolerance: float = 1e-9) -> None:
+        change = np.abs(value - effective[field])
+        changed = change.reshape(batch, -1).sum(axis=1) > tolerance
+        effective[field] = value
+        adjusted[:, names.index(field)] |= changed
+        reasons[:, OVERRIDE_REASONS.index(reason)] |= changed
+
+    for field in NON_NEGATIVE_DECISIONS:
+        override(field, np.maximum(effective[field], 0.0), "negative_value")
+    override("shift_level", np.clip(effective["shift_level"].astype(int), 1, 3), "shift_level")
+    override(
+        "assembly_wage_rate",
+        np.maximum(effective["assembly_wage_rate"], state["wage_rate"] * 100.0),
+        "wage_rate",
+        tolerance=1e-6,
+    )
+    override(
+        "recruit",
+        np.maximum(effective["recruit"], -(state["assembly_workers"] + effective["train"])),
+        "workforce",
+    )
+    override(
+        "machines_to_buy", np.maximum(effective["machines_to_buy"], -state["machines"]), "machines"
+    )
+    override(
+        "term_deposit",
+        np.maximum(effective["term_deposit"], -state["term_deposit"] / 1000.0),
+        "term_deposit",
+    )
+
+    band = state["year_start_share_capital"] * SHARE_CAPITAL_BAND
+    low = state["year_start_share_capital"] - band - state["share_capital"]
+    high = state["year_start_share_capital"] + band - state["share_capital"]
+    override("share_issue", np.clip(effective["share_issue"], low, high), "share_capital_band", 0.5)
+
+    # Lack of funds: machines are ordered up to the credit-worthiness, then
+    # deposit placements and repurchases (paid at the start of the quarter)
+    # up to the cash left plus the overdraft limit
+    limits = financial_limits(state)
+    override(
+        "additional_loan",
+        np.minimum(effective["additional_loan"], limits["borrowing_power"] / 1000.0),
+        "borrowing_power",
+    )
+    affordable_machines = np.floor(limits["credit_worthiness"] / MACHINE_PRICE)
+    override(
+        "machines_to_buy",
+        np.where(
+            effective["machines_to_buy"] > 0,
+            np.minimum(effective["machines_to_buy"], affordable_machines),
+            effective["machines_to_buy"],
+        ),
+        "funds",
+    )
+    funds = np.maximum(
+        state["cash"]
+        + limits["overdraft_limit"]
+        + effective["additional_loan"] * 1000.0
+        + np.maximum(effective["share_issue"], 0.0) * state["share_price"] / 100.0
+        - np.minimum(effective["term_deposit"], 0.0) * 1000.0
+        - np.maximum(effective["machines_to_buy"], 0.0) * MACHINE_PRICE,
+        0.0,
+    )
+    placement = np.minimum(np.maximum(effective["term_deposit"], 0.0) * 1000.0, funds)
+    override(
+        "term_deposit",
+        np.where(effective["term_deposit"] > 0, placement / 1000.0, effective["term_deposit"]),
+        "funds",
+    )
+    funds = funds - placement
+    unit_price = np.maximum(state["share_price"] / 100.0, 1e-9)
+    repurchasable = np.floor(funds / unit_price)
+    override(
+        "share_issue",
+        np.where(
+            effective["share_issue"] < 0,
+            np.maximum(effective["share_issue"], -repurchasable),
+            effective["share_issue"],
+        ),
+        "funds",
+        0.5,
+    )
+
+    # Components: subcontracted arrivals, then machining within machine capacity
+    # (materials never limit machining; simulate_quarter buys shortfalls at a premium).
+    # Enough units are assembled to cover the quality control rejects.
+    shift = effective["shift_level"].astype(int) - 1
+    workers = state["assembly_workers"] + effective["recruit"] + effective["train"]
+    arriving = state["components_on_order"][:, 0, :]
+    requested = effective["deliveries"]
+    requested_units = requested.sum(axis=1)
+    to_assemble = requested_units / (1.0 - REJECT_RATE)
+    components_available = state["component_stock"] + arriving
+    to_machine = np.maximum(to_assemble - components_available, 0.0)
+
+    hours_per_component = MACHINE_MINUTES / 60.0 / MACHINE_EFFICIENCY
+    hours_needed = to_machine @ hours_per_component
+    machine_capacity = state["machines"] * MACHINE_HOURS_PER_SHIFT[shift]
+    machine_scale = np.where(
+        hours_needed > machine_capacity, machine_capacity / np.maximum(hours_needed, 1e-9), 1.0
+    )
+    machined = to_machine * machine_scale[:, None]
+
+    # Assembly within weekday hours plus weekend overtime
+    components_total = components_available + machined
+    assemblable = np.minimum(to_assemble, components_total)
+    assembly_hours_per_unit = effective["assembly_minutes"] / 60.0
+    assembly_needed = (assemblable * assembly_hours_per_unit).sum(axis=1)
+    assembly_capacity = workers * (
+        ASSEMBLY_WEEKDAY_HOURS + ASSEMBLY_SATURDAY_HOURS + ASSEMBLY_SUNDAY_HOURS
+    )
+    assembly_scale = np.where(
+        assembly_needed > assembly_capacity,
+        assembly_capacity / np.maximum(assembly_needed, 1e-9),
+        1.0,
+    )
+    assembled = assemblable * assembly_scale[:, None]
+    rejected = assembled * REJECT_RATE
+
+    delivery_share = np.divide(
+        requested,
+        requested_units[:, None, :],
+        out=np.zeros_like(requested),
+        where=requested_units[:, None, :] > 0,
+    )
+    delivered = delivery_share * (assembled - rejected)[:, None, :]
+    short = (requested - delivered).sum(axis=(1, 2)) > 0.5
+    effective["deliveries"] = delivered
+    adjusted[:, names.index("deliveries")] |= short
+    reasons[:, OVERRIDE_REASONS.index("machine_capacity")] |= short & (machine_scale < 1.0)
+    reasons[:, OVERRIDE_REASONS.index("assembly_capacity")] |= short & (assembly_scale < 1.0)
+
+    projection = {
+        "decisions": effective,
+        "reasons": reasons,
+        "adjusted": adjusted,
+        "production": {
+            "shift": shift,
+            "workers": workers,
+            "machined": machined,
+            "components_total": components_total,
+            "assembled": assembled,
+            "rejected": rejected,
+            "delivered": delivered,
+        },
+    }
+    if profit_after_tax is not None:
+        limit_dividend(state, projection, profit_after_tax)
+    return projection
+
+
+def limit_dividend(
+    state: np.ndarray, projection: Dict[str, Any], profit_after_tax: np.ndarray
+) -> np.ndarray:
+    """
+    Apply the distributable-profit limit to a projection's dividends in place.
+
+    Args:
+        state: (B,) STATE_DTYPE records at the start of the quarter
+        projection: Output of project_decisions
+        profit_after_tax: (B,) profit after tax for the quarter
+
+    Returns:
+        (B,) dividend paid in €
+    """
+    effective = projection["decisions"]
+    column = DECISION_DTYPE.names.index("dividend")
+    requested = effective["dividend"] / 100.0 * state["share_capital"]
+    distributable = np.maximum(state["retained_earnings"] + profit_after_tax, 0.0)
+    dividend = np.minimum(requested, distributable)
+
+    limited = dividend < requested - 0.5
+    effective["dividend"] = np.where(
+        limited, dividend * 100.0 / np.maximum(state["share_capital"], 1.0), effective["dividend"]
+    )
+    projection["adjusted"][:, column] |= limited
+    projection["reasons"][:, OVERRIDE_REASONS.index("distributable_profit")] |= limited
+    return dividend
+
+
+def simulate_quarter(
+    state: np.ndarray, decisions: np.ndarray, reference: ReportReference
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Advance a batch of companies by one quarter.
+
+    Infeasible decisions are overridden the way the simulator marks them with
+    "*" (see project_decisions); material shortfalls are bought at a premium.
+    The outcomes include the effective decisions and the override reasons.
+
+    Args:
+        state: (B,) STATE_DTYPE records at the start of the quarter
+        decisions: (B,) DECISION_DTYPE records for the quarter
+        reference: Base report reference (demand anchor, fixed overheads)
+
+    Returns:
+        Tuple of the (B,) end-of-quarter states and a dict of (B, ...) outcomes
+    """
+    new = state.copy()
+    batch = state.shape[0]
+    projection = project_decisions(state, decisions)
+    decisions = projection["decisions"]
+    production = projection["production"]
+
+    shift = production["shift"]
+    wage = decisions["assembly_wage_rate"] / 100.0
+    workers = production["workers"]
+    machines = state["machines"]
+
+    # Materials short of the machining plan are bought at spot plus a premium
+    arriving = state["components_on_order"][:, 0, :]
+    materials_bought = decisions["materials_to_buy"] * 1000.0
+    materials_needed = production["machined"] @ MATERIALS_PER_UNIT
+    emergency_materials = np.maximum(
+        materials_needed - state["materials_stock"] - materials_bought, 0.0
+    )
+    materials_available = state["materials_stock"] + materials_bought + emergency_materials
+    machined = production["machined"]
+    machine_hours = machined @ (MACHINE_MINUTES / 60.0 / MACHINE_EFFICIENCY)
+    materials_used = materials_needed
+
+    components_total = production["components_total"]
+    assembled = production["assembled"]
+    assembly_hours = (assembled * decisions["assembly_minutes"] / 60.0).sum(axis=1)
+    delivered = production["delivered"]
+
+    # Sales from market stock plus deliveries; rejects are sold for scrap
+    available = state["product_stock"] + delivered
+    orders = reference.demand(decisions["prices"], decisions["advertising"])
+    sales = np.minimum(available, orders)
+    revenue_by_market = (sales * decisions["prices"]).sum(axis=2)
+    scrap_revenue = production["rejected"] @ SCRAP_PRICE
+    revenue = revenue_by_market.sum(axis=1) + scrap_revenue
+
+    # Production costs
+    weekday_hours = workers * ASSEMBLY_WEEKDAY_HOURS
+    overtime = np.maximum(assembly_hours - weekday_hours, 0.0)
+    saturday_hours = np.minimum(overtime, workers * ASSEMBLY_SATURDAY_HOURS)
+    sunday_hours = overtime - saturday_hours
+    assembly_wages = wage * (
+        weekday_hours + SATURDAY_RATE * saturday_hours + SUNDAY_RATE * sunday_hours
+    )
+    machine_weekday_hours = np.minimum(
+        machine_hours, machines * MACHINE_WEEKDAY_HOURS_PER_SHIFT[shift]
+    )
+    machine_saturday_hours = np.minimum(
+        machine_hours - machine_weekday_hours, machines * MACHINE_SATURDAY_HOURS
+    )
+    machine_sunday_hours = machine_hours - machine_weekday_hours - machine_saturday_hours
+    machinist_wages = (
+        (
+            machine_weekday_hours
+            + SATURDAY_RATE * machine_saturday_hours
+            + SUNDAY_RATE * machine_sunday_hours
+        )
+        * MACHINISTS_PER_MACHINE
+        * wage
+        * MACHINIST_WAGE_FACTOR
+        * (1.0 + SHIFT_PREMIUM[shift])
+    )
+    units_assembled = assembled.sum(axis=1)
+    units_delivered = delivered.sum(axis=(1, 2))
+    machine_running = (
+        SUPERVISION_COST_PER_SHIFT[shift]
+        + PRODUCTION_OVERHEAD_PER_MACHINE * machines
+        + MACHINE_RUNNING_COST_PER_HOUR * machine_hours
+        + PLANNING_COST_PER_UNIT * units_delivered
+    )
+    maintenance = decisions["maintenance_hours"] * machines * MAINTENANCE_COST_PER_HOUR
+    spot_price_eur = SPOT_PRICE_USD_PER_1000 * EXCHANGE_RATE / 1000.0
+    materials_cost = spot_price_eur * (
+        materials_bought + emergency_materials * (1.0 + EMERGENCY_MATERIALS_PREMIUM)
+    )
+    subcontract_cost = arriving @ SUBCONTRACT_COST
+    quality_control = QUALITY_CONTROL_PER_UNIT * units_assembled
+    transport = transport_cost(delivered).sum(axis=1)
+    marketing = (
+        decisions["advertising"].sum(axis=1)
+        + decisions["management_budget"]
+        + decisions["website_development"]
+        + decisions["product_development"]
+    ) * 1000.0
+    agents = revenue_by_market @ AGENT_COMMISSION
+    guarantee = GUARANTEE_COST_PER_UNIT * sales.sum(axis=(1, 2))
+    purchasing = PURCHASING_COST_SHARE * materials_cost
+    intelligence = np.full(batch, BUSINESS_INTELLIGENCE_COST)
+    fixed_overheads = np.full(batch, reference.fixed_overheads)
+
+    depreciation = state["machine_value"] * DEPRECIATION_RATE
+    interest_paid = (
+        state["loans"] * LOAN_RATE / 4 + np.maximum(-state["cash"], 0.0) * OVERDRAFT_RATE / 4
+    )
+    interest_received = state["term_deposit"] * DEPOSIT_RATE / 4
+
+    # Closing inventories; cost of sales carries the change in their value
+    new["product_stock"] = available - sales
+    new["component_stock"] = components_total - assembled
+    new["materials_stock"] = materials_available - materials_used
+    inventory_change = inventory_value(state) - inventory_value(new)
+
+    cost_of_sales = (
+        materials_cost
+        + subcontract_cost
+        + machine_running
+        + machinist_wages
+        + assembly_wages
+        + quality_control
+        + transport
+        + inventory_change
+    )
+    administrative_expenses = (
+        marketing + agents + guarantee + maintenance + purchasing + intelligence + fixed_overheads
+    )
+    profit = (
+        revenue
+        - cost_of_sales
+        - administrative_expenses
+        - depreciation
+        + interest_received
+        - interest_paid
+    )
+    taxable = np.maximum(np.minimum(profit, state["retained_earnings"] + profit), 0.0)
+    tax_assessed = taxable * TAX_RATE
+    profit_after_tax = profit - tax_assessed
+
+    # Dividend limited to distributable profit (share issues are already within the band)
+    dividend = limit_dividend(state, projection, profit_after_tax)
+    share_issue = decisions["share_issue"]
+    issue_value = share_issue * state["share_price"] / 100.0
+
+    # Cash: receipts and payments settled by credit terms (app.cash_flow)
+    receipts, receivables = settle_quarter(
+        revenue_by_market, RECEIPT_KERNELS, state["receivables"][:, None]
+    )
+    costs_by_category = np.stack(
+        [
+            assembly_wages + machinist_wages,
+            machine_running
+            + quality_control
+            + agents
+            + fixed_overheads
+            + decisions["management_budget"] * 1000.0,
+            materials_cost,
+            (
+                decisions["advertising"].sum(axis=1)
+                + decisions["website_development"]
+                + decisions["product_development"]
+            )
+            * 1000.0,
+            maintenance + transport + subcontract_cost + guarantee + purchasing + intelligence,
+        ],
+        axis=1,
+    )
+    payments, payables = settle_quarter(
+        costs_by_category, PAYMENT_KERNELS, state["payables"][:, None]
+    )
+    tax_paid, tax_due = settle_quarter(tax_assessed[:, None], TAX_KERNEL, state["tax_due"][:, None])
+    machines_bought = np.maximum(decisions["machines_to_buy"], 0.0)
+    machines_sold = np.minimum(np.maximum(-decisions["machines_to_buy"], 0.0), machines)
+    book_value_per_machine = state["machine_value"] / np.maximum(machines, 1.0)
+    deposit_change = np.maximum(decisions["term_deposit"] * 1000.0, -state["term_deposit"])
+    loan = decisions["additional_loan"] * 1000.0
+
+    receipts = receipts + scrap_revenue
+    new["cash"] = (
+        state["cash"]
+        + receipts
+        - payments
+        - tax_paid
+        + interest_received
+        - interest_paid
+        - machines_bought * MACHINE_PRICE
+        + machines_sold * book_value_per_machine
+        - deposit_change
+        + loan
+        + issue_value
+        - dividend
+    )
+    new["receivables"] = receivables[:, 0]
+    new["payables"] = payables[:, 0]
+    new["tax_due"] = tax_due[:, 0]
+    new["term_deposit"] = state["term_deposit"] + deposit_change
+    new["loans"] = state["loans"] + loan
+
+    # Components on order and assets
+    new["components_on_order"][:, :-1, :] = state["components_on_order"][:, 1:, :]
+    new["components_on_order"][:, -1, :] = decisions["subcontract"]
+    new["machines"] = machines - machines_sold + state["machines_on_order"]
+    new["machines_on_order"] = machines_bought
+    new["machine_value"] = (
+        state["machine_value"]
+        - depreciation
+        - machines_sold * book_value_per_machine
+        + state["machines_on_order"] * MACHINE_PRICE
+    )
+    new["assembly_workers"] = workers
+    new["wage_rate"] = wage
+
+    # Equity, share price and investment performance
+    new["share_capital"] = state["share_capital"] + share_issue
+    new["share_premium"] = state["share_premium"] + issue_value - share_issue
+    new["retained_earnings"] = state["retained_earnings"] + profit_after_tax - dividend
+    equity_per_share = (
+        new["share_capital"] + new["share_premium"] + new["retained_earnings"]
+    ) / np.maximum(new["share_capital"], 1.0)
+    opening_equity_per_share = (
+        state["share_capital"] + state["share_premium"] + state["retained_earnings"]
+    ) / np.maximum(state["share_capital"], 1.0)
+    new["share_price"] = np.maximum(
+        state["share_price"]
+        * np.where(
+            opening_equity_per_share > 0,
+            equity_per_share
+            / np.where(opening_equity_per_share > 0, opening_equity_per_share, 1.0),
+            1.0,
+        ),
+        0.0,
+    )
+    new["issue_value_total"] = state["issue_value_total"] + issue_value
+    new["dividends_total"] = state["dividends_total"] + dividend
+
+    year_end = state["quarter"] == 4
+    new["quarter"] = np.where(year_end, 1, state["quarter"] + 1)
+    new["year_start_share_capital"] = np.where(
+        year_end, new["share_capital"], state["year_start_share_capital"]
+    )
+
+    outcomes = {
+        "revenue": revenue,
+        "cost_of_sales": cost_of_sales,
+        "administrative_expenses": administrative_expenses,
+        "profit": profit_after_tax,
+        "units_sold": sales.sum(axis=(1, 2)),
+        "units_assembled": units_assembled,
+        "machine_hours": machine_hours,
+        "assembly_hours": assembly_hours,
+        "transport_cost": transport,
+        "dividend": dividend,
+        "share_issue": share_issue,
+        "receipts": receipts,
+        "payments": payments + tax_paid,
+        "cash": new["cash"],
+        "investment_performance": investment_performance(new),
+        "decisions": decisions,
+        "adjusted": projection["adjusted"],
+        "reasons": projection["reasons"],
+    }
+    return new, outcomes
+
+
+def investment_performance(state: np.ndarray) -> np.ndarray:
+    """
+    Investment performance of company states.
+
+    Market valuation less the value of shares issued plus dividends paid
+    (Investment Performance sheet).
+
+    Args:
+        state: STATE_DTYPE records
+
+    Returns:
+        Investment performance in €
+    """
+    valuation = state["share_capital"] * state["share_price"] / 100.0
+    return valuation - state["issue_value_total"] + state["dividends_total"]
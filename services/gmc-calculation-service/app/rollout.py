@@ -0,0 +1,176 @@
+"""
+Multi-Quarter Rollout Engine
+
+Evaluates whole decision plans (one decision set per quarter) from a base
+report by carrying the compact company state forward quarter by quarter.
+Plans are stacked into a (plans, quarters) decision array and advanced
+together, so thousands of alternatives cost one vectorised pass per quarter.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.quarter_model import (
+    DECISION_DTYPE,
+    SAMPLE_DECISIONS,
+    ReportReference,
+    decisions_from_parameters,
+    investment_performance,
+    simulate_quarter,
+    state_from_report,
+)
+
+# Outcomes reported per quarter for each plan
+QUARTER_OUTCOMES = (
+    "revenue",
+    "profit",
+    "units_sold",
+    "units_assembled",
+    "receipts",
+    "payments",
+    "cash",
+    "dividend",
+    "share_issue",
+    "investment_performance",
+)
+
+
+class RolloutEngine:
+    """Rolls decision plans forward from one base report."""
+
+    def __init__(
+        self, base_report: Dict[str, Any], base_decisions: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Initialize the engine.
+
+        Args:
+            base_report: Management report the plans start from
+            base_decisions: Last quarter's decisions, repeated where a plan omits them;
+                anything missing falls back to the report's prices and the workbook sample
+        """
+        base_report = base_report or {}
+        self.base_state = state_from_report(base_report)
+        self.reference = ReportReference(base_report)
+
+        defaults = dict(SAMPLE_DECISIONS)
+        for field in ("prices", "advertising"):
+            if field in base_report:
+                defaults[field] = base_report[field]
+        self.base_decisions = decisions_from_parameters(
+            base_decisions or {}, decisions_from_parameters(defaults)
+        )
+
+    def compile_plans(self, plans: Sequence[Sequence[Dict[str, Any]]]) -> np.ndarray:
+        """
+        Convert plans of nested decision parameters into a decision array.
+
+        Shorter plans repeat their last quarter's repeating decisions until
+        the longest plan ends.
+
+        Args:
+            plans: One list of per-quarter decision parameters per plan
+
+        Returns:
+            (plans, quarters) array of DECISION_DTYPE
+        """
+        quarters = max((len(plan) for plan in plans), default=0)
+        compiled = np.zeros((len(plans), quarters), dtype=DECISION_DTYPE)
+        for index, plan in enumerate(plans):
+            previous = self.base_decisions
+            for quarter in range(quarters):
+                parameters = plan[quarter] if quarter < len(plan) else {}
+                previous = decisions_from_parameters(parameters, previous)
+                compiled[index, quarter] = previous
+        return compiled
+
+    def run(self, decisions: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Roll a batch of compiled plans forward.
+
+        Args:
+            decisions: (plans, quarters) array of DECISION_DTYPE
+
+        Returns:
+            Per-quarter outcome arrays of shape (plans, quarters), the final
+            states, and per-quarter adjustment flags
+        """
+        batch, quarters = decisions.shape
+        state = np.repeat(self.base_state[None], batch)
+        history = {name: np.zeros((batch, quarters)) for name in QUARTER_OUTCOMES}
+        adjusted = np.zeros((batch, quarters, len(DECISION_DTYPE.names)), dtype=bool)
+
+        for quarter in range(quarters):
+            state, outcomes = simulate_quarter(state, decisions[:, quarter], self.reference)
+            for name in QUARTER_OUTCOMES:
+                history[name][:, quarter] = outcomes[name]
+            adjusted[:, quarter] = outcomes["adjusted"]
+
+        history["final_state"] = state
+        history["adjusted"] = adjusted
+        return history
+
+    def evaluate(self, plans: Sequence[Sequence[Dict[str, Any]]]) -> Dict[str, np.ndarray]:
+        """Compile and roll plans forward in one call."""
+        return self.run(self.compile_plans(plans))
+
+    def base_investment_performance(self) -> float:
+        """Investment performance of the base report."""
+        return float(investment_performance(self.base_state))
+
+
+def summarize_rollout(
+    results: Dict[str, np.ndarray], include_quarters: bool = False, top: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Build JSON-serialisable per-plan summaries ranked by investment performance.
+
+    Args:
+        results: Output of RolloutEngine.run
+        include_quarters: Include per-quarter outcomes for each plan
+        top: Only return the best N plans
+
+    Returns:
+        Plan summaries, best first
+    """
+    if not results["revenue"].shape[1]:
+        return []
+
+    final = results["investment_performance"][:, -1]
+    order = np.argsort(-final, kind="stable")
+    if top:
+        order = order[:top]
+
+    # Convert each result array once; per-element NumPy indexing dominates large rollouts
+    names = DECISION_DTYPE.names
+    final_values = final[order].tolist()
+    profits = results["profit"][order].sum(axis=1).tolist()
+    cash = results["final_state"]["cash"][order].tolist()
+    share_prices = results["final_state"]["share_price"][order].tolist()
+    adjusted = results["adjusted"][order]
+    if include_quarters:
+        outcomes = {name: results[name][order].tolist() for name in QUARTER_OUTCOMES}
+
+    summaries = []
+    for rank, index in enumerate(order.tolist()):
+        adjusted_quarters = {
+            f"quarter_{quarter + 1}": [names[i] for i in np.flatnonzero(flags)]
+            for quarter, flags in enumerate(adjusted[rank])
+            if flags.any()
+        }
+        summary = {
+            "plan_index": index,
+            "investment_performance": round(final_values[rank], 2),
+            "cumulative_profit": round(profits[rank], 2),
+            "final_cash": round(cash[rank], 2),
+            "final_share_price": round(share_prices[rank], 2),
+            "adjusted_decisions": adjusted_quarters,
+        }
+        if include_quarters:
+            summary["quarters"] = [
+                {name: round(outcomes[name][rank][quarter], 2) for name in QUARTER_OUTCOMES}
+                for quarter in range(results["revenue"].shape[1])
+            ]
+        summaries.append(summary)
+    return summaries
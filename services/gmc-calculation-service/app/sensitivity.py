@@ -0,0 +1,155 @@
+"""
+Decision Sensitivity Analysis
+
+Partial derivatives of investment performance, cash and profit with respect
+to every decision variable, by central finite differences. The base plan and
+one raised and one lowered copy per variable are stacked into a single
+rollout batch, so a full gradient costs one vectorised pass per quarter
+instead of a model run per variable.
+
+The model has genuine kinks (whole containers, capacity limits, clamped
+dividends), so each variable is stepped by a meaningful amount of its own
+unit rather than an infinitesimal one.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.quarter_model import DECISION_DTYPE, MARKETS, PRODUCTS
+from app.rollout import RolloutEngine
+
+# Outcomes differentiated, read from the rollout history
+SENSITIVITY_OUTCOMES = ("investment_performance", "cash", "profit")
+
+# Step per decision, in the decision's own unit (default 1)
+DEFAULT_STEPS = {
+    "deliveries": 10.0,
+    "subcontract": 10.0,
+    "assembly_wage_rate": 10.0,
+    "share_issue": 10000.0,
+}
+
+# Decisions that may be negative (sales, dismissals, repayments, withdrawals)
+SIGNED_DECISIONS = frozenset(
+    ("machines_to_buy", "recruit", "share_issue", "additional_loan", "term_deposit")
+)
+
+
+def _decision_variables() -> List[Tuple[str, Tuple[int, ...], str]]:
+    variables = []
+    for field in DECISION_DTYPE.names:
+        shape = DECISION_DTYPE[field].shape
+        if len(shape) == 2:
+            for i, market in enumerate(MARKETS):
+                for j, product in enumerate(PRODUCTS):
+                    variables.append((field, (i, j), f"{field}.{market}.{product}"))
+        elif len(shape) == 1:
+            for j, product in enumerate(PRODUCTS):
+                variables.append((field, (j,), f"{field}.{product}"))
+        else:
+            variables.append((field, (), field))
+    return variables
+
+
+# (field, element index, parameter path) for every scalar decision
+DECISION_VARIABLES = _decision_variables()
+
+
+def _outcomes(results: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return {
+        "investment_performance": results["investment_performance"][:, -1],
+        "cash": results["cash"][:, -1],
+        "profit": results["profit"].sum(axis=1),
+    }
+
+
+def decision_sensitivity(
+    engine: RolloutEngine,
+    plan: Sequence[Dict[str, Any]],
+    quarter: int = 0,
+    steps: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Differentiate a plan's outcomes with respect to one quarter's decisions.
+
+    Later quarters keep the plan's own decisions, so the derivatives measure
+    the effect of changing that quarter's decision alone.
+
+    Args:
+        engine: Rollout engine holding the base report
+        plan: Per-quarter decision parameters
+        quarter: Index of the quarter whose decisions are varied
+        steps: Step per decision field, overriding DEFAULT_STEPS
+
+    Returns:
+        Base outcomes and, per decision variable, its value, step and the
+        derivative of each outcome per unit of the decision
+    """
+    steps = {**DEFAULT_STEPS, **(steps or {})}
+    base = engine.compile_plans([plan or [{}]])
+    if not 0 <= quarter < base.shape[1]:
+        raise ValueError(f"quarter must be between 1 and {base.shape[1]}")
+
+    count = len(DECISION_VARIABLES)
+    batch = np.repeat(base, 2 * count + 1, axis=0)
+    raised = np.zeros(count)
+    lowered = np.zeros(count)
+
+    for index, (field, element, _) in enumerate(DECISION_VARIABLES):
+        step = float(steps.get(field, 1.0))
+        if step <= 0:
+            raise ValueError(f"Step for {field} must be positive")
+        value = float(base[field][(0, quarter) + element])
+        raised[index] = step
+        # Non-negative decisions at or near zero get a one-sided difference
+        lowered[index] = step if field in SIGNED_DECISIONS or value >= step else 0.0
+        batch[field][(1 + 2 * index, quarter) + element] += raised[index]
+        batch[field][(2 + 2 * index, quarter) + element] -= lowered[index]
+
+    outcomes = _outcomes(engine.run(batch))
+    span = raised + lowered
+    derivatives = {name: (values[1::2] - values[2::2]) / span for name, values in outcomes.items()}
+
+    variables = []
+    for index, (field, element, path) in enumerate(DECISION_VARIABLES):
+        entry = {
+            "parameter": path,
+            "value": float(base[field][(0, quarter) + element]),
+            "step": float(raised[index]),
+        }
+        for name in SENSITIVITY_OUTCOMES:
+            entry[f"d_{name}"] = float(derivatives[name][index])
+        variables.append(entry)
+
+    return {
+        "base": {name: float(values[0]) for name, values in outcomes.items()},
+        "variables": variables,
+    }
+
+
+def rank_by_impact(
+    variables: List[Dict[str, Any]],
+    outcome: str = "investment_performance",
+    top: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Order sensitivity entries by the effect of one step on an outcome (tornado order).
+
+    Args:
+        variables: Entries from decision_sensitivity
+        outcome: Outcome to rank by
+        top: Only return the N largest impacts
+
+    Returns:
+        Entries with an impact per step, largest absolute impact first
+    """
+    key = f"d_{outcome}"
+    if variables and key not in variables[0]:
+        raise ValueError(f"Unknown outcome: {outcome}")
+
+    ranked = sorted(
+        ({**entry, "impact": entry[key] * entry["step"]} for entry in variables),
+        key=lambda entry: -abs(entry["impact"]),
+    )
+    return ranked[:top] if top else ranked
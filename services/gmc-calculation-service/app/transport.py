@@ -0,0 +1,129 @@
+"""
+Hired Transport Allocation
+
+Packs the quarter's deliveries into hired containers at minimum cost
+(Hired Transport sheet). Each market is served by its own journey, so the
+cost-minimising allocation is the smallest number of containers per market
+that holds the delivered units, with every unit taking whole space units.
+
+The space units form a divisible chain (1/2/4) and the container capacity
+is a multiple of the largest, so largest-first packing is optimal: batches
+are costed in closed form by app.quarter_model.transport_cost and single
+allocations list the largest-first loads, memoised on the per-market
+delivery vector.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.quarter_model import (
+    CONTAINER_CAPACITY,
+    CONTAINER_TRIP_COST,
+    MARKETS,
+    PRODUCTS,
+    SPACE_UNITS,
+    whole_units,
+)
+
+ALLOCATION_CACHE_SIZE = 8192
+
+
+def _packing_is_exact(sizes: Sequence[float], capacity: float) -> bool:
+    """Whether largest-first packing is optimal for these sizes and capacity."""
+    ordered = sorted(sizes)
+    chain = all(larger % smaller == 0 for smaller, larger in zip(ordered, ordered[1:]))
+    return chain and capacity % ordered[-1] == 0
+
+
+if not _packing_is_exact(SPACE_UNITS.tolist(), CONTAINER_CAPACITY):
+    raise ImportError("Hired transport packing assumes a divisible chain of space units")
+
+
+def _largest_first(units: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+    """Fill each container in turn, largest products first."""
+    order = np.argsort(-SPACE_UNITS, kind="stable")
+    remaining = list(units)
+    containers = []
+    while any(remaining):
+        load = [0] * len(remaining)
+        free = CONTAINER_CAPACITY
+        for index in order:
+            take = min(remaining[index], int(free // SPACE_UNITS[index]))
+            load[index] = take
+            remaining[index] -= take
+            free -= take * SPACE_UNITS[index]
+        if not any(load):
+            raise ValueError("A product does not fit in an empty container")
+        containers.append(tuple(load))
+    return containers
+
+
+@lru_cache(maxsize=ALLOCATION_CACHE_SIZE)
+def _allocate_cached(units: Tuple[int, ...]) -> Tuple[Tuple[int, ...], ...]:
+    return tuple(_largest_first(units))
+
+
+def allocate_market(units: Sequence[float], market: int) -> Dict[str, Any]:
+    """
+    Minimum-cost container allocation for one market's deliveries.
+
+    Args:
+        units: Units delivered per product
+        market: Market index (0 Europe, 1 NAFTA, 2 Internet)
+
+    Returns:
+        Containers hired, their loads (grouped by identical load), space
+        utilisation and cost
+    """
+    packed = tuple(int(u) for u in whole_units(units))
+    containers = _allocate_cached(packed)
+
+    grouped: Dict[Tuple[int, ...], int] = {}
+    for load in containers:
+        grouped[load] = grouped.get(load, 0) + 1
+
+    space = float(np.dot(packed, SPACE_UNITS))
+    capacity = len(containers) * CONTAINER_CAPACITY
+    return {
+        "containers": len(containers),
+        "loads": [
+            {
+                "count": count,
+                "units": dict(zip(PRODUCTS, load)),
+                "space_used": float(np.dot(load, SPACE_UNITS)),
+            }
+            for load, count in grouped.items()
+        ],
+        "space_used": space,
+        "space_spare": capacity - space,
+        "utilisation": round(space / capacity, 4) if capacity else 0.0,
+        "cost_per_container": float(CONTAINER_TRIP_COST[market]),
+        "cost": float(len(containers) * CONTAINER_TRIP_COST[market]),
+    }
+
+
+def allocate_transport(deliveries: np.ndarray) -> Dict[str, Any]:
+    """
+    Minimum-cost hired transport for one delivery decision.
+
+    Args:
+        deliveries: (3, 3) units delivered per market and product
+
+    Returns:
+        Allocation per market and the total cost
+    """
+    markets = {
+        market: allocate_market(deliveries[index], index) for index, market in enumerate(MARKETS)
+    }
+    return {
+        "markets": markets,
+        "containers": sum(allocation["containers"] for allocation in markets.values()),
+        "total_cost": sum(allocation["cost"] for allocation in markets.values()),
+    }
+
+
+def cache_info() -> Dict[str, int]:
+    """Hit/miss statistics of the allocation cache."""
+    return _allocate_cached.cache_info()._asdict()
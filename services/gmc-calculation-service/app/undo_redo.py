@@ -0,0 +1,587 @@
+"""
+Checkpointed Undo/Redo Engine
+
+Session parameter history for the GMC calculation service. Every decision
+parameter change is stored as a delta (parameter_path, old_value, new_value)
+and a full snapshot of the decision parameters is taken every N changes, so
+any history position can be reconstructed with at most N/2 delta replays
+instead of replaying the session from its creation.
+
+Storage follows the Redis design in
+database/migrations/redis/001_setup_redis_structures.txt:
+
+    LIST project:{project_id}:undo:{session_id}   applied changes
+    LIST project:{project_id}:redo:{session_id}   undone changes (next on top)
+    HASH project:{project_id}:calc_cache          state_hash -> results JSON
+
+Every write carries the store generation it was computed against and is
+rejected if another request changed the history in between; the engine then
+recomputes and retries, so concurrent edits from several workers never
+interleave half-applied.
+
+History positions map directly to parameter_changes.project_undo_redo_position.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Default number of changes between full decision-parameter snapshots
+DEFAULT_CHECKPOINT_INTERVAL = 25
+
+# Calculation cache expiry from the Redis design (1 hour)
+CALC_CACHE_TTL_SECONDS = 3600
+
+# Attempts at a history write before giving up under concurrent edits
+MAX_WRITE_ATTEMPTS = 5
+
+# KEYS: undo list, redo list, checkpoint hash, generation
+# ARGV: expected generation, change JSON, snapshot JSON for the new position (or '')
+APPEND_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[4]) or '0') ~= tonumber(ARGV[1]) then
+  return 0
+end
+local cursor = redis.call('LLEN', KEYS[1])
+redis.call('DEL', KEYS[2])
+for _, position in ipairs(redis.call('HKEYS', KEYS[3])) do
+  if tonumber(position) > cursor then
+    redis.call('HDEL', KEYS[3], position)
+  end
+end
+redis.call('RPUSH', KEYS[1], ARGV[2])
+if ARGV[3] ~= '' then
+  redis.call('HSET', KEYS[3], tostring(cursor + 1), ARGV[3])
+end
+redis.call('INCR', KEYS[4])
+return 1
+"""
+
+# KEYS: undo list, redo list, generation; ARGV: expected generation, target position
+MOVE_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[3]) or '0') ~= tonumber(ARGV[1]) then
+  return 0
+end
+local cursor = redis.call('LLEN', KEYS[1])
+local target = tonumber(ARGV[2])
+while cursor > target do
+  redis.call('LMOVE', KEYS[1], KEYS[2], 'RIGHT', 'LEFT')
+  cursor = cursor - 1
+end
+while cursor < target do
+  redis.call('LMOVE', KEYS[2], KEYS[1], 'LEFT', 'RIGHT')
+  cursor = cursor + 1
+end
+redis.call('INCR', KEYS[3])
+return 1
+"""
+
+
+class HistoryConflictError(RuntimeError):
+    """Raised when a history write keeps losing to concurrent edits."""
+
+
+def flatten_parameters(parameters: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """
+    Flatten nested decision parameters into dotted parameter paths.
+
+    Args:
+        parameters: Nested decision parameters
+        prefix: Path prefix used during recursion
+
+    Returns:
+        Mapping of parameter_path -> leaf value
+    """
+    flat: Dict[str, Any] = {}
+    for key, value in parameters.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict) and value:
+            flat.update(flatten_parameters(value, path))
+        else:
+            flat[path] = value
+    return flat
+
+
+def unflatten_parameters(flat: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rebuild nested decision parameters from dotted parameter paths.
+
+    Args:
+        flat: Mapping of parameter_path -> leaf value
+
+    Returns:
+        Nested decision parameters
+    """
+    nested: Dict[str, Any] = {}
+    for path, value in flat.items():
+        node = nested
+        parts = path.split(".")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return nested
+
+
+def state_hash(parameters: Dict[str, Any]) -> str:
+    """
+    Compute a stable hash of a decision-parameter state.
+
+    Nested and flattened forms of the same decisions hash identically, so
+    results cached by the calculate endpoint are found again by the history
+    engine when a user revisits a state.
+
+    Args:
+        parameters: Nested or flattened decision parameters
+
+    Returns:
+        Hex digest identifying the state
+    """
+    flat = flatten_parameters(parameters)
+    canonical = json.dumps(flat, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class InMemoryHistoryStore:
+    """Process-local history store used in tests and single-worker development."""
+
+    def __init__(self):
+        self._changes: List[Dict[str, Any]] = []
+        self._cursor = 0
+        self._checkpoints: Dict[int, Dict[str, Any]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        return self._generation
+
+    def length(self) -> int:
+        return len(self._changes)
+
+    def cursor(self) -> int:
+        return self._cursor
+
+    def changes(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """Return the changes that move the state from position start to end."""
+        return self._changes[start:end]
+
+    def append(
+        self,
+        change: Dict[str, Any],
+        generation: int,
+        checkpoint: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Append a change at the cursor, discarding the redo tail.
+
+        Returns:
+            False without writing if the history changed since generation
+        """
+        with self._lock:
+            if generation != self._generation:
+                return False
+            del self._changes[self._cursor :]
+            self._changes.append(change)
+            self._cursor = len(self._changes)
+            for position in [p for p in self._checkpoints if p >= self._cursor]:
+                del self._checkpoints[position]
+            if checkpoint is not None:
+                self._checkpoints[self._cursor] = dict(checkpoint)
+            self._generation += 1
+            return True
+
+    def move_cursor(self, position: int, generation: int) -> bool:
+        """Move the cursor unless the history changed since generation."""
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._cursor = position
+            self._generation += 1
+            return True
+
+    def get_checkpoint(self, position: int) -> Optional[Dict[str, Any]]:
+        snapshot = self._checkpoints.get(position)
+        return dict(snapshot) if snapshot is not None else None
+
+    def put_checkpoint(self, position: int, snapshot: Dict[str, Any]) -> None:
+        self._checkpoints[position] = dict(snapshot)
+
+    def checkpoint_positions(self) -> List[int]:
+        return sorted(self._checkpoints)
+
+
+class RedisHistoryStore:
+    """
+    History store backed by the designed project-scoped Redis undo/redo lists.
+
+    The undo list holds applied changes in order, so its length is the cursor.
+    The redo list holds undone changes with the next change to redo at the head,
+    which keeps undo/redo single LMOVE operations. Writes run as Lua scripts
+    that check and bump a generation counter, so each is applied atomically
+    and only against the history state it was computed from.
+    """
+
+    def __init__(self, redis_client, project_id: str, session_id: str):
+        self.redis = redis_client
+        self.undo_key = f"project:{project_id}:undo:{session_id}"
+        self.redo_key = f"project:{project_id}:redo:{session_id}"
+        self.checkpoint_key = f"project:{project_id}:checkpoints:{session_id}"
+        self.generation_key = f"project:{project_id}:history_generation:{session_id}"
+        self.append_script = redis_client.register_script(APPEND_SCRIPT)
+        self.move_script = redis_client.register_script(MOVE_SCRIPT)
+
+    def generation(self) -> int:
+        return int(self.redis.get(self.generation_key) or 0)
+
+    def length(self) -> int:
+        return self.cursor() + int(self.redis.llen(self.redo_key))
+
+    def cursor(self) -> int:
+        return int(self.redis.llen(self.undo_key))
+
+    def changes(self, start: int, end: int) -> List[Dict[str, Any]]:
+        if end <= start:
+            return []
+        cursor = self.cursor()
+        raw: List[Any] = []
+        if start < cursor:
+            raw.extend(self.redis.lrange(self.undo_key, start, min(end, cursor) - 1))
+        if end > cursor:
+            raw.extend(self.redis.lrange(self.redo_key, max(start - cursor, 0), end - cursor - 1))
+        return [json.loads(item) for item in raw]
+
+    def append(
+        self,
+        change: Dict[str, Any],
+        generation: int,
+        checkpoint: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        snapshot = json.dumps(checkpoint, default=str) if checkpoint is not None else ""
+        applied = self.append_script(
+            keys=[self.undo_key, self.redo_key, self.checkpoint_key, self.generation_key],
+            args=[generation, json.dumps(change, default=str), snapshot],
+        )
+        return bool(int(applied))
+
+    def move_cursor(self, position: int, generation: int) -> bool:
+        applied = self.move_script(
+            keys=[self.undo_key, self.redo_key, self.generation_key], args=[generation, position]
+        )
+        return bool(int(applied))
+
+    def get_checkpoint(self, position: int) -> Optional[Dict[str, Any]]:
+        raw = self.redis.hget(self.checkpoint_key, str(position))
+        return json.loads(raw) if raw is not None else None
+
+    def put_checkpoint(self, position: int, snapshot: Dict[str, Any]) -> None:
+        self.redis.hset(self.checkpoint_key, str(position), json.dumps(snapshot, default=str))
+
+    def checkpoint_positions(self) -> List[int]:
+        return sorted(int(p) for p in self.redis.hkeys(self.checkpoint_key))
+
+
+class LRUResultCache:
+    """Bounded in-process cache of calculation results keyed by state hash."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        results = self._entries.get(key)
+        if results is not None:
+            self._entries.move_to_end(key)
+        return results
+
+    def put(self, key: str, results: Dict[str, Any]) -> None:
+        self._entries[key] = results
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisResultCache:
+    """Calculation results cached in the designed project:{project_id}:calc_cache hash."""
+
+    def __init__(self, redis_client, project_id: str, ttl: int = CALC_CACHE_TTL_SECONDS):
+        self.redis = redis_client
+        self.key = f"project:{project_id}:calc_cache"
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.redis.hget(self.key, key)
+        return json.loads(raw) if raw is not None else None
+
+    def put(self, key: str, results: Dict[str, Any]) -> None:
+        pipe = self.redis.pipeline()
+        pipe.hset(self.key, key, json.dumps(results, default=str))
+        pipe.expire(self.key, self.ttl)
+        pipe.execute()
+
+
+def check_parameter_path(flat: Dict[str, Any], parameter_path: str, new_value: Any) -> None:
+    """
+    Check a change keeps the flattened decisions a consistent tree.
+
+    A path must name a leaf: it may not run through an existing leaf (which
+    would make that leaf both a value and a parent), replace an existing
+    subtree (which would leave its children behind), or carry a nested value.
+
+    Args:
+        flat: Flattened decision parameters the change applies to
+        parameter_path: Dotted decision parameter path
+        new_value: Value to assign
+
+    Raises:
+        ValueError: If the path or value would corrupt the parameter tree
+    """
+    if not isinstance(parameter_path, str) or not all(parameter_path.split(".")):
+        raise ValueError(f"Invalid parameter path {parameter_path!r}")
+    if isinstance(new_value, dict) and new_value:
+        raise ValueError(f"{parameter_path} must be set one leaf at a time, not to an object")
+
+    parts = parameter_path.split(".")
+    for depth in range(1, len(parts)):
+        prefix = ".".join(parts[:depth])
+        if prefix in flat:
+            raise ValueError(f"{parameter_path} runs through the existing value {prefix}")
+
+    children = parameter_path + "."
+    if any(path.startswith(children) for path in flat):
+        raise ValueError(f"{parameter_path} is a group of parameters; change its leaves instead")
+
+
+class SessionHistory:
+    """
+    Undo/redo history for one analysis session.
+
+    Snapshots are stored at every multiple of checkpoint_interval (position 0 is
+    the session's base decisions). Reconstructing a position starts from the
+    nearest checkpoint on either side and replays new_value deltas forwards or
+    old_value deltas backwards, so no more than checkpoint_interval / 2 deltas
+    are ever applied.
+    """
+
+    def __init__(
+        self,
+        store,
+        base_parameters: Optional[Dict[str, Any]] = None,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+        result_cache=None,
+    ):
+        """
+        Initialize the history engine.
+
+        Args:
+            store: InMemoryHistoryStore or RedisHistoryStore
+            base_parameters: Decision parameters at session creation
+            checkpoint_interval: Number of changes between full snapshots
+            result_cache: Optional LRUResultCache or RedisResultCache
+        """
+        if checkpoint_interval < 1:
+            raise ValueError("checkpoint_interval must be at least 1")
+
+        self.store = store
+        self.checkpoint_interval = checkpoint_interval
+        self.result_cache = result_cache if result_cache is not None else LRUResultCache()
+
+        if store.get_checkpoint(0) is None:
+            store.put_checkpoint(0, flatten_parameters(base_parameters or {}))
+
+        self._current: Optional[Dict[str, Any]] = None
+
+    @property
+    def position(self) -> int:
+        """Current history position (number of applied changes)."""
+        return self.store.cursor()
+
+    @property
+    def length(self) -> int:
+        """Total number of recorded changes, including undone ones."""
+        return self.store.length()
+
+    def current_state(self) -> Dict[str, Any]:
+        """Return the nested decision parameters at the current position."""
+        return unflatten_parameters(self._current_flat())
+
+    def record_change(
+        self,
+        parameter_path: str,
+        new_value: Any,
+        user_id: Optional[str] = None,
+        change_reason: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Apply a parameter change at the current position.
+
+        Any undone changes beyond the current position are discarded, matching
+        conventional editor undo/redo behaviour. If another request edits the
+        history concurrently, the change is recomputed against the new state.
+
+        Args:
+            parameter_path: Dotted decision parameter path
+            new_value: Value to assign
+            user_id: Team member making the change (academic audit trail)
+            change_reason: Optional free-text rationale
+
+        Returns:
+            Change record, including its project_undo_redo_position
+
+        Raises:
+            ValueError: If the path runs through a leaf or replaces a subtree
+            HistoryConflictError: If concurrent edits win every attempt
+        """
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            generation = self.store.generation()
+            state = self._reconstruct(self.store.cursor())
+            position = self.store.cursor() + 1
+            check_parameter_path(state, parameter_path, new_value)
+
+            change = {
+                "parameter_path": parameter_path,
+                "old_value": state.get(parameter_path),
+                "new_value": new_value,
+                "user_id": user_id,
+                "change_reason": change_reason,
+                "project_undo_redo_position": position,
+                "timestamp": datetime.utcnow().isoformat(),
+            }
+            self._apply(state, change, forward=True)
+            checkpoint = state if position % self.checkpoint_interval == 0 else None
+
+            if self.store.append(change, generation, checkpoint):
+                self._current = state
+                return change
+
+        raise HistoryConflictError("History changed concurrently; change not recorded")
+
+    def undo(self, steps: int = 1) -> Dict[str, Any]:
+        """Move back up to steps changes and return the resulting decisions."""
+        if steps < 1:
+            raise ValueError("steps must be at least 1")
+        return self._move(lambda cursor, length: max(cursor - steps, 0))
+
+    def redo(self, steps: int = 1) -> Dict[str, Any]:
+        """Move forward up to steps changes and return the resulting decisions."""
+        if steps < 1:
+            raise ValueError("steps must be at least 1")
+        return self._move(lambda cursor, length: min(cursor + steps, length))
+
+    def jump_to(self, position: int) -> Dict[str, Any]:
+        """
+        Move the cursor to any recorded history position.
+
+        Args:
+            position: Target position between 0 and the history length
+
+        Returns:
+            Nested decision parameters at the target position
+        """
+        return self._move(lambda cursor, length: position)
+
+    def state_at(self, position: int) -> Dict[str, Any]:
+        """Return the nested decision parameters at a position without moving the cursor."""
+        return unflatten_parameters(self._reconstruct(position))
+
+    def results_at(
+        self,
+        position: int,
+        calculate: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return calculation results for a history position.
+
+        Revisited states reuse cached results; the calculate callable only
+        runs for states that have not been evaluated before.
+
+        Args:
+            position: History position
+            calculate: Optional callable computing results from nested decisions
+            context: Other inputs the results depend on (e.g. the session's base
+                report), hashed into the cache key with the decisions
+
+        Returns:
+            Calculation results, or None if not cached and no calculate given
+        """
+        parameters = self.state_at(position)
+        if context is None:
+            key = state_hash(parameters)
+        else:
+            key = state_hash({"context": context, "decisions": parameters})
+
+        results = self.result_cache.get(key)
+        if results is None and calculate is not None:
+            results = calculate(parameters)
+            self.result_cache.put(key, results)
+        return results
+
+    def summary(self) -> Dict[str, Any]:
+        """Describe the history for API responses."""
+        return {
+            "position": self.store.cursor(),
+            "length": self.store.length(),
+            "checkpoint_interval": self.checkpoint_interval,
+            "checkpoints": self.store.checkpoint_positions(),
+            "can_undo": self.store.cursor() > 0,
+            "can_redo": self.store.cursor() < self.store.length(),
+        }
+
+    def _move(self, target: Callable[[int, int], int]) -> Dict[str, Any]:
+        """Move the cursor to target(cursor, length), retrying on concurrent edits."""
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            generation = self.store.generation()
+            position = target(self.store.cursor(), self.store.length())
+            state = self._reconstruct(position)
+            if self.store.move_cursor(position, generation):
+                self._current = state
+                return unflatten_parameters(state)
+
+        raise HistoryConflictError("History changed concurrently; cursor not moved")
+
+    def _current_flat(self) -> Dict[str, Any]:
+        if self._current is None:
+            self._current = self._reconstruct(self.store.cursor())
+        return dict(self._current)
+
+    def _reconstruct(self, position: int) -> Dict[str, Any]:
+        length = self.store.length()
+        if position < 0 or position > length:
+            raise ValueError(f"History position {position} outside 0..{length}")
+
+        interval = self.checkpoint_interval
+        floor = (position // interval) * interval
+        ceiling = floor + interval
+
+        # Walk backwards from the next checkpoint when it is closer
+        if ceiling - position < position - floor and ceiling <= length:
+            snapshot = self.store.get_checkpoint(ceiling)
+            if snapshot is not None:
+                for change in reversed(self.store.changes(position, ceiling)):
+                    self._apply(snapshot, change, forward=False)
+                return snapshot
+
+        snapshot = self.store.get_checkpoint(floor)
+        if snapshot is None:
+            # Checkpoint lost (e.g. evicted); fall back to the nearest earlier one
+            earlier = [p for p in self.store.checkpoint_positions() if p <= position]
+            floor = earlier[-1] if earlier else 0
+            snapshot = self.store.get_checkpoint(floor) or {}
+            logger.warning(f"Missing history checkpoint, replaying from position {floor}")
+
+        for change in self.store.changes(floor, position):
+            self._apply(snapshot, change, forward=True)
+        return snapshot
+
+    @staticmethod
+    def _apply(state: Dict[str, Any], change: Dict[str, Any], forward: bool) -> None:
+        path = change["parameter_path"]
+        value = change["new_value"] if forward else change["old_value"]
+        if value is None and not forward:
+            state.pop(path, None)
+        else:
+            state[path] = value
@@ -0,0 +1,168 @@
+"""
+Group Valuation and League Tables
+
+Valuation and investment performance for every company of one or more GMC
+groups from the group information pages of a report (Shares & Dividends and
+Investment Performance sheets). Groups and hypothetical rival moves are
+stacked into one (scenarios, companies) batch, so whole-group league tables
+for many groups cost a single vectorised pass.
+
+Moves change the share price only when one is given: the simulator's share
+price reaction to dividends and share issues is not published.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.quarter_model import STATE_DTYPE, investment_performance
+
+# Company figures read from a group information page
+COMPANY_FIELDS = ("shares", "share_price", "dividends_total", "issue_value_total")
+
+
+def _company_values(company: Dict[str, Any]) -> List[float]:
+    return [float(company.get(field, 0) or 0) for field in COMPANY_FIELDS]
+
+
+def apply_moves(
+    values: np.ndarray, companies: Sequence[str], moves: Optional[Dict[str, Dict[str, Any]]]
+) -> np.ndarray:
+    """
+    Apply hypothetical moves to one group's company figures.
+
+    Args:
+        values: (N, len(COMPANY_FIELDS)) company figures
+        companies: Company identifiers in row order
+        moves: Company identifier -> move; a move may set share_price (cents),
+            share_price_change (percent), dividend (cents per share) and
+            share_issue (shares, negative for a repurchase)
+
+    Returns:
+        Updated copy of the company figures
+    """
+    values = values.copy()
+    rows = {company: index for index, company in enumerate(companies)}
+    shares, price, dividends, issues = range(len(COMPANY_FIELDS))
+
+    for company, move in (moves or {}).items():
+        if company not in rows:
+            raise ValueError(f"Unknown company in moves: {company}")
+        row = values[rows[company]]
+        if "share_price" in move:
+            row[price] = float(move["share_price"])
+        if "share_price_change" in move:
+            row[price] *= 1.0 + float(move["share_price_change"]) / 100.0
+        row[dividends] += row[shares] * float(move.get("dividend", 0)) / 100.0
+        issued = float(move.get("share_issue", 0))
+        row[issues] += issued * row[price] / 100.0
+        row[shares] += issued
+        row[price] = max(row[price], 0.0)
+    return values
+
+
+def rank_companies(values: np.ndarray, mask: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Value and rank every company of a batch of groups.
+
+    Args:
+        values: (B, N, len(COMPANY_FIELDS)) company figures, padded to N companies
+        mask: (B, N) True where a company exists
+
+    Returns:
+        (B, N) valuation, investment performance, performance relative to the
+        mean of the company's rivals (0 without rivals), and rank (1 is best, 0 for padding)
+    """
+    state = np.zeros(mask.shape, dtype=STATE_DTYPE)
+    state["share_capital"] = values[..., 0]
+    state["share_price"] = values[..., 1]
+    state["dividends_total"] = values[..., 2]
+    state["issue_value_total"] = values[..., 3]
+
+    valuation = np.where(mask, state["share_capital"] * state["share_price"] / 100.0, 0.0)
+    performance = np.where(mask, investment_performance(state), 0.0)
+
+    companies = mask.sum(axis=1, keepdims=True)
+    rivals_mean = np.divide(
+        performance.sum(axis=1, keepdims=True) - performance,
+        companies - 1,
+        out=np.zeros_like(performance),
+        where=companies > 1,
+    )
+
+    order = np.argsort(np.where(mask, -performance, np.inf), axis=1, kind="stable")
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(1, mask.shape[1] + 1)[None, :], axis=1)
+
+    return {
+        "valuation": valuation,
+        "investment_performance": performance,
+        "relative_to_rivals": np.where(mask & (companies > 1), performance - rivals_mean, 0.0),
+        "rank": np.where(mask, rank, 0),
+    }
+
+
+def league_tables(groups: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    League tables for groups and their hypothetical rival moves.
+
+    Args:
+        groups: Group pages, each with group_id, companies (company, shares,
+            share_price, dividends_total, issue_value_total) and optional
+            scenarios (lists of moves keyed by company)
+
+    Returns:
+        Per group, the reported league table and one table per scenario
+    """
+    rows: List[Tuple[int, Optional[int], List[str], np.ndarray]] = []
+    for group_index, group in enumerate(groups):
+        companies = group.get("companies") or []
+        names = [str(company.get("company", index + 1)) for index, company in enumerate(companies)]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate company identifiers in group {group_index + 1}")
+        values = np.array([_company_values(company) for company in companies]).reshape(
+            -1, len(COMPANY_FIELDS)
+        )
+        rows.append((group_index, None, names, values))
+        for scenario_index, moves in enumerate(group.get("scenarios") or []):
+            rows.append((group_index, scenario_index, names, apply_moves(values, names, moves)))
+
+    width = max((len(names) for _, _, names, _ in rows), default=0)
+    values = np.zeros((len(rows), width, len(COMPANY_FIELDS)))
+    mask = np.zeros((len(rows), width), dtype=bool)
+    for row, (_, _, names, group_values) in enumerate(rows):
+        values[row, : len(names)] = group_values
+        mask[row, : len(names)] = True
+
+    ranked = rank_companies(values, mask)
+
+    tables: List[Dict[str, Any]] = [
+        {"group_id": group.get("group_id", index + 1), "scenarios": []}
+        for index, group in enumerate(groups)
+    ]
+    for row, (group_index, scenario_index, names, _) in enumerate(rows):
+        table = sorted(
+            (
+                {
+                    "company": name,
+                    "rank": int(ranked["rank"][row, column]),
+                    "share_price": round(float(values[row, column, 1]), 2),
+                    "valuation": round(float(ranked["valuation"][row, column]), 2),
+                    "investment_performance": round(
+                        float(ranked["investment_performance"][row, column]), 2
+                    ),
+                    "relative_to_rivals": round(
+                        float(ranked["relative_to_rivals"][row, column]), 2
+                    ),
+                }
+                for column, name in enumerate(names)
+            ),
+            key=lambda entry: entry["rank"],
+        )
+        if scenario_index is None:
+            tables[group_index]["league_table"] = table
+        else:
+            tables[group_index]["scenarios"].append(
+                {"scenario_index": scenario_index, "league_table": table}
+            )
+    return tables
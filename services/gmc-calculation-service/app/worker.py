@@ -0,0 +1,44 @@
+"""
+GMC Calculation Service - Job Worker
+
+Standalone worker consuming the calculation job queue from Redis, so heavy
+rollouts and sensitivity runs execute outside the API processes:
+
+    python -m app.worker
+"""
+
+import logging
+import os
+import sys
+
+import redis
+
+from app.jobs import JOB_HANDLERS
+
+# Shared libraries live at the repository root locally and in /app/shared in images
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from shared.python.jobs import JobWorker, RedisJobQueue  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """Run the worker until interrupted."""
+    redis_url = os.environ.get("REDIS_URL")
+    if not redis_url:
+        raise SystemExit("REDIS_URL is required; without Redis the API runs jobs in-process")
+
+    job_queue = RedisJobQueue(
+        redis.Redis.from_url(redis_url),
+        "calculation",
+        result_ttl_seconds=int(os.environ.get("JOB_RESULT_TTL_SECONDS", 3600)),
+    )
+    processes = int(os.environ.get("JOB_WORKER_PROCESSES", 0)) or None
+    logger.info(f"Consuming calculation jobs for {', '.join(sorted(JOB_HANDLERS))}")
+    JobWorker(job_queue, JOB_HANDLERS, processes=processes).run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Gunicorn configuration for the GMC calculation service.
+
+    gunicorn --config gunicorn.conf.py app.wsgi:application
+
+Calculations are CPU-bound, so the service runs one worker per available CPU
+with a few threads each for database, Redis and WebSocket waits. A
+collaboration socket holds its thread for as long as it is open, so app.main
+caps sockets at a quarter of the threads (MAX_COLLABORATION_SOCKETS) and
+answers 503 beyond that. The app and its calculation tables are preloaded in
+the master and shared copy-on-write by the workers (see shared/python/serving).
+"""
+
+import os
+import sys
+
+# Shared libraries live at the repository root locally and in /app/shared in images
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from shared.python.serving import (  # noqa: E402,F401
+    child_exit,
+    configure_master,
+    post_fork,
+    pre_fork,
+    when_ready,
+    worker_count,
+)
+
+workers = worker_count(workers_per_cpu=1)
+threads = int(os.environ.get("WEB_THREADS", 8))
+configure_master("gmc-calculation-service", workers, threads)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = "gthread"
+preload_app = True
+# Heartbeats on tmpfs, so a slow container disk never gets workers killed
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+# Recycled workers are forked again from the preloaded master
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
@@ -0,0 +1,97 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.capacity import cache_info, capacity_profile, check_feasibility, plan_production
+
+
+class TestCapacityProfile:
+    """Test capacity profiles per (machines, workforce, shift) setup."""
+
+    def test_machine_hours_follow_shift_level(self):
+        """Test machine hours use the workbook hours per shift."""
+        assert capacity_profile(4, 23, 1).machine_hours == 4 * 576
+        assert capacity_profile(4, 23, 2).machine_hours == 4 * 1068
+
+    def test_profiles_are_cached(self):
+        """Test repeated setups reuse the same profile."""
+        assert capacity_profile(5, 20, 2) is capacity_profile(5, 20, 2)
+
+    def test_invalid_shift_level(self):
+        """Test shift levels outside 1-3 are rejected."""
+        with pytest.raises(ValueError):
+            capacity_profile(4, 23, 4)
+
+
+class TestFeasibility:
+    """Test instant feasibility checks."""
+
+    def test_small_quantity_is_feasible(self):
+        """Test a quantity well inside capacity is feasible."""
+        check = check_feasibility([500, 300, 100], capacity_profile(4, 23, 2))
+        assert check['feasible'] is True
+        assert check['max_feasible_scale'] == 1.0
+
+    def test_machining_bottleneck(self):
+        """Test an oversized quantity reports the bottleneck and a feasible scale."""
+        check = check_feasibility([5000, 2000, 1000], capacity_profile(4, 23, 1))
+        assert check['feasible'] is False
+        assert check['bottleneck'] == 'machining'
+        assert 0 < check['max_feasible_scale'] < 1
+
+    def test_component_stock_reduces_machining(self):
+        """Test components in stock need no machine hours."""
+        profile = capacity_profile(4, 23, 1)
+        without = check_feasibility([1000, 0, 0], profile)
+        with_stock = check_feasibility([1000, 0, 0], profile, [1000, 0, 0])
+        assert with_stock['machine_hours']['required'] == 0
+        assert without['machine_hours']['required'] > 0
+
+
+class TestProductionPlanning:
+    """Test the production planning linear program."""
+
+    def test_plan_meets_feasible_target(self):
+        """Test the recommended plan produces the whole target."""
+        plan = plan_production([1400, 925, 500], 4, 23, materials_stock=5000)
+        recommended = plan['recommended']
+        assert recommended['feasible'] is True
+        assert recommended['production'] == {
+            'product_1': 1400.0, 'product_2': 925.0, 'product_3': 500.0
+        }
+        for product in ('product_1', 'product_2', 'product_3'):
+            assert recommended['machined'][product] + recommended['subcontracted'][product] == (
+                pytest.approx(recommended['production'][product])
+            )
+
+    def test_recommends_cheapest_shift(self):
+        """Test the recommendation is the cheapest option considered."""
+        plan = plan_production([1400, 925, 500], 4, 23, materials_stock=5000)
+        cheapest = min(option['total_cost'] for option in plan['options'])
+        assert plan['recommended']['total_cost'] == cheapest
+
+    def test_unmet_demand_without_subcontracting(self):
+        """Test capacity shortfalls are reported as unmet units."""
+        plan = plan_production(
+            [6000, 3000, 2000], 2, 10, shift_level=1, allow_subcontract=False
+        )
+        recommended = plan['recommended']
+        assert recommended['feasible'] is False
+        assert sum(recommended['unmet'].values()) > 0
+
+    def test_repeated_plans_hit_cache(self):
+        """Test repeated inputs are served from the plan cache."""
+        plan_production([800, 400, 200], 4, 23, shift_level=2)
+        hits = cache_info()['plans']['hits']
+        plan_production([800, 400, 200], 4, 23, shift_level=2)
+        assert cache_info()['plans']['hits'] == hits + 1
+
+    def test_returned_plan_is_a_copy(self):
+        """Test callers cannot modify the cached plan."""
+        first = plan_production([800, 400, 200], 4, 23, shift_level=2)
+        first['recommended']['total_cost'] = -1
+        second = plan_production([800, 400, 200], 4, 23, shift_level=2)
+        assert second['recommended']['total_cost'] != -1
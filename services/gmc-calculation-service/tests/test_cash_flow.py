@@ -0,0 +1,87 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.cash_flow import (
+    PAYMENT_CATEGORIES,
+    PAYMENT_KERNELS,
+    RECEIPT_KERNELS,
+    cash_flow_schedule,
+    convolve_terms,
+    settle_quarter,
+)
+
+
+class TestConvolution:
+    """Test spreading flows over quarters by credit terms."""
+
+    def test_kernels_settle_everything(self):
+        """Test every kernel eventually settles the whole amount."""
+        assert np.allclose(RECEIPT_KERNELS.sum(axis=1), 1.0)
+        assert np.allclose(PAYMENT_KERNELS.sum(axis=1), 1.0)
+
+    def test_receipts_follow_market_terms(self):
+        """Test Europe, NAFTA and Internet sales are collected on their terms."""
+        sales = np.array([[[1000.0, 1000.0, 1000.0]]])
+        settled = convolve_terms(sales, RECEIPT_KERNELS)
+        assert settled[0, 0].tolist() == pytest.approx([330.0, 0.0, 1000.0])
+        assert settled[0, 1].tolist() == pytest.approx([670.0, 1000.0, 0.0])
+
+    def test_step_matches_convolution(self):
+        """Test advancing one quarter at a time reproduces the full convolution."""
+        rng = np.random.default_rng(3)
+        flows = rng.uniform(0, 1000, size=(4, 6, len(PAYMENT_CATEGORIES)))
+        expected = convolve_terms(flows, PAYMENT_KERNELS).sum(axis=2)
+
+        carried = np.zeros((4, PAYMENT_KERNELS.shape[1] - 1))
+        for quarter in range(6):
+            paid, carried = settle_quarter(flows[:, quarter], PAYMENT_KERNELS, carried)
+            assert paid == pytest.approx(expected[:, quarter])
+        assert carried[:, 0] == pytest.approx(expected[:, 6])
+
+
+class TestSchedule:
+    """Test batched cash-flow schedules."""
+
+    def test_opening_balances_settle_in_first_quarter(self):
+        """Test opening receivables and payables are collected and paid first."""
+        schedule = cash_flow_schedule(
+            np.zeros((1, 2, 3)),
+            np.zeros((1, 2, len(PAYMENT_CATEGORIES))),
+            opening_cash=np.array([100.0]),
+            opening_receivables=np.array([50.0]),
+            opening_payables=np.array([30.0]),
+        )
+        assert schedule['cash'][0].tolist() == [120.0, 120.0]
+        assert schedule['receivables'][0].tolist() == [0.0, 0.0]
+
+    def test_balances_reconcile_with_flows(self):
+        """Test closing balances equal flows not yet settled."""
+        rng = np.random.default_rng(5)
+        sales = rng.uniform(0, 1e5, size=(10, 4, 3))
+        costs = rng.uniform(0, 1e5, size=(10, 4, len(PAYMENT_CATEGORIES)))
+        schedule = cash_flow_schedule(sales, costs, opening_cash=np.zeros(10))
+
+        last_sales = sales[:, -1]
+        assert schedule['receivables'][:, -1] == pytest.approx(last_sales @ RECEIPT_KERNELS[:, 1])
+        assert schedule['cash'][:, -1] == pytest.approx(
+            sales.sum(axis=(1, 2))
+            - schedule['receivables'][:, -1]
+            - costs.sum(axis=(1, 2))
+            + schedule['payables'][:, -1]
+        )
+
+    def test_zero_quarters_give_empty_schedules(self):
+        """Test scenarios without quarters schedule nothing instead of failing."""
+        schedule = cash_flow_schedule(
+            np.zeros((2, 0, 3)),
+            np.zeros((2, 0, len(PAYMENT_CATEGORIES))),
+            opening_cash=np.array([100.0, 200.0]),
+            opening_receivables=np.array([50.0, 0.0]),
+        )
+        assert schedule['receipts'].shape == (2, 0)
+        assert schedule['cash'].shape == (2, 0)
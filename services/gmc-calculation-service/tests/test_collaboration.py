@@ -0,0 +1,177 @@
+import pytest
+import sys
+import os
+import json
+import time
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.collaboration import CollaborationHub, LocalChangeStream, delta
+from app.undo_redo import InMemoryHistoryStore, SessionHistory, flatten_parameters
+
+
+class Sessions:
+    """Session histories with a counting snapshot callable."""
+
+    def __init__(self):
+        self.histories = {}
+        self.calls = 0
+
+    def history(self, session_id):
+        if session_id not in self.histories:
+            self.histories[session_id] = SessionHistory(InMemoryHistoryStore(), {'shift_level': 1})
+        return self.histories[session_id]
+
+    def snapshot(self, project_id, session_id):
+        self.calls += 1
+        parameters = self.history(session_id).current_state()
+        return flatten_parameters(parameters), {'shift_level': parameters['shift_level'] * 10}
+
+
+@pytest.fixture
+def sessions():
+    return Sessions()
+
+
+@pytest.fixture
+def hub(sessions):
+    """Hub without background pumps, driven by pump/flush."""
+    return CollaborationHub(sessions.snapshot, threaded=False)
+
+
+def drain(connection):
+    messages = []
+    message = connection.next_message(timeout=0)
+    while message is not None:
+        messages.append(json.loads(message))
+        message = connection.next_message(timeout=0)
+    return messages
+
+
+def change(hub, sessions, session_id, value, user_id):
+    sessions.history(session_id).record_change('shift_level', value, user_id=user_id)
+    hub.publish('p1', {'session_id': session_id, 'user_id': user_id, 'action': 'change'})
+
+
+class TestCoalescing:
+    """Test change events are coalesced into per-frame deltas."""
+
+    def test_one_recalculation_and_message_per_frame(self, hub, sessions):
+        """Test a burst of changes costs one recalculation and one message per teammate."""
+        connections = [hub.connect('p1', f'user_{i}') for i in range(6)]
+        for connection in connections:
+            drain(connection)
+
+        for value in range(1, 51):
+            change(hub, sessions, 's1', value % 3 + 1, f'user_{value % 6}')
+        channel = hub.channel('p1')
+        assert channel.pump(timeout=0) == 50
+        message = channel.flush()
+
+        assert sessions.calls == 1
+        assert channel.stats['recalculations'] == 1
+        for connection in connections:
+            assert drain(connection) == [message]
+        assert message['s']['s1']['u'] == [f'user_{i}' for i in range(6)]
+
+    def test_frame_carries_only_changes(self, hub, sessions):
+        """Test frames send changed parameters and outputs, and nothing when unchanged."""
+        connection = hub.connect('p1', 'alice')
+        channel = hub.channel('p1')
+        change(hub, sessions, 's1', 2, 'alice')
+        channel.pump(timeout=0)
+        first = channel.flush()
+        assert first['s']['s1']['p'] == {'shift_level': 2}
+        assert first['s']['s1']['o'] == {'shift_level': 20}
+
+        hub.publish('p1', {'session_id': 's1', 'user_id': 'alice', 'action': 'jump'})
+        channel.pump(timeout=0)
+        assert channel.flush() is None
+        assert [m['t'] for m in drain(connection)] == ['s', 'p', 'f']
+
+    def test_new_connection_gets_snapshot(self, hub, sessions):
+        """Test a late joiner receives the full state of edited sessions."""
+        hub.connect('p1', 'alice')
+        change(hub, sessions, 's1', 3, 'alice')
+        channel = hub.channel('p1')
+        channel.pump(timeout=0)
+        channel.flush()
+
+        snapshot = drain(hub.connect('p1', 'bob'))[0]
+        assert snapshot['t'] == 's'
+        assert snapshot['s']['s1']['p'] == {'shift_level': 3}
+
+    def test_overflow_resyncs_with_snapshot(self, hub, sessions):
+        """Test a connection whose outbox overflowed is sent a snapshot instead of a delta."""
+        connection = hub.connect('p1', 'alice')
+        for _ in range(100):
+            connection.push('{}')
+        assert connection.resync
+        change(hub, sessions, 's1', 2, 'alice')
+        channel = hub.channel('p1')
+        channel.pump(timeout=0)
+        channel.flush()
+        assert drain(connection)[-1]['t'] == 's'
+        assert not connection.resync
+
+
+class TestPresence:
+    """Test presence messages on connect and disconnect."""
+
+    def test_presence_updates(self, hub):
+        """Test teammates see who is connected."""
+        alice = hub.connect('p1', 'alice')
+        bob = hub.connect('p1', 'bob')
+        assert drain(alice)[-1] == {'t': 'p', 'users': ['alice', 'bob']}
+        hub.disconnect(bob)
+        assert drain(alice)[-1] == {'t': 'p', 'users': ['alice']}
+        assert hub.active_users('p1') == ['alice']
+
+    def test_channel_dropped_on_last_disconnect(self, hub):
+        """Test a project's channel is released when its last teammate leaves."""
+        alice = hub.connect('p1', 'alice')
+        bob = hub.connect('p1', 'bob')
+        hub.disconnect(alice)
+        assert 'p1' in hub.channels
+        hub.disconnect(bob)
+        assert hub.channels == {}
+
+        carol = hub.connect('p1', 'carol')
+        assert drain(carol)[-1] == {'t': 'p', 'users': ['carol']}
+
+
+class TestStream:
+    """Test the process-local change stream and deltas."""
+
+    def test_read_from_tail(self):
+        """Test readers see only events published after the tail they started from."""
+        stream = LocalChangeStream(maxlen=3)
+        stream.publish({'n': 0})
+        start = stream.tail()
+        for n in range(1, 5):
+            stream.publish({'n': n})
+        last_id, events = stream.read(start, timeout=0)
+        assert [e['n'] for e in events] == [2, 3, 4]
+        assert stream.read(last_id, timeout=0)[1] == []
+
+    def test_delta_marks_removed_keys(self):
+        """Test removed entries are sent as None."""
+        assert delta({'a': 1, 'b': 2}, {'a': 1, 'c': 3}) == {'c': 3, 'b': None}
+
+
+def test_threaded_pump_delivers_frames(sessions):
+    """Test the background pump coalesces and delivers without manual flushing."""
+    hub = CollaborationHub(sessions.snapshot, frame_seconds=0.02)
+    connection = hub.connect('p1', 'alice')
+    try:
+        for value in (2, 3, 1, 2):
+            change(hub, sessions, 's1', value, 'alice')
+        deadline = time.monotonic() + 2
+        frames = []
+        while time.monotonic() < deadline and not frames:
+            frames = [m for m in drain(connection) if m['t'] == 'f']
+            time.sleep(0.01)
+        assert frames and frames[-1]['s']['s1']['p'] == {'shift_level': 2}
+    finally:
+        hub.disconnect(connection)
@@ -0,0 +1,100 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.demand_model import DemandModel, quarter_design
+from app.quarter_model import MARKETS, PRICE_ELASTICITY, PRODUCTS, ReportReference
+
+
+def _nested(values):
+    return {m: {p: float(values[i, j]) for j, p in enumerate(PRODUCTS)} for i, m in enumerate(MARKETS)}
+
+
+def _history(quarters=6, companies=8, price_elasticity=2.2, seed=1):
+    """Generate group information with known elasticities."""
+    rng = np.random.default_rng(seed)
+    history = []
+    for quarter in range(quarters):
+        group = []
+        for company in range(companies):
+            prices = 100 * np.exp(rng.normal(0, 0.2, (3, 3)))
+            advertising = rng.uniform(10, 60, 3)
+            units = (
+                1000 * (prices / 100) ** -price_elasticity * ((1 + advertising) / 35) ** 0.3
+                * np.exp(rng.normal(0, 0.02, (3, 3)))
+            )
+            group.append({
+                'company': str(company),
+                'prices': _nested(prices),
+                'sales_units': _nested(units),
+                'advertising': dict(zip(PRODUCTS, advertising)),
+            })
+        history.append((f'Y15Q{quarter + 1}', group))
+    return history
+
+
+class TestDemandModel:
+    """Test incremental demand elasticity fitting."""
+
+    def test_recovers_elasticities(self):
+        """Test fitted elasticities approach the generating ones."""
+        model = DemandModel()
+        for quarter, group in _history():
+            model.ingest(quarter, group)
+        elasticities = model.elasticities()
+        assert np.allclose(elasticities['price_elasticity'], 2.2, atol=0.15)
+        assert np.allclose(elasticities['advertising_elasticity'], 0.3, atol=0.05)
+
+    def test_empty_model_uses_defaults(self):
+        """Test a project without history keeps the default elasticities."""
+        elasticities = DemandModel().elasticities()
+        assert np.allclose(elasticities['price_elasticity'], PRICE_ELASTICITY)
+
+    def test_incremental_matches_full_fit(self):
+        """Test ingesting quarters across stored round trips matches one full fit."""
+        history = _history()
+        full = DemandModel()
+        for quarter, group in history:
+            full.ingest(quarter, group)
+
+        stored = DemandModel().to_dict()
+        for quarter, group in history:
+            model = DemandModel.from_dict(stored)
+            model.ingest(quarter, group)
+            stored = model.to_dict()
+
+        restored = DemandModel.from_dict(stored)
+        assert np.allclose(restored.coefficients(), full.coefficients())
+        assert restored.quarters == [quarter for quarter, _ in history]
+
+    def test_quarters_are_ingested_once(self):
+        """Test re-sending a quarter does not double count it."""
+        model = DemandModel()
+        quarter, group = _history(quarters=1)[0]
+        assert model.ingest(quarter, group) is True
+        assert model.ingest(quarter, group) is False
+        assert model.observations.sum() == 8 * 9
+
+    def test_withdrawn_products_are_excluded(self):
+        """Test companies not offering a product add no observation for it."""
+        _, group = _history(quarters=1)[0]
+        group[0]['prices']['europe']['product_1'] = 0
+        rows = quarter_design(group)
+        assert rows['valid'][0, 0].sum() == 7
+
+    def test_fitted_elasticities_drive_forecasts(self):
+        """Test report references use per-cell fitted elasticities."""
+        model = DemandModel()
+        for quarter, group in _history():
+            model.ingest(quarter, group)
+        fitted = {name: values.tolist() for name, values in model.elasticities().items()}
+        reference = ReportReference(fitted)
+        default = ReportReference({})
+        doubled = reference.prices * 2
+        ratio = reference.demand(doubled, reference.advertising) / reference.sales_units
+        default_ratio = default.demand(doubled, default.advertising) / default.sales_units
+        assert ratio[0, 0] < default_ratio[0, 0]
@@ -0,0 +1,123 @@
+import io
+import json
+import pytest
+import sys
+import os
+import zipfile
+
+from openpyxl import load_workbook
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.excel_export import (
+    EXPORT_ERRORS_FILENAME,
+    SHEET_NAMES,
+    export_filename,
+    export_session,
+    iter_project_zip,
+    iter_session_workbook,
+    session_from_record,
+)
+
+
+DECISIONS = {
+    'prices': {'europe': {'product_1': 95, 'product_2': 120, 'product_3': 150}},
+    'deliveries': {'europe': {'product_1': 900, 'product_2': 600, 'product_3': 300}},
+}
+
+
+class TestSessionWorkbook:
+    """Test single-session workbook export."""
+
+    def test_workbook_has_analysis_sheets(self):
+        """Test the workbook carries every analysis sheet in order."""
+        session = export_session('s1', DECISIONS, session_name='Plan A')
+        workbook = load_workbook(io.BytesIO(b''.join(iter_session_workbook(session))))
+        assert workbook.sheetnames == list(SHEET_NAMES)
+
+    def test_decision_sheet_reflects_decisions(self):
+        """Test decided prices are written to the Decision sheet."""
+        session = export_session('s1', DECISIONS)
+        workbook = load_workbook(io.BytesIO(b''.join(iter_session_workbook(session))))
+        rows = list(workbook['Decision'].iter_rows(values_only=True))
+        europe = next(row for row in rows if row[0] == 'Europe')
+        assert europe[1:4] == (95, 120, 150)
+
+    def test_invalid_decisions_raise_before_streaming(self):
+        """Test malformed decisions fail when the stream is created, before any bytes are sent."""
+        with pytest.raises(ValueError):
+            iter_session_workbook(export_session('s1', {'shift_level': 'double'}))
+
+    def test_streams_in_chunks(self):
+        """Test the workbook is yielded in chunks no larger than the chunk size."""
+        chunks = list(iter_session_workbook(export_session('s1', DECISIONS), chunk_size=1024))
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 1024 for chunk in chunks)
+
+
+class TestProjectZip:
+    """Test whole-project zip export."""
+
+    def test_one_workbook_per_session(self):
+        """Test every session becomes a readable workbook entry."""
+        sessions = [export_session(str(i), DECISIONS, session_name=f'Team {i}') for i in range(3)]
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(iter_project_zip(sessions))))
+        assert archive.namelist() == ['Team_0.xlsx', 'Team_1.xlsx', 'Team_2.xlsx']
+        assert archive.testzip() is None
+        workbook = load_workbook(io.BytesIO(archive.read('Team_1.xlsx')))
+        assert workbook.sheetnames == list(SHEET_NAMES)
+
+    def test_duplicate_names_are_numbered(self):
+        """Test sessions sharing a name get distinct entries."""
+        sessions = [export_session(str(i), {}, session_name='Plan') for i in range(2)]
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(iter_project_zip(sessions))))
+        assert archive.namelist() == ['Plan.xlsx', 'Plan_2.xlsx']
+
+    def test_failed_sessions_recorded(self):
+        """Test a session that cannot be calculated is skipped and listed, not fatal."""
+        sessions = [
+            export_session('1', DECISIONS, session_name='Good'),
+            export_session('2', {'prices': 'high'}, session_name='Broken'),
+            export_session('3', DECISIONS, session_name='Also good'),
+        ]
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(iter_project_zip(sessions))))
+        assert archive.namelist() == ['Good.xlsx', 'Also_good.xlsx', EXPORT_ERRORS_FILENAME]
+        assert archive.testzip() is None
+        errors = json.loads(archive.read(EXPORT_ERRORS_FILENAME))
+        assert [error['session_id'] for error in errors] == ['2']
+
+    def test_sessions_consumed_lazily(self):
+        """Test the zip starts streaming before later sessions are produced."""
+        produced = []
+
+        def sessions():
+            for i in range(3):
+                produced.append(i)
+                yield export_session(str(i), {})
+
+        stream = iter_project_zip(sessions())
+        next(stream)
+        assert produced == [0]
+
+
+class TestSessionMapping:
+    """Test session records and file names."""
+
+    def test_from_record(self):
+        """Test an analysis_sessions row maps to an export session."""
+        session = session_from_record(
+            {'session_id': 7, 'session_name': 'Q3', 'decision_parameters': DECISIONS}
+        )
+        assert session['session_id'] == '7'
+        assert session['decisions'] == DECISIONS
+        assert session['base_report'] == {}
+
+    @pytest.mark.parametrize('name,expected', [
+        ('Team A / Q3', 'Team_A_Q3.xlsx'),
+        ('../etc', '.._etc.xlsx'),
+        ('', 's1.xlsx'),
+    ])
+    def test_safe_filename(self, name, expected):
+        """Test file names are limited to safe characters."""
+        assert export_filename({'session_id': 's1', 'session_name': name}) == expected
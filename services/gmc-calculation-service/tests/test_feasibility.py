@@ -0,0 +1,121 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.feasibility import decision_parameters, describe_overrides, feasible_mask, project_batch
+from app.quarter_model import DECISION_DTYPE, OVERRIDE_REASONS, SAMPLE_DECISIONS, simulate_quarter
+from app.rollout import RolloutEngine
+
+
+@pytest.fixture
+def engine():
+    """Create a rollout engine from the workbook sample company."""
+    return RolloutEngine({}, SAMPLE_DECISIONS)
+
+
+def reasons_of(projection, index=0):
+    return {r for r, flag in zip(OVERRIDE_REASONS, projection['reasons'][index]) if flag}
+
+
+class TestProjection:
+    """Test projected simulator overrides."""
+
+    def test_sample_decisions_are_feasible(self, engine):
+        """Test the workbook sample decisions need no overrides."""
+        projection = project_batch(engine, [{}])
+        assert not projection['adjusted'].any()
+        assert describe_overrides(projection, 0) == []
+
+    def test_rule_reasons(self, engine):
+        """Test each state-dependent rule reports its reason."""
+        projection = project_batch(engine, [
+            {'shift_level': 5},
+            {'assembly_wage_rate': 1000},
+            {'recruit': -50},
+            {'machines_to_buy': -10},
+            {'share_issue': 1000000},
+            {'advertising': {'product_1': -5}},
+        ], include_dividend=False)
+        assert [reasons_of(projection, i) for i in range(5)] == [
+            {'shift_level'},
+            {'wage_rate'},
+            {'workforce', 'assembly_capacity'},
+            {'machines'},
+            {'share_capital_band'},
+        ]
+        assert reasons_of(projection, 5) == {'negative_value'}
+        assert projection['decisions']['share_issue'][4] == pytest.approx(400000)
+
+    def test_lack_of_funds(self, engine):
+        """Test machine orders, placements, repurchases and loans stay within the bank's limits."""
+        projection = project_batch(engine, [
+            {'machines_to_buy': 100},
+            {'term_deposit': 100000},
+            {'machines_to_buy': 10, 'share_issue': -400000},
+            {'additional_loan': 100000},
+        ], include_dividend=False)
+        assert [reasons_of(projection, i) for i in range(4)] == [
+            {'funds'}, {'funds'}, {'funds'}, {'borrowing_power'},
+        ]
+        decisions = projection['decisions']
+        assert 0 < decisions['machines_to_buy'][0] < 100
+        assert 0 < decisions['term_deposit'][1] < 100000
+        assert decisions['machines_to_buy'][2] == 10
+        assert -400000 < decisions['share_issue'][2] <= 0
+        assert 0 < decisions['additional_loan'][3] < 100000
+        overrides = describe_overrides(projection, 1)
+        assert overrides[0]['parameter'] == 'term_deposit'
+        assert overrides[0]['reasons'][0]['code'] == 'funds'
+
+    def test_capacity_limits_deliveries(self, engine):
+        """Test deliveries beyond machine capacity are scaled back."""
+        projection = project_batch(engine, [{'deliveries': {'europe': {'product_3': 5000}}}])
+        assert 'machine_capacity' in reasons_of(projection)
+        overrides = describe_overrides(projection, 0)
+        europe = next(o for o in overrides if o['parameter'] == 'deliveries.europe.product_3')
+        assert europe['effective'] < europe['requested'] == 5000
+        assert europe['reasons'][0]['code'] == 'machine_capacity'
+
+    def test_dividend_needs_profit(self, engine):
+        """Test the dividend limit applies only when the quarter is simulated."""
+        fast = project_batch(engine, [{'dividend': 50}], include_dividend=False)
+        full = project_batch(engine, [{'dividend': 50}])
+        assert not fast['adjusted'].any()
+        assert reasons_of(full) == {'distributable_profit'}
+        assert full['decisions']['dividend'][0] < 50
+
+    def test_effective_decisions_need_no_overrides(self, engine):
+        """Test simulating the effective decisions needs no further overrides."""
+        proposed = [{'shift_level': 0, 'recruit': -30, 'dividend': 40, 'share_issue': -900000}]
+        projection = project_batch(engine, proposed)
+        state = np.repeat(engine.base_state[None], 1)
+        _, replayed = simulate_quarter(state, projection['decisions'], engine.reference)
+        _, original = simulate_quarter(state, projection['proposed'], engine.reference)
+        assert not replayed['adjusted'].any()
+        assert replayed['units_assembled'] == pytest.approx(original['units_assembled'])
+        assert replayed['dividend'] == pytest.approx(original['dividend'])
+
+    def test_feasible_mask_matches_batch(self, engine):
+        """Test the pre-filter flags exactly the sets with overrides."""
+        sets = [{}, {'shift_level': 4}, {'deliveries': {'europe': {'product_1': 1200}}}]
+        compiled = engine.compile_plans([[s] for s in sets])[:, 0]
+        state = np.repeat(engine.base_state[None], len(sets))
+        mask = feasible_mask(state, compiled)
+        projection = project_batch(engine, sets, include_dividend=False)
+        assert mask.tolist() == (~projection['adjusted'].any(axis=1)).tolist()
+        assert mask[0] and not mask[1]
+
+
+class TestDecisionParameters:
+    """Test effective decisions as nested parameters."""
+
+    def test_round_trip(self, engine):
+        """Test nested parameters rebuild the same decision record."""
+        compiled = engine.compile_plans([[{}]])[0, 0]
+        rebuilt = engine.compile_plans([[decision_parameters(compiled)]])[0, 0]
+        for field in DECISION_DTYPE.names:
+            assert np.allclose(rebuilt[field], compiled[field]), field
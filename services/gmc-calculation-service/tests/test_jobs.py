@@ -0,0 +1,66 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import app.jobs as jobs
+from app.jobs import rollout_payload, run_rollout_job, run_sensitivity_job
+from app.quarter_model import SAMPLE_DECISIONS
+from app.rollout import RolloutEngine
+
+
+class Context:
+    """Job context recording progress reports."""
+
+    def __init__(self):
+        self.reports = []
+
+    def progress(self, fraction, message=None):
+        self.reports.append(fraction)
+
+
+def price_plans(count):
+    return [[{'prices': {'europe': {'product_1': 300 + index}}}] * 2 for index in range(count)]
+
+
+class TestRolloutJob:
+    """Test chunked rollout jobs."""
+
+    def test_chunks_match_single_run(self, monkeypatch):
+        """Test rolling plans forward in chunks gives the same ranking as one batch."""
+        engine = RolloutEngine({}, SAMPLE_DECISIONS)
+        whole = rollout_payload(engine, price_plans(7))
+        monkeypatch.setattr(jobs, 'ROLLOUT_CHUNK_PLANS', 3)
+        context = Context()
+        chunked = rollout_payload(engine, price_plans(7), progress=context.progress)
+        assert chunked == whole
+        assert context.reports == pytest.approx([3 / 7, 6 / 7, 1.0])
+
+    def test_skip_infeasible_keeps_plan_indices(self):
+        """Test skipped plans are counted and kept plans keep their request index."""
+        plans = [[{'shift_level': 5}], [{}]]
+        payload = run_rollout_job({'plans': plans, 'skip_infeasible': True}, Context())
+        assert payload['skipped_plans'] == 1
+        assert [plan['plan_index'] for plan in payload['plans']] == [1]
+
+    def test_all_plans_infeasible(self):
+        """Test a batch with no feasible plan returns no plans instead of failing."""
+        plans = [[{'shift_level': 5}], [{'shift_level': 0}, {}]]
+        context = Context()
+        payload = run_rollout_job({'plans': plans, 'skip_infeasible': True}, context)
+        assert payload['plans'] == []
+        assert payload['skipped_plans'] == 2
+        assert payload['quarters'] == 2
+        assert context.reports == [1.0]
+
+
+class TestSensitivityJob:
+    """Test sensitivity jobs."""
+
+    def test_ranked_variables(self):
+        """Test the handler ranks decision variables like the synchronous endpoint."""
+        payload = run_sensitivity_job({'plan': [{}], 'top': 5}, Context())
+        assert len(payload['variables']) == 5
+        assert 'investment_performance' in payload['base']
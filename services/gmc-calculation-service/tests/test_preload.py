@@ -0,0 +1,29 @@
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.capacity import capacity_profile
+from app.preload import preload_tables
+from app.quarter_model import SAMPLE_REPORT
+
+
+class TestPreload:
+    """Test read-only tables are built before workers fork."""
+
+    def test_sample_setups_cached(self):
+        """Test the sample company's capacity profiles are built at every shift level."""
+        summary = preload_tables()
+        assert summary['capacity_profiles'] >= 3
+        assert summary['production_plans'] >= 1
+
+        machines, workers = SAMPLE_REPORT['machines'], SAMPLE_REPORT['assembly_workers']
+        hits = capacity_profile.cache_info().hits
+        for shift in (1, 2, 3):
+            capacity_profile(machines, workers, shift, 1200, (115.0, 165.0, 325.0))
+        assert capacity_profile.cache_info().hits == hits + 3
+
+    def test_runs_once_per_process(self):
+        """Test repeated factory calls reuse the first preload."""
+        assert preload_tables() is preload_tables()
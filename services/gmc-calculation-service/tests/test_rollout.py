@@ -0,0 +1,100 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.quarter_model import (
+    SAMPLE_DECISIONS,
+    STATE_DTYPE,
+    decisions_from_parameters,
+    investment_performance,
+    state_from_report,
+    transport_cost,
+)
+from app.rollout import RolloutEngine, summarize_rollout
+
+
+@pytest.fixture
+def engine():
+    """Create a rollout engine from the workbook sample company."""
+    return RolloutEngine({}, SAMPLE_DECISIONS)
+
+
+class TestQuarterModel:
+    """Test the compact state and decision records."""
+
+    def test_state_from_report_uses_sample_defaults(self):
+        """Test missing report values fall back to the workbook sample."""
+        state = state_from_report({'cash': 1000})
+        assert state.dtype == STATE_DTYPE
+        assert state['cash'] == 1000
+        assert state['machines'] == 4
+        assert investment_performance(state_from_report({})) == pytest.approx(4320400)
+
+    def test_one_off_decisions_do_not_repeat(self):
+        """Test subcontracting resets while prices repeat."""
+        first = decisions_from_parameters({'subcontract': {'product_1': 100}, 'shift_level': 2})
+        second = decisions_from_parameters({'prices': {'europe': {'product_1': 300}}}, first)
+        assert second['subcontract'][0] == 0
+        assert second['shift_level'] == 2
+        assert second['prices'][0, 0] == 300
+
+    def test_transport_cost_matches_workbook(self):
+        """Test the Hired Transport sheet example (total €33,350)."""
+        deliveries = np.array([[900, 700, 400], [100, 100, 50], [700, 450, 200]], dtype=float)
+        assert transport_cost(deliveries).tolist() == [20800, 9300, 3250]
+
+
+class TestRolloutEngine:
+    """Test multi-quarter plan rollout."""
+
+    def test_batch_matches_individual_rollouts(self, engine):
+        """Test plans evaluated together equal plans evaluated alone."""
+        plans = [
+            [{}, {}, {}],
+            [{'prices': {'europe': {'product_1': 300}}}, {'dividend': 1}, {}],
+        ]
+        batch = engine.evaluate(plans)['investment_performance']
+        for index, plan in enumerate(plans):
+            single = engine.evaluate([plan])['investment_performance']
+            np.testing.assert_allclose(batch[index], single[0])
+
+    def test_subcontracted_components_arrive_after_two_quarters(self, engine):
+        """Test the two-quarter subcontracting lead time."""
+        no_product_3 = {market: {'product_3': 0} for market in ('europe', 'nafta', 'internet')}
+        plan = [{'subcontract': {'product_3': 500}, 'deliveries': no_product_3}, {}, {}]
+
+        in_transit = engine.evaluate([plan[:2]])['final_state'][0]
+        assert in_transit['components_on_order'][0, 2] == 500
+        assert in_transit['component_stock'][2] == 0
+
+        arrived = engine.evaluate([plan])['final_state'][0]
+        assert arrived['components_on_order'].sum() == 0
+        assert arrived['component_stock'][2] == pytest.approx(500)
+
+    def test_wage_rate_never_decreases(self, engine):
+        """Test a lower wage decision keeps the previous rate."""
+        results = engine.evaluate([[{'assembly_wage_rate': 1500}, {'assembly_wage_rate': 1000}]])
+        assert results['final_state'][0]['wage_rate'] == 15
+
+    def test_infeasible_dividend_is_adjusted(self, engine):
+        """Test dividends beyond distributable profit are cut and flagged."""
+        results = engine.evaluate([[{'dividend': 50}]])
+        summary = summarize_rollout(results)[0]
+        assert 'dividend' in summary['adjusted_decisions']['quarter_1']
+        assert results['dividend'][0, 0] < 0.5 * 4000000
+
+    def test_share_issue_limited_to_annual_band(self, engine):
+        """Test issues are limited to 10% of opening share capital per year."""
+        results = engine.evaluate([[{'share_issue': 300000}, {'share_issue': 300000}]])
+        assert results['final_state'][0]['share_capital'] == pytest.approx(4400000)
+
+    def test_summaries_ranked_by_investment_performance(self, engine):
+        """Test plan summaries are returned best first."""
+        plans = [[{'shift_level': 3, 'deliveries': {'europe': {'product_1': 3000}}}] * 4, [{}] * 4]
+        summaries = summarize_rollout(engine.evaluate(plans), include_quarters=True)
+        assert [summary['plan_index'] for summary in summaries] == [1, 0]
+        assert len(summaries[0]['quarters']) == 4
@@ -0,0 +1,75 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.quarter_model import SAMPLE_DECISIONS
+from app.rollout import RolloutEngine
+from app.sensitivity import DECISION_VARIABLES, decision_sensitivity, rank_by_impact
+
+
+@pytest.fixture
+def engine():
+    """Create a rollout engine from the workbook sample company."""
+    return RolloutEngine({}, SAMPLE_DECISIONS)
+
+
+def _entry(result, parameter):
+    return next(v for v in result['variables'] if v['parameter'] == parameter)
+
+
+class TestDecisionSensitivity:
+    """Test batched finite-difference sensitivities."""
+
+    def test_every_decision_variable_is_covered(self, engine):
+        """Test one derivative entry per scalar decision."""
+        result = decision_sensitivity(engine, [{}])
+        assert len(result['variables']) == len(DECISION_VARIABLES)
+        assert _entry(result, 'prices.europe.product_1')['value'] > 0
+
+    def test_matches_separate_runs(self, engine):
+        """Test the batched derivative equals a difference of two separate rollouts."""
+        result = decision_sensitivity(engine, [{}])
+        entry = _entry(result, 'advertising.product_2')
+        advertising = entry['value']
+
+        def performance(value):
+            plan = [{'advertising': {'product_2': value}}]
+            return engine.evaluate([plan])['investment_performance'][0, -1]
+
+        expected = (performance(advertising + 1) - performance(advertising - 1)) / 2
+        assert entry['d_investment_performance'] == pytest.approx(expected)
+
+    def test_dividend_costs_cash_not_profit(self, engine):
+        """Test paying a dividend reduces cash but leaves profit unchanged."""
+        entry = _entry(decision_sensitivity(engine, [{}]), 'dividend')
+        assert entry['d_cash'] < 0
+        assert entry['d_profit'] == pytest.approx(0)
+
+    def test_later_quarter(self, engine):
+        """Test decisions of a later quarter can be varied."""
+        result = decision_sensitivity(engine, [{}, {}], quarter=1)
+        assert _entry(result, 'prices.europe.product_1')['d_profit'] != 0
+
+    def test_quarter_out_of_range(self, engine):
+        """Test quarters beyond the plan are rejected."""
+        with pytest.raises(ValueError):
+            decision_sensitivity(engine, [{}], quarter=2)
+
+
+class TestImpactRanking:
+    """Test tornado ordering."""
+
+    def test_ranked_by_absolute_impact(self, engine):
+        """Test entries are ordered by the absolute effect of one step."""
+        ranked = rank_by_impact(decision_sensitivity(engine, [{}])['variables'], 'cash', top=5)
+        impacts = [abs(entry['impact']) for entry in ranked]
+        assert len(ranked) == 5
+        assert impacts == sorted(impacts, reverse=True)
+
+    def test_unknown_outcome(self, engine):
+        """Test ranking by an unknown outcome is rejected."""
+        with pytest.raises(ValueError):
+            rank_by_impact(decision_sensitivity(engine, [{}])['variables'], 'revenue')
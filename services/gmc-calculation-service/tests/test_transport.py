@@ -0,0 +1,73 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import transport
+from app.quarter_model import transport_cost
+from app.transport import allocate_market, allocate_transport
+
+
+WORKBOOK_DELIVERIES = np.array([[900, 600, 300], [1500, 500, 0], [0, 0, 250]], dtype=float)
+
+
+class TestAllocation:
+    """Test minimum-cost container allocation."""
+
+    def test_matches_workbook_costs(self):
+        """Test the allocation costs the workbook example like the quarter model."""
+        allocation = allocate_transport(WORKBOOK_DELIVERIES)
+        costs = [allocation['markets'][m]['cost'] for m in ('europe', 'nafta', 'internet')]
+        assert costs == transport_cost(WORKBOOK_DELIVERIES).tolist()
+
+    def test_loads_cover_deliveries(self):
+        """Test every delivered unit is loaded and no container is overfilled."""
+        allocation = allocate_market([900, 600, 300], 0)
+        loaded = {'product_1': 0, 'product_2': 0, 'product_3': 0}
+        for load in allocation['loads']:
+            assert load['space_used'] <= transport.CONTAINER_CAPACITY
+            for product, units in load['units'].items():
+                loaded[product] += load['count'] * units
+        assert loaded == {'product_1': 900, 'product_2': 600, 'product_3': 300}
+        assert allocation['containers'] == 7
+
+    def test_fractional_units_round_up(self):
+        """Test part units still take a whole unit of space."""
+        assert allocate_market([500.2, 0, 0], 2)['containers'] == 2
+
+    def test_fractional_units_cost_whole_units(self):
+        """Test the quarter model charges part units like the allocation does."""
+        deliveries = np.array([[500.2, 0, 0], [0, 0, 0], [0, 0, 0]])
+        assert transport_cost(deliveries).sum() == allocate_transport(deliveries)['total_cost']
+
+    def test_no_deliveries_hire_nothing(self):
+        """Test empty markets cost nothing."""
+        assert allocate_transport(np.zeros((3, 3)))['total_cost'] == 0
+
+
+class TestPacking:
+    """Test when largest-first packing is optimal."""
+
+    def test_divisible_chain_is_exact(self):
+        """Test the model's 1/2/4 space units in 500-unit containers pack exactly."""
+        assert transport._packing_is_exact([1.0, 2.0, 4.0], 500.0)
+
+    def test_other_sizes_are_not_exact(self):
+        """Test sizes outside a divisible chain are recognised."""
+        assert not transport._packing_is_exact([2.0, 3.0, 4.0], 10.0)
+        assert not transport._packing_is_exact([1.0, 2.0, 4.0], 502.0)
+
+
+class TestBatch:
+    """Test vectorised costing of many delivery scenarios."""
+
+    def test_batch_matches_single_allocations(self):
+        """Test batched costs equal one-at-a-time allocations."""
+        rng = np.random.default_rng(7)
+        deliveries = rng.integers(0, 2000, size=(20, 3, 3)).astype(float)
+        costs = transport_cost(deliveries)
+        for scenario, cost in zip(deliveries, costs):
+            assert cost.sum() == allocate_transport(scenario)['total_cost']
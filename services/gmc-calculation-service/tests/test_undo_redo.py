@@ -0,0 +1,292 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.undo_redo import (
+    HistoryConflictError,
+    InMemoryHistoryStore,
+    LRUResultCache,
+    RedisHistoryStore,
+    SessionHistory,
+    flatten_parameters,
+    state_hash,
+    unflatten_parameters,
+)
+
+
+BASE_PARAMETERS = {
+    'prices': {'europe': {'product_1': 330, 'product_2': 520}},
+    'shift_level': 1,
+}
+
+
+class CountingStore(InMemoryHistoryStore):
+    """In-memory store that records how many deltas each reconstruction reads."""
+
+    def __init__(self):
+        super().__init__()
+        self.replayed = []
+
+    def changes(self, start, end):
+        changes = super().changes(start, end)
+        self.replayed.append(len(changes))
+        return changes
+
+
+class RacingStore(InMemoryHistoryStore):
+    """In-memory store where another request edits the history before each of our writes."""
+
+    def __init__(self, races):
+        super().__init__()
+        self.races = races
+
+    def _race(self):
+        if self.races:
+            self.races -= 1
+            rival = {'parameter_path': 'shift_level', 'old_value': 1, 'new_value': 5}
+            assert InMemoryHistoryStore.append(self, rival, self.generation())
+
+    def append(self, change, generation, checkpoint=None):
+        self._race()
+        return super().append(change, generation, checkpoint)
+
+    def move_cursor(self, position, generation):
+        self._race()
+        return super().move_cursor(position, generation)
+
+
+@pytest.fixture
+def history():
+    """Create a session history with a small checkpoint interval."""
+    return SessionHistory(InMemoryHistoryStore(), BASE_PARAMETERS, checkpoint_interval=4)
+
+
+class TestParameterPaths:
+    """Test parameter flattening and state hashing."""
+
+    def test_flatten_round_trip(self):
+        """Test nested parameters survive flattening."""
+        flat = flatten_parameters(BASE_PARAMETERS)
+        assert flat['prices.europe.product_1'] == 330
+        assert unflatten_parameters(flat) == BASE_PARAMETERS
+
+    def test_state_hash_ignores_nesting(self):
+        """Test nested and flat forms of one state hash identically."""
+        assert state_hash(BASE_PARAMETERS) == state_hash(flatten_parameters(BASE_PARAMETERS))
+        assert state_hash(BASE_PARAMETERS) != state_hash({'shift_level': 2})
+
+
+class TestSessionHistory:
+    """Test checkpointed undo/redo behaviour."""
+
+    def test_record_change_tracks_old_value(self, history):
+        """Test changes capture the previous value and position."""
+        change = history.record_change('prices.europe.product_1', 340, user_id='user-1')
+
+        assert change['old_value'] == 330
+        assert change['project_undo_redo_position'] == 1
+        assert history.current_state()['prices']['europe']['product_1'] == 340
+
+    def test_undo_and_redo(self, history):
+        """Test undo restores and redo reapplies changes."""
+        history.record_change('shift_level', 2)
+        history.record_change('shift_level', 3)
+
+        assert history.undo()['shift_level'] == 2
+        assert history.undo()['shift_level'] == 1
+        assert history.redo(2)['shift_level'] == 3
+        assert history.summary()['can_redo'] is False
+
+    def test_new_change_discards_redo_tail(self, history):
+        """Test recording after undo drops undone changes."""
+        for level in range(2, 8):
+            history.record_change('shift_level', level)
+        history.undo(3)
+        history.record_change('shift_level', 9)
+
+        assert history.length == 4
+        assert history.state_at(3)['shift_level'] == 4
+        assert history.current_state()['shift_level'] == 9
+        assert history.summary()['checkpoints'] == [0, 4]
+
+    def test_new_parameter_removed_on_undo(self, history):
+        """Test undoing the creation of a parameter removes it."""
+        history.record_change('subcontracting.product_1', 325)
+        assert 'subcontracting' not in history.undo()
+
+    def test_jump_matches_full_replay(self):
+        """Test every position matches a replay from session creation."""
+        history = SessionHistory(InMemoryHistoryStore(), {}, checkpoint_interval=5)
+        expected = [{}]
+        state = {}
+        for i in range(23):
+            path = f'deliveries.product_{i % 3}'
+            history.record_change(path, i)
+            state = dict(state, **{path: i})
+            expected.append(dict(state))
+
+        for position in (0, 7, 13, 22, 3, 23):
+            assert flatten_parameters(history.jump_to(position)) == expected[position]
+
+    def test_reconstruction_replays_at_most_half_interval(self):
+        """Test reconstruction never replays more than N/2 deltas."""
+        store = CountingStore()
+        history = SessionHistory(store, {}, checkpoint_interval=10)
+        for i in range(1000):
+            history.record_change('prices.europe.product_1', i)
+
+        store.replayed.clear()
+        for position in range(0, 1001, 7):
+            history.state_at(position)
+
+        assert max(store.replayed) <= 5
+
+    def test_invalid_position_rejected(self, history):
+        """Test jumping outside the history raises."""
+        with pytest.raises(ValueError):
+            history.jump_to(5)
+
+    def test_path_through_leaf_rejected(self, history):
+        """Test a change below an existing leaf is refused and nothing is recorded."""
+        with pytest.raises(ValueError):
+            history.record_change('shift_level.x', 2)
+        with pytest.raises(ValueError):
+            history.record_change('prices.europe.product_1.units', 2)
+
+        assert history.length == 0
+        assert history.current_state() == BASE_PARAMETERS
+
+    def test_subtree_replacement_rejected(self, history):
+        """Test a change may not overwrite a group of parameters or set a nested value."""
+        with pytest.raises(ValueError):
+            history.record_change('prices', 5)
+        with pytest.raises(ValueError):
+            history.record_change('prices.europe', {'product_1': 1})
+        with pytest.raises(ValueError):
+            history.record_change('prices..europe', 1)
+
+        assert history.length == 0
+
+    def test_invalid_steps_rejected(self, history):
+        """Test undo and redo need a positive number of steps."""
+        with pytest.raises(ValueError):
+            history.undo(0)
+        with pytest.raises(ValueError):
+            history.redo(-1)
+
+
+class TestConcurrentEdits:
+    """Test history writes are applied only against the state they were computed from."""
+
+    def test_stale_write_rejected(self):
+        """Test a store refuses writes computed against an older generation."""
+        store = InMemoryHistoryStore()
+        generation = store.generation()
+        assert store.append({'parameter_path': 'a', 'new_value': 1}, generation)
+        assert not store.append({'parameter_path': 'a', 'new_value': 2}, generation)
+        assert not store.move_cursor(0, generation)
+        assert store.length() == 1
+
+    def test_change_recomputed_after_concurrent_edit(self):
+        """Test a change losing a race is recorded on top of the rival change."""
+        store = RacingStore(races=1)
+        history = SessionHistory(store, {'shift_level': 1})
+        change = history.record_change('shift_level', 2)
+
+        assert change['project_undo_redo_position'] == 2
+        assert change['old_value'] == 5
+        assert history.undo()['shift_level'] == 5
+
+    def test_persistent_conflict_raises(self):
+        """Test writes give up after repeatedly losing to concurrent edits."""
+        history = SessionHistory(RacingStore(races=100), {'shift_level': 1})
+        with pytest.raises(HistoryConflictError):
+            history.record_change('shift_level', 2)
+
+
+class TestRedisHistoryStore:
+    """Test the Redis store applies history writes atomically."""
+
+    @pytest.fixture
+    def redis_client(self):
+        """Create a fakeredis client with Lua support."""
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+        return fakeredis.FakeRedis()
+
+    def test_undo_redo_and_truncation(self, redis_client):
+        """Test the Redis store matches the in-memory store's behaviour."""
+        history = SessionHistory(
+            RedisHistoryStore(redis_client, 'p1', 's1'), BASE_PARAMETERS, checkpoint_interval=2
+        )
+        for level in range(2, 6):
+            history.record_change('shift_level', level)
+        assert history.undo(3)['shift_level'] == 2
+
+        change = history.record_change('shift_level', 9)
+        assert change['project_undo_redo_position'] == 2
+        assert history.length == 2
+        assert history.summary()['checkpoints'] == [0, 2]
+        assert history.redo()['shift_level'] == 9
+        assert history.jump_to(0)['shift_level'] == 1
+
+    def test_stale_write_rejected(self, redis_client):
+        """Test scripts refuse writes computed against an older generation."""
+        store = RedisHistoryStore(redis_client, 'p1', 's1')
+        generation = store.generation()
+        assert store.append({'parameter_path': 'a', 'new_value': 1}, generation)
+        assert not store.append({'parameter_path': 'a', 'new_value': 2}, generation)
+        assert not store.move_cursor(0, generation)
+        assert store.cursor() == 1
+
+
+class TestResultReuse:
+    """Test calculation result caching for revisited states."""
+
+    def test_revisited_state_uses_cache(self, history):
+        """Test calculate only runs once per distinct state."""
+        calls = []
+
+        def calculate(parameters):
+            calls.append(parameters)
+            return {'investment_performance': parameters['shift_level'] * 1.0}
+
+        history.record_change('shift_level', 2)
+        history.results_at(0, calculate)
+        history.results_at(1, calculate)
+        history.undo()
+        history.redo()
+        history.record_change('shift_level', 1)
+
+        assert history.results_at(history.position, calculate) == {'investment_performance': 1.0}
+        assert len(calls) == 2
+
+    def test_context_separates_cached_results(self, history):
+        """Test one decision state is cached separately per base report."""
+        def calculate(report):
+            return lambda parameters: {'cash': report['cash']}
+
+        first = {'cash': 1}
+        second = {'cash': 2}
+        assert history.results_at(0, calculate(first), context=first) == {'cash': 1}
+        assert history.results_at(0, calculate(second), context=second) == {'cash': 2}
+        assert history.results_at(0, context=first) == {'cash': 1}
+        assert history.results_at(0) is None
+
+    def test_lru_cache_is_bounded(self):
+        """Test the in-process cache evicts the least recently used entry."""
+        cache = LRUResultCache(max_entries=2)
+        cache.put('a', {'v': 1})
+        cache.put('b', {'v': 2})
+        cache.get('a')
+        cache.put('c', {'v': 3})
+
+        assert cache.get('b') is None
+        assert cache.get('a') == {'v': 1}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
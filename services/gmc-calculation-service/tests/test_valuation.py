@@ -0,0 +1,87 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add parent directory to path to import app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.quarter_model import SAMPLE_REPORT, investment_performance, state_from_report
+from app.valuation import apply_moves, league_tables, rank_companies
+
+
+@pytest.fixture
+def group():
+    """Create a three-company group information page."""
+    return {
+        'group_id': 'G1',
+        'companies': [
+            {'company': 'A', 'shares': 7500000, 'share_price': 108, 'dividends_total': 150000},
+            {'company': 'B', 'shares': 7500000, 'share_price': 112},
+            {'company': 'C', 'shares': 8000000, 'share_price': 95, 'issue_value_total': 450000},
+        ],
+    }
+
+
+class TestRanking:
+    """Test vectorised valuation and ranking."""
+
+    def test_performance_matches_quarter_model(self):
+        """Test group performance uses the same formula as the company model."""
+        state = state_from_report(SAMPLE_REPORT)
+        values = np.array([[[
+            state['share_capital'], state['share_price'],
+            state['dividends_total'], state['issue_value_total'],
+        ]]])
+        ranked = rank_companies(values, np.ones((1, 1), dtype=bool))
+        assert ranked['investment_performance'][0, 0] == pytest.approx(
+            float(investment_performance(state))
+        )
+
+    def test_padding_is_ignored(self):
+        """Test padded slots of smaller groups get no rank or rival share."""
+        values = np.zeros((1, 3, 4))
+        values[0, :2, 0] = 1000
+        values[0, :2, 1] = [100, 200]
+        ranked = rank_companies(values, np.array([[True, True, False]]))
+        assert ranked['rank'][0].tolist() == [2, 1, 0]
+        assert ranked['relative_to_rivals'][0].tolist() == [-1000, 1000, 0]
+
+
+class TestLeagueTables:
+    """Test league tables and hypothetical moves."""
+
+    def test_league_table_is_ordered(self, group):
+        """Test companies are listed best first."""
+        table = league_tables([group])[0]['league_table']
+        assert [entry['company'] for entry in table] == ['B', 'A', 'C']
+        assert [entry['rank'] for entry in table] == [1, 2, 3]
+
+    def test_rival_move_reranks(self, group):
+        """Test a hypothetical share price rise changes the ranking."""
+        group['scenarios'] = [{'C': {'share_price_change': 30}}]
+        result = league_tables([group])[0]
+        assert result['league_table'][0]['company'] == 'B'
+        assert result['scenarios'][0]['league_table'][0]['company'] == 'C'
+
+    def test_dividend_and_issue_moves(self, group):
+        """Test dividends add to performance and issues at market price are neutral."""
+        names = ['A', 'B', 'C']
+        values = np.array([[7.5e6, 108, 0, 0], [7.5e6, 112, 0, 0], [8e6, 95, 0, 0]])
+        moved = apply_moves(values, names, {'A': {'dividend': 5}, 'B': {'share_issue': 100000}})
+        ranked = rank_companies(np.stack([values, moved]), np.ones((2, 3), dtype=bool))
+        before, after = ranked['investment_performance']
+        assert after[0] - before[0] == pytest.approx(7.5e6 * 0.05)
+        assert after[1] == pytest.approx(before[1])
+
+    def test_many_groups_in_one_pass(self, group):
+        """Test groups of different sizes are tabled together."""
+        small = {'group_id': 'G2', 'companies': [{'company': 'X', 'shares': 1, 'share_price': 1}]}
+        tables = league_tables([group, small])
+        assert [len(t['league_table']) for t in tables] == [3, 1]
+
+    def test_unknown_company_in_moves(self, group):
+        """Test moves for companies outside the group are rejected."""
+        group['scenarios'] = [{'Z': {'dividend': 1}}]
+        with pytest.raises(ValueError):
+            league_tables([group])
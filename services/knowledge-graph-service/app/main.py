@@ -10,8 +10,25 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 import logging
 import os
+import sys
+import threading
 from datetime import datetime
 from neo4j import GraphDatabase
+import redis
+
+# Shared libraries live at the repository root locally and in /app/shared in images
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from shared.python.observability import (  # noqa: E402
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RedisProfileStore,
+    TracingMiddleware,
+    start_span,
+    track_query,
+)
+from shared.python.ratelimit import RateLimitMiddleware, create_rate_limiter  # noqa: E402
+from shared.python.responses import ResponseMiddleware, conditional_get  # noqa: E402
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -23,6 +40,10 @@ NEO4J_URI = os.environ.get("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.environ.get("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.environ.get("NEO4J_PASSWORD", "password")
 
+# Redis shares rate limit budgets between workers when configured
+REDIS_URL = os.environ.get("REDIS_URL")
+redis_client = redis.Redis.from_url(REDIS_URL) if REDIS_URL else None
+
 # Initialize extensions
 cors = CORS(app)
 jwt = JWTManager(app)
@@ -41,17 +62,40 @@ SERVICE_INFO = {
     "status": "active",
 }
 
+metrics = MetricsMiddleware(app, SERVICE_INFO["name"])
+tracing = TracingMiddleware(app, SERVICE_INFO["name"])
+# Profiles and the sample percentage are shared by all workers when Redis is configured
+profiler = ProfilingMiddleware(
+    app,
+    SERVICE_INFO["name"],
+    RedisProfileStore(redis_client, SERVICE_INFO["name"]) if redis_client is not None else None,
+)
+# Fast JSON (orjson), MessagePack on request and Brotli/gzip for large bodies
+responses = ResponseMiddleware(app)
+# Per-user and per-project budgets, shared by all workers when Redis is configured
+rate_limits = RateLimitMiddleware(app, SERVICE_INFO["name"], create_rate_limiter(redis_client))
+
 
 class Neo4jConnection:
-    """Neo4j database connection manager."""
+    """
+    Neo4j database connection manager.
+
+    Drivers hold sockets and background state that must not be shared
+    between processes, so each process connects on first use rather than at
+    import: a pre-forking server imports the app once in its master and every
+    worker opens its own driver.
+    """
 
     def __init__(self):
         self.driver = None
+        self.pid = None
+        self._lock = threading.Lock()
 
     def connect(self) -> bool:
         """Establish connection to Neo4j."""
         try:
             self.driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+            self.pid = os.getpid()
             # Test connection
             with self.driver.session() as session:
                 result = session.run("RETURN 1 AS test")
@@ -61,6 +105,17 @@ class Neo4jConnection:
             logger.error(f"Neo4j connection failed: {e}")
             return False
 
+    def ensure_connected(self):
+        """Open this process's driver if it has not been opened yet."""
+        if self.driver is not None and self.pid == os.getpid():
+            return
+        with self._lock:
+            if self.driver is None or self.pid != os.getpid():
+                # A driver inherited from a parent process is dropped, not closed
+                self.driver = None
+                if self.connect():
+                    logger.info(f"Neo4j connection established in process {self.pid}")
+
     def close(self):
         """Close Neo4j connection."""
         if self.driver:
@@ -69,6 +124,7 @@ class Neo4jConnection:
     def is_healthy(self) -> bool:
         """Check if connection is healthy."""
         try:
+            self.ensure_connected()
             with self.driver.session() as session:
                 result = session.run("RETURN 1 AS health")
                 return result.single()["health"] == 1
@@ -76,21 +132,9 @@ class Neo4jConnection:
             return False
 
 
-# Initialize Neo4j connection
+# Connected lazily in each process (see Neo4jConnection)
 neo4j_conn = Neo4jConnection()
 
-def initialize_database():
-    """Initialize Neo4j connection on startup."""
-    connected = neo4j_conn.connect()
-    if connected:
-        logger.info("Neo4j connection established")
-    else:
-        logger.error("Failed to establish Neo4j connection")
-
-# Initialize the database connection when the app starts
-with app.app_context():
-    initialize_database()
-
 
 @app.teardown_appcontext
 def close_database(error):
@@ -152,6 +196,17 @@ def service_info():
                 {"path": "/health", "method": "GET", "description": "Health check"},
                 {"path": "/health/ready", "method": "GET", "description": "Readiness check"},
                 {"path": "/api/v1/info", "method": "GET", "description": "Service information"},
+                {"path": "/metrics", "method": "GET", "description": "Prometheus metrics"},
+                {
+                    "path": "/admin/profiling",
+                    "method": "GET, PUT",
+                    "description": "Profiling sample percentage and profiled routes (admin)",
+                },
+                {
+                    "path": "/admin/profiling/flamegraph",
+                    "method": "GET, DELETE",
+                    "description": "Aggregated flame-graph data by route and project (admin)",
+                },
                 {
                     "path": "/api/v1/projects/{project_id}/rules",
                     "method": "GET",
@@ -173,12 +228,52 @@ def service_info():
                 "Strategic reasoning and analysis",
                 "Constraint dependency management",
                 "Project-scoped knowledge contexts",
+                "Prometheus metrics",
+                "Distributed tracing",
+                "On-demand request profiling",
+                "Compressed JSON and MessagePack responses",
+                "ETag revalidation for rules and relationships",
+                "Per-user and per-project rate limits",
             ],
         }
     )
 
 
+# Adding or removing a rule or relationship changes the counts; rule loaders
+# set rule.updated_at whenever they edit a rule or its relationships
+RULES_VERSION_QUERY = """
+MATCH (pc:ProjectContext {project_id: $project_id})-[:CONTAINS]->(rule:GMCRule)
+OPTIONAL MATCH (rule)-[r]-()
+RETURN count(DISTINCT rule) AS rules, count(r) AS relationships,
+       toString(max(rule.updated_at)) AS updated_at
+"""
+
+
+def rules_version(project_id: str) -> str:
+    """Version of a project's rules and relationships, read from the graph."""
+    neo4j_conn.ensure_connected()
+    with neo4j_conn.driver.session() as session:
+        with track_query("neo4j", "rules_version"):
+            record = session.run(RULES_VERSION_QUERY, project_id=project_id).single()
+    return f"{record['rules']}:{record['relationships']}:{record['updated_at']}"
+
+
+def cypher_span(operation: str, query: str, project_id: str):
+    """Trace span around a Cypher query."""
+    return start_span(
+        f"cypher {operation}",
+        kind="client",
+        attributes={
+            "db.system": "neo4j",
+            "db.operation": operation,
+            "db.statement": " ".join(query.split()),
+            "gmc.project_id": project_id,
+        },
+    )
+
+
 @app.route("/api/v1/projects/<project_id>/rules", methods=["GET"])
+@conditional_get(rules_version)
 def get_project_rules(project_id: str):
     """Get GMC rules for a specific project."""
     if not neo4j_conn.is_healthy():
@@ -194,9 +289,11 @@ def get_project_rules(project_id: str):
                    rule.educational_explanation as explanation
             ORDER BY rule.priority DESC
             """
-            result = session.run(query, project_id=project_id)
-
-            rules = [dict(record) for record in result]
+            with (
+                track_query("neo4j", "project_rules"),
+                cypher_span("project_rules", query, project_id),
+            ):
+                rules = [dict(record) for record in session.run(query, project_id=project_id)]
 
             return jsonify(
                 {
@@ -213,6 +310,7 @@ def get_project_rules(project_id: str):
 
 
 @app.route("/api/v1/projects/<project_id>/relationships", methods=["GET"])
+@conditional_get(rules_version)
 def get_rule_relationships(project_id: str):
     """Get rule relationships for strategic analysis."""
     if not neo4j_conn.is_healthy():
@@ -234,10 +332,14 @@ def get_rule_relationships(project_id: str):
                    END as target,
                    labels(related) as target_type
             """
-            result = session.run(query, project_id=project_id)
+            with (
+                track_query("neo4j", "rule_relationships"),
+                cypher_span("rule_relationships", query, project_id),
+            ):
+                records = list(session.run(query, project_id=project_id))
 
             relationships = []
-            for record in result:
+            for record in records:
                 if record["relationship"]:  # Only include records with relationships
                     relationships.append(
                         {
@@ -320,6 +422,20 @@ def internal_error(error):
     )
 
 
+def create_app() -> Flask:
+    """
+    Application factory for the WSGI server (see app/wsgi.py and gunicorn.conf.py).
+
+    Routes, extensions and middleware are registered when this module is
+    imported. Neo4j is not connected here: the factory runs in the pre-fork
+    master, and each worker connects on first use.
+
+    Returns:
+        The configured application
+    """
+    return app
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5001))
     debug = os.environ.get("FLASK_ENV") == "development"
@@ -328,4 +444,4 @@ if __name__ == "__main__":
     logger.info(f"Debug mode: {debug}")
     logger.info(f"Neo4j URI: {NEO4J_URI}")
 
-    app.run(host="0.0.0.0", port=port, debug=debug)
+    create_app().run(host="0.0.0.0", port=port, debug=debug)
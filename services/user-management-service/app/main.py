@@ -9,29 +9,69 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from sqlalchemy import text
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 import logging
 import os
+import sys
 from datetime import datetime, timedelta
 import uuid
 
+import redis
+
+# Shared libraries live at the repository root locally and in /app/shared in images
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from shared.python.database.engine_factory import (  # noqa: E402
+    DatabaseHealthMonitor,
+    PoolMetrics,
+    configure_flask_database,
+    dispose_after_fork,
+)
+from shared.python.observability import (  # noqa: E402
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RedisProfileStore,
+    TracingMiddleware,
+    instrument_sqlalchemy,
+)
+from shared.python.ratelimit import (  # noqa: E402
+    DEFAULT_POLICIES,
+    RateLimitMiddleware,
+    RateLimitPolicy,
+    create_rate_limiter,
+)
+from shared.python.responses import ResponseMiddleware  # noqa: E402
+
 # Initialize Flask app
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-key")
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
-    "USER_DATABASE_URL", "postgresql://localhost/gmc_users"
-)
+DATABASE_URL = os.environ.get("USER_DATABASE_URL", "postgresql://localhost/gmc_users")
+configure_flask_database(app, DATABASE_URL, "user-management-service")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "jwt-secret-key")
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=24)
 
+# Redis shares rate limit budgets between workers when configured
+REDIS_URL = os.environ.get("REDIS_URL")
+redis_client = redis.Redis.from_url(REDIS_URL) if REDIS_URL else None
+
 # Initialize extensions
 cors = CORS(app)
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 jwt = JWTManager(app)
 
+with app.app_context():
+    PoolMetrics.attach(db.engine)
+    instrument_sqlalchemy(db.engine)
+    # Workers forked from a preloading server start with their own pool
+    dispose_after_fork(db.engine)
+
+# Connectivity is probed in the background; health endpoints serve the cached state
+db_health = DatabaseHealthMonitor(
+    DATABASE_URL, interval_seconds=float(os.environ.get("DB_HEALTH_INTERVAL_SECONDS", 10))
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -46,6 +86,34 @@ SERVICE_INFO = {
     "status": "active",
 }
 
+metrics = MetricsMiddleware(app, SERVICE_INFO["name"])
+tracing = TracingMiddleware(app, SERVICE_INFO["name"])
+# Profiles and the sample percentage are shared by all workers when Redis is configured
+profiler = ProfilingMiddleware(
+    app,
+    SERVICE_INFO["name"],
+    RedisProfileStore(redis_client, SERVICE_INFO["name"]) if redis_client is not None else None,
+)
+# Fast JSON (orjson), MessagePack on request and Brotli/gzip for large bodies
+responses = ResponseMiddleware(app)
+# Login and registration are budgeted per client address to slow password guessing;
+# the burst lets a classroom behind one address sign in together
+rate_limits = RateLimitMiddleware(
+    app,
+    SERVICE_INFO["name"],
+    create_rate_limiter(redis_client),
+    policies=DEFAULT_POLICIES
+    + (
+        RateLimitPolicy(
+            "auth",
+            limit=30,
+            period=60,
+            burst=60,
+            endpoints=("/api/v1/auth/login", "/api/v1/auth/register"),
+        ),
+    ),
+)
+
 
 # Placeholder models - will be enhanced in next story
 class User(db.Model):
@@ -68,38 +136,30 @@ class User(db.Model):
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint for Kubernetes liveness probe."""
-    try:
-        # Test database connection
-        db.session.execute(text("SELECT 1"))
-        db_status = "healthy"
-    except Exception as e:
-        logger.error(f"Database health check failed: {e}")
-        db_status = "unhealthy"
+    database = db_health.start().status()
+    db_status = "healthy" if database["healthy"] else "unhealthy"
 
     return jsonify(
         {
-            "status": "healthy" if db_status == "healthy" else "unhealthy",
+            "status": db_status,
             "service": SERVICE_INFO["name"],
             "version": SERVICE_INFO["version"],
             "timestamp": datetime.utcnow().isoformat(),
             "database": db_status,
-            "checks": {"database_connection": db_status == "healthy", "service_ready": True},
+            "checks": {"database_connection": database["healthy"], "service_ready": True},
+            "database_checked_at": database["checked_at"],
         }
-    ), (200 if db_status == "healthy" else 503)
+    ), (200 if database["healthy"] else 503)
 
 
 @app.route("/health/ready", methods=["GET"])
 def readiness_check():
     """Readiness check endpoint for Kubernetes readiness probe."""
-    try:
-        # Test database connection and user table
-        db.session.execute(text("SELECT 1"))
-        ready = True
-        message = "Service ready"
-    except Exception as e:
-        logger.error(f"Readiness check failed: {e}")
-        ready = False
-        message = f"Service not ready: {str(e)}"
+    database = db_health.start().status()
+    ready = database["healthy"]
+    message = "Service ready" if ready else f"Service not ready: {database['error']}"
+
+    pool = db.engine.pool_metrics.snapshot(db.engine)
 
     return jsonify(
         {
@@ -107,6 +167,7 @@ def readiness_check():
             "service": SERVICE_INFO["name"],
             "message": message,
             "timestamp": datetime.utcnow().isoformat(),
+            "database_pool": pool,
         }
     ), (200 if ready else 503)
 
@@ -121,6 +182,17 @@ def service_info():
                 {"path": "/health", "method": "GET", "description": "Health check"},
                 {"path": "/health/ready", "method": "GET", "description": "Readiness check"},
                 {"path": "/api/v1/info", "method": "GET", "description": "Service information"},
+                {"path": "/metrics", "method": "GET", "description": "Prometheus metrics"},
+                {
+                    "path": "/admin/profiling",
+                    "method": "GET, PUT",
+                    "description": "Profiling sample percentage and profiled routes (admin)",
+                },
+                {
+                    "path": "/admin/profiling/flamegraph",
+                    "method": "GET, DELETE",
+                    "description": "Aggregated flame-graph data by route and project (admin)",
+                },
                 {
                     "path": "/api/v1/auth/login",
                     "method": "POST",
@@ -145,6 +217,11 @@ def service_info():
                 "Encrypted API key storage",
                 "Budget controls for AI services",
                 "Institutional boundaries",
+                "Prometheus metrics",
+                "Distributed tracing",
+                "On-demand request profiling",
+                "Compressed JSON and MessagePack responses",
+                "Login and per-user rate limits",
             ],
         }
     )
@@ -313,6 +390,20 @@ def internal_error(error):
     )
 
 
+def create_app() -> Flask:
+    """
+    Application factory for the WSGI server (see app/wsgi.py and gunicorn.conf.py).
+
+    Routes, extensions and middleware are registered when this module is
+    imported. The factory runs in the pre-fork master; the database engine
+    gives each forked worker its own connection pool.
+
+    Returns:
+        The configured application
+    """
+    return app
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5003))
     debug = os.environ.get("FLASK_ENV") == "development"
@@ -320,4 +411,4 @@ if __name__ == "__main__":
     logger.info(f"Starting {SERVICE_INFO['name']} on port {port}")
     logger.info(f"Debug mode: {debug}")
 
-    app.run(host="0.0.0.0", port=port, debug=debug)
+    create_app().run(host="0.0.0.0", port=port, debug=debug)
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production serving.
+
+    gunicorn --config gunicorn.conf.py app.wsgi:application
+"""
+
+from app.main import create_app
+
+application = create_app()
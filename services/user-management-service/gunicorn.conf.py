@@ -0,0 +1,42 @@
+"""
+Gunicorn configuration for the user management service.
+
+    gunicorn --config gunicorn.conf.py app.wsgi:application
+
+Requests mostly wait on PostgreSQL, so the service runs two workers per
+available CPU with a few threads each. The app is preloaded in the master
+and shared copy-on-write by the workers (see shared/python/serving); each
+worker gets its own connection pool.
+"""
+
+import os
+import sys
+
+# Shared libraries live at the repository root locally and in /app/shared in images
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from shared.python.serving import (  # noqa: E402,F401
+    child_exit,
+    configure_master,
+    post_fork,
+    pre_fork,
+    when_ready,
+    worker_count,
+)
+
+workers = worker_count(workers_per_cpu=2)
+threads = int(os.environ.get("WEB_THREADS", 4))
+configure_master("user-management-service", workers, threads)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5003)}"
+worker_class = "gthread"
+preload_app = True
+# Heartbeats on tmpfs, so a slow container disk never gets workers killed
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+# Recycled workers are forked again from the preloaded master
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
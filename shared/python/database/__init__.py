@@ -6,5 +6,28 @@ for GMC Dashboard microservices.
 """
 
 from .project_queries import ProjectScopedQueries, create_project_scoped_session
+from .isolation_auditor import IncrementalIsolationAuditor, get_stored_verification
+from .replica_routing import ReplicaRouter, create_replica_router
+from .engine_factory import (
+    DatabaseHealthMonitor,
+    PoolMetrics,
+    build_engine_options,
+    configure_flask_database,
+    create_tuned_engine,
+    dispose_after_fork,
+)
 
-__all__ = ["ProjectScopedQueries", "create_project_scoped_session"]
+__all__ = [
+    "ProjectScopedQueries",
+    "create_project_scoped_session",
+    "IncrementalIsolationAuditor",
+    "get_stored_verification",
+    "ReplicaRouter",
+    "create_replica_router",
+    "DatabaseHealthMonitor",
+    "PoolMetrics",
+    "build_engine_options",
+    "configure_flask_database",
+    "create_tuned_engine",
+    "dispose_after_fork",
+]
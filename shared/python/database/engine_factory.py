@@ -0,0 +1,363 @@
+"""
+Shared Database Engine Factory
+
+Tuned SQLAlchemy engine configuration for the Flask services, plus pool
+metrics and a cached database health monitor.
+
+Pool sizing follows the serving model: every worker thread can hold at most
+one connection, and the total across all workers of a replica is capped by a
+per-pod connection budget so that scaling pods does not exhaust PostgreSQL's
+max_connections. Health endpoints read a connectivity state refreshed in the
+background over a dedicated unpooled connection, so frequent Kubernetes
+probes never check out (or wait for) a pooled connection.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+logger = logging.getLogger(__name__)
+
+# Defaults chosen for the calculation workload (short transactions, <2s requests)
+DEFAULT_CONNECTION_BUDGET = 40
+DEFAULT_POOL_TIMEOUT_SECONDS = 10
+DEFAULT_POOL_RECYCLE_SECONDS = 1800
+DEFAULT_STATEMENT_TIMEOUT_MS = 15000
+DEFAULT_IDLE_IN_TRANSACTION_TIMEOUT_MS = 60000
+DEFAULT_HEALTH_INTERVAL_SECONDS = 10.0
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def calculate_pool_size(
+    workers: Optional[int] = None,
+    threads: Optional[int] = None,
+    connection_budget: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Size the connection pool from the serving configuration.
+
+    Args:
+        workers: Worker processes per pod (defaults to WEB_CONCURRENCY or 1)
+        threads: Threads per worker (defaults to WEB_THREADS or 1)
+        connection_budget: Maximum connections per pod (defaults to DB_CONNECTION_BUDGET)
+
+    Returns:
+        pool_size and max_overflow for each worker's engine
+    """
+    workers = max(workers or _env_int("WEB_CONCURRENCY", 1), 1)
+    threads = max(threads or _env_int("WEB_THREADS", 1), 1)
+    budget = connection_budget or _env_int("DB_CONNECTION_BUDGET", DEFAULT_CONNECTION_BUDGET)
+
+    per_worker = max(budget // workers, 2)
+    pool_size = min(threads, per_worker)
+    max_overflow = min(threads, per_worker - pool_size)
+    return {"pool_size": pool_size, "max_overflow": max_overflow}
+
+
+def build_engine_options(
+    database_url: str,
+    workers: Optional[int] = None,
+    threads: Optional[int] = None,
+    statement_timeout_ms: Optional[int] = None,
+    idle_in_transaction_timeout_ms: Optional[int] = None,
+    application_name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Build create_engine keyword options (also usable as SQLALCHEMY_ENGINE_OPTIONS).
+
+    Args:
+        database_url: Database URL the options are for
+        workers: Worker processes per pod
+        threads: Threads per worker
+        statement_timeout_ms: Server-side statement timeout
+        idle_in_transaction_timeout_ms: Server-side idle-in-transaction timeout
+        application_name: Name reported in pg_stat_activity
+
+    Returns:
+        Engine options dictionary
+    """
+    options: Dict[str, Any] = {
+        "pool_pre_ping": True,
+        "pool_recycle": _env_int("DB_POOL_RECYCLE_SECONDS", DEFAULT_POOL_RECYCLE_SECONDS),
+    }
+
+    # SQLite (tests) uses its own pool class without sizing arguments
+    if not database_url.startswith("postgresql"):
+        return options
+
+    options.update(calculate_pool_size(workers, threads))
+    options["pool_timeout"] = _env_int("DB_POOL_TIMEOUT_SECONDS", DEFAULT_POOL_TIMEOUT_SECONDS)
+
+    statement_timeout = statement_timeout_ms or _env_int(
+        "DB_STATEMENT_TIMEOUT_MS", DEFAULT_STATEMENT_TIMEOUT_MS
+    )
+    idle_timeout = idle_in_transaction_timeout_ms or _env_int(
+        "DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", DEFAULT_IDLE_IN_TRANSACTION_TIMEOUT_MS
+    )
+    options["connect_args"] = {
+        "options": (
+            f"-c statement_timeout={statement_timeout} "
+            f"-c idle_in_transaction_session_timeout={idle_timeout}"
+        ),
+        "connect_timeout": 5,
+    }
+    if application_name:
+        options["connect_args"]["application_name"] = application_name
+
+    return options
+
+
+def configure_flask_database(app, database_url: str, service_name: str) -> Dict[str, Any]:
+    """
+    Apply tuned engine options to a Flask app before SQLAlchemy(app) is created.
+
+    Args:
+        app: Flask application
+        database_url: SQLAlchemy database URL
+        service_name: Service name used as the PostgreSQL application_name
+
+    Returns:
+        The engine options applied
+    """
+    options = build_engine_options(database_url, application_name=service_name)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    logger.info(
+        f"{service_name} database pool: size={options.get('pool_size', 'default')} "
+        f"overflow={options.get('max_overflow', 'default')}"
+    )
+    return options
+
+
+def dispose_after_fork(engine: Engine) -> None:
+    """
+    Give forked processes a fresh pool instead of the parent's connections.
+
+    Under a pre-forking server the engine is created in the master; any
+    connection it opened there would otherwise be shared by every worker.
+    The inherited connections are discarded without closing them, so the
+    parent's sockets stay usable.
+
+    Args:
+        engine: Engine created before the fork
+    """
+    os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+
+def create_tuned_engine(database_url: str, **overrides: Any) -> Engine:
+    """
+    Create a standalone engine (background jobs, auditors) with tuned options.
+
+    Args:
+        database_url: SQLAlchemy database URL
+        **overrides: Options overriding the tuned defaults
+
+    Returns:
+        Engine with pool metrics registered
+    """
+    options = build_engine_options(database_url)
+    options.update(overrides)
+    engine = create_engine(database_url, **options)
+    PoolMetrics.attach(engine)
+    return engine
+
+
+class PoolMetrics:
+    """Connection pool counters collected from SQLAlchemy pool events."""
+
+    def __init__(self):
+        self.connections_opened = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.checkout_seconds_total = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def attach(cls, engine: Engine) -> "PoolMetrics":
+        """
+        Register pool event listeners on an engine (idempotent).
+
+        Args:
+            engine: SQLAlchemy engine
+
+        Returns:
+            The engine's PoolMetrics
+        """
+        existing = getattr(engine, "pool_metrics", None)
+        if existing is not None:
+            return existing
+
+        metrics = cls()
+        engine.pool_metrics = metrics
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            with metrics._lock:
+                metrics.connections_opened += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            connection_record.info["checked_out_at"] = time.perf_counter()
+            with metrics._lock:
+                metrics.checkouts += 1
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            started = connection_record.info.pop("checked_out_at", None)
+            if started is not None:
+                with metrics._lock:
+                    metrics.checkout_seconds_total += time.perf_counter() - started
+
+        @event.listens_for(engine, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with metrics._lock:
+                metrics.invalidations += 1
+
+        return metrics
+
+    def snapshot(self, engine: Engine) -> Dict[str, Any]:
+        """
+        Current pool gauges and cumulative counters.
+
+        Args:
+            engine: Engine the metrics are attached to
+
+        Returns:
+            Pool metrics dictionary
+        """
+        pool = engine.pool
+        gauges: Dict[str, Any] = {"pool_class": type(pool).__name__}
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, name, None)
+            if callable(method):
+                gauges[name] = method()
+
+        with self._lock:
+            gauges.update(
+                {
+                    "connections_opened": self.connections_opened,
+                    "checkouts": self.checkouts,
+                    "invalidations": self.invalidations,
+                    "checkout_seconds_total": round(self.checkout_seconds_total, 6),
+                }
+            )
+        return gauges
+
+
+class DatabaseHealthMonitor:
+    """
+    Background database connectivity check served from a cached state.
+
+    Probes use a separate NullPool engine, so each refresh opens and closes one
+    short-lived connection and never competes with request traffic for the
+    application's pool.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        interval_seconds: float = DEFAULT_HEALTH_INTERVAL_SECONDS,
+        stale_after_seconds: Optional[float] = None,
+    ):
+        """
+        Initialize the monitor.
+
+        Args:
+            database_url: SQLAlchemy database URL to probe
+            interval_seconds: Delay between background probes
+            stale_after_seconds: Age after which a cached result is reported unhealthy
+        """
+        self.interval = interval_seconds
+        self.stale_after = stale_after_seconds or interval_seconds * 3
+        connect_args = {"connect_timeout": 5} if database_url.startswith("postgresql") else {}
+        self._probe_engine = create_engine(
+            database_url, poolclass=NullPool, connect_args=connect_args
+        )
+        self._state: Dict[str, Any] = {
+            "healthy": False,
+            "error": "Health check has not run yet",
+            "checked_at": None,
+            "latency_ms": None,
+        }
+        self._checked_monotonic: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check_now(self) -> Dict[str, Any]:
+        """Run one connectivity probe and cache its result."""
+        started = time.perf_counter()
+        try:
+            with self._probe_engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            healthy, error = True, None
+        except Exception as e:
+            healthy, error = False, str(e)
+            logger.error(f"Database health probe failed: {e}")
+
+        state = {
+            "healthy": healthy,
+            "error": error,
+            "checked_at": datetime.utcnow().isoformat(),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        with self._lock:
+            self._state = state
+            self._checked_monotonic = time.monotonic()
+        return dict(state)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Cached connectivity state.
+
+        Only the very first call (before any background probe has finished)
+        runs a probe inline; afterwards the database is never touched.
+
+        Returns:
+            Health state including whether the cached result is stale
+        """
+        if self._checked_monotonic is None:
+            self.check_now()
+
+        with self._lock:
+            state = dict(self._state)
+            checked = self._checked_monotonic
+
+        age = time.monotonic() - checked
+        stale = age > self.stale_after
+        state["age_seconds"] = round(age, 2)
+        state["stale"] = stale
+        if stale and state["healthy"]:
+            state["healthy"] = False
+            state["error"] = "Health state is stale"
+        return state
+
+    def start(self) -> "DatabaseHealthMonitor":
+        """Start the background refresh thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        def loop():
+            while not self._stop_event.is_set():
+                self.check_now()
+                self._stop_event.wait(self.interval)
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=loop, name="db-health-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background refresh thread."""
+        self._stop_event.set()
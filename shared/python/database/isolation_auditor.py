@@ -0,0 +1,370 @@
+"""
+Incremental Project Isolation Auditor
+
+Background job that verifies project data isolation by scanning only rows
+written since its last run. Each audited table keeps a high-water mark in
+isolation_audit_watermarks and per-project results are accumulated in
+project_isolation_verifications, so validation endpoints read one row instead
+of joining every analysis session against every parameter change.
+
+Rows carry the id of the transaction that wrote them (created_txid and
+updated_txid, migration 004). A run audits ids below the oldest transaction
+still in flight, so every row in its window has committed and a long
+transaction is audited once it commits, however early it started.
+Contaminated sessions are recorded in isolation_contaminated_sessions so each
+one is counted once, however often it is touched afterwards.
+
+Deployed as the isolation-auditor service in docker-compose.yml:
+
+    python -m shared.python.database.isolation_auditor --interval 60
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import argparse
+import logging
+import os
+import threading
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Watermark used before a table has ever been audited (full initial scan)
+INITIAL_WATERMARK = 0
+
+AUDITED_TABLES = ("analysis_sessions", "gmc_reports", "parameter_changes")
+
+# Every transaction with a lower id has committed or aborted, so rows written
+# below this id are complete and visible to the scans that follow
+SNAPSHOT_XMIN_QUERY = "SELECT txid_snapshot_xmin(txid_current_snapshot())"
+
+# New rows per project written by transactions in [since, until)
+NEW_SESSIONS_QUERY = """
+SELECT project_id, COUNT(*) AS count
+FROM analysis_sessions
+WHERE created_txid >= :since AND created_txid < :until
+GROUP BY project_id
+"""
+
+NEW_REPORTS_QUERY = """
+SELECT project_id, COUNT(*) AS count
+FROM gmc_reports
+WHERE created_txid >= :since AND created_txid < :until
+GROUP BY project_id
+"""
+
+NEW_CHANGES_QUERY = """
+SELECT project_id, COUNT(*) AS count
+FROM parameter_changes
+WHERE created_txid >= :since AND created_txid < :until
+GROUP BY project_id
+"""
+
+# Sessions referenced by new parameter changes from a different project
+CONTAMINATED_CHANGES_QUERY = """
+SELECT DISTINCT pc.project_id, pc.session_id
+FROM parameter_changes pc
+JOIN analysis_sessions s ON s.session_id = pc.session_id
+WHERE pc.created_txid >= :since AND pc.created_txid < :until
+AND s.project_id != pc.project_id
+"""
+
+# Sessions updated since the last run that older changes from another project reference
+CONTAMINATED_BY_SESSION_UPDATE_QUERY = """
+SELECT DISTINCT pc.project_id, pc.session_id
+FROM analysis_sessions s
+JOIN parameter_changes pc ON pc.session_id = s.session_id
+WHERE s.updated_txid >= :since AND s.updated_txid < :until
+AND pc.created_txid < :changes_since
+AND s.project_id != pc.project_id
+"""
+
+# Each contaminated session is counted once per project, however often it is
+# updated or changed afterwards; a zero rowcount means it was already recorded
+RECORD_CONTAMINATED_SESSION_QUERY = """
+INSERT INTO isolation_contaminated_sessions (project_id, session_id, detected_at)
+VALUES (:project_id, :session_id, :detected_at)
+ON CONFLICT (project_id, session_id) DO NOTHING
+"""
+
+UPSERT_VERIFICATION_QUERY = """
+INSERT INTO project_isolation_verifications (
+    project_id, session_count, report_count, parameter_change_count,
+    contamination_count, isolation_status, last_contamination_at, last_verified_at
+) VALUES (
+    :project_id, :session_count, :report_count, :parameter_change_count,
+    :contamination_count, :isolation_status, :last_contamination_at, :verified_at
+)
+ON CONFLICT (project_id) DO UPDATE SET
+    session_count = project_isolation_verifications.session_count + excluded.session_count,
+    report_count = project_isolation_verifications.report_count + excluded.report_count,
+    parameter_change_count =
+        project_isolation_verifications.parameter_change_count + excluded.parameter_change_count,
+    contamination_count =
+        project_isolation_verifications.contamination_count + excluded.contamination_count,
+    isolation_status = CASE
+        WHEN project_isolation_verifications.contamination_count + excluded.contamination_count > 0
+        THEN 'contaminated' ELSE 'verified' END,
+    last_contamination_at = COALESCE(
+        excluded.last_contamination_at, project_isolation_verifications.last_contamination_at
+    ),
+    last_verified_at = excluded.last_verified_at
+"""
+
+UPSERT_WATERMARK_QUERY = """
+INSERT INTO isolation_audit_watermarks (table_name, high_water_mark, rows_scanned, updated_at)
+VALUES (:table_name, :high_water_mark, :rows_scanned, :audited_at)
+ON CONFLICT (table_name) DO UPDATE SET
+    high_water_mark = excluded.high_water_mark,
+    rows_scanned = isolation_audit_watermarks.rows_scanned + excluded.rows_scanned,
+    updated_at = excluded.updated_at
+"""
+
+
+def _as_datetime(value: Any) -> datetime:
+    """Normalize driver timestamp values (datetime or ISO string) to datetime."""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(str(value))
+
+
+class IncrementalIsolationAuditor:
+    """Verifies project isolation for rows written since the previous run."""
+
+    def get_watermarks(self, db_session: Session) -> Dict[str, int]:
+        """
+        Get the current high-water mark for every audited table.
+
+        Args:
+            db_session: SQLAlchemy database session
+
+        Returns:
+            Mapping of table name -> first transaction id not yet audited
+        """
+        rows = db_session.execute(
+            text("SELECT table_name, high_water_mark FROM isolation_audit_watermarks")
+        ).fetchall()
+        stored = {row.table_name: int(row.high_water_mark) for row in rows}
+        return {table: stored.get(table, INITIAL_WATERMARK) for table in AUDITED_TABLES}
+
+    def run_once(self, db_session: Session) -> Dict[str, Any]:
+        """
+        Audit rows written since the last run and store per-project results.
+
+        Watermarks and verification results are committed in one transaction,
+        so an interrupted run is simply repeated from the same watermarks.
+
+        Args:
+            db_session: SQLAlchemy database session
+
+        Returns:
+            Summary of the audit run
+        """
+        now = _as_datetime(db_session.execute(text("SELECT CURRENT_TIMESTAMP")).scalar())
+        until = int(db_session.execute(text(SNAPSHOT_XMIN_QUERY)).scalar())
+        watermarks = self.get_watermarks(db_session)
+
+        try:
+            per_project: Dict[str, Dict[str, int]] = {}
+            scanned: Dict[str, int] = {}
+
+            def project_counts(project_id: str) -> Dict[str, int]:
+                return per_project.setdefault(
+                    project_id,
+                    {
+                        "session_count": 0,
+                        "report_count": 0,
+                        "parameter_change_count": 0,
+                        "contamination_count": 0,
+                    },
+                )
+
+            def accumulate(query: str, field: str, **params: Any) -> int:
+                total = 0
+                for row in db_session.execute(text(query), dict(params, until=until)):
+                    project_counts(str(row.project_id))[field] += row.count
+                    total += row.count
+                return total
+
+            scanned["analysis_sessions"] = accumulate(
+                NEW_SESSIONS_QUERY, "session_count", since=watermarks["analysis_sessions"]
+            )
+            scanned["gmc_reports"] = accumulate(
+                NEW_REPORTS_QUERY, "report_count", since=watermarks["gmc_reports"]
+            )
+            scanned["parameter_changes"] = accumulate(
+                NEW_CHANGES_QUERY, "parameter_change_count", since=watermarks["parameter_changes"]
+            )
+            contaminated_sessions = set()
+            for query, params in (
+                (CONTAMINATED_CHANGES_QUERY, {"since": watermarks["parameter_changes"]}),
+                (
+                    CONTAMINATED_BY_SESSION_UPDATE_QUERY,
+                    {
+                        "since": watermarks["analysis_sessions"],
+                        "changes_since": watermarks["parameter_changes"],
+                    },
+                ),
+            ):
+                for row in db_session.execute(text(query), dict(params, until=until)):
+                    contaminated_sessions.add((str(row.project_id), str(row.session_id)))
+
+            contamination = 0
+            for project_id, session_id in sorted(contaminated_sessions):
+                recorded = db_session.execute(
+                    text(RECORD_CONTAMINATED_SESSION_QUERY),
+                    {"project_id": project_id, "session_id": session_id, "detected_at": now},
+                )
+                if recorded.rowcount:
+                    project_counts(project_id)["contamination_count"] += 1
+                    contamination += 1
+
+            for project_id, counts in per_project.items():
+                contaminated = counts["contamination_count"] > 0
+                db_session.execute(
+                    text(UPSERT_VERIFICATION_QUERY),
+                    dict(
+                        counts,
+                        project_id=project_id,
+                        isolation_status="contaminated" if contaminated else "verified",
+                        last_contamination_at=now if contaminated else None,
+                        verified_at=now,
+                    ),
+                )
+
+            for table_name in AUDITED_TABLES:
+                db_session.execute(
+                    text(UPSERT_WATERMARK_QUERY),
+                    {
+                        "table_name": table_name,
+                        "high_water_mark": until,
+                        "rows_scanned": scanned[table_name],
+                        "audited_at": now,
+                    },
+                )
+
+            db_session.commit()
+
+        except Exception as e:
+            db_session.rollback()
+            logger.error(f"Isolation audit run failed: {e}")
+            raise
+
+        if contamination:
+            logger.warning(f"Isolation audit detected {contamination} newly contaminated sessions")
+
+        logger.info(
+            f"Isolation audit through transaction {until}: "
+            f"{sum(scanned.values())} new rows across {len(per_project)} projects"
+        )
+        return {
+            "audited_at": now.isoformat(),
+            "high_water_mark": until,
+            "rows_scanned": scanned,
+            "projects_updated": len(per_project),
+            "contamination_detected": contamination,
+        }
+
+    def reset(self, db_session: Session) -> None:
+        """
+        Discard stored results so the next run re-verifies all rows.
+
+        Args:
+            db_session: SQLAlchemy database session
+        """
+        db_session.execute(text("DELETE FROM project_isolation_verifications"))
+        db_session.execute(text("DELETE FROM isolation_contaminated_sessions"))
+        db_session.execute(text("DELETE FROM isolation_audit_watermarks"))
+        db_session.commit()
+        logger.info("Isolation audit state reset; next run performs a full scan")
+
+    def start_background(
+        self, session_factory: Callable[[], Session], interval_seconds: float = 60.0
+    ) -> threading.Event:
+        """
+        Run the auditor periodically in a daemon thread.
+
+        Args:
+            session_factory: Callable returning a new database session
+            interval_seconds: Delay between audit runs
+
+        Returns:
+            Event that stops the background loop when set
+        """
+        stop_event = threading.Event()
+
+        def loop():
+            while not stop_event.is_set():
+                db_session = session_factory()
+                try:
+                    self.run_once(db_session)
+                except Exception as e:
+                    logger.error(f"Background isolation audit failed: {e}")
+                finally:
+                    db_session.close()
+                stop_event.wait(interval_seconds)
+
+        thread = threading.Thread(target=loop, name="isolation-auditor", daemon=True)
+        thread.start()
+        return stop_event
+
+
+def get_stored_verification(db_session: Session, project_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the stored verification result for one project.
+
+    Args:
+        db_session: SQLAlchemy database session
+        project_id: Project identifier
+
+    Returns:
+        Verification record with verified_through (when the least recently
+        audited table was last audited), or None if never audited
+    """
+    row = db_session.execute(
+        text("""
+            SELECT v.project_id, v.session_count, v.report_count, v.parameter_change_count,
+                   v.contamination_count, v.isolation_status, v.last_contamination_at,
+                   v.last_verified_at,
+                   (SELECT MIN(updated_at) FROM isolation_audit_watermarks) AS verified_through
+            FROM project_isolation_verifications v
+            WHERE v.project_id = :project_id
+            """),
+        {"project_id": project_id},
+    ).fetchone()
+    return dict(row._mapping) if row is not None else None
+
+
+def main() -> None:
+    """Run the auditor as a standalone background job."""
+    parser = argparse.ArgumentParser(description="Incremental project isolation auditor")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between runs")
+    parser.add_argument("--once", action="store_true", help="Run a single audit and exit")
+    parser.add_argument("--reset", action="store_true", help="Re-verify all rows from scratch")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("DATABASE_URL or --database-url is required")
+
+    logging.basicConfig(level=logging.INFO)
+    session_factory = sessionmaker(bind=create_engine(args.database_url, pool_pre_ping=True))
+    auditor = IncrementalIsolationAuditor()
+
+    if args.reset:
+        with session_factory() as db_session:
+            auditor.reset(db_session)
+
+    if args.once:
+        with session_factory() as db_session:
+            auditor.run_once(db_session)
+        return
+
+    auditor.start_background(session_factory, args.interval)
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
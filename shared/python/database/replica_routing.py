@@ -0,0 +1,221 @@
+"""
+Read-Replica Routing
+
+Routes project-scoped reads to a pool of PostgreSQL read replicas while
+writes stay on the primary. Routing is done per statement through the
+session's bind, so a single request-scoped SQLAlchemy session can read from
+a replica and write to the primary without managing extra sessions.
+
+Consistency rules:
+- Read-your-writes: after a write, reads for that project go to the primary
+  for the rest of the request and for a short stickiness window afterwards
+  (shared across workers through Redis when a client is configured).
+- Replica lag: each replica's replay lag is probed at most every few seconds;
+  replicas lagging beyond the threshold, or failing the probe, are skipped and
+  reads fall back to the primary when no replica qualifies.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+import itertools
+import logging
+import threading
+import time
+
+from flask import g, has_app_context
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .engine_factory import create_tuned_engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_REPLICA_LAG_SECONDS = 5.0
+DEFAULT_STICKY_SECONDS = 10.0
+DEFAULT_LAG_CHECK_INTERVAL_SECONDS = 2.0
+
+# Replay lag in seconds; zero when the replica has replayed everything received
+REPLICA_LAG_QUERY = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM (now() - pg_last_xact_replay_timestamp())), 0)
+END AS lag_seconds
+"""
+
+
+def probe_postgres_replica_lag(engine: Engine) -> Optional[float]:
+    """
+    Measure replication lag on a PostgreSQL standby.
+
+    Args:
+        engine: Replica engine
+
+    Returns:
+        Lag in seconds, or None if the replica could not be reached
+    """
+    try:
+        with engine.connect() as connection:
+            return float(connection.execute(text(REPLICA_LAG_QUERY)).scalar() or 0.0)
+    except Exception as e:
+        logger.warning(f"Replica lag probe failed for {engine.url.host}: {e}")
+        return None
+
+
+class ReplicaRouter:
+    """Chooses the bind (primary or replica engine) for project-scoped statements."""
+
+    def __init__(
+        self,
+        replica_engines: Sequence[Engine],
+        primary_engine: Optional[Engine] = None,
+        max_replica_lag_seconds: float = DEFAULT_MAX_REPLICA_LAG_SECONDS,
+        sticky_seconds: float = DEFAULT_STICKY_SECONDS,
+        lag_check_interval_seconds: float = DEFAULT_LAG_CHECK_INTERVAL_SECONDS,
+        lag_probe: Callable[[Engine], Optional[float]] = probe_postgres_replica_lag,
+        redis_client=None,
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            replica_engines: Engines for the read replica pool
+            primary_engine: Primary engine; None uses the session's default bind
+            max_replica_lag_seconds: Maximum acceptable replica lag
+            sticky_seconds: How long reads stay on the primary after a write
+            lag_check_interval_seconds: Minimum delay between lag probes per replica
+            lag_probe: Callable returning replica lag in seconds (None if unreachable)
+            redis_client: Optional Redis client sharing stickiness across workers
+        """
+        self.replica_engines: List[Engine] = list(replica_engines)
+        self.primary_engine = primary_engine
+        self.max_replica_lag = max_replica_lag_seconds
+        self.sticky_seconds = sticky_seconds
+        self.lag_check_interval = lag_check_interval_seconds
+        self.lag_probe = lag_probe
+        self.redis = redis_client
+
+        self._round_robin = itertools.cycle(range(len(self.replica_engines)))
+        self._lag_cache: Dict[int, tuple] = {}
+        self._sticky_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def write_bind(self) -> Optional[Engine]:
+        """Bind used for writes (the primary)."""
+        return self.primary_engine
+
+    def read_bind(self, project_id: str) -> Optional[Engine]:
+        """
+        Choose the bind for a project-scoped read.
+
+        Args:
+            project_id: Project identifier
+
+        Returns:
+            A healthy replica engine, or the primary bind
+        """
+        if not self.replica_engines or self.is_sticky(project_id):
+            return self.primary_engine
+
+        for _ in range(len(self.replica_engines)):
+            with self._lock:
+                index = next(self._round_robin)
+            if self._replica_is_fresh(index):
+                return self.replica_engines[index]
+
+        logger.warning(
+            f"No replica within lag threshold; reading project {project_id} from primary"
+        )
+        return self.primary_engine
+
+    def record_write(self, project_id: str) -> None:
+        """
+        Pin reads for a project to the primary after a write.
+
+        Args:
+            project_id: Project identifier
+        """
+        if has_app_context():
+            sticky_projects = getattr(g, "primary_sticky_projects", None)
+            if sticky_projects is None:
+                sticky_projects = g.primary_sticky_projects = set()
+            sticky_projects.add(project_id)
+
+        with self._lock:
+            self._sticky_until[project_id] = time.monotonic() + self.sticky_seconds
+
+        if self.redis is not None:
+            try:
+                self.redis.set(
+                    f"project:{project_id}:read_primary", 1, px=int(self.sticky_seconds * 1000)
+                )
+            except Exception as e:
+                logger.warning(f"Failed to share primary stickiness for {project_id}: {e}")
+
+    def is_sticky(self, project_id: str) -> bool:
+        """Check whether reads for a project must use the primary."""
+        if has_app_context() and project_id in getattr(g, "primary_sticky_projects", ()):
+            return True
+
+        with self._lock:
+            until = self._sticky_until.get(project_id)
+            if until is not None:
+                if until > time.monotonic():
+                    return True
+                del self._sticky_until[project_id]
+
+        if self.redis is not None:
+            try:
+                return bool(self.redis.exists(f"project:{project_id}:read_primary"))
+            except Exception as e:
+                logger.warning(f"Stickiness lookup failed for {project_id}, using primary: {e}")
+                return True
+
+        return False
+
+    def replica_status(self) -> List[Dict[str, object]]:
+        """Describe the last known lag of every replica."""
+        status = []
+        for index, engine in enumerate(self.replica_engines):
+            lag, checked_at = self._lag_cache.get(index, (None, None))
+            status.append(
+                {
+                    "replica": engine.url.host or str(index),
+                    "lag_seconds": lag,
+                    "healthy": lag is not None and lag <= self.max_replica_lag,
+                    "checked_seconds_ago": (
+                        round(time.monotonic() - checked_at, 1) if checked_at else None
+                    ),
+                }
+            )
+        return status
+
+    def _replica_is_fresh(self, index: int) -> bool:
+        now = time.monotonic()
+        lag, checked_at = self._lag_cache.get(index, (None, None))
+        if checked_at is None or now - checked_at >= self.lag_check_interval:
+            lag = self.lag_probe(self.replica_engines[index])
+            self._lag_cache[index] = (lag, now)
+        return lag is not None and lag <= self.max_replica_lag
+
+
+def create_replica_router(
+    replica_urls: Sequence[str], primary_engine: Optional[Engine] = None, **router_options
+) -> Optional[ReplicaRouter]:
+    """
+    Create a router from replica database URLs.
+
+    Args:
+        replica_urls: Replica connection URLs (e.g. from DATABASE_REPLICA_URLS)
+        primary_engine: Primary engine; None uses the session's default bind
+        **router_options: Additional ReplicaRouter options
+
+    Returns:
+        ReplicaRouter, or None when no replicas are configured
+    """
+    urls = [url.strip() for url in replica_urls if url and url.strip()]
+    if not urls:
+        return None
+
+    # Pool sizing, timeouts and pool metrics match the primary's engine
+    engines = [create_tuned_engine(url) for url in urls]
+    logger.info(f"Read replica routing enabled with {len(engines)} replicas")
+    return ReplicaRouter(engines, primary_engine=primary_engine, **router_options)
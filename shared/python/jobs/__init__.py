@@ -0,0 +1,35 @@
+"""
+Shared Background Job Utilities
+
+Redis-backed job queue and process-pool worker for long-running work
+in GMC Dashboard microservices.
+"""
+
+from .queue import (
+    CANCELLED,
+    FAILED,
+    FINISHED_STATUSES,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    InMemoryJobQueue,
+    JobCancelled,
+    RedisJobQueue,
+    input_hash,
+)
+from .worker import JobContext, JobWorker
+
+__all__ = [
+    "CANCELLED",
+    "FAILED",
+    "FINISHED_STATUSES",
+    "QUEUED",
+    "RUNNING",
+    "SUCCEEDED",
+    "InMemoryJobQueue",
+    "JobCancelled",
+    "RedisJobQueue",
+    "input_hash",
+    "JobContext",
+    "JobWorker",
+]
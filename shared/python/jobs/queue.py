@@ -0,0 +1,437 @@
+"""
+Job Queue
+
+Queue and status store for long-running work (optimisations, Monte Carlo
+rollouts, bulk imports, exports) that is too slow for a synchronous request.
+
+Jobs are project-scoped and de-duplicated by input hash: submitting the same
+job type, project and parameters while an earlier submission is queued,
+running or holding a stored result returns the earlier job instead of
+computing it again. Finished jobs and their results expire after a TTL.
+
+Workers renew a lease on each running job (heartbeat_at). A running job
+whose lease has lapsed lost its worker: it is failed and identical
+submissions queue a new job instead of waiting on it.
+
+Redis layout (see database/migrations/redis/001_setup_redis_structures.txt):
+
+    LIST   jobs:queue:{queue_name}                      "{project_id}:{job_id}" items
+    HASH   project:{project_id}:jobs:{job_id}           job status fields
+    STRING project:{project_id}:jobs:{job_id}:result    result JSON
+    STRING project:{project_id}:jobs:dedupe:{hash}      job_id
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import queue
+import threading
+import time
+import uuid
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Finished jobs and their results are kept this long
+DEFAULT_RESULT_TTL_SECONDS = 3600
+
+# Unfinished jobs are dropped after this long, so a lost worker cannot leak records
+DEFAULT_JOB_TTL_SECONDS = 86400
+
+# A running job whose worker has not renewed its lease for this long is stale
+DEFAULT_LEASE_SECONDS = 60
+
+STALE_JOB_ERROR = "Job worker stopped responding"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested."""
+
+
+def input_hash(job_type: str, project_id: str, parameters: Dict[str, Any]) -> str:
+    """
+    Hash identifying identical job submissions.
+
+    Args:
+        job_type: Registered job type
+        project_id: Project the job belongs to
+        parameters: JSON-serialisable job parameters
+
+    Returns:
+        Hex SHA-256 digest of the canonical JSON of the inputs
+    """
+    canonical = json.dumps(
+        {"type": job_type, "project_id": project_id, "parameters": parameters},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _new_job(job_type: str, project_id: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": uuid.uuid4().hex,
+        "type": job_type,
+        "project_id": project_id,
+        "status": QUEUED,
+        "progress": 0.0,
+        "message": None,
+        "error": None,
+        "cancel_requested": False,
+        "input_hash": input_hash(job_type, project_id, parameters),
+        "created_at": datetime.utcnow().isoformat(),
+        "started_at": None,
+        "heartbeat_at": None,
+        "finished_at": None,
+    }
+
+
+def _stale(job: Dict[str, Any], lease_seconds: float) -> bool:
+    """Whether a running job's worker has stopped renewing its lease."""
+    renewed = job.get("heartbeat_at") or job.get("started_at")
+    if job["status"] != RUNNING or not renewed:
+        return False
+    age = datetime.utcnow() - datetime.fromisoformat(renewed)
+    return age.total_seconds() > lease_seconds
+
+
+def _reusable(job: Optional[Dict[str, Any]], lease_seconds: float) -> bool:
+    """Whether a job can serve a duplicate submission."""
+    return (
+        job is not None
+        and job["status"] in (QUEUED, RUNNING, SUCCEEDED)
+        and not _stale(job, lease_seconds)
+    )
+
+
+class InMemoryJobQueue:
+    """Process-local job queue used when Redis is not configured."""
+
+    def __init__(
+        self,
+        result_ttl_seconds: float = DEFAULT_RESULT_TTL_SECONDS,
+        job_ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ):
+        self.result_ttl_seconds = result_ttl_seconds
+        self.job_ttl_seconds = job_ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._parameters: Dict[str, Dict[str, Any]] = {}
+        self._results: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._dedupe: Dict[Tuple[str, str], str] = {}
+        self._pending: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    def submit(
+        self, job_type: str, project_id: str, parameters: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a job unless an identical one can be reused.
+
+        Args:
+            job_type: Registered job type
+            project_id: Project the job belongs to
+            parameters: JSON-serialisable job parameters
+
+        Returns:
+            Job status and whether an existing job was returned
+        """
+        job = _new_job(job_type, project_id, parameters)
+        with self._lock:
+            self._purge()
+            existing_id = self._dedupe.get((project_id, job["input_hash"]))
+            existing = self._jobs.get(existing_id) if existing_id is not None else None
+            if _reusable(existing, self.lease_seconds):
+                return dict(existing), True
+            if existing is not None and _stale(existing, self.lease_seconds):
+                self._finish(existing_id, FAILED, error=STALE_JOB_ERROR)
+
+            self._jobs[job["job_id"]] = job
+            self._parameters[job["job_id"]] = parameters
+            self._expires[job["job_id"]] = time.monotonic() + self.job_ttl_seconds
+            self._dedupe[(project_id, job["input_hash"])] = job["job_id"]
+        self._pending.put(job["job_id"])
+        return dict(job), False
+
+    def get(self, project_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status, or None if unknown, expired or in another project."""
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(job_id)
+            if job is None or job["project_id"] != project_id:
+                return None
+            return dict(job)
+
+    def result(self, project_id: str, job_id: str) -> Any:
+        """Stored result of a succeeded job (None if there is none)."""
+        if self.get(project_id, job_id) is None:
+            return None
+        return self._results.get(job_id)
+
+    def claim(self, timeout: float) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Take the next queued job and mark it running.
+
+        Args:
+            timeout: Seconds to wait for a job
+
+        Returns:
+            Job status and parameters, or None if no job arrived in time
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                job_id = self._pending.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                return None
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None and job["status"] == QUEUED:
+                    started_at = datetime.utcnow().isoformat()
+                    job.update(status=RUNNING, started_at=started_at, heartbeat_at=started_at)
+                    return dict(job), self._parameters.pop(job_id, {})
+
+    def heartbeat(self, project_id: str, job_id: str) -> None:
+        """Renew a running job's lease."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] == RUNNING:
+                job["heartbeat_at"] = datetime.utcnow().isoformat()
+
+    def update_progress(
+        self, project_id: str, job_id: str, progress: float, message: Optional[str] = None
+    ) -> None:
+        """Record a running job's progress (0 to 1)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] == RUNNING:
+                job.update(progress=round(min(max(progress, 0.0), 1.0), 4), message=message)
+
+    def finish(
+        self,
+        project_id: str,
+        job_id: str,
+        status: str,
+        result: Any = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """Mark a job finished, store its result and start its TTL."""
+        with self._lock:
+            self._finish(job_id, status, result, error)
+
+    def _finish(
+        self, job_id: str, status: str, result: Any = None, error: Optional[str] = None
+    ) -> None:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.update(status=status, error=error, finished_at=datetime.utcnow().isoformat())
+        if status == SUCCEEDED:
+            job["progress"] = 1.0
+            self._results[job_id] = result
+        self._expires[job_id] = time.monotonic() + self.result_ttl_seconds
+
+    def cancel(self, project_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Request cancellation of a job.
+
+        Queued jobs are cancelled at once; running jobs stop at their next
+        progress report.
+
+        Returns:
+            Job status, or None if the job is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["project_id"] != project_id:
+                return None
+            if job["status"] not in FINISHED_STATUSES:
+                job["cancel_requested"] = True
+            queued = job["status"] == QUEUED
+        if queued:
+            self.finish(project_id, job_id, CANCELLED)
+        return self.get(project_id, job_id)
+
+    def cancel_requested(self, project_id: str, job_id: str) -> bool:
+        """Whether cancellation of a job has been requested."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is not None and bool(job["cancel_requested"])
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for job_id in [job_id for job_id, expires in self._expires.items() if expires <= now]:
+            job = self._jobs.pop(job_id, None)
+            self._results.pop(job_id, None)
+            self._parameters.pop(job_id, None)
+            self._expires.pop(job_id, None)
+            if job is not None:
+                key = (job["project_id"], job["input_hash"])
+                if self._dedupe.get(key) == job_id:
+                    del self._dedupe[key]
+
+
+class RedisJobQueue:
+    """Job queue shared by API and worker processes through Redis."""
+
+    def __init__(
+        self,
+        redis_client,
+        queue_name: str = "default",
+        result_ttl_seconds: int = DEFAULT_RESULT_TTL_SECONDS,
+        job_ttl_seconds: int = DEFAULT_JOB_TTL_SECONDS,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ):
+        self.redis = redis_client
+        self.queue_key = f"jobs:queue:{queue_name}"
+        self.result_ttl_seconds = int(result_ttl_seconds)
+        self.job_ttl_seconds = int(job_ttl_seconds)
+        self.lease_seconds = lease_seconds
+
+    @staticmethod
+    def _job_key(project_id: str, job_id: str) -> str:
+        return f"project:{project_id}:jobs:{job_id}"
+
+    def submit(
+        self, job_type: str, project_id: str, parameters: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Queue a job unless an identical one can be reused (see InMemoryJobQueue.submit)."""
+        job = _new_job(job_type, project_id, parameters)
+        dedupe_key = f"project:{project_id}:jobs:dedupe:{job['input_hash']}"
+
+        if not self.redis.set(dedupe_key, job["job_id"], nx=True, ex=self.job_ttl_seconds):
+            existing_id = self.redis.get(dedupe_key)
+            existing = self.get(project_id, _text(existing_id)) if existing_id else None
+            if _reusable(existing, self.lease_seconds):
+                return existing, True
+            if existing is not None and _stale(existing, self.lease_seconds):
+                self.finish(project_id, existing["job_id"], FAILED, error=STALE_JOB_ERROR)
+            self.redis.set(dedupe_key, job["job_id"], ex=self.job_ttl_seconds)
+
+        key = self._job_key(project_id, job["job_id"])
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping={**_encode(job), "parameters": json.dumps(parameters)})
+        pipe.expire(key, self.job_ttl_seconds)
+        pipe.lpush(self.queue_key, f"{project_id}:{job['job_id']}")
+        pipe.execute()
+        return job, False
+
+    def get(self, project_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status, or None if unknown, expired or in another project."""
+        raw = self.redis.hgetall(self._job_key(project_id, job_id))
+        if not raw:
+            return None
+        return _decode(raw)
+
+    def result(self, project_id: str, job_id: str) -> Any:
+        """Stored result of a succeeded job (None if there is none)."""
+        raw = self.redis.get(f"{self._job_key(project_id, job_id)}:result")
+        return json.loads(raw) if raw else None
+
+    def claim(self, timeout: float) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Take the next queued job and mark it running (see InMemoryJobQueue.claim)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            item = self.redis.brpop(self.queue_key, timeout=max(int(remaining), 1))
+            if item is None:
+                return None
+            project_id, job_id = _text(item[1]).rsplit(":", 1)
+            key = self._job_key(project_id, job_id)
+            if _text(self.redis.hget(key, "status")) != QUEUED:
+                continue  # cancelled or expired while queued
+            started_at = datetime.utcnow().isoformat()
+            self.redis.hset(
+                key,
+                mapping={"status": RUNNING, "started_at": started_at, "heartbeat_at": started_at},
+            )
+            parameters = self.redis.hget(key, "parameters")
+            job = self.get(project_id, job_id)
+            return job, json.loads(parameters) if parameters else {}
+
+    def heartbeat(self, project_id: str, job_id: str) -> None:
+        """Renew a running job's lease."""
+        key = self._job_key(project_id, job_id)
+        if _text(self.redis.hget(key, "status")) == RUNNING:
+            self.redis.hset(key, "heartbeat_at", datetime.utcnow().isoformat())
+
+    def update_progress(
+        self, project_id: str, job_id: str, progress: float, message: Optional[str] = None
+    ) -> None:
+        """Record a running job's progress (0 to 1)."""
+        fields = {"progress": round(min(max(progress, 0.0), 1.0), 4), "message": message}
+        self.redis.hset(self._job_key(project_id, job_id), mapping=_encode(fields))
+
+    def finish(
+        self,
+        project_id: str,
+        job_id: str,
+        status: str,
+        result: Any = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """Mark a job finished, store its result and start its TTL."""
+        key = self._job_key(project_id, job_id)
+        fields = {"status": status, "error": error, "finished_at": datetime.utcnow().isoformat()}
+        if status == SUCCEEDED:
+            fields["progress"] = 1.0
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping=_encode(fields))
+        pipe.hdel(key, "parameters")
+        pipe.expire(key, self.result_ttl_seconds)
+        if status == SUCCEEDED:
+            pipe.set(f"{key}:result", json.dumps(result, default=str), ex=self.result_ttl_seconds)
+        pipe.hget(key, "input_hash")
+        hash_value = pipe.execute()[-1]
+        if hash_value:
+            dedupe_key = f"project:{project_id}:jobs:dedupe:{_text(hash_value)}"
+            self.redis.expire(dedupe_key, self.result_ttl_seconds)
+
+    def cancel(self, project_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        """Request cancellation of a job (see InMemoryJobQueue.cancel)."""
+        job = self.get(project_id, job_id)
+        if job is None:
+            return None
+        if job["status"] not in FINISHED_STATUSES:
+            self.redis.hset(self._job_key(project_id, job_id), "cancel_requested", "1")
+        if job["status"] == QUEUED:
+            self.finish(project_id, job_id, CANCELLED)
+        return self.get(project_id, job_id)
+
+    def cancel_requested(self, project_id: str, job_id: str) -> bool:
+        """Whether cancellation of a job has been requested."""
+        flag = self.redis.hget(self._job_key(project_id, job_id), "cancel_requested")
+        return flag is not None and _text(flag) == "1"
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _encode(fields: Dict[str, Any]) -> Dict[str, str]:
+    """Redis hash fields; None is stored as an empty string."""
+    encoded = {}
+    for name, value in fields.items():
+        if isinstance(value, bool):
+            value = int(value)
+        encoded[name] = "" if value is None else str(value)
+    return encoded
+
+
+def _decode(raw: Dict[Any, Any]) -> Dict[str, Any]:
+    fields = {_text(name): _text(value) for name, value in raw.items()}
+    fields.pop("parameters", None)
+    job = {name: (value if value != "" else None) for name, value in fields.items()}
+    job["progress"] = float(job.get("progress") or 0.0)
+    job["cancel_requested"] = job.get("cancel_requested") == "1"
+    return job
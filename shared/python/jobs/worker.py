@@ -0,0 +1,233 @@
+"""
+Job Worker
+
+Runs queued jobs in a pool of worker processes so CPU-bound calculation work
+never competes with request handling for the interpreter lock.
+
+Handlers are plain module-level functions taking (parameters, context) and
+returning a JSON-serialisable result. They report progress through
+context.progress(), which also raises JobCancelled once cancellation has been
+requested, so long loops stop at the next report. Progress and cancellation
+cross the process boundary through a multiprocessing manager; the worker's
+monitor thread relays progress to the queue, renews the leases of running
+jobs and polls for cancellations.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+
+from .queue import CANCELLED, FAILED, SUCCEEDED, JobCancelled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_SECONDS = 1.0
+
+Handler = Callable[[Dict[str, Any], "JobContext"], Any]
+
+
+class JobContext:
+    """Progress reporting and cancellation for one running job."""
+
+    def __init__(self, job_id: str, updates, cancel_event):
+        self.job_id = job_id
+        self._updates = updates
+        self._cancel_event = cancel_event
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """
+        Report progress and stop if the job was cancelled.
+
+        Args:
+            fraction: Share of the work done, 0 to 1
+            message: Optional human-readable step description
+
+        Raises:
+            JobCancelled: If cancellation has been requested
+        """
+        if self.cancelled:
+            raise JobCancelled(self.job_id)
+        self._updates.put((self.job_id, float(fraction), message))
+
+
+def _execute(handler: Handler, job_id: str, parameters: Dict[str, Any], updates, cancel_event):
+    """Entry point in the worker process."""
+    return handler(parameters, JobContext(job_id, updates, cancel_event))
+
+
+class JobWorker:
+    """Claims jobs from a queue and runs them in a process pool."""
+
+    def __init__(
+        self,
+        job_queue,
+        handlers: Dict[str, Handler],
+        processes: Optional[int] = None,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            job_queue: InMemoryJobQueue or RedisJobQueue
+            handlers: Job type -> module-level handler function
+            processes: Worker processes; defaults to the CPU count
+            poll_seconds: How often to poll for jobs and cancellations
+        """
+        self.queue = job_queue
+        self.handlers = dict(handlers)
+        self.processes = processes or os.cpu_count() or 1
+        self.poll_seconds = poll_seconds
+
+        self._running: Dict[str, Dict[str, Any]] = {}  # job_id -> project_id, cancel event
+        self._slots = threading.Semaphore(self.processes)
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._updates = None
+
+    def start(self) -> "JobWorker":
+        """Start the process pool and the dispatch and monitor threads."""
+        if self._executor is not None:
+            return self
+        # Spawned children do not inherit the API process's threads and locks
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        self._updates = self._manager.Queue()
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+        self._stopping.clear()
+        for target in (self._dispatch, self._monitor):
+            thread = threading.Thread(target=target, name=f"job-{target.__name__}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Job worker started with {self.processes} processes")
+        return self
+
+    def stop(self, wait: bool = True) -> None:
+        """Stop claiming jobs, cancel running ones and shut the pool down."""
+        self._stopping.set()
+        with self._lock:
+            for running in self._running.values():
+                running["cancel"].set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def run_forever(self) -> None:
+        """Run until interrupted (standalone worker processes)."""
+        self.start()
+        try:
+            self._stopping.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    @property
+    def running_jobs(self) -> int:
+        with self._lock:
+            return len(self._running)
+
+    def _dispatch(self) -> None:
+        while not self._stopping.is_set():
+            if not self._slots.acquire(timeout=self.poll_seconds):
+                continue
+            try:
+                claimed = self.queue.claim(timeout=self.poll_seconds)
+            except Exception as e:
+                logger.error(f"Claiming a job failed: {e}")
+                claimed = None
+            if claimed is None:
+                self._slots.release()
+                continue
+
+            job, parameters = claimed
+            handler = self.handlers.get(job["type"])
+            if handler is None:
+                self.queue.finish(
+                    job["project_id"],
+                    job["job_id"],
+                    FAILED,
+                    error=f"Unknown job type {job['type']}",
+                )
+                self._slots.release()
+                continue
+
+            cancel_event = self._manager.Event()
+            with self._lock:
+                self._running[job["job_id"]] = {
+                    "project_id": job["project_id"],
+                    "cancel": cancel_event,
+                }
+            future = self._executor.submit(
+                _execute, handler, job["job_id"], parameters, self._updates, cancel_event
+            )
+            future.add_done_callback(
+                lambda f, job=job: self._finished(job["project_id"], job["job_id"], f)
+            )
+            logger.info(f"Started {job['type']} job {job['job_id']} for {job['project_id']}")
+
+    def _finished(self, project_id: str, job_id: str, future: Future) -> None:
+        self._relay_progress()  # apply updates that arrived before completion
+        with self._lock:
+            running = self._running.pop(job_id, None)
+        self._slots.release()
+
+        try:
+            result = future.result()
+        except JobCancelled:
+            self.queue.finish(project_id, job_id, CANCELLED)
+            return
+        except Exception as e:
+            if running is not None and running["cancel"].is_set():
+                self.queue.finish(project_id, job_id, CANCELLED)
+            else:
+                logger.error(f"Job {job_id} failed: {e}")
+                self.queue.finish(project_id, job_id, FAILED, error=str(e))
+            return
+
+        if self.queue.cancel_requested(project_id, job_id):
+            self.queue.finish(project_id, job_id, CANCELLED)
+        else:
+            self.queue.finish(project_id, job_id, SUCCEEDED, result=result)
+
+    def _relay_progress(self, timeout: float = 0) -> None:
+        while True:
+            try:
+                job_id, fraction, message = self._updates.get(timeout=timeout)
+            except (queue.Empty, EOFError, OSError):
+                return
+            with self._lock:
+                running = self._running.get(job_id)
+            if running is not None:
+                self.queue.update_progress(running["project_id"], job_id, fraction, message)
+            timeout = 0
+
+    def _monitor(self) -> None:
+        while not self._stopping.is_set():
+            self._relay_progress(timeout=self.poll_seconds)
+            with self._lock:
+                running = list(self._running.items())
+            for job_id, job in running:
+                try:
+                    self.queue.heartbeat(job["project_id"], job_id)
+                    if self.queue.cancel_requested(job["project_id"], job_id):
+                        job["cancel"].set()
+                except Exception as e:
+                    logger.warning(f"Renewing or checking cancellation of job {job_id} failed: {e}")
@@ -0,0 +1,60 @@
+"""
+Shared Observability Utilities
+
+Prometheus metrics, distributed tracing and request profiling for GMC Dashboard
+microservices.
+"""
+
+from .metrics import (
+    MeteredCache,
+    MetricsMiddleware,
+    instrument_sqlalchemy,
+    metrics_payload,
+    record_cache_lookup,
+    record_rate_limit,
+    track_llm_call,
+    track_query,
+)
+from .profiling import (
+    InMemoryProfileStore,
+    ProfilingMiddleware,
+    RedisProfileStore,
+    flame_graph,
+)
+from .tracing import (
+    FileSpanExporter,
+    InMemorySpanExporter,
+    OTLPHttpExporter,
+    TracingMiddleware,
+    configure_tracer,
+    current_span,
+    get_tracer,
+    inject_headers,
+    parse_traceparent,
+    start_span,
+)
+
+__all__ = [
+    "FileSpanExporter",
+    "InMemoryProfileStore",
+    "InMemorySpanExporter",
+    "MeteredCache",
+    "MetricsMiddleware",
+    "OTLPHttpExporter",
+    "ProfilingMiddleware",
+    "RedisProfileStore",
+    "TracingMiddleware",
+    "configure_tracer",
+    "current_span",
+    "flame_graph",
+    "get_tracer",
+    "inject_headers",
+    "instrument_sqlalchemy",
+    "metrics_payload",
+    "parse_traceparent",
+    "record_cache_lookup",
+    "record_rate_limit",
+    "start_span",
+    "track_llm_call",
+    "track_query",
+]
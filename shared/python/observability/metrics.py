@@ -0,0 +1,263 @@
+"""
+Prometheus Metrics
+
+One metrics surface for every GMC service, labelled by service name:
+
+    gmc_http_request_duration_seconds   per-route latency histogram
+    gmc_http_requests_in_flight         requests being handled
+    gmc_db_query_duration_seconds       SQL, Cypher and document-store query timings
+    gmc_cache_requests_total            cache lookups by result (hit ratio)
+    gmc_llm_requests_total              LLM provider calls by outcome
+    gmc_llm_tokens_total                LLM tokens by kind (prompt, completion)
+    gmc_llm_request_duration_seconds    LLM provider latency
+    gmc_rate_limit_decisions_total      rate limit checks by source (local, redis) and outcome
+
+MetricsMiddleware records the HTTP metrics and serves /metrics. Under a
+pre-forking server set PROMETHEUS_MULTIPROC_DIR so every worker's samples are
+aggregated into one scrape.
+"""
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# Latency buckets spanning cached lookups to full multi-quarter rollouts
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+# LLM calls are slower; buckets cover the 2 s API and 10 s local-model targets
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 60.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "gmc_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["service", "method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "gmc_http_requests_in_flight",
+    "HTTP requests currently being handled",
+    ["service"],
+    multiprocess_mode="livesum",
+)
+DB_QUERY_DURATION = Histogram(
+    "gmc_db_query_duration_seconds",
+    "Database query latency",
+    ["service", "database", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "gmc_cache_requests_total",
+    "Cache lookups by result",
+    ["service", "cache", "result"],
+)
+LLM_REQUESTS = Counter(
+    "gmc_llm_requests_total",
+    "LLM provider calls by outcome",
+    ["service", "provider", "model", "outcome"],
+)
+LLM_TOKENS = Counter(
+    "gmc_llm_tokens_total",
+    "LLM tokens used",
+    ["service", "provider", "model", "kind"],
+)
+LLM_REQUEST_DURATION = Histogram(
+    "gmc_llm_request_duration_seconds",
+    "LLM provider call latency",
+    ["service", "provider", "model"],
+    buckets=LLM_LATENCY_BUCKETS,
+)
+
+RATE_LIMIT_DECISIONS = Counter(
+    "gmc_rate_limit_decisions_total",
+    "Rate limit checks by where they were decided and outcome",
+    ["service", "source", "outcome"],
+)
+
+# Service label for metrics recorded outside a request (set by MetricsMiddleware)
+_service_name = os.environ.get("SERVICE_NAME", "unknown")
+
+
+def service_name() -> str:
+    """Service label of this process."""
+    return _service_name
+
+
+def metrics_payload() -> bytes:
+    """Exposition-format metrics, aggregated across workers in multiprocess mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+class MetricsMiddleware:
+    """Flask middleware recording per-route latency and in-flight requests."""
+
+    def __init__(self, app=None, service: Optional[str] = None):
+        self.service = service
+        if app is not None:
+            self.init_app(app, service)
+
+    def init_app(self, app, service: Optional[str] = None):
+        """Register request hooks and the /metrics endpoint."""
+        global _service_name
+        self.service = service or self.service or _service_name
+        _service_name = self.service
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule("/metrics", "metrics", self.metrics_view, methods=["GET"])
+
+    def before_request(self):
+        if request.path == "/metrics":
+            return
+        g._metrics_started = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.labels(self.service).inc()
+
+    def after_request(self, response):
+        started = g.get("_metrics_started")
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            HTTP_REQUEST_DURATION.labels(
+                self.service, request.method, route, str(response.status_code)
+            ).observe(time.perf_counter() - started)
+        return response
+
+    def teardown_request(self, error=None):
+        # Runs even when after_request did not, so the gauge cannot drift upwards
+        if g.pop("_metrics_started", None) is not None:
+            HTTP_REQUESTS_IN_FLIGHT.labels(self.service).dec()
+
+    @staticmethod
+    def metrics_view():
+        return Response(metrics_payload(), mimetype=CONTENT_TYPE_LATEST)
+
+
+def _sql_operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def instrument_sqlalchemy(engine, database: str = "postgresql"):
+    """
+    Time every statement executed on an engine (idempotent).
+
+    Args:
+        engine: SQLAlchemy engine
+        database: Database label
+
+    Returns:
+        The engine
+    """
+    from sqlalchemy import event  # services without SQL databases do not install SQLAlchemy
+
+    if getattr(engine, "_gmc_query_metrics", False):
+        return engine
+    engine._gmc_query_metrics = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("gmc_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("gmc_query_started")
+        if started:
+            DB_QUERY_DURATION.labels(service_name(), database, _sql_operation(statement)).observe(
+                time.perf_counter() - started.pop()
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("gmc_query_started"):
+            connection.info["gmc_query_started"].pop()
+
+    return engine
+
+
+@contextmanager
+def track_query(database: str, operation: str) -> Iterator[None]:
+    """
+    Time a query issued through a driver without event hooks (Neo4j, MongoDB).
+
+    Args:
+        database: Database label, e.g. "neo4j"
+        operation: Query name, e.g. "project_rules"
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        DB_QUERY_DURATION.labels(service_name(), database, operation).observe(
+            time.perf_counter() - started
+        )
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache lookup as a hit or miss."""
+    CACHE_REQUESTS.labels(service_name(), cache, "hit" if hit else "miss").inc()
+
+
+def record_rate_limit(source: str, outcome: str) -> None:
+    """Count a rate limit decision made locally or by the shared store."""
+    RATE_LIMIT_DECISIONS.labels(service_name(), source, outcome).inc()
+
+
+class MeteredCache:
+    """Wraps a get/put result cache and counts hits and misses."""
+
+    def __init__(self, cache, name: str):
+        self.cache = cache
+        self.name = name
+
+    def get(self, key: str) -> Any:
+        value = self.cache.get(key)
+        record_cache_lookup(self.name, value is not None)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        self.cache.put(key, value)
+
+
+@contextmanager
+def track_llm_call(provider: str, model: str) -> Iterator[Dict[str, int]]:
+    """
+    Time an LLM provider call and count its tokens and outcome.
+
+    The caller fills the yielded dict with "prompt_tokens" and
+    "completion_tokens" from the provider's usage report.
+
+    Args:
+        provider: Provider name, e.g. "anthropic"
+        model: Model name
+    """
+    usage: Dict[str, int] = {"prompt_tokens": 0, "completion_tokens": 0}
+    service = service_name()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield usage
+        outcome = "success"
+    finally:
+        LLM_REQUEST_DURATION.labels(service, provider, model).observe(time.perf_counter() - started)
+        LLM_REQUESTS.labels(service, provider, model, outcome).inc()
+        for kind in ("prompt", "completion"):
+            tokens = int(usage.get(f"{kind}_tokens") or 0)
+            if tokens:
+                LLM_TOKENS.labels(service, provider, model, kind).inc(tokens)
@@ -0,0 +1,431 @@
+"""
+Request Profiling
+
+On-demand statistical profiling for GMC services, for diagnosing slow
+requests in production without redeploying.
+
+A profiled request's thread is sampled every few milliseconds by a single
+background sampler thread. The sampled call stacks are folded into
+"outer;inner;leaf" strings and aggregated per route template and project.
+Requests that are not profiled pay only a random draw.
+
+Requests are profiled when:
+
+- a percentage of requests is sampled (set through the admin endpoint or
+  PROFILING_SAMPLE_PERCENT), or
+- an admin sends the X-Profile header to force profiling of that request
+
+Admin endpoints require the X-Admin-Token header to match
+PROFILING_ADMIN_TOKEN; without that setting they are refused:
+
+    GET    /admin/profiling             sample percentage and profiled routes
+    PUT    /admin/profiling             {"sample_percent": 5}
+    GET    /admin/profiling/flamegraph  ?route=&project_id=&format=json|folded
+    DELETE /admin/profiling/flamegraph  discard collected profiles
+
+Profiles are kept per process by InMemoryProfileStore, or shared by every
+worker through RedisProfileStore.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+from flask import g, jsonify, request, Response
+
+logger = logging.getLogger(__name__)
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+FORCE_PROFILE_HEADER = "X-Profile"
+
+# Frames above this depth are dropped from folded stacks
+MAX_STACK_DEPTH = 128
+
+# Seconds the Redis-backed sample percentage is cached per process
+SAMPLE_PERCENT_REFRESH_SECONDS = 1.0
+
+# Paths never profiled (scrapes, probes and the admin surface itself)
+_UNPROFILED_PREFIXES = ("/metrics", "/health", "/admin/profiling")
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def fold_stack(frame) -> str:
+    """
+    Fold a frame and its callers into a flame-graph stack string.
+
+    Args:
+        frame: Innermost frame
+
+    Returns:
+        Semicolon-separated frame names, outermost first
+    """
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """One background thread sampling the stacks of registered threads."""
+
+    def __init__(self, interval_seconds: float = 0.005):
+        self.interval_seconds = interval_seconds
+        self._targets: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread_id: int) -> None:
+        """Begin sampling a thread."""
+        with self._lock:
+            self._targets[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, thread_id: int) -> Counter:
+        """Stop sampling a thread and return its folded stack counts."""
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def sample(self) -> None:
+        """Record the current stack of every registered thread once."""
+        frames = sys._current_frames()
+        with self._lock:
+            for thread_id, stacks in self._targets.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stacks[fold_stack(frame)] += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                idle = not self._targets
+                if idle:
+                    self._wake.clear()
+            if idle:
+                self._wake.wait()
+                continue
+            time.sleep(self.interval_seconds)
+            self.sample()
+
+
+class InMemoryProfileStore:
+    """Aggregated profiles held by this process."""
+
+    def __init__(self, sample_percent: float = 0.0):
+        self.sample_percent = sample_percent
+        self._profiles: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get_sample_percent(self) -> float:
+        return self.sample_percent
+
+    def set_sample_percent(self, percent: float) -> None:
+        self.sample_percent = percent
+
+    def add(self, route: str, project_id: str, stacks: Counter, duration: float) -> None:
+        """Merge one request's stacks into the route and project aggregate."""
+        with self._lock:
+            profile = self._profiles.setdefault(
+                (route, project_id), {"requests": 0, "seconds": 0.0, "stacks": Counter()}
+            )
+            profile["requests"] += 1
+            profile["seconds"] += duration
+            profile["stacks"].update(stacks)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Profiled routes and projects with request and sample counts."""
+        with self._lock:
+            return [
+                {
+                    "route": route,
+                    "project_id": project_id or None,
+                    "requests": profile["requests"],
+                    "total_seconds": round(profile["seconds"], 6),
+                    "samples": sum(profile["stacks"].values()),
+                }
+                for (route, project_id), profile in self._profiles.items()
+            ]
+
+    def stacks(self, route: Optional[str] = None, project_id: Optional[str] = None) -> Counter:
+        """Folded stack counts merged across matching routes and projects."""
+        merged = Counter()
+        with self._lock:
+            for (profile_route, profile_project), profile in self._profiles.items():
+                if route is not None and profile_route != route:
+                    continue
+                if project_id is not None and profile_project != project_id:
+                    continue
+                merged.update(profile["stacks"])
+        return merged
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+class RedisProfileStore:
+    """Aggregated profiles shared by every worker through Redis."""
+
+    def __init__(self, redis_client, service: str, ttl_seconds: int = 86400):
+        """
+        Initialize the store.
+
+        Args:
+            redis_client: Redis client
+            service: Service name used in key names
+            ttl_seconds: Seconds profiles are kept after their last update
+        """
+        self.redis = redis_client
+        self.prefix = f"profiling:{service}"
+        self.ttl_seconds = ttl_seconds
+        self._percent: Tuple[float, float] = (0.0, 0.0)
+
+    def _stacks_key(self, route: str, project_id: str) -> str:
+        return f"{self.prefix}:stacks:{route}|{project_id}"
+
+    def get_sample_percent(self) -> float:
+        value, expires = self._percent
+        if time.monotonic() >= expires:
+            raw = self.redis.get(f"{self.prefix}:sample_percent")
+            value = float(raw) if raw else 0.0
+            self._percent = (value, time.monotonic() + SAMPLE_PERCENT_REFRESH_SECONDS)
+        return value
+
+    def set_sample_percent(self, percent: float) -> None:
+        self.redis.set(f"{self.prefix}:sample_percent", percent)
+        self._percent = (percent, 0.0)
+
+    def add(self, route: str, project_id: str, stacks: Counter, duration: float) -> None:
+        field = json.dumps([route, project_id])
+        key = self._stacks_key(route, project_id)
+        pipe = self.redis.pipeline()
+        for stack, count in stacks.items():
+            pipe.hincrby(key, stack, count)
+        pipe.expire(key, self.ttl_seconds)
+        pipe.hincrby(f"{self.prefix}:requests", field, 1)
+        pipe.hincrbyfloat(f"{self.prefix}:seconds", field, duration)
+        pipe.expire(f"{self.prefix}:requests", self.ttl_seconds)
+        pipe.expire(f"{self.prefix}:seconds", self.ttl_seconds)
+        pipe.execute()
+
+    def _index(self) -> List[Tuple[str, str, int, float]]:
+        requests = self.redis.hgetall(f"{self.prefix}:requests")
+        seconds = self.redis.hgetall(f"{self.prefix}:seconds")
+        index = []
+        for field, count in requests.items():
+            route, project_id = json.loads(field)
+            index.append((route, project_id, int(count), float(seconds.get(field, 0))))
+        return index
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        summaries = []
+        for route, project_id, count, seconds in self._index():
+            counts = self.redis.hvals(self._stacks_key(route, project_id))
+            summaries.append(
+                {
+                    "route": route,
+                    "project_id": project_id or None,
+                    "requests": count,
+                    "total_seconds": round(seconds, 6),
+                    "samples": sum(int(value) for value in counts),
+                }
+            )
+        return summaries
+
+    def stacks(self, route: Optional[str] = None, project_id: Optional[str] = None) -> Counter:
+        merged = Counter()
+        for profile_route, profile_project, _, _ in self._index():
+            if route is not None and profile_route != route:
+                continue
+            if project_id is not None and profile_project != project_id:
+                continue
+            for stack, count in self.redis.hgetall(
+                self._stacks_key(profile_route, profile_project)
+            ).items():
+                merged[stack.decode() if isinstance(stack, bytes) else stack] += int(count)
+        return merged
+
+    def clear(self) -> None:
+        keys = [self._stacks_key(route, project) for route, project, _, _ in self._index()]
+        self.redis.delete(f"{self.prefix}:requests", f"{self.prefix}:seconds", *keys)
+
+
+def flame_graph(stacks: Counter) -> Dict[str, Any]:
+    """
+    Build a nested flame-graph tree from folded stack counts.
+
+    Args:
+        stacks: Folded stack string -> sample count
+
+    Returns:
+        {"name", "value", "children"} tree as read by d3-flame-graph
+    """
+    root: Dict[str, Any] = {"name": "root", "value": 0, "children": {}}
+    for stack, count in stacks.items():
+        root["value"] += count
+        node = root
+        for name in stack.split(";"):
+            node = node["children"].setdefault(name, {"name": name, "value": 0, "children": {}})
+            node["value"] += count
+
+    def finish(node):
+        children = sorted(node["children"].values(), key=lambda child: -child["value"])
+        return {
+            "name": node["name"],
+            "value": node["value"],
+            "children": [finish(child) for child in children],
+        }
+
+    return finish(root)
+
+
+class ProfilingMiddleware:
+    """Flask middleware profiling sampled or admin-requested requests."""
+
+    def __init__(self, app=None, service: Optional[str] = None, store=None, sampler=None):
+        if app is not None:
+            self.init_app(app, service, store, sampler)
+
+    def init_app(self, app, service: Optional[str] = None, store=None, sampler=None):
+        """Register request hooks and the admin profiling endpoints."""
+        self.service = service or os.environ.get("SERVICE_NAME", "unknown")
+        self.admin_token = os.environ.get("PROFILING_ADMIN_TOKEN", "")
+        self.store = store or InMemoryProfileStore(
+            float(os.environ.get("PROFILING_SAMPLE_PERCENT", 0))
+        )
+        self.sampler = sampler or StackSampler(
+            float(os.environ.get("PROFILING_INTERVAL_MS", 5)) / 1000
+        )
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule(
+            "/admin/profiling", "profiling_settings", self.settings_view, methods=["GET", "PUT"]
+        )
+        app.add_url_rule(
+            "/admin/profiling/flamegraph",
+            "profiling_flamegraph",
+            self.flamegraph_view,
+            methods=["GET", "DELETE"],
+        )
+
+    def is_admin(self) -> bool:
+        supplied = request.headers.get(ADMIN_TOKEN_HEADER, "")
+        return bool(self.admin_token) and hmac.compare_digest(supplied, self.admin_token)
+
+    def _should_profile(self) -> bool:
+        if request.path.startswith(_UNPROFILED_PREFIXES):
+            return False
+        if request.headers.get(FORCE_PROFILE_HEADER) and self.is_admin():
+            return True
+        try:
+            percent = self.store.get_sample_percent()
+        except Exception as e:
+            logger.warning(f"Reading profiling sample percentage failed: {e}")
+            return False
+        return percent > 0 and random.random() * 100 < percent
+
+    def before_request(self):
+        if not self._should_profile():
+            return
+        g._profile_thread = threading.get_ident()
+        g._profile_started = time.perf_counter()
+        self.sampler.start(g._profile_thread)
+
+    def after_request(self, response):
+        if g.get("_profile_thread") is not None:
+            response.headers["X-Profiled"] = "1"
+        return response
+
+    def teardown_request(self, error=None):
+        thread_id = g.pop("_profile_thread", None)
+        if thread_id is None:
+            return
+        stacks = self.sampler.stop(thread_id)
+        duration = time.perf_counter() - g.pop("_profile_started")
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        project_id = (request.view_args or {}).get("project_id") or ""
+        try:
+            self.store.add(route, project_id, stacks, duration)
+        except Exception as e:
+            logger.warning(f"Storing profile for {route} failed: {e}")
+
+    def _forbidden(self):
+        if not self.admin_token:
+            return jsonify({"error": "Profiling disabled", "message": "Set PROFILING_ADMIN_TOKEN"})
+        return jsonify({"error": "Forbidden", "message": f"Valid {ADMIN_TOKEN_HEADER} required"})
+
+    def settings_view(self):
+        if not self.is_admin():
+            return self._forbidden(), 403
+
+        if request.method == "PUT":
+            data = request.get_json(silent=True) or {}
+            try:
+                percent = float(data.get("sample_percent"))
+            except (TypeError, ValueError):
+                percent = -1.0
+            if not 0 <= percent <= 100:
+                return (
+                    jsonify(
+                        {
+                            "error": "Invalid sample_percent",
+                            "message": "sample_percent must be between 0 and 100",
+                        }
+                    ),
+                    400,
+                )
+            self.store.set_sample_percent(percent)
+            logger.info(f"Profiling sample percentage set to {percent} for {self.service}")
+
+        return jsonify(
+            {
+                "service": self.service,
+                "sample_percent": self.store.get_sample_percent(),
+                "interval_ms": self.sampler.interval_seconds * 1000,
+                "profiles": self.store.summaries(),
+            }
+        )
+
+    def flamegraph_view(self):
+        if not self.is_admin():
+            return self._forbidden(), 403
+
+        if request.method == "DELETE":
+            self.store.clear()
+            return jsonify({"service": self.service, "cleared": True})
+
+        route = request.args.get("route")
+        project_id = request.args.get("project_id")
+        stacks = self.store.stacks(route, project_id)
+
+        if request.args.get("format") == "folded":
+            body = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+            return Response(body, mimetype="text/plain")
+
+        return jsonify(
+            {
+                "service": self.service,
+                "route": route,
+                "project_id": project_id,
+                "samples": sum(stacks.values()),
+                "flamegraph": flame_graph(stacks),
+            }
+        )
@@ -0,0 +1,476 @@
+"""
+Distributed Tracing
+
+W3C trace-context propagation and span recording for GMC services.
+
+TracingMiddleware continues the trace from an incoming `traceparent` header
+(set by Kong or a calling service) or starts a new one, and records a server
+span per request. Code inside the request opens child spans with
+start_span(); outgoing HTTP calls carry the context via inject_headers().
+
+Finished spans go to a pluggable exporter: any object with an
+export(spans) method receiving span dictionaries. Included are a JSON-lines
+file exporter (a local stand-in for a collector), an OTLP/HTTP JSON exporter
+and an in-memory exporter for tests. TRACE_EXPORTER selects one from the
+environment ("file", "otlp", "memory" or "none").
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+TRACESTATE_HEADER = "tracestate"
+TRACERESPONSE_HEADER = "traceresponse"
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?$")
+
+# Attribute values longer than this are truncated (SQL and Cypher text)
+MAX_ATTRIBUTE_LENGTH = 2000
+
+
+@dataclass
+class SpanContext:
+    """Identifiers propagated between services."""
+
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+    tracestate: Optional[str] = None
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(header: Optional[str], tracestate: Optional[str] = None):
+    """
+    Parse a W3C traceparent header.
+
+    Args:
+        header: traceparent header value
+        tracestate: Optional tracestate header value, carried through unchanged
+
+    Returns:
+        SpanContext of the remote parent, or None if the header is missing or invalid
+    """
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if match is None:
+        return None
+    version, trace_id, span_id, flags, rest = match.groups()
+    if version == "ff" or (version == "00" and rest):
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 0x01), tracestate)
+
+
+def _random_id(length: int) -> str:
+    return f"{random.getrandbits(length * 4):0{length}x}"
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        context: SpanContext,
+        parent_id: Optional[str],
+        kind: str,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = {}
+        self.status = "ok"
+        self.status_message: Optional[str] = None
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self._started = time.perf_counter()
+        for key, value in (attributes or {}).items():
+            self.set_attribute(key, value)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is None:
+            return
+        if isinstance(value, str) and len(value) > MAX_ATTRIBUTE_LENGTH:
+            value = value[:MAX_ATTRIBUTE_LENGTH] + "..."
+        self.attributes[key] = value
+
+    def record_exception(self, error: BaseException) -> None:
+        self.status = "error"
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_time is not None:
+            return
+        self.end_time = self.start_time + (time.perf_counter() - self._started)
+        if self.context.sampled:
+            self.tracer.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "service": self.tracer.service,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": round((self.end_time - self.start_time) * 1000, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+            "status_message": self.status_message,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("gmc_current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """The active span of this request or task, if any."""
+    return _current_span.get()
+
+
+class Tracer:
+    """Creates spans for one service and hands finished ones to the exporter."""
+
+    def __init__(
+        self,
+        service: str,
+        exporter=None,
+        sample_ratio: float = 1.0,
+        export_interval: float = 1.0,
+        max_queue: int = 10000,
+    ):
+        """
+        Initialize the tracer.
+
+        Args:
+            service: Service name recorded on every span
+            exporter: Object with export(spans); None records nothing
+            sample_ratio: Share of new traces recorded; continued traces follow the caller
+            export_interval: Seconds between background exports; 0 exports on span end
+            max_queue: Finished spans buffered before new ones are dropped
+        """
+        self.service = service
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self.export_interval = export_interval
+        self.max_queue = max_queue
+        self.dropped = 0
+
+        self._queue: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(
+        self,
+        name: str,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[SpanContext] = None,
+    ) -> Span:
+        """
+        Start a span without activating it.
+
+        Args:
+            name: Operation name
+            kind: "server", "client" or "internal"
+            attributes: Initial attributes
+            parent: Remote parent; defaults to the active span
+
+        Returns:
+            The started span; call end() when the operation finishes
+        """
+        parent_id = None
+        if parent is None and current_span() is not None:
+            parent = current_span().context
+        if parent is not None:
+            context = SpanContext(
+                parent.trace_id, _random_id(16), parent.sampled, parent.tracestate
+            )
+            parent_id = parent.span_id
+        else:
+            sampled = self.exporter is not None and random.random() < self.sample_ratio
+            context = SpanContext(_random_id(32), _random_id(16), sampled)
+        return Span(self, name, context, parent_id, kind, attributes)
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[SpanContext] = None,
+    ) -> Iterator[Span]:
+        """Start an active span for the duration of the block (see begin)."""
+        span = self.begin(name, kind, attributes, parent)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def export(self, span: Span) -> None:
+        """Queue a finished span for export."""
+        if self.exporter is None:
+            return
+        if self.export_interval <= 0:
+            self._send([span.to_dict()])
+            return
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return
+            self._queue.append(span.to_dict())
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="trace-exporter", daemon=True
+                )
+                self._thread.start()
+
+    def flush(self) -> None:
+        """Export every queued span now."""
+        with self._lock:
+            spans, self._queue = self._queue, []
+        if spans:
+            self._send(spans)
+
+    def _send(self, spans: List[Dict[str, Any]]) -> None:
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            logger.warning(f"Exporting {len(spans)} spans failed: {e}")
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.export_interval)
+            self.flush()
+
+
+class InMemorySpanExporter:
+    """Keeps exported spans in a list (tests and local debugging)."""
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        self.spans.extend(spans)
+
+
+class FileSpanExporter:
+    """Appends spans as JSON lines to a local file, a stand-in for a collector."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(lines)
+
+
+_OTLP_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPHttpExporter:
+    """Sends spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0, headers: Optional[Dict] = None):
+        self.url = endpoint.rstrip("/")
+        if not self.url.endswith("/v1/traces"):
+            self.url += "/v1/traces"
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def payload(self, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """OTLP ExportTraceServiceRequest body, one resource per service."""
+        by_service: Dict[str, List[Dict[str, Any]]] = {}
+        for span in spans:
+            by_service.setdefault(span["service"], []).append(
+                {
+                    "traceId": span["trace_id"],
+                    "spanId": span["span_id"],
+                    "parentSpanId": span["parent_span_id"] or "",
+                    "name": span["name"],
+                    "kind": _OTLP_KINDS.get(span["kind"], 1),
+                    "startTimeUnixNano": str(int(span["start_time"] * 1e9)),
+                    "endTimeUnixNano": str(int(span["end_time"] * 1e9)),
+                    "attributes": [
+                        {"key": key, "value": _otlp_value(value)}
+                        for key, value in span["attributes"].items()
+                    ],
+                    "status": {
+                        "code": 2 if span["status"] == "error" else 1,
+                        "message": span["status_message"] or "",
+                    },
+                }
+            )
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [{"key": "service.name", "value": {"stringValue": service}}]
+                    },
+                    "scopeSpans": [{"scope": {"name": "gmc"}, "spans": service_spans}],
+                }
+                for service, service_spans in by_service.items()
+            ]
+        }
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        import requests
+
+        response = requests.post(
+            self.url, json=self.payload(spans), headers=self.headers, timeout=self.timeout
+        )
+        response.raise_for_status()
+
+
+def exporter_from_env():
+    """Span exporter selected by TRACE_EXPORTER (file, otlp, memory or none)."""
+    kind = os.environ.get("TRACE_EXPORTER", "none").lower()
+    if kind == "file":
+        return FileSpanExporter(os.environ.get("TRACE_FILE_PATH", "traces.jsonl"))
+    if kind == "otlp":
+        return OTLPHttpExporter(
+            os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+        )
+    if kind == "memory":
+        return InMemorySpanExporter()
+    return None
+
+
+_tracer = Tracer(os.environ.get("SERVICE_NAME", "unknown"))
+
+
+def configure_tracer(
+    service: str, exporter=None, sample_ratio: Optional[float] = None, **options
+) -> Tracer:
+    """Set the process-wide tracer used by start_span and TracingMiddleware."""
+    global _tracer
+    if sample_ratio is None:
+        sample_ratio = float(os.environ.get("TRACE_SAMPLE_RATIO", 1.0))
+    _tracer = Tracer(service, exporter, sample_ratio, **options)
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def start_span(name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None):
+    """Start an active child span of the current span (context manager)."""
+    return _tracer.start_span(name, kind, attributes)
+
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Add the current trace context to outgoing HTTP request headers.
+
+    Args:
+        headers: Headers to extend (copied)
+
+    Returns:
+        Headers with traceparent (and tracestate) when a span is active
+    """
+    headers = dict(headers or {})
+    span = current_span()
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.context.traceparent()
+        if span.context.tracestate:
+            headers[TRACESTATE_HEADER] = span.context.tracestate
+    return headers
+
+
+class TracingMiddleware:
+    """Flask middleware continuing W3C traces and recording a span per request."""
+
+    def __init__(self, app=None, service: Optional[str] = None, exporter=None):
+        if app is not None:
+            self.init_app(app, service, exporter)
+
+    def init_app(self, app, service: Optional[str] = None, exporter=None):
+        """Configure the tracer and register request hooks."""
+        configure_tracer(
+            service or os.environ.get("SERVICE_NAME", "unknown"),
+            exporter if exporter is not None else exporter_from_env(),
+        )
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def before_request(self):
+        if request.path in ("/metrics", "/health", "/health/ready"):
+            return
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        parent = parse_traceparent(
+            request.headers.get(TRACEPARENT_HEADER), request.headers.get(TRACESTATE_HEADER)
+        )
+        span = get_tracer().begin(
+            f"{request.method} {route}",
+            kind="server",
+            parent=parent,
+            attributes={
+                "http.method": request.method,
+                "http.route": route,
+                "http.target": request.path,
+                "gmc.project_id": (request.view_args or {}).get("project_id"),
+            },
+        )
+        g._trace_span = span
+        g._trace_token = _current_span.set(span)
+
+    def after_request(self, response):
+        span = g.get("_trace_span")
+        if span is not None:
+            span.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.status = "error"
+            response.headers[TRACERESPONSE_HEADER] = span.context.traceparent()
+        return response
+
+    def teardown_request(self, error=None):
+        span = g.pop("_trace_span", None)
+        if span is None:
+            return
+        if error is not None:
+            span.record_exception(error)
+        try:
+            _current_span.reset(g.pop("_trace_token"))
+        except (KeyError, ValueError):
+            _current_span.set(None)
+        span.end()
@@ -0,0 +1,46 @@
+"""
+Shared Rate Limiting
+
+Per-user, per-project and per-endpoint request budgets for GMC Dashboard
+microservices, enforced in-service behind Kong's coarse per-route limits.
+
+Usage:
+    limiter = create_rate_limiter(redis_client)
+    rate_limits = RateLimitMiddleware(app, "gmc-calculation-service", limiter,
+                                      policies=DEFAULT_POLICIES, costs={"*/rollout": 10})
+"""
+
+from .limiter import (
+    GCRA_SCRIPT,
+    InMemoryRateLimitStore,
+    RateLimitDecision,
+    RateLimiter,
+    RedisRateLimitStore,
+    create_rate_limiter,
+)
+from .middleware import RateLimitMiddleware, request_identity
+from .policies import (
+    DEFAULT_POLICIES,
+    ENDPOINT,
+    PROJECT,
+    USER,
+    RateLimitPolicy,
+    request_cost,
+)
+
+__all__ = [
+    "DEFAULT_POLICIES",
+    "ENDPOINT",
+    "GCRA_SCRIPT",
+    "PROJECT",
+    "USER",
+    "InMemoryRateLimitStore",
+    "RateLimitDecision",
+    "RateLimitMiddleware",
+    "RateLimitPolicy",
+    "RateLimiter",
+    "RedisRateLimitStore",
+    "create_rate_limiter",
+    "request_cost",
+    "request_identity",
+]
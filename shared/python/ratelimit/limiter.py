@@ -0,0 +1,303 @@
+"""
+Rate Limiter
+
+GCRA (generic cell rate algorithm) budgets checked atomically in Redis, with
+a local pre-check in each worker that answers most requests without a round
+trip.
+
+Redis layout (see database/migrations/redis/001_setup_redis_structures.txt):
+
+    HASH rate_limit:{user_id}               {service}:{policy} -> theoretical arrival time (ms)
+    HASH project:{project_id}:rate_limit    {service}:{policy} -> theoretical arrival time (ms)
+    HASH rate_limit:endpoint:{service}      {policy}:{endpoint} -> theoretical arrival time (ms)
+
+GCRA stores one timestamp per budget instead of a window of request logs, and
+the Lua script checks every budget a request is charged against before
+updating any of them, so a request is either charged everywhere or nowhere.
+
+The local pre-check leases units: when a worker goes to Redis for a busy
+budget it takes a small batch sized from that budget's recent use, and spends
+the rest locally for up to a second. Unused units are handed back on the next
+trip. Denials are remembered until their retry time, so a client hammering a
+closed budget does not reach Redis either.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+import logging
+import math
+import threading
+import time
+
+from ..observability.metrics import record_rate_limit
+from .policies import RateLimitPolicy
+
+logger = logging.getLogger(__name__)
+
+# Leases are sized from use in the previous lease, up to this share of a policy's burst
+MAX_LEASE_FRACTION = 0.1
+
+# Drop expired local state once this many budgets are tracked
+MAX_LOCAL_BUDGETS = 10000
+
+# KEYS[i]: budget hash; ARGV per budget: field, interval_ms, capacity_ms, cost, lease, refund
+GCRA_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local tats = {}
+for i = 1, #KEYS do
+  local base = (i - 1) * 6
+  local interval = tonumber(ARGV[base + 2])
+  local capacity = tonumber(ARGV[base + 3])
+  local cost = tonumber(ARGV[base + 4])
+  local refund = tonumber(ARGV[base + 6])
+  local tat = tonumber(redis.call('HGET', KEYS[i], ARGV[base + 1])) or now
+  tat = math.max(tat - refund * interval, now)
+  local allow_at = tat + cost * interval - capacity
+  if allow_at > now then
+    return {0, allow_at - now, i}
+  end
+  tats[i] = tat
+end
+local result = {1, 0, 0}
+for i = 1, #KEYS do
+  local base = (i - 1) * 6
+  local interval = tonumber(ARGV[base + 2])
+  local capacity = tonumber(ARGV[base + 3])
+  local cost = tonumber(ARGV[base + 4])
+  local lease = tonumber(ARGV[base + 5])
+  local available = math.floor((now + capacity - tats[i]) / interval)
+  local granted = math.max(cost, math.min(lease, available))
+  local tat = tats[i] + granted * interval
+  redis.call('HSET', KEYS[i], ARGV[base + 1], string.format('%d', tat))
+  if redis.call('PTTL', KEYS[i]) < tat - now then
+    redis.call('PEXPIRE', KEYS[i], tat - now)
+  end
+  result[#result + 1] = granted
+end
+return result
+"""
+
+
+@dataclass(frozen=True)
+class Charge:
+    """A request's cost against one policy budget."""
+
+    policy: RateLimitPolicy
+    key: str
+    field: str
+    cost: int
+
+    @property
+    def budget(self) -> Tuple[str, str]:
+        return (self.key, self.field)
+
+
+@dataclass
+class Acquisition:
+    """Outcome of charging budgets in a store."""
+
+    allowed: bool
+    retry_after: float = 0.0
+    denied_index: Optional[int] = None
+    granted: List[int] = field(default_factory=list)
+
+
+@dataclass
+class RateLimitDecision:
+    """Whether a request may proceed, and if not, when to retry."""
+
+    allowed: bool
+    retry_after: float = 0.0
+    policy: Optional[RateLimitPolicy] = None
+    source: str = "local"
+
+
+class RedisRateLimitStore:
+    """GCRA budgets shared by every worker through one Lua script call."""
+
+    def __init__(self, redis_client):
+        """
+        Initialize the store.
+
+        Args:
+            redis_client: Redis client (server 5.0 or later for TIME in scripts)
+        """
+        self.redis = redis_client
+        self.script = redis_client.register_script(GCRA_SCRIPT)
+
+    def acquire(self, requests: Sequence[Tuple[Charge, int, int]]) -> Acquisition:
+        """
+        Charge budgets atomically.
+
+        Args:
+            requests: (charge, lease units to take, unused units to hand back) per budget
+
+        Returns:
+            Acquisition with the units granted per budget when allowed
+        """
+        keys, args = [], []
+        for charge, lease, refund in requests:
+            keys.append(charge.key)
+            args.extend(
+                [
+                    charge.field,
+                    charge.policy.interval_ms,
+                    charge.policy.interval_ms * charge.policy.capacity,
+                    charge.cost,
+                    lease,
+                    refund,
+                ]
+            )
+        result = self.script(keys=keys, args=args)
+        if not result[0]:
+            return Acquisition(False, int(result[1]) / 1000, int(result[2]) - 1)
+        return Acquisition(True, granted=[int(g) for g in result[3:]])
+
+
+class InMemoryRateLimitStore:
+    """Process-local GCRA budgets with the same semantics as the Redis script."""
+
+    def __init__(self):
+        self._tats = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, requests: Sequence[Tuple[Charge, int, int]]) -> Acquisition:
+        now = int(time.monotonic() * 1000)
+        with self._lock:
+            tats = []
+            for index, (charge, _, refund) in enumerate(requests):
+                interval = charge.policy.interval_ms
+                tat = max(self._tats.get(charge.budget, now) - refund * interval, now)
+                allow_at = tat + charge.cost * interval - interval * charge.policy.capacity
+                if allow_at > now:
+                    return Acquisition(False, (allow_at - now) / 1000, index)
+                tats.append(tat)
+
+            granted = []
+            for (charge, lease, _), tat in zip(requests, tats):
+                interval = charge.policy.interval_ms
+                available = (now + interval * charge.policy.capacity - tat) // interval
+                units = max(charge.cost, min(lease, available))
+                self._tats[charge.budget] = tat + units * interval
+                granted.append(units)
+
+            if len(self._tats) > MAX_LOCAL_BUDGETS:
+                self._tats = {k: v for k, v in self._tats.items() if v > now}
+            return Acquisition(True, granted=granted)
+
+
+@dataclass
+class _Lease:
+    tokens: int = 0
+    expires_at: float = 0.0
+    used: int = 0
+    blocked_until: float = 0.0
+
+
+class RateLimiter:
+    """Checks charges against a store, spending leased units locally when possible."""
+
+    def __init__(self, store, lease_seconds: float = 1.0):
+        """
+        Initialize the limiter.
+
+        Args:
+            store: RedisRateLimitStore or InMemoryRateLimitStore
+            lease_seconds: How long leased units may be spent locally (0 disables leasing)
+        """
+        self.store = store
+        self.lease_seconds = lease_seconds
+        self.source = "redis" if isinstance(store, RedisRateLimitStore) else "memory"
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def check(self, charges: Sequence[Charge]) -> RateLimitDecision:
+        """
+        Charge a request against every applicable budget.
+
+        Args:
+            charges: One charge per policy the request falls under
+
+        Returns:
+            Decision; store errors fail open so an outage never blocks traffic
+        """
+        now = time.monotonic()
+        with self._lock:
+            for charge in charges:
+                lease = self._leases.get(charge.budget)
+                if lease is not None and lease.blocked_until > now:
+                    record_rate_limit("local", "denied")
+                    return RateLimitDecision(False, lease.blocked_until - now, charge.policy)
+
+            local, remote = [], []
+            for charge in charges:
+                lease = self._leases.setdefault(charge.budget, _Lease())
+                if lease.expires_at > now and lease.tokens >= charge.cost:
+                    lease.tokens -= charge.cost
+                    lease.used += charge.cost
+                    local.append(charge)
+                else:
+                    remote.append(charge)
+
+            if not remote:
+                record_rate_limit("local", "allowed")
+                return RateLimitDecision(True)
+
+            requests = []
+            for charge in remote:
+                lease = self._leases[charge.budget]
+                max_lease = max(charge.cost, int(charge.policy.capacity * MAX_LEASE_FRACTION))
+                size = min(max(charge.cost, 2 * lease.used), max_lease)
+                if not self.lease_seconds:
+                    size = charge.cost
+                requests.append((charge, size, lease.tokens))
+                lease.tokens = 0
+
+        try:
+            result = self.store.acquire(requests)
+        except Exception as e:
+            logger.warning(f"Rate limit check failed, allowing request: {e}")
+            record_rate_limit(self.source, "error")
+            return RateLimitDecision(True, source=self.source)
+
+        with self._lock:
+            if not result.allowed:
+                for charge in local:
+                    lease = self._leases[charge.budget]
+                    lease.tokens += charge.cost
+                    lease.used -= charge.cost
+                for charge, _, refund in requests:
+                    self._leases[charge.budget].tokens += refund
+                denied = requests[result.denied_index][0]
+                self._leases[denied.budget].blocked_until = now + result.retry_after
+                record_rate_limit(self.source, "denied")
+                return RateLimitDecision(False, result.retry_after, denied.policy, self.source)
+
+            for (charge, _, _), granted in zip(requests, result.granted):
+                lease = self._leases[charge.budget]
+                lease.tokens += granted - charge.cost
+                lease.used = charge.cost
+                lease.expires_at = now + self.lease_seconds
+
+            if len(self._leases) > MAX_LOCAL_BUDGETS:
+                self._leases = {
+                    k: v
+                    for k, v in self._leases.items()
+                    if v.expires_at > now or v.blocked_until > now
+                }
+
+        record_rate_limit(self.source, "allowed")
+        return RateLimitDecision(True, source=self.source)
+
+
+def create_rate_limiter(redis_client=None) -> RateLimiter:
+    """Limiter shared by all workers through Redis, or process-local without it."""
+    if redis_client is not None:
+        return RateLimiter(RedisRateLimitStore(redis_client))
+    return RateLimiter(InMemoryRateLimitStore(), lease_seconds=0)
+
+
+def retry_after_header(seconds: float) -> str:
+    """Whole seconds for a Retry-After header (at least 1)."""
+    return str(max(1, math.ceil(seconds)))
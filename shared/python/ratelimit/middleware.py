@@ -0,0 +1,144 @@
+"""
+Rate Limit Middleware
+
+Charges every request against the service's policies before the view runs
+and answers 429 Too Many Requests with Retry-After when a budget is spent.
+Health checks, metrics and admin endpoints are exempt.
+
+Users are identified by their JWT identity; requests without a valid token
+are budgeted per client address. The address is taken from X-Forwarded-For
+only as far back as TRUSTED_PROXY_HOPS proxies (Kong by default), so
+clients cannot pick their own budget by sending the header themselves.
+"""
+
+from typing import Dict, Optional, Sequence
+import logging
+import os
+
+from flask import jsonify, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from .limiter import Charge, RateLimiter, create_rate_limiter, retry_after_header
+from .policies import (
+    DEFAULT_POLICIES,
+    EXEMPT_PATH_PREFIXES,
+    PROJECT,
+    USER,
+    RateLimitPolicy,
+    request_cost,
+)
+
+try:
+    from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+except ImportError:
+    verify_jwt_in_request = None
+
+logger = logging.getLogger(__name__)
+
+
+def request_identity() -> str:
+    """JWT identity of the caller, or its client address when unauthenticated."""
+    if verify_jwt_in_request is not None and "Authorization" in request.headers:
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+            if identity:
+                return str(identity)
+        except Exception:
+            pass
+    # remote_addr is the right-most X-Forwarded-For entry added by a trusted proxy
+    # (see init_app); left-most entries are whatever the client sent
+    return f"ip:{request.remote_addr}"
+
+
+class RateLimitMiddleware:
+    """Per-user, per-project and per-endpoint request budgets for a Flask app."""
+
+    def __init__(
+        self,
+        app=None,
+        service: str = "unknown",
+        limiter: Optional[RateLimiter] = None,
+        policies: Sequence[RateLimitPolicy] = DEFAULT_POLICIES,
+        costs: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: Flask application
+            service: Service name, part of every budget key
+            limiter: Shared limiter; defaults to a process-local one
+            policies: Policies charged for matching requests
+            costs: fnmatch pattern over URL rules -> cost weight (default 1)
+        """
+        self.service = service
+        self.limiter = limiter or create_rate_limiter()
+        self.policies = tuple(policies)
+        self.costs = costs or {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault(
+            "RATE_LIMIT_ENABLED", os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+        )
+        app.config.setdefault("TRUSTED_PROXY_HOPS", int(os.environ.get("TRUSTED_PROXY_HOPS", 1)))
+        hops = app.config["TRUSTED_PROXY_HOPS"]
+        if hops > 0 and not isinstance(app.wsgi_app, ProxyFix):
+            app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops)
+        self.app = app
+        app.before_request(self.before_request)
+
+    def charges(self, endpoint: str, user: str, project_id: Optional[str]):
+        """Charges for one request against every policy that applies to it."""
+        cost = request_cost(endpoint, self.costs)
+        charges = []
+        for policy in self.policies:
+            if not policy.applies_to(endpoint):
+                continue
+            if policy.scope == USER:
+                key, field = f"rate_limit:{user}", f"{self.service}:{policy.name}"
+            elif policy.scope == PROJECT:
+                if not project_id:
+                    continue
+                key, field = f"project:{project_id}:rate_limit", f"{self.service}:{policy.name}"
+            else:
+                key, field = f"rate_limit:endpoint:{self.service}", f"{policy.name}:{endpoint}"
+            charges.append(Charge(policy, key, field, min(cost, policy.capacity)))
+        return charges
+
+    def before_request(self):
+        if (
+            not self.app.config["RATE_LIMIT_ENABLED"]
+            or request.method == "OPTIONS"
+            or request.url_rule is None
+            or request.path.startswith(EXEMPT_PATH_PREFIXES)
+        ):
+            return None
+
+        project_id = (request.view_args or {}).get("project_id") or request.headers.get(
+            "X-Project-ID"
+        )
+        charges = self.charges(request.url_rule.rule, request_identity(), project_id)
+        if not charges:
+            return None
+
+        decision = self.limiter.check(charges)
+        if decision.allowed:
+            return None
+
+        policy = decision.policy
+        logger.info(f"Rate limited {request.method} {request.path} by policy {policy.name}")
+        response = jsonify(
+            {
+                "error": "Rate limit exceeded",
+                "message": f"{policy.scope.capitalize()} limit of {policy.limit} units per "
+                f"{policy.period:g}s reached for policy '{policy.name}'",
+                "retry_after": round(decision.retry_after, 3),
+            }
+        )
+        response.status_code = 429
+        response.headers["Retry-After"] = retry_after_header(decision.retry_after)
+        response.headers["X-RateLimit-Policy"] = policy.name
+        return response
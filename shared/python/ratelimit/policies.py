@@ -0,0 +1,82 @@
+"""
+Rate Limit Policies
+
+A policy is a budget of cost units per period, shared by everyone in its
+scope:
+
+    user       each user (or anonymous client address) has its own budget
+    project    all users of a project share one budget
+    endpoint   all callers of the matched endpoints share one service-wide budget
+
+Policies can be restricted to endpoints with fnmatch patterns over Flask URL
+rules (e.g. "*/rollout"). Each request is charged a cost weight so batch and
+optimizer calls draw down budgets faster than cheap reads.
+"""
+
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Dict, Optional, Tuple
+
+USER = "user"
+PROJECT = "project"
+ENDPOINT = "endpoint"
+SCOPES = (USER, PROJECT, ENDPOINT)
+
+# Never rate limited: health checks, Prometheus scrapes and admin controls
+EXEMPT_PATH_PREFIXES = ("/health", "/metrics", "/admin/")
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """A budget of cost units per period for one scope."""
+
+    name: str
+    limit: int
+    period: float = 60.0
+    scope: str = USER
+    endpoints: Tuple[str, ...] = ()
+    burst: Optional[int] = None
+
+    def __post_init__(self):
+        if self.scope not in SCOPES:
+            raise ValueError(f"Unknown rate limit scope: {self.scope}")
+        if self.limit < 1 or self.period <= 0:
+            raise ValueError("Rate limit policies need a positive limit and period")
+
+    @property
+    def capacity(self) -> int:
+        """Largest burst of units allowed at once."""
+        return self.burst or self.limit
+
+    @property
+    def interval_ms(self) -> int:
+        """Milliseconds for one unit of budget to be restored."""
+        return max(1, round(self.period * 1000 / self.limit))
+
+    def applies_to(self, endpoint: str) -> bool:
+        """Whether requests to a URL rule are charged against this policy."""
+        return not self.endpoints or any(fnmatchcase(endpoint, p) for p in self.endpoints)
+
+
+# Every service gets per-user and per-project budgets; services add stricter ones
+DEFAULT_POLICIES = (
+    RateLimitPolicy("user", limit=600, period=60),
+    RateLimitPolicy("project", limit=6000, period=60, scope=PROJECT),
+)
+
+
+def request_cost(endpoint: str, costs: Optional[Dict[str, int]] = None) -> int:
+    """
+    Cost weight of a request.
+
+    Args:
+        endpoint: Flask URL rule of the request
+        costs: fnmatch pattern -> weight; the first matching pattern wins
+
+    Returns:
+        Weight in budget units (1 when no pattern matches)
+    """
+    for pattern, cost in (costs or {}).items():
+        if fnmatchcase(endpoint, pattern):
+            return cost
+    return 1
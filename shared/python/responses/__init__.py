@@ -0,0 +1,50 @@
+"""
+Shared Response Utilities
+
+Fast JSON serialization, MessagePack for numeric arrays, compressed
+responses and conditional GET for GMC Dashboard microservices.
+
+Usage:
+    responses = ResponseMiddleware(app)
+
+jsonify() then encodes with orjson when installed (NumPy arrays and
+datetimes included), answers Accept: application/msgpack with MessagePack
+when msgpack is installed, and compresses large bodies with Brotli or gzip
+according to Accept-Encoding. Views wrapped with conditional_get() answer
+If-None-Match with 304 from a cheap version lookup.
+"""
+
+from .compression import (
+    DEFAULT_MIN_BYTES,
+    available_encodings,
+    choose_encoding,
+    compress_response,
+    parse_accept_encoding,
+)
+from .conditional import conditional_get, make_etag
+from .middleware import ResponseMiddleware
+from .serialization import (
+    MSGPACK_MIMETYPE,
+    FastJSONProvider,
+    dumps,
+    loads,
+    packb,
+    to_builtin,
+)
+
+__all__ = [
+    "DEFAULT_MIN_BYTES",
+    "MSGPACK_MIMETYPE",
+    "FastJSONProvider",
+    "ResponseMiddleware",
+    "available_encodings",
+    "choose_encoding",
+    "compress_response",
+    "conditional_get",
+    "dumps",
+    "loads",
+    "make_etag",
+    "packb",
+    "parse_accept_encoding",
+    "to_builtin",
+]
@@ -0,0 +1,128 @@
+"""
+Response Compression
+
+Content negotiation for compressed responses. Brotli is preferred when it
+is installed and accepted, then gzip. Small bodies are sent as-is because
+the encoding overhead outweighs the saving.
+"""
+
+from typing import Dict, Optional, Sequence
+import gzip
+import logging
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not compressed (about one TCP segment)
+DEFAULT_MIN_BYTES = 1024
+
+# Fast settings: dynamic responses are compressed on every request
+DEFAULT_GZIP_LEVEL = 5
+DEFAULT_BROTLI_QUALITY = 4
+
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "application/msgpack",
+    "application/javascript",
+    "text/",
+)
+
+
+def available_encodings() -> Sequence[str]:
+    """Encodings this process can produce, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """
+    Parse an Accept-Encoding header into encoding -> quality.
+
+    Args:
+        header: Header value, e.g. "gzip, br;q=0.9, *;q=0"
+
+    Returns:
+        Lower-cased encodings with their q-values (1.0 when omitted)
+    """
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(header: Optional[str], available: Optional[Sequence[str]] = None):
+    """
+    Pick the response encoding for an Accept-Encoding header.
+
+    Args:
+        header: Accept-Encoding header value
+        available: Encodings to choose from, most preferred first
+
+    Returns:
+        The accepted encoding with the highest q-value (ties go to the earlier
+        available encoding), or None to send the body unencoded
+    """
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for encoding in available or available_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=DEFAULT_BROTLI_QUALITY if level is None else level)
+    return gzip.compress(body, compresslevel=DEFAULT_GZIP_LEVEL if level is None else level)
+
+
+def compress_response(response, min_bytes: int = DEFAULT_MIN_BYTES):
+    """
+    Compress a Flask response for the current request when worthwhile.
+
+    Args:
+        response: Response about to be sent
+        min_bytes: Smallest body worth compressing
+
+    Returns:
+        The response, compressed in place when the client accepts an available encoding
+    """
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or not (response.mimetype or "").startswith(COMPRESSIBLE_MIMETYPES)
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
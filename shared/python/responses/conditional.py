@@ -0,0 +1,89 @@
+"""
+Conditional GET
+
+Version-derived ETags for polled, rarely changing resources. A view wrapped
+with conditional_get() first asks a cheap version function for the
+resource's version, such as the row count and MAX(updated_at) of the
+underlying rows. When the client's If-None-Match still matches, the view
+answers 304 without running its query at all.
+
+Cache-Control lets browsers and shared caches reuse responses: public
+resources are cached for max_age seconds, private ones revalidate on every
+use.
+"""
+
+from functools import wraps
+from typing import Any, Callable
+import hashlib
+import json
+import logging
+
+from flask import make_response, request
+
+from .serialization import wants_msgpack
+
+logger = logging.getLogger(__name__)
+
+
+def make_etag(*parts: Any) -> str:
+    """Opaque entity tag from version parts (weakness is set by the caller)."""
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:20]
+
+
+def conditional_get(
+    version: Callable[..., Any], max_age: int = 0, public: bool = False
+) -> Callable:
+    """
+    Answer GET requests with ETags and 304 Not Modified from a cheap version lookup.
+
+    Args:
+        version: Called with the view's arguments; returns a JSON-serializable version,
+            or None to serve the view without validators
+        max_age: Seconds caches may reuse the response without revalidating
+        public: Allow shared caches (Kong) to store the response; otherwise private
+
+    Returns:
+        View decorator
+    """
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+            try:
+                current = version(*args, **kwargs)
+            except Exception as e:
+                logger.warning(f"Version lookup for {request.path} failed: {e}")
+                current = None
+            if current is None:
+                return view(*args, **kwargs)
+
+            # Representations differ by query and by negotiated format
+            etag = make_etag(
+                request.path,
+                request.query_string.decode("latin-1"),
+                "msgpack" if wants_msgpack() else "json",
+                current,
+            )
+
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.cache_control.public = public
+            response.cache_control.private = not public
+            response.cache_control.max_age = max_age
+            if not max_age:
+                response.cache_control.no_cache = True
+            response.vary.update(("Accept", "Accept-Encoding"))
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,32 @@
+"""
+Response Middleware
+
+Installs the fast JSON provider and response compression on a Flask app.
+"""
+
+from typing import Optional
+import os
+
+from .compression import DEFAULT_MIN_BYTES, compress_response
+from .serialization import FastJSONProvider
+
+
+class ResponseMiddleware:
+    """Installs the fast JSON provider and response compression on a Flask app."""
+
+    def __init__(self, app=None, min_bytes: Optional[int] = None):
+        if app is not None:
+            self.init_app(app, min_bytes)
+
+    def init_app(self, app, min_bytes: Optional[int] = None):
+        """Replace the app's JSON provider and register the compression hook."""
+        self.min_bytes = (
+            min_bytes
+            if min_bytes is not None
+            else int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", DEFAULT_MIN_BYTES))
+        )
+        app.json = FastJSONProvider(app)
+        app.after_request(self.after_request)
+
+    def after_request(self, response):
+        return compress_response(response, self.min_bytes)
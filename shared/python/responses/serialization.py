@@ -0,0 +1,145 @@
+"""
+Response Serialization
+
+Fast JSON and MessagePack encoding for API payloads.
+
+orjson is used when installed and serializes NumPy arrays, datetimes and
+UUIDs natively. Without it the standard library encoder is used with the
+same type conversions, so both paths produce equivalent documents.
+
+MessagePack (when installed) carries NumPy arrays as raw typed buffers:
+{"dtype": "<f8", "shape": [1000, 8], "data": <bytes>}, which clients read
+directly into typed arrays instead of parsing decimal text.
+"""
+
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+import json
+
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import numpy as np
+except ImportError:  # services without NumPy never hold arrays
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/msgpack"
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def to_builtin(value: Any) -> Any:
+    """
+    Convert a value the JSON encoders do not handle natively.
+
+    Args:
+        value: NumPy array or scalar, date/time, Decimal, UUID, set or bytes
+
+    Returns:
+        Equivalent built-in value
+
+    Raises:
+        TypeError: If the value has no JSON representation
+    """
+    if np is not None:
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(value, default=to_builtin, option=_ORJSON_OPTIONS)
+    return json.dumps(value, default=to_builtin, separators=(",", ":"), ensure_ascii=False).encode(
+        "utf-8"
+    )
+
+
+def loads(data) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _msgpack_default(value: Any) -> Any:
+    if np is not None and isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        if array.dtype.kind in "biuf":
+            return {"dtype": array.dtype.str, "shape": list(array.shape), "data": array.tobytes()}
+    return to_builtin(value)
+
+
+def packb(value: Any) -> bytes:
+    """
+    MessagePack encoding with NumPy arrays as raw typed buffers.
+
+    Raises:
+        RuntimeError: If msgpack is not installed
+    """
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+
+def wants_msgpack() -> bool:
+    """Whether the request's Accept header prefers MessagePack over JSON."""
+    if msgpack is None or not has_request_context():
+        return False
+    return request.accept_mimetypes.best_match([JSON_MIMETYPE, MSGPACK_MIMETYPE]) == (
+        MSGPACK_MIMETYPE
+    )
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by the fast encoder.
+
+    jsonify() responses are encoded once to bytes, or as MessagePack when the
+    client asks for application/msgpack.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        if wants_msgpack():
+            response = self._app.response_class(packb(obj), mimetype=MSGPACK_MIMETYPE)
+        else:
+            response = self._app.response_class(dumps(obj) + b"\n", mimetype=self.mimetype)
+        if msgpack is not None:
+            response.vary.add("Accept")
+        return response
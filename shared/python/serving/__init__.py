@@ -0,0 +1,39 @@
+"""
+Shared Serving
+
+Pre-fork gunicorn settings and hooks for GMC Dashboard microservices: the
+application is preloaded in the master and shared copy-on-write by workers.
+
+Usage (gunicorn.conf.py):
+    from shared.python.serving import (child_exit, configure_master, post_fork,
+                                       pre_fork, when_ready, worker_count)
+    workers = worker_count(workers_per_cpu=1)
+    configure_master("gmc-calculation-service", workers, threads)
+    preload_app = True
+"""
+
+from .prefork import (
+    NATIVE_THREAD_VARIABLES,
+    available_cpus,
+    child_exit,
+    configure_master,
+    cpu_quota,
+    post_fork,
+    pre_fork,
+    prepare_metrics_directory,
+    when_ready,
+    worker_count,
+)
+
+__all__ = [
+    "NATIVE_THREAD_VARIABLES",
+    "available_cpus",
+    "child_exit",
+    "configure_master",
+    "cpu_quota",
+    "post_fork",
+    "pre_fork",
+    "prepare_metrics_directory",
+    "when_ready",
+    "worker_count",
+]
@@ -0,0 +1,157 @@
+"""
+Pre-fork Serving
+
+Settings and server hooks shared by each service's gunicorn.conf.py.
+
+The master process imports the application once (preload_app) and forks its
+workers from it, so the interpreter, NumPy/SciPy and every read-only table
+built at startup are shared copy-on-write instead of rebuilt in each worker.
+Two things would otherwise undo that sharing:
+
+- The cyclic garbage collector writes to the header of every object it
+  examines, so a collection in a worker copies the pages holding the
+  master's objects. Collection is disabled while the master loads the app,
+  everything loaded is moved to the permanent generation with gc.freeze()
+  before forking, and collection is re-enabled in each worker.
+- Native thread pools (OpenBLAS/OpenMP) sized to every CPU in every worker
+  oversubscribe the replica, so numeric libraries get one thread per worker.
+
+Worker counts follow the container's CPU quota rather than the node's CPU
+count, and are exported as WEB_CONCURRENCY/WEB_THREADS before the app is
+imported so database pools are sized for the same serving model.
+"""
+
+from typing import Optional
+import gc
+import glob
+import logging
+import math
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Thread pool sizes read by NumPy's BLAS and OpenMP when they are first imported
+NATIVE_THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_quota() -> Optional[float]:
+    """CPUs allowed by the container's cgroup CPU limit, or None when unlimited."""
+    cpu_max = _read(CGROUP_V2_CPU_MAX)
+    if cpu_max:
+        limit, _, period = cpu_max.partition(" ")
+        if limit == "max" or not period:
+            return None
+        return int(limit) / int(period)
+
+    limit, period = _read(CGROUP_V1_CPU_QUOTA), _read(CGROUP_V1_CPU_PERIOD)
+    if limit and period and int(limit) > 0:
+        return int(limit) / int(period)
+    return None
+
+
+def available_cpus() -> float:
+    """CPUs this process may use: the CPU quota when set, else the CPUs it may run on."""
+    try:
+        cpus = float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        cpus = float(os.cpu_count() or 1)
+    quota = cpu_quota()
+    return min(cpus, quota) if quota else cpus
+
+
+def worker_count(workers_per_cpu: float = 1.0, max_workers: Optional[int] = None) -> int:
+    """
+    Worker processes per replica.
+
+    Args:
+        workers_per_cpu: Workers per available CPU (1 for CPU-bound services)
+        max_workers: Upper bound on the computed count
+
+    Returns:
+        WEB_CONCURRENCY when set, otherwise workers for the available CPUs (at least 1)
+    """
+    configured = os.environ.get("WEB_CONCURRENCY")
+    if configured:
+        return max(int(configured), 1)
+    workers = max(math.ceil(available_cpus() * workers_per_cpu), 1)
+    return min(workers, max_workers) if max_workers else workers
+
+
+def prepare_metrics_directory(service: str) -> str:
+    """
+    Point prometheus_client at a multiprocess directory and clear stale samples.
+
+    Must run before prometheus_client is imported, which is why the server
+    hooks below import it lazily.
+
+    Args:
+        service: Service name, used for the default directory
+
+    Returns:
+        The directory (PROMETHEUS_MULTIPROC_DIR)
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        directory = os.path.join(base, f"prometheus-{service}")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    os.makedirs(directory, exist_ok=True)
+    # Samples from a previous master would otherwise be summed with ours
+    for path in glob.glob(os.path.join(directory, "*.db")):
+        os.remove(path)
+    return directory
+
+
+def configure_master(service: str, workers: int, threads: int) -> None:
+    """
+    Prepare the master process before the application is imported.
+
+    Args:
+        service: Service name
+        workers: Worker processes per replica
+        threads: Threads per worker
+    """
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    os.environ["WEB_THREADS"] = str(threads)
+    for name in NATIVE_THREAD_VARIABLES:
+        os.environ.setdefault(name, "1")
+    prepare_metrics_directory(service)
+    # Avoid leaving freed holes in pages that workers will share
+    gc.disable()
+
+
+def when_ready(server):
+    """Freeze the preloaded application once it has been imported."""
+    gc.freeze()
+    server.log.info(f"Preloaded application: {gc.get_freeze_count()} objects shared with workers")
+
+
+def pre_fork(server, worker):
+    """Freeze objects created in the master since the last fork."""
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Re-enable garbage collection for objects the worker creates itself."""
+    gc.enable()
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the aggregated metrics."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,400 @@
+"""
+Cohort Deadline Load Test Harness
+
+Replays how a cohort uses the platform in the hours before a decision
+deadline against running services, and reports throughput, latency
+percentiles and error rates per endpoint.
+
+Each virtual student belongs to a team sharing one project. Students log in,
+upload the new quarter's report as they arrive (the upload burst), then
+repeat a weighted mix of:
+
+- slider sessions: a run of decision changes followed by a rollout
+- knowledge graph rule lookups
+- coaching chats (answered by tests/load/stub_llm.py in the load-test stack)
+
+The run passes when every endpoint's p95 latency is within the response
+budget, its error rate is within MAX_ERROR_RATE and at least
+MIN_CONCURRENT_USERS students were simulated.
+
+Usage:
+    docker compose -f docker-compose.yml -f docker-compose.loadtest.yml up -d
+    python tests/load/cohort_load.py --users 60 --duration 300 --report load_report.json
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+
+import requests
+
+SERVICE_URLS = {
+    "calculation": os.environ.get("GMC_CALCULATION_URL", "http://localhost:5000"),
+    "knowledge_graph": os.environ.get("GMC_KNOWLEDGE_GRAPH_URL", "http://localhost:5001"),
+    "conversation": os.environ.get("GMC_CONVERSATION_URL", "http://localhost:5002"),
+    "user_management": os.environ.get("GMC_USER_MANAGEMENT_URL", "http://localhost:5003"),
+}
+
+# Development standards: 50+ concurrent users with sub-2 second responses
+MIN_CONCURRENT_USERS = 50
+RESPONSE_BUDGET_SECONDS = 2.0
+MAX_ERROR_RATE = 0.01
+
+TEAM_SIZE = 5
+COMPANIES_PER_GROUP = 8
+REQUEST_TIMEOUT_SECONDS = 30
+
+# Share of a student's actions after the upload burst
+BEHAVIOUR_WEIGHTS = {"slider": 0.6, "rules": 0.2, "chat": 0.15, "upload": 0.05}
+
+# Seconds a student pauses between actions and between slider steps (before scaling)
+THINK_SECONDS = (1.0, 5.0)
+SLIDER_STEP_SECONDS = (0.2, 1.0)
+
+PROJECT_ROUTE = "/api/v1/projects/<project_id>"
+SESSION_ROUTE = f"{PROJECT_ROUTE}/sessions/<session_id>"
+
+COACHING_QUESTIONS = [
+    "Why did my contribution fall when I cut prices in Europe?",
+    "How much advertising is worth it for product 2?",
+    "Should we add a shift next quarter or buy more machines?",
+    "What happens to cash if we raise the dividend?",
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    Args:
+        values: Observations
+        q: Percentile between 0 and 100
+
+    Returns:
+        The smallest observation with at least q percent of values at or below it
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class LoadReport:
+    """Thread-safe latency and error samples per endpoint."""
+
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.setdefault(endpoint, []).append(seconds)
+            self._errors[endpoint] = self._errors.get(endpoint, 0) + (0 if ok else 1)
+
+    def summary(self, elapsed_seconds: float, users: int) -> Dict[str, Any]:
+        """
+        Summarize the run.
+
+        Args:
+            elapsed_seconds: Wall-clock duration of the run
+            users: Concurrent virtual students
+
+        Returns:
+            Per-endpoint and overall throughput, latency percentiles (ms) and error rates
+        """
+        with self._lock:
+            samples = {endpoint: list(values) for endpoint, values in self._samples.items()}
+            errors = dict(self._errors)
+
+        def stats(values: List[float], error_count: int) -> Dict[str, Any]:
+            return {
+                "requests": len(values),
+                "errors": error_count,
+                "error_rate": round(error_count / len(values), 4) if values else 0.0,
+                "throughput_rps": round(len(values) / elapsed_seconds, 3),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(max(values, default=0.0) * 1000, 1),
+            }
+
+        everything = [value for values in samples.values() for value in values]
+        return {
+            "users": users,
+            "duration_seconds": round(elapsed_seconds, 2),
+            "endpoints": {
+                endpoint: stats(values, errors[endpoint])
+                for endpoint, values in sorted(samples.items())
+            },
+            "overall": stats(everything, sum(errors.values())),
+        }
+
+
+def slo_failures(
+    summary: Dict[str, Any],
+    budget_seconds: float = RESPONSE_BUDGET_SECONDS,
+    max_error_rate: float = MAX_ERROR_RATE,
+    min_users: int = MIN_CONCURRENT_USERS,
+) -> List[str]:
+    """
+    Check a run summary against the response budget and error-rate target.
+
+    Returns:
+        Descriptions of every missed target; empty when the run passes
+    """
+    failures = []
+    if summary["users"] < min_users:
+        failures.append(f"only {summary['users']} concurrent users (target {min_users}+)")
+    for endpoint, stats in summary["endpoints"].items():
+        if stats["p95_ms"] > budget_seconds * 1000:
+            failures.append(f"{endpoint}: p95 {stats['p95_ms']} ms over {budget_seconds} s")
+        if stats["error_rate"] > max_error_rate:
+            failures.append(f"{endpoint}: error rate {stats['error_rate']:.2%}")
+    return failures
+
+
+def group_information(quarter: int, rng: random.Random) -> Dict[str, Any]:
+    """Group information for one quarter, as uploaded from the simulation's report."""
+    companies = []
+    for company in range(1, COMPANIES_PER_GROUP + 1):
+        prices = [round(rng.uniform(90, 140), 2) for _ in range(3)]
+        advertising = [round(rng.uniform(10, 60), 1) for _ in range(3)]
+        companies.append(
+            {
+                "company": str(company),
+                "prices": prices,
+                "advertising": advertising,
+                "sales_units": [
+                    round(1000 * (price / 100) ** -2.2 * ((1 + spend) / 35) ** 0.3)
+                    for price, spend in zip(prices, advertising)
+                ],
+            }
+        )
+    return {"quarter_period": f"Q{quarter}", "companies": companies}
+
+
+class CohortUser:
+    """One virtual student working on their team's project."""
+
+    def __init__(
+        self,
+        index: int,
+        report: LoadReport,
+        urls: Optional[Dict[str, str]] = None,
+        seed: int = 0,
+        think_scale: float = 1.0,
+        quarter: int = 1,
+    ):
+        self.index = index
+        self.report = report
+        self.urls = {**SERVICE_URLS, **(urls or {})}
+        self.rng = random.Random(seed * 100003 + index)
+        self.think_scale = think_scale
+        self.quarter = quarter
+        self.project_id = f"loadtest-team-{index // TEAM_SIZE + 1}"
+        self.session_id = f"loadtest-session-{index + 1}"
+        self.http = requests.Session()
+        self.token: Optional[str] = None
+        self.price = 120.0
+
+    def call(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """Send one request, recording its latency and outcome under the endpoint name."""
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, url, timeout=REQUEST_TIMEOUT_SECONDS, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.report.record(endpoint, time.perf_counter() - started, ok)
+        if not ok:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return {}
+
+    def think(self, bounds=THINK_SECONDS) -> None:
+        time.sleep(self.rng.uniform(*bounds) * self.think_scale)
+
+    def login(self) -> None:
+        body = self.call(
+            "POST /api/v1/auth/login",
+            "POST",
+            f"{self.urls['user_management']}/api/v1/auth/login",
+            json={"username": f"student{self.index + 1}", "password": "load-test"},
+        )
+        self.token = (body or {}).get("access_token")
+        if self.token:
+            # Every service budgets rate limits per user, so send the token everywhere
+            self.http.headers["Authorization"] = f"Bearer {self.token}"
+
+    def upload_report(self) -> None:
+        self.call(
+            f"POST {PROJECT_ROUTE}/demand-model/observations",
+            "POST",
+            f"{self.urls['calculation']}/api/v1/projects/{self.project_id}"
+            "/demand-model/observations",
+            json=group_information(self.quarter, self.rng),
+        )
+
+    def slider_session(self) -> None:
+        """Drag a price slider through several values, then recalculate the plan."""
+        base = f"{self.urls['calculation']}/api/v1/projects/{self.project_id}"
+        for _ in range(self.rng.randint(3, 8)):
+            self.price = round(min(200.0, max(60.0, self.price + self.rng.uniform(-8, 8))), 1)
+            self.call(
+                f"POST {SESSION_ROUTE}/changes",
+                "POST",
+                f"{base}/sessions/{self.session_id}/changes",
+                json={
+                    "parameter_path": "prices.europe.product_1",
+                    "new_value": self.price,
+                    "user_id": f"student{self.index + 1}",
+                },
+            )
+            self.think(SLIDER_STEP_SECONDS)
+
+        decisions = {"prices": {"europe": {"product_1": self.price}}}
+        self.call(
+            f"POST {PROJECT_ROUTE}/rollout",
+            "POST",
+            f"{base}/rollout",
+            json={"plan": [decisions] * 4},
+        )
+
+    def rules_lookup(self) -> None:
+        self.call(
+            f"GET {PROJECT_ROUTE}/rules",
+            "GET",
+            f"{self.urls['knowledge_graph']}/api/v1/projects/{self.project_id}/rules",
+        )
+
+    def coaching_chat(self) -> None:
+        self.call(
+            f"POST {PROJECT_ROUTE}/chat",
+            "POST",
+            f"{self.urls['conversation']}/api/v1/projects/{self.project_id}/chat",
+            json={"message": self.rng.choice(COACHING_QUESTIONS)},
+        )
+
+    def run(self, stop_at: float, weights: Optional[Dict[str, float]] = None) -> None:
+        """
+        Act until the deadline: log in, upload the report, then follow the behaviour mix.
+
+        Args:
+            stop_at: time.monotonic() value at which to stop
+            weights: Behaviour -> relative frequency (defaults to BEHAVIOUR_WEIGHTS)
+        """
+        weights = weights or BEHAVIOUR_WEIGHTS
+        actions = {
+            "slider": self.slider_session,
+            "rules": self.rules_lookup,
+            "chat": self.coaching_chat,
+            "upload": self.upload_report,
+        }
+        names = [name for name in weights if weights[name] > 0]
+
+        if "chat" in names:
+            self.login()
+        if "upload" in names:
+            self.upload_report()
+        while time.monotonic() < stop_at:
+            self.think()
+            if time.monotonic() >= stop_at:
+                break
+            actions[self.rng.choices(names, [weights[name] for name in names])[0]]()
+
+
+def run_load(
+    users: int = MIN_CONCURRENT_USERS,
+    duration_seconds: float = 60.0,
+    ramp_seconds: float = 10.0,
+    urls: Optional[Dict[str, str]] = None,
+    think_scale: float = 1.0,
+    seed: int = 0,
+    weights: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Simulate a cohort against running services.
+
+    Args:
+        users: Concurrent virtual students
+        duration_seconds: Length of the run after the first student starts
+        ramp_seconds: Students start evenly spread over this window
+        urls: Service base URLs overriding SERVICE_URLS
+        think_scale: Multiplier on think times (lower is more aggressive)
+        seed: Random seed for reproducible behaviour
+        weights: Behaviour mix overriding BEHAVIOUR_WEIGHTS
+
+    Returns:
+        Run summary (see LoadReport.summary)
+    """
+    report = LoadReport()
+    started = time.monotonic()
+    stop_at = started + duration_seconds
+
+    def student(index: int) -> None:
+        time.sleep(ramp_seconds * index / max(users, 1))
+        CohortUser(index, report, urls, seed, think_scale).run(stop_at, weights)
+
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix="student") as pool:
+        for future in [pool.submit(student, index) for index in range(users)]:
+            future.result()
+
+    return report.summary(time.monotonic() - started, users)
+
+
+def format_report(summary: Dict[str, Any], failures: List[str]) -> str:
+    """Render a run summary as a text table."""
+    lines = [
+        f"{summary['users']} users for {summary['duration_seconds']} s",
+        "",
+        f"{'endpoint':<62} {'reqs':>6} {'rps':>7} {'err%':>6} " f"{'p50':>7} {'p95':>7} {'p99':>7}",
+    ]
+    rows = list(summary["endpoints"].items()) + [("overall", summary["overall"])]
+    for endpoint, stats in rows:
+        lines.append(
+            f"{endpoint:<62} {stats['requests']:>6} {stats['throughput_rps']:>7.2f} "
+            f"{stats['error_rate'] * 100:>6.2f} {stats['p50_ms']:>7.0f} "
+            f"{stats['p95_ms']:>7.0f} {stats['p99_ms']:>7.0f}"
+        )
+    lines.append("")
+    lines.append("PASS" if not failures else "FAIL")
+    lines.extend(f"  - {failure}" for failure in failures)
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cohort deadline load test")
+    parser.add_argument("--users", type=int, default=MIN_CONCURRENT_USERS)
+    parser.add_argument("--duration", type=float, default=120.0, help="seconds")
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds to start all users")
+    parser.add_argument("--think-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget", type=float, default=RESPONSE_BUDGET_SECONDS)
+    parser.add_argument("--report", help="write the JSON summary to this path")
+    args = parser.parse_args()
+
+    summary = run_load(
+        args.users, args.duration, args.ramp, think_scale=args.think_scale, seed=args.seed
+    )
+    failures = slo_failures(summary, budget_seconds=args.budget)
+    print(format_report(summary, failures))
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({**summary, "failures": failures}, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
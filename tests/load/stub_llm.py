@@ -0,0 +1,95 @@
+"""
+Stub LLM Provider for Load Tests
+
+An OpenAI-compatible /v1/chat/completions endpoint that answers with canned
+coaching text after a realistic, log-normally distributed delay, so coaching
+chats can be load tested without provider cost or rate limits.
+
+Usage:
+    python tests/load/stub_llm.py --port 8080 --median-ms 800
+    # conversation service, without a provider credential
+    LLM_API_BASE=http://localhost:8080 LLM_ALLOW_UNAUTHENTICATED=true python app/main.py
+"""
+
+from datetime import datetime
+import argparse
+import math
+import os
+import random
+import time
+
+from flask import Flask, jsonify, request
+
+app = Flask(__name__)
+app.config["MEDIAN_LATENCY_MS"] = float(os.environ.get("STUB_LLM_MEDIAN_MS", 800))
+app.config["LATENCY_SIGMA"] = float(os.environ.get("STUB_LLM_SIGMA", 0.5))
+app.config["ERROR_RATE"] = float(os.environ.get("STUB_LLM_ERROR_RATE", 0.0))
+
+REPLY = (
+    "Look at how your price change moves contribution per unit before raising "
+    "advertising. In this market demand is price elastic, so check whether the "
+    "extra volume fits your production capacity and cash position next quarter."
+)
+
+
+def _tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    return jsonify({"status": "healthy", "service": "stub-llm"})
+
+
+@app.route("/v1/chat/completions", methods=["POST"])
+def chat_completions():
+    data = request.get_json(silent=True) or {}
+    messages = data.get("messages") or []
+
+    time.sleep(
+        app.config["MEDIAN_LATENCY_MS"]
+        / 1000
+        * math.exp(random.gauss(0, app.config["LATENCY_SIGMA"]))
+    )
+    if random.random() < app.config["ERROR_RATE"]:
+        return jsonify({"error": {"message": "Stub overloaded", "type": "overloaded"}}), 529
+
+    prompt = " ".join(str(message.get("content", "")) for message in messages)
+    return jsonify(
+        {
+            "id": f"chatcmpl-stub-{random.getrandbits(32):08x}",
+            "object": "chat.completion",
+            "created": int(datetime.utcnow().timestamp()),
+            "model": data.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": REPLY},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": _tokens(prompt),
+                "completion_tokens": _tokens(REPLY),
+                "total_tokens": _tokens(prompt) + _tokens(REPLY),
+            },
+        }
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible LLM provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--median-ms", type=float, default=app.config["MEDIAN_LATENCY_MS"])
+    parser.add_argument("--error-rate", type=float, default=app.config["ERROR_RATE"])
+    args = parser.parse_args()
+
+    app.config["MEDIAN_LATENCY_MS"] = args.median_ms
+    app.config["ERROR_RATE"] = args.error_rate
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Tests for the cohort load-test harness.
+
+A short run drives a local stand-in app serving every endpoint the harness
+calls, so the behaviour mix and report can be checked without the stack.
+"""
+
+import pytest
+import threading
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+from cohort_load import LoadReport, format_report, percentile, run_load, slo_failures
+import stub_llm
+
+
+@pytest.fixture
+def stand_in():
+    """Serve every harness endpoint; rule lookups fail as if Neo4j were down."""
+    app = Flask(__name__)
+
+    @app.route('/api/v1/auth/login', methods=['POST'])
+    def login():
+        return jsonify({'access_token': 'token'})
+
+    @app.route('/api/v1/projects/<project_id>/demand-model/observations', methods=['POST'])
+    @app.route('/api/v1/projects/<project_id>/sessions/<session_id>/changes', methods=['POST'])
+    @app.route('/api/v1/projects/<project_id>/rollout', methods=['POST'])
+    def accept(**kwargs):
+        return jsonify({'ok': True})
+
+    @app.route('/api/v1/projects/<project_id>/chat', methods=['POST'])
+    def chat(project_id):
+        assert request.headers['Authorization'] == 'Bearer token'
+        return jsonify({'ai_response': 'ok'})
+
+    @app.route('/api/v1/projects/<project_id>/rules', methods=['GET'])
+    def rules(project_id):
+        return jsonify({'error': 'Knowledge graph service unavailable'}), 503
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    yield {
+        name: url
+        for name in ('calculation', 'knowledge_graph', 'conversation', 'user_management')
+    }
+    server.shutdown()
+
+
+class TestReport:
+    """Test percentiles and SLO checks."""
+
+    def test_nearest_rank_percentile(self):
+        """Test percentiles pick observed values."""
+        values = [float(value) for value in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 95) == 95.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 95) == 0.0
+
+    def test_slo_failures(self):
+        """Test slow or failing endpoints and small cohorts are reported."""
+        report = LoadReport()
+        for _ in range(99):
+            report.record('GET rules', 0.1, True)
+        report.record('GET rules', 5.0, False)
+        for _ in range(10):
+            report.record('POST rollout', 2.5, True)
+        summary = report.summary(elapsed_seconds=10.0, users=50)
+
+        assert summary['endpoints']['GET rules']['throughput_rps'] == 10.0
+        assert summary['overall']['requests'] == 110
+        failures = slo_failures(summary)
+        assert len(failures) == 1 and 'POST rollout' in failures[0]
+        assert len(slo_failures(summary, max_error_rate=0.005)) == 2
+        assert 'target 60+' in slo_failures(summary, min_users=60)[0]
+
+
+class TestRun:
+    """Test a short run against the stand-in."""
+
+    def test_cohort_mix(self, stand_in):
+        """Test every behaviour is exercised and errors are attributed to their endpoint."""
+        summary = run_load(
+            users=6, duration_seconds=1.5, ramp_seconds=0.2, urls=stand_in, think_scale=0.02
+        )
+        endpoints = summary['endpoints']
+
+        assert endpoints['POST /api/v1/auth/login']['requests'] == 6
+        assert endpoints['POST /api/v1/projects/<project_id>/demand-model/observations'][
+            'requests'
+        ] >= 6
+        assert endpoints['POST /api/v1/projects/<project_id>/sessions/<session_id>/changes'][
+            'error_rate'
+        ] == 0.0
+        assert endpoints['GET /api/v1/projects/<project_id>/rules']['error_rate'] == 1.0
+        assert 'FAIL' in format_report(summary, slo_failures(summary, min_users=0))
+
+
+class TestStubLLM:
+    """Test the stub provider speaks the chat completions format."""
+
+    def test_completion_with_usage(self):
+        """Test replies carry a message and token usage."""
+        stub_llm.app.config['MEDIAN_LATENCY_MS'] = 0
+        response = stub_llm.app.test_client().post(
+            '/v1/chat/completions',
+            json={'model': 'stub', 'messages': [{'role': 'user', 'content': 'Hello coach'}]},
+        )
+        body = response.get_json()
+        assert body['choices'][0]['message']['role'] == 'assistant'
+        assert body['usage']['prompt_tokens'] == 3
+        assert body['usage']['completion_tokens'] > 0
@@ -0,0 +1,410 @@
+"""
+Calculation Engine Benchmark Harness
+
+Parity fixtures and timing for the gmc-calculation-service engine.
+
+Parity fixtures are read from overview/gmc_analysis.xlsx by cell reference
+(PARITY_CELLS) and stored in fixtures/gmc_analysis_parity.json, so the suite
+runs without the workbook and a changed workbook shows up as a fixture diff.
+
+Each benchmark mode times a representative workload and is compared against
+the stored baseline (baseline.json): a mode fails when its median latency
+exceeds the baseline by more than the tolerance factor, or when any run
+exceeds the response budget from the development standards.
+
+Usage:
+    python tests/performance/engine_benchmark.py                 # run and compare
+    python tests/performance/engine_benchmark.py --update-baseline
+    python tests/performance/engine_benchmark.py --extract-fixtures
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SERVICE_DIR = os.path.join(ROOT, "services", "gmc-calculation-service")
+sys.path.insert(0, SERVICE_DIR)
+
+from app.quarter_model import SAMPLE_DECISIONS  # noqa: E402
+from app.rollout import RolloutEngine  # noqa: E402
+from app.undo_redo import InMemoryHistoryStore, SessionHistory  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKBOOK_PATH = os.path.join(ROOT, "overview", "gmc_analysis.xlsx")
+FIXTURES_PATH = os.path.join(HERE, "fixtures", "gmc_analysis_parity.json")
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+
+# Development standards: sub-2 second responses
+RESPONSE_BUDGET_SECONDS = 2.0
+
+# Median latency may grow to this multiple of the baseline before failing
+DEFAULT_TOLERANCE = float(os.environ.get("GMC_BENCHMARK_TOLERANCE", 3.0))
+
+# Slowdowns smaller than this are timer noise on sub-millisecond modes
+MIN_REGRESSION_SECONDS = 0.005
+
+BATCH_SCENARIOS = 1000
+ROLLOUT_PLANS = 1000
+ROLLOUT_QUARTERS = 8
+
+# Fixture name -> sheet and cell ranges (rows of cells) read from the workbook
+PARITY_CELLS: Dict[str, Tuple[str, Dict[str, str]]] = {
+    "hired_transport": (
+        "Hired Transport",
+        {"deliveries": "D21:F23", "costs": "W27:W29", "total_cost": "W30"},
+    ),
+    "investment_performance": (
+        "Investment Performance",
+        {
+            "share_issue": "D21:I21",
+            "share_price": "D22:I22",
+            "issue_value": "D23:I23",
+            "share_capital": "D25:I25",
+            "market_valuation": "D26:I26",
+            "dividend_paid": "D29:I29",
+            "investment_performance": "D31:I31",
+        },
+    ),
+    "receipts": (
+        "Receipts & Receivables",
+        {
+            "sales": "M21:O23",
+            "opening_receivables": "Q11",
+            "receipts_in_quarter": "S21:S23",
+            "receipts": "Q26",
+            "receivables": "Q27",
+        },
+    ),
+    "payments": (
+        "Payments & Payables",
+        {
+            "costs": "V7:V20",
+            "opening_payables": "Z2",
+            "payments": "W24",
+            "payables": "W25",
+            "due_next_quarter": "X21",
+            "due_quarter_after": "Z21",
+        },
+    ),
+    "balance_sheet": (
+        "Receipts & Receivables",
+        {
+            "machine_value": "E7",
+            "receivables": "E14",
+            "cash": "E15",
+            "payables": "E21",
+            "share_capital": "Investment Performance!E3",
+            "retained_earnings": "Investment Performance!E5",
+            "share_price": "Investment Performance!L5",
+        },
+    ),
+    # The quarter behind the sample report: its decisions, opening balances,
+    # income statement and cash flow statement
+    "quarter": (
+        "Cost of Production",
+        {
+            "prices": "AE72:AG74",
+            "deliveries": "Y71:AA73",
+            "assembly_minutes": "Y51:AA51",
+            "machines": "P5",
+            "assembly_workers": "AQ57",
+            "wage_rate": "P9",
+            "opening_receivables": "Receipts & Receivables!Q11",
+            "opening_payables": "Payments & Payables!Z2",
+            "opening_retained_earnings": "E30",
+            "sales_units": "Receipts & Receivables!M15:O17",
+            "revenue": "E4",
+            "opening_inventory": "E6",
+            "materials_purchased": "E8",
+            "closing_inventory": "E14",
+            "cost_of_sales": "E15",
+            "administrative_expenses": "E17",
+            "insurance_receipts": "E18",
+            "depreciation": "E19",
+            "finance_income": "E21",
+            "profit": "E25",
+            "operating_cash_flow": "Receipts & Receivables!J9",
+            "investing_cash_flow": "Receipts & Receivables!J15",
+            "financing_cash_flow": "Receipts & Receivables!J23",
+            "closing_cash": "Receipts & Receivables!E15",
+        },
+    ),
+}
+
+# Payments & Payables rows V7:V20 -> cash_flow.PAYMENT_CATEGORIES index
+PAYMENT_ROW_CATEGORIES = (
+    3,  # advertising
+    1,  # internet service provider
+    1,  # agents and distributors
+    4,  # guarantee servicing
+    3,  # web-site development
+    0,  # personnel
+    4,  # machine maintenance
+    4,  # purchasing and warehousing
+    4,  # business intelligence
+    1,  # insurance premiums
+    1,  # overheads
+    2,  # materials and components
+    4,  # transport
+    4,  # interest
+)
+
+
+def _read_range(workbook, sheet: str, reference: str) -> Any:
+    if "!" in reference:
+        sheet, reference = reference.split("!")
+    cells = workbook[sheet][reference]
+    if not isinstance(cells, tuple):
+        return cells.value
+    rows = [[cell.value for cell in row] for row in cells]
+    if len(rows) == 1:
+        return rows[0]
+    if all(len(row) == 1 for row in rows):
+        return [row[0] for row in rows]
+    return rows
+
+
+def extract_fixtures(workbook_path: str = WORKBOOK_PATH) -> Dict[str, Any]:
+    """
+    Read the parity fixtures from the analysis workbook.
+
+    Args:
+        workbook_path: Path to gmc_analysis.xlsx
+
+    Returns:
+        Fixture name -> field -> cached cell values
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(workbook_path, data_only=True, read_only=True)
+    try:
+        return {
+            name: {
+                field: _read_range(workbook, sheet, reference)
+                for field, reference in ranges.items()
+            }
+            for name, (sheet, ranges) in PARITY_CELLS.items()
+        }
+    finally:
+        workbook.close()
+
+
+def load_fixtures() -> Dict[str, Any]:
+    """Load the stored parity fixtures."""
+    with open(FIXTURES_PATH) as f:
+        return json.load(f)
+
+
+def load_baseline() -> Dict[str, Any]:
+    """Load the stored benchmark baseline ({} before the first recording)."""
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def measure(
+    workload: Callable[[], Any], items: int = 1, repeat: int = 20, warmup: int = 2
+) -> Dict[str, float]:
+    """
+    Time a workload.
+
+    Args:
+        workload: Callable run once per measurement
+        items: Scenario-quarters evaluated per call, for throughput
+        repeat: Timed runs
+        warmup: Untimed runs first (caches, lazy imports)
+
+    Returns:
+        Median, p95 and max latency in seconds and throughput per second
+    """
+    for _ in range(warmup):
+        workload()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        workload()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        "runs": repeat,
+        "items": items,
+        "median_seconds": median,
+        "p95_seconds": timings[min(int(round(0.95 * (repeat - 1))), repeat - 1)],
+        "max_seconds": timings[-1],
+        "throughput_per_second": items / median if median > 0 else float("inf"),
+    }
+
+
+def _price_plans(count: int, quarters: int) -> List[List[Dict[str, Any]]]:
+    prices = np.linspace(250, 450, count)
+    return [[{"prices": {"europe": {"product_1": float(price)}}}] * quarters for price in prices]
+
+
+def benchmark_workloads() -> Dict[str, Tuple[Callable[[], Any], int]]:
+    """
+    Workloads per benchmark mode.
+
+    Returns:
+        Mode -> (workload callable, scenario-quarters per call)
+    """
+    engine = RolloutEngine({}, SAMPLE_DECISIONS)
+    batch_plans = _price_plans(BATCH_SCENARIOS, 1)
+    rollout_plans = _price_plans(ROLLOUT_PLANS, ROLLOUT_QUARTERS)
+
+    history = SessionHistory(InMemoryHistoryStore(), SAMPLE_DECISIONS)
+    counter = iter(range(10**9))
+
+    def calculate(parameters: Dict[str, Any]) -> Dict[str, Any]:
+        results = engine.evaluate([[parameters]])
+        return {"investment_performance": float(results["investment_performance"][0, -1])}
+
+    def incremental() -> None:
+        # One parameter edit, then results for the new state (never seen before)
+        history.record_change("prices.europe.product_1", 300 + next(counter) * 0.01)
+        history.results_at(history.position, calculate)
+
+    return {
+        "single": (lambda: engine.evaluate([[{}]]), 1),
+        "batch": (lambda: engine.evaluate(batch_plans), BATCH_SCENARIOS),
+        "incremental": (incremental, 1),
+        "rollout": (lambda: engine.evaluate(rollout_plans), ROLLOUT_PLANS * ROLLOUT_QUARTERS),
+    }
+
+
+def run_benchmarks(repeat: int = 20) -> Dict[str, Dict[str, float]]:
+    """Measure every benchmark mode."""
+    return {
+        mode: measure(workload, items, repeat=repeat)
+        for mode, (workload, items) in benchmark_workloads().items()
+    }
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """
+    Find regressions against the stored baseline and the response budget.
+
+    Args:
+        results: Output of run_benchmarks
+        baseline: Stored baseline with a "modes" entry per mode
+        tolerance: Allowed median latency as a multiple of the baseline
+
+    Returns:
+        Regression messages (empty when every mode is within limits)
+    """
+    failures = []
+    recorded = baseline.get("modes", {})
+    for mode, measured in results.items():
+        if measured["max_seconds"] > RESPONSE_BUDGET_SECONDS:
+            failures.append(
+                f"{mode}: slowest run {measured['max_seconds']:.3f}s exceeds the "
+                f"{RESPONSE_BUDGET_SECONDS:.1f}s response budget"
+            )
+        if mode not in recorded:
+            continue
+        limit = max(
+            recorded[mode]["median_seconds"] * tolerance,
+            recorded[mode]["median_seconds"] + MIN_REGRESSION_SECONDS,
+        )
+        if measured["median_seconds"] > limit:
+            failures.append(
+                f"{mode}: median {measured['median_seconds'] * 1000:.2f}ms is "
+                f"{measured['median_seconds'] / recorded[mode]['median_seconds']:.1f}x the "
+                f"baseline {recorded[mode]['median_seconds'] * 1000:.2f}ms "
+                f"(tolerance {tolerance:.1f}x)"
+            )
+    return failures
+
+
+def write_baseline(results: Dict[str, Dict[str, float]], path: str = BASELINE_PATH) -> None:
+    """Store measured results as the new baseline."""
+    baseline = {
+        "recorded_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "modes": {
+            mode: {
+                key: round(value, 6) if isinstance(value, float) else value
+                for key, value in measured.items()
+            }
+            for mode, measured in results.items()
+        },
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def format_results(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any]) -> str:
+    """Render results as a table with the change against the baseline."""
+    recorded = baseline.get("modes", {})
+    lines = [f"{'mode':<12}{'median ms':>12}{'p95 ms':>10}{'items/s':>14}{'vs baseline':>14}"]
+    for mode, measured in results.items():
+        change = ""
+        if mode in recorded:
+            ratio = measured["median_seconds"] / recorded[mode]["median_seconds"]
+            change = f"{ratio:.2f}x"
+        lines.append(
+            f"{mode:<12}{measured['median_seconds'] * 1000:>12.2f}"
+            f"{measured['p95_seconds'] * 1000:>10.2f}"
+            f"{measured['throughput_per_second']:>14.0f}{change:>14}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the GMC calculation engine")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per mode")
+    parser.add_argument("--update-baseline", action="store_true", help="Store results as baseline")
+    parser.add_argument(
+        "--extract-fixtures", action="store_true", help="Re-read parity fixtures from the workbook"
+    )
+    parser.add_argument("--output", help="Write measured results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.extract_fixtures:
+        with open(FIXTURES_PATH, "w") as f:
+            json.dump(extract_fixtures(), f, indent=2)
+            f.write("\n")
+        print(f"Parity fixtures written to {FIXTURES_PATH}")
+        return 0
+
+    baseline = load_baseline()
+    results = run_benchmarks(args.repeat)
+    print(format_results(results, baseline))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        write_baseline(results)
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    failures = compare_to_baseline(results, baseline)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Excel Parity and Performance Benchmarks for the Calculation Engine
+
+Parity tests check the engine against values cached in
+overview/gmc_analysis.xlsx, up to a whole quarter replayed from the
+workbook's decisions and opening balances; benchmark tests time the single,
+batch, incremental and rollout modes against the stored baseline.
+
+Refresh the baseline after an intended performance change with:
+    python tests/performance/engine_benchmark.py --update-baseline
+"""
+
+import pytest
+import os
+import numpy as np
+
+import engine_benchmark
+from engine_benchmark import (
+    PAYMENT_ROW_CATEGORIES,
+    RESPONSE_BUDGET_SECONDS,
+    WORKBOOK_PATH,
+    compare_to_baseline,
+    extract_fixtures,
+    load_baseline,
+    load_fixtures,
+    measure,
+    run_benchmarks,
+)
+from app.cash_flow import PAYMENT_CATEGORIES, cash_flow_schedule
+from app.quarter_model import (
+    EXCHANGE_RATE,
+    SAMPLE_DECISIONS,
+    SPOT_PRICE_USD_PER_1000,
+    STATE_DTYPE,
+    SUBCONTRACT_COST,
+    investment_performance,
+    simulate_quarter,
+    state_from_report,
+    transport_cost,
+)
+from app.rollout import RolloutEngine
+from app.transport import allocate_transport
+
+pytestmark = pytest.mark.performance
+
+
+@pytest.fixture(scope='module')
+def fixtures():
+    """Parity fixtures extracted from the analysis workbook."""
+    return load_fixtures()
+
+
+def workbook_engine(fixtures):
+    """Rollout engine starting from the opening balances of the workbook quarter."""
+    sheet = fixtures['quarter']
+    opening_cash = sheet['closing_cash'] - (
+        sheet['operating_cash_flow'] + sheet['investing_cash_flow'] + sheet['financing_cash_flow']
+    )
+    # Opening product stock covers the sales beyond the quarter's deliveries;
+    # the rest of the opening inventory is materials
+    spot_price = SPOT_PRICE_USD_PER_1000 * EXCHANGE_RATE / 1000.0
+    product_stock = np.maximum(np.array(sheet['sales_units']) - np.array(sheet['deliveries']), 0)
+    product_value = product_stock.sum(axis=0) @ SUBCONTRACT_COST
+    report = {
+        'machines': sheet['machines'],
+        'assembly_workers': sheet['assembly_workers'],
+        'assembly_wage_rate': sheet['wage_rate'] * 100,
+        'product_stock': product_stock.tolist(),
+        'materials_stock': (sheet['opening_inventory'] - product_value) / spot_price,
+        'cash': opening_cash,
+        'receivables': sheet['opening_receivables'],
+        'payables': sheet['opening_payables'],
+        'retained_earnings': sheet['opening_retained_earnings'],
+        'machine_value': fixtures['balance_sheet']['machine_value'] + sheet['depreciation'],
+        'sales_units': sheet['sales_units'],
+        'prices': sheet['prices'],
+    }
+    decisions = {field: sheet[field] for field in ('prices', 'deliveries', 'assembly_minutes')}
+    return RolloutEngine(report, decisions)
+
+
+def workbook_plan(fixtures):
+    """The workbook quarter's one-off decisions, as a single one-quarter plan."""
+    spot_price = SPOT_PRICE_USD_PER_1000 * EXCHANGE_RATE / 1000.0
+    return [[{'materials_to_buy': fixtures['quarter']['materials_purchased'] / spot_price / 1000.0}]]
+
+
+@pytest.fixture(scope='module')
+def workbook_quarter(fixtures):
+    """Rollout outcomes of the workbook quarter's decisions."""
+    return workbook_engine(fixtures).evaluate(workbook_plan(fixtures))
+
+
+@pytest.fixture(scope='module')
+def results():
+    """Benchmark results for every mode, measured once."""
+    return run_benchmarks()
+
+
+class TestFixtures:
+    """Test the stored fixtures still reflect the workbook."""
+
+    def test_fixtures_match_workbook(self, fixtures):
+        """Test re-extracting the workbook reproduces the stored fixtures."""
+        pytest.importorskip('openpyxl')
+        if not os.path.exists(WORKBOOK_PATH):
+            pytest.skip('analysis workbook not available')
+        assert extract_fixtures() == fixtures
+
+
+class TestExcelParity:
+    """Test engine results equal the workbook's cached values."""
+
+    def test_hired_transport(self, fixtures):
+        """Test container costs per market and in total (Hired Transport W27:W30)."""
+        sheet = fixtures['hired_transport']
+        deliveries = np.array(sheet['deliveries'], dtype=float)
+        assert transport_cost(deliveries).tolist() == sheet['costs']
+        assert allocate_transport(deliveries)['total_cost'] == sheet['total_cost']
+
+    def test_investment_performance(self, fixtures):
+        """Test valuation and investment performance by quarter (row 31)."""
+        sheet = fixtures['investment_performance']
+        state = np.zeros(len(sheet['share_price']), dtype=STATE_DTYPE)
+        state['share_capital'] = sheet['share_capital']
+        state['share_price'] = sheet['share_price']
+        state['issue_value_total'] = np.cumsum(sheet['issue_value'])
+        state['dividends_total'] = np.cumsum(sheet['dividend_paid'])
+
+        valuation = state['share_capital'] * state['share_price'] / 100.0
+        assert valuation == pytest.approx(sheet['market_valuation'])
+        assert investment_performance(state) == pytest.approx(sheet['investment_performance'])
+
+    def test_receipts(self, fixtures):
+        """Test receipts and receivables by market credit terms (Q26:Q27)."""
+        sheet = fixtures['receipts']
+        sales = np.array(sheet['sales'], dtype=float).sum(axis=1)[None, None, :]
+        schedule = cash_flow_schedule(
+            sales,
+            np.zeros((1, 1, len(PAYMENT_CATEGORIES))),
+            np.zeros(1),
+            opening_receivables=np.array([sheet['opening_receivables']], dtype=float),
+        )
+        assert schedule['receipts_by_market'][0, 0] == pytest.approx(sheet['receipts_in_quarter'])
+        assert schedule['receipts'][0, 0] == pytest.approx(sheet['receipts'])
+        assert schedule['receivables'][0, 0] == pytest.approx(sheet['receivables'])
+
+    def test_payments(self, fixtures):
+        """Test trade payments and payables by cost category terms (W24:W25)."""
+        sheet = fixtures['payments']
+        costs = np.zeros((1, 1, len(PAYMENT_CATEGORIES)))
+        np.add.at(costs[0, 0], list(PAYMENT_ROW_CATEGORIES), np.array(sheet['costs'], dtype=float))
+        schedule = cash_flow_schedule(
+            np.zeros((1, 1, 3)),
+            costs,
+            np.zeros(1),
+            opening_payables=np.array([sheet['opening_payables']], dtype=float),
+        )
+        assert schedule['payments'][0, 0] == pytest.approx(sheet['payments'])
+        assert schedule['payables'][0, 0] == pytest.approx(sheet['payables'])
+        assert schedule['payables'][0, 0] == pytest.approx(sheet['due_quarter_after'])
+
+    def test_sample_report_state(self, fixtures):
+        """Test the sample report defaults match the workbook balance sheet."""
+        sheet = fixtures['balance_sheet']
+        state = state_from_report({})
+        for field, value in sheet.items():
+            assert float(state[field]) == pytest.approx(value), field
+
+    def test_quarter_end_to_end(self, fixtures, workbook_quarter):
+        """Test the income statement of the workbook quarter (E4:E25).
+
+        Insurance receipts and interest on the current account are not modelled,
+        so they are taken out of the expected profit. Profit is a small difference
+        of large totals and is held to 1% of revenue. Cash is covered line by line
+        by test_receipts and test_payments: the workbook's own receipt and payment
+        schedules do not reconcile with its cash flow statement.
+        """
+        sheet = fixtures['quarter']
+        engine = workbook_engine(fixtures)
+        _, outcomes = simulate_quarter(
+            np.repeat(engine.base_state[None], 1),
+            engine.compile_plans(workbook_plan(fixtures))[:, 0],
+            engine.reference,
+        )
+        for name in ('revenue', 'cost_of_sales', 'administrative_expenses'):
+            assert outcomes[name][0] == pytest.approx(sheet[name], rel=1e-2), name
+        expected_profit = sheet['profit'] - sheet['insurance_receipts'] - sheet['finance_income']
+        assert outcomes['profit'][0] == pytest.approx(expected_profit, abs=0.01 * sheet['revenue'])
+        assert workbook_quarter['profit'][0, 0] == pytest.approx(outcomes['profit'][0])
+
+    def test_quarter_replay(self, fixtures, workbook_quarter):
+        """Test the rollout engine replays the workbook quarter like simulate_quarter does."""
+        sheet = fixtures['quarter']
+        engine = workbook_engine(fixtures)
+        state = np.repeat(engine.base_state[None], 1)
+        new_state, outcomes = simulate_quarter(
+            state, engine.compile_plans(workbook_plan(fixtures))[:, 0], engine.reference
+        )
+        assert not outcomes['adjusted'].any()
+        for name in ('revenue', 'profit', 'receipts', 'payments', 'cash'):
+            assert workbook_quarter[name][0, 0] == pytest.approx(outcomes[name][0]), name
+        assert engine.base_state['machine_value'] - new_state['machine_value'][0] == (
+            pytest.approx(sheet['depreciation'], abs=0.5)
+        )
+
+    def test_base_investment_performance(self, fixtures):
+        """Test the rollout engine starts from the workbook's first quarter."""
+        engine = RolloutEngine({}, SAMPLE_DECISIONS)
+        expected = fixtures['investment_performance']['investment_performance'][0]
+        assert engine.base_investment_performance() == pytest.approx(expected)
+
+
+class TestBaselineComparison:
+    """Test regression detection against the stored baseline."""
+
+    def test_measure_reports_latency_and_throughput(self):
+        """Test a measurement records latency percentiles and throughput."""
+        measured = measure(lambda: sum(range(1000)), items=10, repeat=5, warmup=0)
+        assert measured['runs'] == 5
+        assert 0 < measured['median_seconds'] <= measured['p95_seconds'] <= measured['max_seconds']
+        assert measured['throughput_per_second'] == pytest.approx(10 / measured['median_seconds'])
+
+    def test_slowdown_beyond_tolerance_fails(self):
+        """Test a mode slower than the tolerance allows is reported."""
+        baseline = {'modes': {'batch': {'median_seconds': 0.01}}}
+        measured = {'batch': {'median_seconds': 0.05, 'max_seconds': 0.06}}
+        failures = compare_to_baseline(measured, baseline, tolerance=3.0)
+        assert len(failures) == 1 and failures[0].startswith('batch')
+
+    def test_timer_noise_is_ignored(self):
+        """Test sub-millisecond modes are not failed for microsecond slowdowns."""
+        baseline = {'modes': {'single': {'median_seconds': 0.0005}}}
+        measured = {'single': {'median_seconds': 0.002, 'max_seconds': 0.003}}
+        assert compare_to_baseline(measured, baseline, tolerance=3.0) == []
+
+    def test_response_budget_enforced_without_baseline(self):
+        """Test runs over the response budget fail even for new modes."""
+        slow = RESPONSE_BUDGET_SECONDS + 1
+        measured = {'new_mode': {'median_seconds': slow, 'max_seconds': slow}}
+        assert compare_to_baseline(measured, {}) != []
+
+
+class TestEngineBenchmarks:
+    """Time each engine mode against the stored baseline."""
+
+    @pytest.mark.parametrize('mode', ['single', 'batch', 'incremental', 'rollout'])
+    def test_mode_within_baseline(self, results, mode):
+        """Test the mode's latency is within the baseline tolerance and response budget."""
+        failures = compare_to_baseline({mode: results[mode]}, load_baseline())
+        assert not failures, '\n'.join(failures)
+
+    def test_baseline_covers_every_mode(self, results):
+        """Test every benchmarked mode has a stored baseline."""
+        assert set(results) <= set(load_baseline().get('modes', {}))
+
+    def test_rollout_throughput_beats_single_calls(self, results):
+        """Test batched rollout evaluates scenario-quarters faster than one at a time."""
+        assert (
+            results['rollout']['throughput_per_second']
+            > 10 * results['single']['throughput_per_second']
+        )
+        assert engine_benchmark.ROLLOUT_PLANS * engine_benchmark.ROLLOUT_QUARTERS == (
+            results['rollout']['items']
+        )
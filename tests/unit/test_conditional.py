@@ -0,0 +1,130 @@
+"""
+Unit tests for version-derived ETags and conditional GET handling.
+"""
+
+import pytest
+import sys
+import os
+from flask import Flask, jsonify
+
+# Add repository root to path to import shared libraries
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.python.responses import ResponseMiddleware, conditional_get
+
+
+@pytest.fixture
+def versions():
+    """Create per-project rule versions changed by the test."""
+    return {}
+
+
+@pytest.fixture
+def app(versions):
+    """Create a Flask app with public rules and private session lists."""
+    app = Flask(__name__)
+    ResponseMiddleware(app)
+    app.calls = []
+
+    def rules_version(project_id):
+        return versions.get(project_id, 0)
+
+    def failing_version(project_id):
+        raise ConnectionError('version store unavailable')
+
+    @app.route('/projects/<project_id>/rules', methods=['GET', 'POST'])
+    @conditional_get(rules_version, max_age=60, public=True)
+    def rules(project_id):
+        app.calls.append(project_id)
+        return jsonify({'project_id': project_id, 'rules': []})
+
+    @app.route('/projects/<project_id>/sessions')
+    @conditional_get(lambda project_id: 'v1')
+    def sessions(project_id):
+        app.calls.append(project_id)
+        if project_id == 'missing':
+            return jsonify({'error': 'Sessions unavailable'}), 503
+        return jsonify({'sessions': []})
+
+    @app.route('/projects/<project_id>/reports')
+    @conditional_get(failing_version)
+    def reports(project_id):
+        app.calls.append(project_id)
+        return jsonify({'reports': []})
+
+    return app
+
+
+class TestConditionalGet:
+    """Test ETag validation short-circuits the view."""
+
+    def test_matching_etag_skips_view(self, app):
+        """Test a matching If-None-Match returns 304 without running the query."""
+        client = app.test_client()
+        first = client.get('/projects/p1/rules')
+        etag = first.headers['ETag']
+        assert first.status_code == 200
+        assert etag.startswith('W/"')
+
+        second = client.get('/projects/p1/rules', headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.data == b''
+        assert second.headers['ETag'] == etag
+        assert app.calls == ['p1']
+
+    def test_version_change_changes_etag(self, app, versions):
+        """Test a new resource version invalidates earlier ETags."""
+        client = app.test_client()
+        etag = client.get('/projects/p1/rules').headers['ETag']
+        versions['p1'] = 1
+
+        response = client.get('/projects/p1/rules', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_etag_varies_by_project_query_and_format(self, app):
+        """Test representations of different requests never share an ETag."""
+        client = app.test_client()
+        etags = {
+            client.get('/projects/p1/rules').headers['ETag'],
+            client.get('/projects/p2/rules').headers['ETag'],
+            client.get('/projects/p1/rules?limit=5').headers['ETag'],
+        }
+        assert len(etags) == 3
+
+    def test_strong_and_wildcard_validators_match(self, app):
+        """Test strong forms of the weak tag and '*' both revalidate."""
+        client = app.test_client()
+        etag = client.get('/projects/p1/rules').headers['ETag']
+        strong = etag[2:]
+        assert client.get('/projects/p1/rules', headers={'If-None-Match': strong}).status_code == 304
+        assert client.get('/projects/p1/rules', headers={'If-None-Match': '*'}).status_code == 304
+        assert client.get(
+            '/projects/p1/rules', headers={'If-None-Match': f'"other", {etag}'}
+        ).status_code == 304
+
+    def test_cache_control(self, app):
+        """Test public resources get max-age and private ones always revalidate."""
+        client = app.test_client()
+        rules = client.get('/projects/p1/rules')
+        assert rules.cache_control.public
+        assert rules.cache_control.max_age == 60
+
+        sessions = client.get('/projects/p1/sessions')
+        assert sessions.cache_control.private
+        assert sessions.cache_control.no_cache
+        assert 'Accept' in sessions.headers['Vary']
+
+    def test_errors_and_writes_are_not_validated(self, app):
+        """Test error responses and non-GET requests carry no ETag."""
+        client = app.test_client()
+        assert 'ETag' not in client.get('/projects/missing/sessions').headers
+        assert 'ETag' not in client.post('/projects/p1/rules').headers
+
+    def test_version_lookup_failure_serves_view(self, app):
+        """Test a failing version lookup falls back to the full response."""
+        response = app.test_client().get('/projects/p1/reports', headers={'If-None-Match': '*'})
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+        assert app.calls == ['p1']
+
@@ -0,0 +1,135 @@
+"""
+Unit tests for the shared database engine factory.
+
+Covers pool sizing, PostgreSQL connection options, pool metrics and the
+cached health monitor (probed against SQLite files).
+"""
+
+import pytest
+import sys
+import os
+import time
+from sqlalchemy import create_engine, text
+
+# Add repository root to path to import shared libraries
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.python.database import DatabaseHealthMonitor, PoolMetrics, build_engine_options
+from shared.python.database.engine_factory import calculate_pool_size
+
+
+class TestPoolSizing:
+    """Test pool sizing from the serving configuration."""
+
+    def test_pool_matches_threads_within_budget(self):
+        """Each worker gets one pooled connection per thread."""
+        sizing = calculate_pool_size(workers=4, threads=4, connection_budget=40)
+        assert sizing == {'pool_size': 4, 'max_overflow': 4}
+
+    def test_budget_caps_connections_per_pod(self):
+        """Workers never exceed the per-pod connection budget together."""
+        sizing = calculate_pool_size(workers=8, threads=8, connection_budget=40)
+        assert 8 * (sizing['pool_size'] + sizing['max_overflow']) <= 40
+
+    def test_reads_worker_count_from_environment(self, monkeypatch):
+        """WEB_CONCURRENCY and WEB_THREADS drive the defaults."""
+        monkeypatch.setenv('WEB_CONCURRENCY', '10')
+        monkeypatch.setenv('WEB_THREADS', '2')
+        monkeypatch.setenv('DB_CONNECTION_BUDGET', '20')
+        assert calculate_pool_size() == {'pool_size': 2, 'max_overflow': 0}
+
+
+class TestEngineOptions:
+    """Test engine option generation."""
+
+    def test_postgres_options_include_server_timeouts(self):
+        """Statement and idle-in-transaction timeouts are set per connection."""
+        options = build_engine_options(
+            'postgresql://localhost/gmc', workers=2, threads=4,
+            statement_timeout_ms=5000, application_name='gmc-calculation-service'
+        )
+        assert options['pool_pre_ping'] is True
+        assert options['pool_size'] == 4
+        assert '-c statement_timeout=5000' in options['connect_args']['options']
+        assert 'idle_in_transaction_session_timeout' in options['connect_args']['options']
+        assert options['connect_args']['application_name'] == 'gmc-calculation-service'
+
+    def test_sqlite_options_are_accepted_by_create_engine(self):
+        """Non-PostgreSQL URLs get only portable options."""
+        options = build_engine_options('sqlite://')
+        assert 'pool_size' not in options
+        assert 'connect_args' not in options
+        create_engine('sqlite://', **options).dispose()
+
+
+class TestPoolMetrics:
+    """Test pool metrics collection."""
+
+    def test_counts_checkouts_and_connections(self):
+        """Checkouts and new connections are counted from pool events."""
+        engine = create_engine('sqlite://')
+        metrics = PoolMetrics.attach(engine)
+        assert PoolMetrics.attach(engine) is metrics
+
+        for _ in range(3):
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+
+        snapshot = metrics.snapshot(engine)
+        assert snapshot['checkouts'] == 3
+        assert snapshot['connections_opened'] >= 1
+        assert snapshot['checkout_seconds_total'] >= 0
+
+
+class TestDatabaseHealthMonitor:
+    """Test the cached database health monitor."""
+
+    def test_reports_healthy_database(self, tmp_path):
+        """A reachable database is reported healthy."""
+        monitor = DatabaseHealthMonitor(f"sqlite:///{tmp_path / 'health.db'}")
+        status = monitor.status()
+        assert status['healthy'] is True
+        assert status['stale'] is False
+        assert status['checked_at'] is not None
+
+    def test_status_is_served_from_cache(self, tmp_path, monkeypatch):
+        """Only the first status call probes the database."""
+        monitor = DatabaseHealthMonitor(f"sqlite:///{tmp_path / 'health.db'}")
+        probes = []
+        original = monitor.check_now
+        monkeypatch.setattr(monitor, 'check_now', lambda: probes.append(1) or original())
+
+        for _ in range(5):
+            monitor.status()
+
+        assert len(probes) == 1
+
+    def test_unreachable_database_is_unhealthy(self, tmp_path):
+        """Probe failures are reported with their error."""
+        monitor = DatabaseHealthMonitor(f"sqlite:///{tmp_path / 'missing' / 'health.db'}")
+        status = monitor.status()
+        assert status['healthy'] is False
+        assert status['error']
+
+    def test_stale_state_is_unhealthy(self, tmp_path):
+        """A result older than the staleness limit is not trusted."""
+        monitor = DatabaseHealthMonitor(
+            f"sqlite:///{tmp_path / 'health.db'}", interval_seconds=1, stale_after_seconds=0.01
+        )
+        monitor.check_now()
+        time.sleep(0.05)
+        status = monitor.status()
+        assert status['stale'] is True
+        assert status['healthy'] is False
+
+    def test_background_thread_refreshes_state(self, tmp_path):
+        """The background thread keeps the cached state current."""
+        monitor = DatabaseHealthMonitor(
+            f"sqlite:///{tmp_path / 'health.db'}", interval_seconds=0.01
+        ).start()
+        try:
+            first = monitor.status()['checked_at']
+            time.sleep(0.1)
+            assert monitor.status()['checked_at'] != first
+        finally:
+            monitor.stop()
@@ -0,0 +1,218 @@
+"""
+Unit tests for the incremental project isolation auditor.
+
+Uses an in-memory SQLite database with the audited tables so the
+high-water-mark logic can be verified without PostgreSQL. Transaction ids
+are set explicitly and the oldest in-flight transaction is simulated.
+"""
+
+import pytest
+import sys
+import os
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+# Add repository root to path to import shared libraries
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.python.database import ProjectScopedQueries
+from shared.python.database.isolation_auditor import IncrementalIsolationAuditor
+
+SCHEMA = [
+    """CREATE TABLE analysis_sessions (
+        session_id TEXT PRIMARY KEY, project_id TEXT NOT NULL,
+        created_txid INTEGER NOT NULL, updated_txid INTEGER NOT NULL)""",
+    """CREATE TABLE gmc_reports (
+        report_id TEXT PRIMARY KEY, project_id TEXT NOT NULL, created_txid INTEGER NOT NULL)""",
+    """CREATE TABLE parameter_changes (
+        change_id TEXT PRIMARY KEY, project_id TEXT NOT NULL, session_id TEXT NOT NULL,
+        created_txid INTEGER NOT NULL)""",
+    """CREATE TABLE isolation_audit_watermarks (
+        table_name TEXT PRIMARY KEY, high_water_mark INTEGER NOT NULL,
+        rows_scanned INTEGER NOT NULL DEFAULT 0, updated_at TIMESTAMP)""",
+    """CREATE TABLE project_isolation_verifications (
+        project_id TEXT PRIMARY KEY, session_count INTEGER NOT NULL DEFAULT 0,
+        report_count INTEGER NOT NULL DEFAULT 0, parameter_change_count INTEGER NOT NULL DEFAULT 0,
+        contamination_count INTEGER NOT NULL DEFAULT 0,
+        isolation_status TEXT NOT NULL DEFAULT 'verified', last_contamination_at TIMESTAMP,
+        last_verified_at TIMESTAMP NOT NULL)""",
+    """CREATE TABLE isolation_contaminated_sessions (
+        project_id TEXT NOT NULL, session_id TEXT NOT NULL, detected_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (project_id, session_id))""",
+]
+
+
+class Snapshot:
+    """Oldest transaction id still in flight, as txid_snapshot_xmin reports it."""
+
+    xmin = 100
+
+
+@pytest.fixture
+def db_session():
+    """Create an in-memory database with the audited tables."""
+    engine = create_engine('sqlite://')
+
+    @event.listens_for(engine, 'connect')
+    def register_txid_functions(connection, record):
+        connection.create_function('txid_current_snapshot', 0, lambda: Snapshot.xmin)
+        connection.create_function('txid_snapshot_xmin', 1, lambda snapshot: snapshot)
+
+    Snapshot.xmin = 100
+    session = sessionmaker(bind=engine)()
+    for statement in SCHEMA:
+        session.execute(text(statement))
+    session.commit()
+    yield session
+    session.close()
+
+
+def insert(db_session, table, **values):
+    """Insert a row into one of the audited tables."""
+    columns = ', '.join(values)
+    params = ', '.join(f':{column}' for column in values)
+    db_session.execute(text(f'INSERT INTO {table} ({columns}) VALUES ({params})'), values)
+    db_session.commit()
+
+
+def insert_session(db_session, session_id, project_id, txid):
+    """Insert an analysis session created by transaction txid."""
+    insert(db_session, 'analysis_sessions', session_id=session_id, project_id=project_id,
+           created_txid=txid, updated_txid=txid)
+
+
+class TestIncrementalIsolationAuditor:
+    """Test high-water-mark isolation auditing."""
+
+    def test_initial_run_counts_all_rows(self, db_session):
+        """Test the first run scans existing rows and stores project results."""
+        insert_session(db_session, 's1', 'pa', 10)
+        insert(db_session, 'gmc_reports', report_id='r1', project_id='pa', created_txid=10)
+        insert(db_session, 'parameter_changes', change_id='c1', project_id='pa',
+               session_id='s1', created_txid=11)
+
+        summary = IncrementalIsolationAuditor().run_once(db_session)
+
+        assert summary['rows_scanned'] == {
+            'analysis_sessions': 1, 'gmc_reports': 1, 'parameter_changes': 1
+        }
+        assert summary['high_water_mark'] == 100
+        result = ProjectScopedQueries(db_session, 'pa').validate_project_data_isolation()
+        assert result['isolation_status'] == 'verified'
+        assert result['record_counts'] == {'sessions': 1, 'reports': 1, 'parameter_changes': 1}
+        assert result['contamination_detected'] is False
+        assert result['verified_through'] is not None
+
+    def test_subsequent_run_only_scans_new_rows(self, db_session):
+        """Test rows below the high-water mark are not scanned again."""
+        auditor = IncrementalIsolationAuditor()
+        insert_session(db_session, 's1', 'pa', 10)
+        auditor.run_once(db_session)
+
+        insert(db_session, 'parameter_changes', change_id='c1', project_id='pa',
+               session_id='s1', created_txid=120)
+        Snapshot.xmin = 200
+        summary = auditor.run_once(db_session)
+
+        assert summary['rows_scanned'] == {
+            'analysis_sessions': 0, 'gmc_reports': 0, 'parameter_changes': 1
+        }
+        result = ProjectScopedQueries(db_session, 'pa').validate_project_data_isolation()
+        assert result['record_counts']['sessions'] == 1
+        assert result['record_counts']['parameter_changes'] == 1
+
+    def test_long_transaction_audited_after_commit(self, db_session):
+        """Test rows of a transaction still in flight are audited once it commits."""
+        auditor = IncrementalIsolationAuditor()
+        insert_session(db_session, 's1', 'pa', 10)
+        auditor.run_once(db_session)
+
+        # Transaction 110 started first but commits after transaction 150
+        insert(db_session, 'parameter_changes', change_id='c2', project_id='pa',
+               session_id='s1', created_txid=150)
+        Snapshot.xmin = 110
+        assert auditor.run_once(db_session)['rows_scanned']['parameter_changes'] == 0
+
+        insert(db_session, 'parameter_changes', change_id='c1', project_id='pb',
+               session_id='s1', created_txid=110)
+        Snapshot.xmin = 200
+        summary = auditor.run_once(db_session)
+        assert summary['rows_scanned']['parameter_changes'] == 2
+        assert summary['contamination_detected'] == 1
+
+        Snapshot.xmin = 300
+        assert auditor.run_once(db_session)['rows_scanned']['parameter_changes'] == 0
+        result = ProjectScopedQueries(db_session, 'pa').validate_project_data_isolation()
+        assert result['record_counts']['parameter_changes'] == 1
+
+    def test_cross_project_change_detected(self, db_session):
+        """Test a change referencing another project's session is flagged."""
+        insert_session(db_session, 's1', 'pa', 10)
+        insert(db_session, 'parameter_changes', change_id='c1', project_id='pb',
+               session_id='s1', created_txid=11)
+
+        summary = IncrementalIsolationAuditor().run_once(db_session)
+
+        assert summary['contamination_detected'] == 1
+        result = ProjectScopedQueries(db_session, 'pb').validate_project_data_isolation()
+        assert result['isolation_status'] == 'contaminated'
+        assert result['contamination_detected'] is True
+
+    def test_session_moved_between_projects_detected(self, db_session):
+        """Test updating a session's project flags its earlier changes."""
+        auditor = IncrementalIsolationAuditor()
+        insert_session(db_session, 's1', 'pa', 10)
+        insert(db_session, 'parameter_changes', change_id='c1', project_id='pa',
+               session_id='s1', created_txid=11)
+        auditor.run_once(db_session)
+
+        db_session.execute(text(
+            "UPDATE analysis_sessions SET project_id = 'pb', updated_txid = 150"
+        ))
+        db_session.commit()
+        Snapshot.xmin = 200
+        summary = auditor.run_once(db_session)
+
+        assert summary['contamination_detected'] == 1
+        result = ProjectScopedQueries(db_session, 'pa').validate_project_data_isolation()
+        assert result['isolation_status'] == 'contaminated'
+
+    def test_repeated_session_updates_counted_once(self, db_session):
+        """Test a contaminated session is not recounted each time it is updated."""
+        auditor = IncrementalIsolationAuditor()
+        insert_session(db_session, 's1', 'pa', 10)
+        insert(db_session, 'parameter_changes', change_id='c1', project_id='pb',
+               session_id='s1', created_txid=11)
+        insert(db_session, 'parameter_changes', change_id='c2', project_id='pb',
+               session_id='s1', created_txid=12)
+        assert auditor.run_once(db_session)['contamination_detected'] == 1
+
+        for txid in (150, 250):
+            db_session.execute(text(
+                "UPDATE analysis_sessions SET updated_txid = :txid"
+            ), {'txid': txid})
+            db_session.commit()
+            Snapshot.xmin = txid + 50
+            summary = auditor.run_once(db_session)
+            assert summary['contamination_detected'] == 0
+            # Updated, not new: the session count is unchanged
+            assert summary['rows_scanned']['analysis_sessions'] == 0
+
+        result = ProjectScopedQueries(db_session, 'pb').validate_project_data_isolation()
+        assert result['contamination_count'] == 1
+        assert result['isolation_status'] == 'contaminated'
+
+    def test_unaudited_project_pending(self, db_session):
+        """Test projects without stored results report pending verification."""
+        result = ProjectScopedQueries(db_session, 'unknown').validate_project_data_isolation()
+        assert result['isolation_status'] == 'pending_verification'
+
+    def test_reset_forces_full_rescan(self, db_session):
+        """Test reset clears results and watermarks."""
+        auditor = IncrementalIsolationAuditor()
+        insert(db_session, 'gmc_reports', report_id='r1', project_id='pa', created_txid=10)
+        auditor.run_once(db_session)
+        auditor.reset(db_session)
+
+        summary = auditor.run_once(db_session)
+        assert summary['rows_scanned']['gmc_reports'] == 1
@@ -0,0 +1,175 @@
+"""
+Unit tests for the shared background job queue and worker.
+
+The in-memory queue stands in for Redis; the worker runs real spawned
+processes, so handlers are module-level functions.
+"""
+
+import pytest
+import sys
+import os
+import time
+
+# Add repository root to path to import shared libraries
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.python.jobs import (
+    CANCELLED,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    InMemoryJobQueue,
+    JobWorker,
+    input_hash,
+)
+
+PROJECT_ID = 'project-a'
+
+
+def add_numbers(parameters, context):
+    """Sum the numbers, reporting progress after each one."""
+    total = 0
+    for index, value in enumerate(parameters['numbers']):
+        total += value
+        context.progress((index + 1) / len(parameters['numbers']))
+    return {'total': total}
+
+
+def count_slowly(parameters, context):
+    """Count until cancelled."""
+    for step in range(parameters['steps']):
+        context.progress(step / parameters['steps'], f'step {step}')
+        time.sleep(0.05)
+    return {'steps': parameters['steps']}
+
+
+def fail(parameters, context):
+    raise ValueError('bad input')
+
+
+def wait_for(job_queue, job_id, statuses, timeout=30):
+    """Poll until the job reaches one of the statuses."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get(PROJECT_ID, job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'job stayed {job["status"]}')
+
+
+class TestJobQueue:
+    """Test submission, de-duplication, cancellation and expiry."""
+
+    def test_identical_submissions_reuse_the_job(self):
+        """Test the same inputs return the queued job instead of a new one."""
+        job_queue = InMemoryJobQueue()
+        first, first_duplicate = job_queue.submit('sum', PROJECT_ID, {'numbers': [1, 2]})
+        second, second_duplicate = job_queue.submit('sum', PROJECT_ID, {'numbers': [1, 2]})
+        other, _ = job_queue.submit('sum', 'project-b', {'numbers': [1, 2]})
+        assert not first_duplicate and second_duplicate
+        assert second['job_id'] == first['job_id'] != other['job_id']
+
+    def test_input_hash_ignores_key_order(self):
+        """Test parameter order does not change the input hash."""
+        assert input_hash('sum', PROJECT_ID, {'a': 1, 'b': 2}) == input_hash(
+            'sum', PROJECT_ID, {'b': 2, 'a': 1}
+        )
+
+    def test_jobs_are_project_scoped(self):
+        """Test another project cannot read or cancel a job."""
+        job_queue = InMemoryJobQueue()
+        job, _ = job_queue.submit('sum', PROJECT_ID, {})
+        assert job_queue.get('project-b', job['job_id']) is None
+        assert job_queue.cancel('project-b', job['job_id']) is None
+
+    def test_cancelled_queued_job_is_not_claimed(self):
+        """Test cancelling a queued job finishes it and skips it when claiming."""
+        job_queue = InMemoryJobQueue()
+        job, _ = job_queue.submit('sum', PROJECT_ID, {'numbers': [1]})
+        assert job_queue.cancel(PROJECT_ID, job['job_id'])['status'] == CANCELLED
+        assert job_queue.claim(timeout=0) is None
+
+        resubmitted, duplicate = job_queue.submit('sum', PROJECT_ID, {'numbers': [1]})
+        assert not duplicate and resubmitted['status'] == QUEUED
+
+    def test_claim_marks_running(self):
+        """Test claiming returns the parameters and marks the job running."""
+        job_queue = InMemoryJobQueue()
+        job, _ = job_queue.submit('sum', PROJECT_ID, {'numbers': [3]})
+        claimed, parameters = job_queue.claim(timeout=0)
+        assert claimed['job_id'] == job['job_id'] and claimed['status'] == RUNNING
+        assert parameters == {'numbers': [3]}
+
+    def test_stale_running_job_is_not_reused(self):
+        """Test a running job whose lease lapsed is failed and a new job is queued."""
+        job_queue = InMemoryJobQueue(lease_seconds=0.05)
+        job, _ = job_queue.submit('sum', PROJECT_ID, {'numbers': [1]})
+        job_queue.claim(timeout=0)
+        time.sleep(0.1)
+        resubmitted, duplicate = job_queue.submit('sum', PROJECT_ID, {'numbers': [1]})
+        assert not duplicate and resubmitted['job_id'] != job['job_id']
+        assert job_queue.get(PROJECT_ID, job['job_id'])['status'] == FAILED
+
+    def test_heartbeat_renews_the_lease(self):
+        """Test a running job with a live worker keeps serving duplicates."""
+        job_queue = InMemoryJobQueue(lease_seconds=0.1)
+        job, _ = job_queue.submit('sum', PROJECT_ID, {'numbers': [1]})
+        job_queue.claim(timeout=0)
+        for _ in range(3):
+            time.sleep(0.05)
+            job_queue.heartbeat(PROJECT_ID, job['job_id'])
+        duplicate_job, duplicate = job_queue.submit('sum', PROJECT_ID, {'numbers': [1]})
+        assert duplicate and duplicate_job['job_id'] == job['job_id']
+
+    def test_results_expire(self):
+        """Test finished jobs and their results are dropped after the TTL."""
+        job_queue = InMemoryJobQueue(result_ttl_seconds=0.05)
+        job, _ = job_queue.submit('sum', PROJECT_ID, {})
+        job_queue.claim(timeout=0)
+        job_queue.finish(PROJECT_ID, job['job_id'], SUCCEEDED, result={'total': 0})
+        assert job_queue.result(PROJECT_ID, job['job_id']) == {'total': 0}
+        time.sleep(0.1)
+        assert job_queue.get(PROJECT_ID, job['job_id']) is None
+        assert not job_queue.submit('sum', PROJECT_ID, {})[1]
+
+
+class TestJobWorker:
+    """Test jobs run in worker processes with progress and cancellation."""
+
+    @pytest.fixture
+    def job_queue(self):
+        job_queue = InMemoryJobQueue()
+        worker = JobWorker(
+            job_queue,
+            {'sum': add_numbers, 'count': count_slowly, 'fail': fail},
+            processes=2,
+            poll_seconds=0.05,
+        ).start()
+        yield job_queue
+        worker.stop()
+
+    def test_job_runs_to_completion(self, job_queue):
+        """Test a job's result is stored and its progress reaches 1."""
+        job, _ = job_queue.submit('sum', PROJECT_ID, {'numbers': [1, 2, 3]})
+        finished = wait_for(job_queue, job['job_id'], (SUCCEEDED, FAILED))
+        assert finished['status'] == SUCCEEDED and finished['progress'] == 1.0
+        assert job_queue.result(PROJECT_ID, job['job_id']) == {'total': 6}
+
+    def test_running_job_is_cancelled(self, job_queue):
+        """Test a running job stops at its next progress report."""
+        job, _ = job_queue.submit('count', PROJECT_ID, {'steps': 400})
+        running = wait_for(job_queue, job['job_id'], (RUNNING,))
+        assert running['status'] == RUNNING
+        job_queue.cancel(PROJECT_ID, job['job_id'])
+        finished = wait_for(job_queue, job['job_id'], (SUCCEEDED, FAILED, CANCELLED))
+        assert finished['status'] == CANCELLED
+        assert job_queue.result(PROJECT_ID, job['job_id']) is None
+
+    def test_failures_and_unknown_types_are_reported(self, job_queue):
+        """Test handler errors and unregistered types fail the job."""
+        failing, _ = job_queue.submit('fail', PROJECT_ID, {})
+        unknown, _ = job_queue.submit('unknown', PROJECT_ID, {})
+        assert wait_for(job_queue, failing['job_id'], (FAILED,))['error'] == 'bad input'
+        assert 'Unknown job type' in wait_for(job_queue, unknown['job_id'], (FAILED,))['error']
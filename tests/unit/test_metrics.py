@@ -0,0 +1,141 @@
+"""
+Unit tests for the shared Prometheus metrics surface.
+
+Metrics live in the default registry, so tests compare sample values before
+and after each action rather than absolute counts.
+"""
+
+import pytest
+import sys
+import os
+from flask import Flask, jsonify
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+# Add repository root to path to import shared libraries
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.python.observability import (
+    MeteredCache,
+    MetricsMiddleware,
+    instrument_sqlalchemy,
+    track_llm_call,
+    track_query,
+)
+
+SERVICE = 'test-service'
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, {'service': SERVICE, **labels}) or 0.0
+
+
+@pytest.fixture
+def client():
+    """Create a Flask app with the metrics middleware."""
+    app = Flask(__name__)
+    MetricsMiddleware(app, SERVICE)
+
+    @app.route('/api/v1/projects/<project_id>/calculate')
+    def calculate(project_id):
+        return jsonify({'project_id': project_id})
+
+    @app.route('/fail')
+    def fail():
+        raise RuntimeError('boom')
+
+    return app.test_client()
+
+
+class TestHttpMetrics:
+    """Test per-route latency and in-flight request metrics."""
+
+    def test_latency_is_labelled_by_route_template(self, client):
+        """Test requests for different projects share the route's histogram."""
+        labels = {
+            'method': 'GET',
+            'route': '/api/v1/projects/<project_id>/calculate',
+            'status': '200',
+        }
+        before = sample('gmc_http_request_duration_seconds_count', **labels)
+        client.get('/api/v1/projects/a/calculate')
+        client.get('/api/v1/projects/b/calculate')
+        assert sample('gmc_http_request_duration_seconds_count', **labels) == before + 2
+
+    def test_in_flight_returns_to_zero_after_errors(self, client):
+        """Test failing requests are recorded and do not leak in-flight counts."""
+        before = sample(
+            'gmc_http_request_duration_seconds_count', method='GET', route='/fail', status='500'
+        )
+        assert client.get('/fail').status_code == 500
+        assert client.get('/missing').status_code == 404
+        assert sample('gmc_http_requests_in_flight') == 0
+        assert sample(
+            'gmc_http_request_duration_seconds_count', method='GET', route='/fail', status='500'
+        ) == before + 1
+        assert sample(
+            'gmc_http_request_duration_seconds_count',
+            method='GET', route='unmatched', status='404',
+        ) >= 1
+
+    def test_metrics_endpoint(self, client):
+        """Test /metrics serves the exposition format."""
+        client.get('/api/v1/projects/a/calculate')
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        assert b'gmc_http_request_duration_seconds_bucket' in response.data
+
+
+class TestDependencyMetrics:
+    """Test query, cache and LLM metrics."""
+
+    def test_sql_statements_are_timed(self, client):
+        """Test SQLAlchemy statements are timed by operation."""
+        engine = instrument_sqlalchemy(create_engine('sqlite://'), 'sqlite')
+        instrument_sqlalchemy(engine, 'sqlite')  # idempotent
+        labels = {'database': 'sqlite', 'operation': 'SELECT'}
+        before = sample('gmc_db_query_duration_seconds_count', **labels)
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+        assert sample('gmc_db_query_duration_seconds_count', **labels) == before + 1
+
+    def test_driver_queries_are_timed(self, client):
+        """Test queries without event hooks are timed even when they raise."""
+        labels = {'database': 'neo4j', 'operation': 'project_rules'}
+        before = sample('gmc_db_query_duration_seconds_count', **labels)
+        with pytest.raises(ValueError):
+            with track_query('neo4j', 'project_rules'):
+                raise ValueError('unavailable')
+        assert sample('gmc_db_query_duration_seconds_count', **labels) == before + 1
+
+    def test_cache_hits_and_misses(self, client):
+        """Test metered caches count hits and misses."""
+
+        class DictCache(dict):
+            def put(self, key, value):
+                self[key] = value
+
+        cache = MeteredCache(DictCache(), 'results')
+        hits = sample('gmc_cache_requests_total', cache='results', result='hit')
+        misses = sample('gmc_cache_requests_total', cache='results', result='miss')
+        assert cache.get('a') is None
+        cache.put('a', {'value': 1})
+        assert cache.get('a') == {'value': 1}
+        assert sample('gmc_cache_requests_total', cache='results', result='hit') == hits + 1
+        assert sample('gmc_cache_requests_total', cache='results', result='miss') == misses + 1
+
+    def test_llm_calls_count_tokens_and_outcomes(self, client):
+        """Test LLM calls record tokens on success and errors on failure."""
+        labels = {'provider': 'anthropic', 'model': 'm'}
+        tokens = sample('gmc_llm_tokens_total', kind='completion', **labels)
+        errors = sample('gmc_llm_requests_total', outcome='error', **labels)
+
+        with track_llm_call('anthropic', 'm') as usage:
+            usage.update(prompt_tokens=120, completion_tokens=30)
+        with pytest.raises(TimeoutError):
+            with track_llm_call('anthropic', 'm'):
+                raise TimeoutError
+
+        assert sample('gmc_llm_tokens_total', kind='completion', **labels) == tokens + 30
+        assert sample('gmc_llm_requests_total', outcome='error', **labels) == errors + 1
@@ -0,0 +1,135 @@
+"""
+Unit tests for pre-fork serving: worker sizing, master preparation and server hooks.
+"""
+
+import gc
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+# Add repository root to path to import shared libraries
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.python.serving import prefork
+from shared.python.serving import (
+    available_cpus,
+    configure_master,
+    cpu_quota,
+    post_fork,
+    pre_fork,
+    prepare_metrics_directory,
+    worker_count,
+)
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    """Point the cgroup readers at files under a temporary directory."""
+    paths = {
+        'CGROUP_V2_CPU_MAX': tmp_path / 'cpu.max',
+        'CGROUP_V1_CPU_QUOTA': tmp_path / 'cpu.cfs_quota_us',
+        'CGROUP_V1_CPU_PERIOD': tmp_path / 'cpu.cfs_period_us',
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(prefork, name, str(path))
+    return SimpleNamespace(**{name.lower(): path for name, path in paths.items()})
+
+
+@pytest.fixture
+def environment(monkeypatch):
+    """Isolate the serving environment variables."""
+    names = ('WEB_CONCURRENCY', 'WEB_THREADS', 'PROMETHEUS_MULTIPROC_DIR')
+    for name in names + prefork.NATIVE_THREAD_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+class TestWorkerSizing:
+    """Test worker counts follow the container's CPU quota."""
+
+    def test_cgroup_v2_quota(self, cgroup):
+        """Test cpu.max limits are read as CPUs."""
+        cgroup.cgroup_v2_cpu_max.write_text('150000 100000\n')
+        assert cpu_quota() == 1.5
+
+        cgroup.cgroup_v2_cpu_max.write_text('max 100000\n')
+        assert cpu_quota() is None
+
+    def test_cgroup_v1_quota(self, cgroup):
+        """Test CFS quotas are read when cgroup v2 is absent, and -1 means unlimited."""
+        cgroup.cgroup_v1_cpu_quota.write_text('200000')
+        cgroup.cgroup_v1_cpu_period.write_text('100000')
+        assert cpu_quota() == 2.0
+
+        cgroup.cgroup_v1_cpu_quota.write_text('-1')
+        assert cpu_quota() is None
+
+    def test_quota_caps_available_cpus(self, cgroup, monkeypatch):
+        """Test a pod limited to half a CPU on a large node gets one worker, not one per core."""
+        monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: set(range(64)), raising=False)
+        cgroup.cgroup_v2_cpu_max.write_text('50000 100000')
+        assert available_cpus() == 0.5
+        assert worker_count(workers_per_cpu=1) == 1
+        assert worker_count(workers_per_cpu=8) == 4
+
+    def test_web_concurrency_wins(self, cgroup, environment):
+        """Test an explicit WEB_CONCURRENCY overrides the computed count."""
+        environment.setattr(os, 'sched_getaffinity', lambda pid: set(range(64)), raising=False)
+        cgroup.cgroup_v2_cpu_max.write_text('400000 100000')
+        assert worker_count(workers_per_cpu=2, max_workers=6) == 6
+        environment.setenv('WEB_CONCURRENCY', '3')
+        assert worker_count(workers_per_cpu=2) == 3
+
+
+class TestMaster:
+    """Test the master is prepared before the app is imported."""
+
+    def test_configure_master(self, environment, tmp_path):
+        """Test pool sizing variables, native thread pools and GC are set up for forking."""
+        environment.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+        environment.setenv('OPENBLAS_NUM_THREADS', '2')
+        try:
+            configure_master('test-service', workers=4, threads=8)
+            assert not gc.isenabled()
+        finally:
+            gc.enable()
+
+        assert os.environ['WEB_CONCURRENCY'] == '4'
+        assert os.environ['WEB_THREADS'] == '8'
+        assert os.environ['OMP_NUM_THREADS'] == '1'
+        assert os.environ['OPENBLAS_NUM_THREADS'] == '2'
+
+    def test_metrics_directory_cleared(self, environment, tmp_path):
+        """Test samples left by a previous master are removed."""
+        (tmp_path / 'counter_123.db').write_bytes(b'stale')
+        (tmp_path / 'README').write_text('kept')
+        environment.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+
+        assert prepare_metrics_directory('test-service') == str(tmp_path)
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['README']
+
+    def test_metrics_directory_default(self, environment):
+        """Test a per-service directory is chosen when none is configured."""
+        directory = prepare_metrics_directory('test-service')
+        assert directory.endswith('prometheus-test-service')
+        assert os.environ['PROMETHEUS_MULTIPROC_DIR'] == directory
+        assert os.path.isdir(directory)
+        os.rmdir(directory)
+
+
+class TestHooks:
+    """Test the fork hooks share preloaded objects and re-enable collection in workers."""
+
+    def test_freeze_before_fork(self):
+        """Test objects alive at fork time move to the permanent generation."""
+        preloaded = [{'table': i} for i in range(100)]
+        try:
+            gc.disable()
+            pre_fork(None, None)
+            assert gc.get_freeze_count() >= len(preloaded)
+            post_fork(None, None)
+            assert gc.isenabled()
+        finally:
+            gc.unfreeze()
+            gc.enable()
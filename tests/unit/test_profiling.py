@@ -0,0 +1,119 @@
+"""
+Unit tests for the on-demand request profiler.
+"""
+
+import pytest
+import sys
+import os
+import time
+from collections import Counter
+from flask import Flask, jsonify
+
+# Add repository root to path to import shared libraries
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.python.observability import InMemoryProfileStore, ProfilingMiddleware, flame_graph
+from shared.python.observability.profiling import StackSampler
+
+ADMIN = {'X-Admin-Token': 'secret'}
+ROUTE = '/api/v1/projects/<project_id>/rollout'
+
+
+def slow_rollout():
+    """Spin long enough to be sampled several times."""
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture
+def store():
+    return InMemoryProfileStore()
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    """Create a Flask app with the profiling middleware."""
+    monkeypatch.setenv('PROFILING_ADMIN_TOKEN', 'secret')
+    app = Flask(__name__)
+    ProfilingMiddleware(app, 'test-service', store, StackSampler(interval_seconds=0.001))
+
+    @app.route('/api/v1/projects/<project_id>/rollout')
+    def rollout(project_id):
+        slow_rollout()
+        return jsonify({'project_id': project_id})
+
+    return app.test_client()
+
+
+class TestProfiling:
+    """Test forced and sampled profiling tagged by route and project."""
+
+    def test_requests_are_not_profiled_by_default(self, client, store):
+        """Test nothing is recorded while the sample percentage is zero."""
+        response = client.get('/api/v1/projects/a/rollout')
+        assert 'X-Profiled' not in response.headers
+        assert store.summaries() == []
+
+    def test_header_forces_profile_for_admins_only(self, client, store):
+        """Test X-Profile is honoured with the admin token and ignored without it."""
+        client.get('/api/v1/projects/a/rollout', headers={'X-Profile': '1'})
+        assert store.summaries() == []
+
+        response = client.get('/api/v1/projects/a/rollout', headers={'X-Profile': '1', **ADMIN})
+        assert response.headers['X-Profiled'] == '1'
+        (summary,) = store.summaries()
+        assert (summary['route'], summary['project_id'], summary['requests']) == (ROUTE, 'a', 1)
+        assert summary['samples'] > 0
+        assert any('slow_rollout' in stack for stack in store.stacks(ROUTE, 'a'))
+
+    def test_sample_percent_toggle(self, client, store):
+        """Test the admin endpoint sets the sampled share of requests."""
+        assert client.put('/admin/profiling', json={'sample_percent': 100}).status_code == 403
+        assert client.put(
+            '/admin/profiling', json={'sample_percent': 150}, headers=ADMIN
+        ).status_code == 400
+        response = client.put('/admin/profiling', json={'sample_percent': 100}, headers=ADMIN)
+        assert response.get_json()['sample_percent'] == 100
+
+        client.get('/api/v1/projects/a/rollout')
+        client.get('/api/v1/projects/b/rollout')
+        projects = {summary['project_id'] for summary in store.summaries()}
+        assert projects == {'a', 'b'}
+
+    def test_flamegraph_endpoint_filters_by_project(self, client, store):
+        """Test flame-graph data is aggregated for the requested project only."""
+        store.add(ROUTE, 'a', Counter({'main;calculate': 3}), 0.1)
+        store.add(ROUTE, 'b', Counter({'main;export': 5}), 0.1)
+
+        response = client.get('/admin/profiling/flamegraph?project_id=a', headers=ADMIN)
+        data = response.get_json()
+        assert data['samples'] == 3
+        assert data['flamegraph']['children'][0]['children'][0]['name'] == 'calculate'
+
+        folded = client.get('/admin/profiling/flamegraph?format=folded', headers=ADMIN)
+        assert folded.data.decode().splitlines() == ['main;export 5', 'main;calculate 3']
+
+        client.delete('/admin/profiling/flamegraph', headers=ADMIN)
+        assert store.summaries() == []
+
+    def test_disabled_without_admin_token(self, store, monkeypatch):
+        """Test the admin surface is refused when no token is configured."""
+        monkeypatch.delenv('PROFILING_ADMIN_TOKEN', raising=False)
+        app = Flask(__name__)
+        ProfilingMiddleware(app, 'test-service', store)
+        response = app.test_client().get('/admin/profiling', headers={'X-Admin-Token': ''})
+        assert response.status_code == 403
+        assert response.get_json()['error'] == 'Profiling disabled'
+
+
+class TestFlameGraph:
+    """Test folded stacks are merged into a tree."""
+
+    def test_tree_values(self):
+        """Test each node counts the samples of its whole subtree."""
+        tree = flame_graph(Counter({'a;b': 2, 'a;c': 1, 'd': 1}))
+        assert tree['value'] == 4
+        a, d = tree['children']
+        assert (a['name'], a['value'], d['value']) == ('a', 3, 1)
+        assert [child['name'] for child in a['children']] == ['b', 'c']
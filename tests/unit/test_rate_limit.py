@@ -0,0 +1,253 @@
+"""
+Unit tests for GCRA rate limiting: policies, the Redis script, local leases and middleware.
+"""
+
+import pytest
+import sys
+import os
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager, create_access_token
+
+# Add repository root to path to import shared libraries
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.python.ratelimit import (
+    ENDPOINT,
+    PROJECT,
+    InMemoryRateLimitStore,
+    RateLimitMiddleware,
+    RateLimitPolicy,
+    RateLimiter,
+    RedisRateLimitStore,
+    request_cost,
+)
+from shared.python.ratelimit.limiter import Charge
+
+USER_POLICY = RateLimitPolicy('user', limit=10, period=60)
+PROJECT_POLICY = RateLimitPolicy('project', limit=100, period=60, scope=PROJECT)
+
+
+class CountingStore:
+    """Wraps a store and counts round trips."""
+
+    def __init__(self, store):
+        self.store = store
+        self.calls = 0
+
+    def acquire(self, requests):
+        self.calls += 1
+        return self.store.acquire(requests)
+
+
+class FailingStore:
+    """Store whose backend is unreachable."""
+
+    def acquire(self, requests):
+        raise ConnectionError('redis unavailable')
+
+
+def charge(policy=USER_POLICY, key='rate_limit:u1', cost=1):
+    return Charge(policy, key, f'svc:{policy.name}', cost)
+
+
+@pytest.fixture
+def redis_store():
+    """Create a Redis store backed by fakeredis with Lua support."""
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    return RedisRateLimitStore(fakeredis.FakeRedis())
+
+
+class TestPolicies:
+    """Test policy matching and cost weights."""
+
+    def test_endpoint_patterns_and_costs(self):
+        """Test fnmatch patterns select policies and the first matching cost wins."""
+        heavy = RateLimitPolicy('compute', limit=50, endpoints=('*/rollout', '*/jobs'))
+        assert heavy.applies_to('/api/v1/projects/<project_id>/rollout')
+        assert not heavy.applies_to('/api/v1/projects/<project_id>/jobs/<job_id>')
+        assert USER_POLICY.applies_to('/anything')
+
+        costs = {'*/rollout': 10, '*': 2}
+        assert request_cost('/api/v1/projects/<project_id>/rollout', costs) == 10
+        assert request_cost('/api/v1/info', costs) == 2
+        assert request_cost('/api/v1/info') == 1
+
+    def test_invalid_policies_rejected(self):
+        """Test unknown scopes and empty budgets raise."""
+        with pytest.raises(ValueError):
+            RateLimitPolicy('bad', limit=10, scope='team')
+        with pytest.raises(ValueError):
+            RateLimitPolicy('bad', limit=0)
+
+
+class TestStores:
+    """Test the Lua script and in-memory store enforce the same budgets."""
+
+    @pytest.mark.parametrize('store_name', ['memory', 'redis'])
+    def test_budget_then_retry_after(self, store_name, request):
+        """Test a burst up to the limit passes and the next request waits one interval."""
+        store = (
+            InMemoryRateLimitStore() if store_name == 'memory'
+            else request.getfixturevalue('redis_store')
+        )
+        results = [store.acquire([(charge(), 1, 0)]) for _ in range(11)]
+        assert all(r.allowed for r in results[:10])
+        assert not results[10].allowed
+        assert results[10].denied_index == 0
+        assert 5.5 < results[10].retry_after <= 6.0
+
+    def test_all_or_nothing(self, redis_store):
+        """Test a request denied by one budget is not charged against the others."""
+        tight = RateLimitPolicy('tight', limit=1, period=60)
+        assert redis_store.acquire([(charge(tight), 1, 0)]).allowed
+
+        requests = [(charge(PROJECT_POLICY, 'project:p1:rate_limit'), 1, 0), (charge(tight), 1, 0)]
+        result = redis_store.acquire(requests)
+        assert not result.allowed
+        assert result.denied_index == 1
+        assert redis_store.redis.hget('project:p1:rate_limit', 'svc:project') is None
+
+    def test_cost_weights_and_leases(self, redis_store):
+        """Test costs draw down budgets and leases never exceed what is available."""
+        assert redis_store.acquire([(charge(cost=4), 1, 0)]).granted == [4]
+        assert redis_store.acquire([(charge(), 50, 0)]).granted == [6]
+        assert not redis_store.acquire([(charge(), 1, 0)]).allowed
+
+    def test_refunds_restore_budget(self, redis_store):
+        """Test unused leased units handed back can be spent again."""
+        assert redis_store.acquire([(charge(), 10, 0)]).granted == [10]
+        assert not redis_store.acquire([(charge(), 1, 0)]).allowed
+        assert redis_store.acquire([(charge(), 1, 5)]).allowed
+
+    def test_keys_expire(self, redis_store):
+        """Test budget hashes expire once fully restored."""
+        redis_store.acquire([(charge(), 1, 0)])
+        assert 0 < redis_store.redis.pttl('rate_limit:u1') <= 6000
+
+
+class TestRateLimiter:
+    """Test the local pre-check avoids round trips."""
+
+    def test_leases_batch_round_trips(self, redis_store):
+        """Test a busy budget is mostly decided locally without over-admitting."""
+        store = CountingStore(redis_store)
+        limiter = RateLimiter(store)
+        policy = RateLimitPolicy('user', limit=600, period=60)
+
+        allowed = sum(limiter.check([charge(policy)]).allowed for _ in range(700))
+        assert allowed == 600
+        assert store.calls < 50
+
+    def test_denials_are_cached(self):
+        """Test requests to a closed budget are denied without the store."""
+        store = CountingStore(InMemoryRateLimitStore())
+        limiter = RateLimiter(store, lease_seconds=0)
+        for _ in range(10):
+            assert limiter.check([charge()]).allowed
+        denied = limiter.check([charge()])
+        assert not denied.allowed
+        assert denied.policy is USER_POLICY
+        calls = store.calls
+
+        again = limiter.check([charge()])
+        assert not again.allowed
+        assert again.source == 'local'
+        assert store.calls == calls
+
+    def test_store_errors_fail_open(self):
+        """Test an unreachable store allows traffic."""
+        assert RateLimiter(FailingStore()).check([charge()]).allowed
+
+
+@pytest.fixture
+def app():
+    """Create a Flask app with tight limits on a compute endpoint."""
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = 'test-secret'
+    JWTManager(app)
+    policies = (
+        RateLimitPolicy('user', limit=100, period=60),
+        RateLimitPolicy('user-compute', limit=20, period=60, endpoints=('*/rollout',)),
+        RateLimitPolicy('compute', limit=30, period=60, scope=ENDPOINT, endpoints=('*/rollout',)),
+    )
+    RateLimitMiddleware(
+        app,
+        'test-service',
+        RateLimiter(InMemoryRateLimitStore(), lease_seconds=0),
+        policies=policies,
+        costs={'*/rollout': 10},
+    )
+
+    @app.route('/projects/<project_id>/rollout', methods=['POST'])
+    def rollout(project_id):
+        return jsonify({'project_id': project_id})
+
+    @app.route('/health')
+    def health():
+        return jsonify({'status': 'healthy'})
+
+    return app
+
+
+def auth(app, user):
+    with app.app_context():
+        return {'Authorization': f'Bearer {create_access_token(identity=user)}'}
+
+
+class TestRateLimitMiddleware:
+    """Test requests are budgeted per user with cost weights."""
+
+    def test_weighted_calls_limited_per_user(self, app):
+        """Test two rollouts spend a user's compute budget, and other users are unaffected."""
+        client = app.test_client()
+        alice = auth(app, 'alice')
+        assert client.post('/projects/p1/rollout', headers=alice).status_code == 200
+        assert client.post('/projects/p1/rollout', headers=alice).status_code == 200
+
+        limited = client.post('/projects/p1/rollout', headers=alice)
+        assert limited.status_code == 429
+        assert limited.headers['X-RateLimit-Policy'] == 'user-compute'
+        assert int(limited.headers['Retry-After']) >= 1
+        assert limited.get_json()['error'] == 'Rate limit exceeded'
+
+        assert client.post('/projects/p1/rollout', headers=auth(app, 'bob')).status_code == 200
+
+    def test_endpoint_budget_shared_by_all_users(self, app):
+        """Test the service-wide budget caps many users together."""
+        client = app.test_client()
+        statuses = [
+            client.post('/projects/p1/rollout', headers=auth(app, f'user{i}')).status_code
+            for i in range(4)
+        ]
+        assert statuses == [200, 200, 200, 429]
+
+    def test_anonymous_clients_by_address(self, app):
+        """Test requests without a token are budgeted per client address."""
+        client = app.test_client()
+        first = {'X-Forwarded-For': '10.0.0.1'}
+        for _ in range(2):
+            assert client.post('/projects/p1/rollout', headers=first).status_code == 200
+        assert client.post('/projects/p1/rollout', headers=first).status_code == 429
+        assert client.post(
+            '/projects/p1/rollout', headers={'X-Forwarded-For': '10.0.0.2'}
+        ).status_code == 200
+
+    def test_spoofed_forwarded_for_ignored(self, app):
+        """Test clients cannot rotate budgets by prepending their own X-Forwarded-For entries."""
+        client = app.test_client()
+        statuses = [
+            client.post(
+                '/projects/p1/rollout', headers={'X-Forwarded-For': f'192.0.2.{i}, 10.0.0.1'}
+            ).status_code
+            for i in range(3)
+        ]
+        assert statuses == [200, 200, 429]
+
+    def test_health_checks_exempt_and_disable_switch(self, app):
+        """Test health checks are never limited and limits can be switched off."""
+        client = app.test_client()
+        assert all(client.get('/health').status_code == 200 for _ in range(150))
+
+        app.config['RATE_LIMIT_ENABLED'] = False
+        assert all(client.post('/projects/p1/rollout').status_code == 200 for _ in range(5))
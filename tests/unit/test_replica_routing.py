@@ -0,0 +1,144 @@
+"""
+Unit tests for read-replica routing in ProjectScopedQueries.
+
+Two in-memory SQLite engines stand in for the primary and a replica so the
+chosen bind can be observed from the data each one returns.
+"""
+
+import pytest
+import sys
+import os
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+# Add repository root to path to import shared libraries
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.python.database import ProjectScopedQueries, ReplicaRouter, create_replica_router
+
+PROJECT_ID = 'project-a'
+
+
+def make_engine(session_name):
+    """Create an engine holding one analysis session with the given name."""
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    with engine.begin() as connection:
+        connection.execute(text(
+            """CREATE TABLE analysis_sessions (
+                session_id TEXT, session_name TEXT, company_id TEXT, base_report_data TEXT,
+                decision_parameters TEXT, calculated_results TEXT, investment_performance REAL,
+                is_active BOOLEAN, created_at TIMESTAMP, updated_at TIMESTAMP, project_id TEXT)"""
+        ))
+        connection.execute(text(
+            "INSERT INTO analysis_sessions (session_id, session_name, is_active, project_id) "
+            "VALUES ('s1', :name, 1, :project_id)"
+        ), {'name': session_name, 'project_id': PROJECT_ID})
+    return engine
+
+
+@pytest.fixture
+def engines():
+    """Create primary and replica engines."""
+    return make_engine('from-primary'), make_engine('from-replica')
+
+
+def session_names(queries):
+    """Read the project's session names through ProjectScopedQueries."""
+    return [row['session_name'] for row in queries.get_project_sessions()]
+
+
+class TestReplicaRouting:
+    """Test read/write splitting and consistency fallbacks."""
+
+    def test_reads_use_replica(self, engines):
+        """Test project reads are served by the replica pool."""
+        primary, replica = engines
+        router = ReplicaRouter([replica], lag_probe=lambda engine: 0.0)
+
+        with Session(primary) as db_session:
+            queries = ProjectScopedQueries(db_session, PROJECT_ID, router)
+            assert session_names(queries) == ['from-replica']
+
+    def test_without_router_reads_use_session_bind(self, engines):
+        """Test existing callers keep reading from the session's database."""
+        primary, _ = engines
+        with Session(primary) as db_session:
+            assert session_names(ProjectScopedQueries(db_session, PROJECT_ID)) == ['from-primary']
+
+    def test_lagging_replica_falls_back_to_primary(self, engines):
+        """Test replicas beyond the lag threshold are skipped."""
+        primary, replica = engines
+        router = ReplicaRouter([replica], lag_probe=lambda engine: 30.0, max_replica_lag_seconds=5)
+
+        with Session(primary) as db_session:
+            queries = ProjectScopedQueries(db_session, PROJECT_ID, router)
+            assert session_names(queries) == ['from-primary']
+
+    def test_unreachable_replica_falls_back_to_primary(self, engines):
+        """Test failed lag probes exclude the replica."""
+        primary, replica = engines
+        router = ReplicaRouter([replica], lag_probe=lambda engine: None)
+
+        with Session(primary) as db_session:
+            queries = ProjectScopedQueries(db_session, PROJECT_ID, router)
+            assert session_names(queries) == ['from-primary']
+
+    def test_lag_probe_is_rate_limited(self, engines):
+        """Test lag is probed at most once per check interval."""
+        primary, replica = engines
+        probes = []
+        router = ReplicaRouter(
+            [replica], lag_probe=lambda engine: probes.append(engine) or 0.0,
+            lag_check_interval_seconds=60,
+        )
+
+        with Session(primary) as db_session:
+            queries = ProjectScopedQueries(db_session, PROJECT_ID, router)
+            for _ in range(5):
+                session_names(queries)
+
+        assert len(probes) == 1
+
+    def test_write_pins_project_to_primary(self, engines):
+        """Test reads after a write see the primary for the stickiness window."""
+        primary, replica = engines
+        router = ReplicaRouter([replica], lag_probe=lambda engine: 0.0, sticky_seconds=60)
+
+        router.record_write(PROJECT_ID)
+
+        with Session(primary) as db_session:
+            assert session_names(ProjectScopedQueries(db_session, PROJECT_ID, router)) == [
+                'from-primary'
+            ]
+            assert session_names(ProjectScopedQueries(db_session, 'other', router)) == []
+        assert router.read_bind('other') is replica
+
+    def test_request_stickiness(self, engines):
+        """Test a write pins the project to the primary for the rest of the request."""
+        _, replica = engines
+        router = ReplicaRouter([replica], lag_probe=lambda engine: 0.0, sticky_seconds=0)
+        app = Flask(__name__)
+
+        with app.test_request_context():
+            router.record_write(PROJECT_ID)
+            assert router.read_bind(PROJECT_ID) is None
+
+        with app.test_request_context():
+            assert router.read_bind(PROJECT_ID) is replica
+
+
+class TestCreateReplicaRouter:
+    """Test routers built from replica URLs."""
+
+    def test_no_replicas_configured(self):
+        """Test an empty DATABASE_REPLICA_URLS disables routing."""
+        assert create_replica_router(''.split(',')) is None
+        assert create_replica_router([' ', '']) is None
+
+    def test_replicas_use_tuned_engines(self):
+        """Test replica engines get the tuned pool options of the primary."""
+        router = create_replica_router(['sqlite://', ' sqlite:// '])
+        assert len(router.replica_engines) == 2
+        assert all(engine.pool._pre_ping for engine in router.replica_engines)
@@ -0,0 +1,137 @@
+"""
+Unit tests for the shared response layer: fast JSON, MessagePack and compression.
+"""
+
+import gzip
+import json
+import pytest
+import sys
+import os
+from datetime import datetime
+from decimal import Decimal
+from flask import Flask, jsonify
+import numpy as np
+
+# Add repository root to path to import shared libraries
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.python.responses import (
+    ResponseMiddleware,
+    choose_encoding,
+    dumps,
+    parse_accept_encoding,
+)
+import shared.python.responses.compression as compression
+import shared.python.responses.serialization as serialization
+
+PAYLOAD = {
+    'results': np.arange(12, dtype=float).reshape(3, 4),
+    'units': np.int64(7),
+    'created_at': datetime(2024, 3, 1, 9, 30),
+    'price': Decimal('12.5'),
+}
+EXPECTED = {
+    'results': [[0.0, 1.0, 2.0, 3.0], [4.0, 5.0, 6.0, 7.0], [8.0, 9.0, 10.0, 11.0]],
+    'units': 7,
+    'created_at': '2024-03-01T09:30:00',
+    'price': 12.5,
+}
+
+
+@pytest.fixture
+def client():
+    """Create a Flask app with the response middleware."""
+    app = Flask(__name__)
+    ResponseMiddleware(app, min_bytes=256)
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/large')
+    def large():
+        return jsonify({'values': np.linspace(0, 1, 2000)})
+
+    @app.route('/typed')
+    def typed():
+        return jsonify(PAYLOAD)
+
+    return app.test_client()
+
+
+class TestSerialization:
+    """Test NumPy, datetime and Decimal values are encoded natively."""
+
+    def test_jsonify_handles_numpy_and_datetimes(self, client):
+        """Test arrays, NumPy scalars, datetimes and decimals round-trip as JSON."""
+        response = client.get('/typed')
+        assert response.mimetype == 'application/json'
+        assert json.loads(response.data) == EXPECTED
+
+    def test_standard_library_fallback_matches(self, monkeypatch):
+        """Test the encoder without orjson produces the same document."""
+        fast = json.loads(dumps(PAYLOAD))
+        monkeypatch.setattr(serialization, 'orjson', None)
+        assert json.loads(dumps(PAYLOAD)) == fast == EXPECTED
+
+    def test_msgpack_carries_typed_buffers(self, client):
+        """Test clients accepting MessagePack get arrays as raw buffers."""
+        msgpack = pytest.importorskip('msgpack')
+        response = client.get('/typed', headers={'Accept': 'application/msgpack'})
+        assert response.mimetype == 'application/msgpack'
+        data = msgpack.unpackb(response.data)
+        array = np.frombuffer(data['results']['data'], dtype=data['results']['dtype'])
+        assert array.reshape(data['results']['shape']).tolist() == EXPECTED['results']
+        assert data['created_at'] == EXPECTED['created_at']
+
+        browser = client.get('/typed', headers={'Accept': 'text/html,*/*;q=0.8'})
+        assert browser.mimetype == 'application/json'
+
+
+class TestCompression:
+    """Test Accept-Encoding negotiation."""
+
+    def test_parse_accept_encoding(self):
+        """Test q-values default to 1 and malformed values are refused."""
+        assert parse_accept_encoding('gzip, br;q=0.5, deflate;q=x') == {
+            'gzip': 1.0,
+            'br': 0.5,
+            'deflate': 0.0,
+        }
+
+    @pytest.mark.parametrize('header, expected', [
+        ('gzip, br', 'br'),
+        ('gzip, br;q=0.5', 'gzip'),
+        ('*', 'br'),
+        ('gzip;q=0, br;q=0', None),
+        ('identity', None),
+        (None, None),
+    ])
+    def test_choose_encoding(self, header, expected):
+        """Test the highest-quality available encoding is chosen."""
+        assert choose_encoding(header, ('br', 'gzip')) == expected
+
+    def test_large_json_is_gzipped(self, client, monkeypatch):
+        """Test large bodies are compressed and small ones are not."""
+        monkeypatch.setattr(compression, 'brotli', None)
+        response = client.get('/large', headers={'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert len(json.loads(gzip.decompress(response.data))['values']) == 2000
+
+        small = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in small.headers
+        assert 'Accept-Encoding' in small.headers['Vary']
+
+    def test_brotli_preferred_when_installed(self, client):
+        """Test Brotli is chosen over gzip when both are accepted."""
+        brotli = pytest.importorskip('brotli')
+        response = client.get('/large', headers={'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == 'br'
+        assert len(json.loads(brotli.decompress(response.data))['values']) == 2000
+
+    def test_uncompressed_without_accept_encoding(self, client):
+        """Test clients that do not accept an encoding get the plain body."""
+        response = client.get('/large')
+        assert 'Content-Encoding' not in response.headers
+        assert len(response.get_json()['values']) == 2000
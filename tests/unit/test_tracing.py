@@ -0,0 +1,158 @@
+"""
+Unit tests for W3C trace-context propagation and span recording.
+"""
+
+import json
+import pytest
+import sys
+import os
+from flask import Flask, jsonify
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add repository root to path to import shared libraries
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from shared.python.database.project_queries import ProjectScopedQueries
+from shared.python.observability import (
+    FileSpanExporter,
+    InMemorySpanExporter,
+    OTLPHttpExporter,
+    TracingMiddleware,
+    configure_tracer,
+    inject_headers,
+    parse_traceparent,
+    start_span,
+)
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+@pytest.fixture
+def exporter():
+    """Record spans synchronously in memory."""
+    exporter = InMemorySpanExporter()
+    configure_tracer('test-service', exporter, sample_ratio=1.0, export_interval=0)
+    yield exporter
+    configure_tracer('test-service', None)
+
+
+@pytest.fixture
+def client(exporter):
+    """Create a Flask app with the tracing middleware."""
+    app = Flask(__name__)
+    TracingMiddleware(app, 'test-service', exporter)
+    # The middleware batches exports; export on span end instead
+    configure_tracer('test-service', exporter, sample_ratio=1.0, export_interval=0)
+
+    @app.route('/api/v1/projects/<project_id>/calculate')
+    def calculate(project_id):
+        with start_span('calculate'):
+            pass
+        return jsonify({'downstream': inject_headers()})
+
+    @app.route('/fail')
+    def fail():
+        raise RuntimeError('boom')
+
+    return app.test_client()
+
+
+class TestTraceparent:
+    """Test traceparent parsing."""
+
+    def test_valid_header(self):
+        """Test ids and the sampled flag are read."""
+        context = parse_traceparent(f'00-{TRACE_ID}-{PARENT_ID}-01', 'vendor=1')
+        assert (context.trace_id, context.span_id, context.sampled) == (TRACE_ID, PARENT_ID, True)
+        assert context.tracestate == 'vendor=1'
+        assert context.traceparent() == f'00-{TRACE_ID}-{PARENT_ID}-01'
+
+    @pytest.mark.parametrize('header', [
+        None,
+        'garbage',
+        f'ff-{TRACE_ID}-{PARENT_ID}-01',
+        f'00-{"0" * 32}-{PARENT_ID}-01',
+        f'00-{TRACE_ID}-{"0" * 16}-01',
+        f'00-{TRACE_ID}-{PARENT_ID}-01-extra',
+    ])
+    def test_invalid_headers_are_ignored(self, header):
+        """Test malformed or forbidden values start a new trace."""
+        assert parse_traceparent(header) is None
+
+
+class TestTracingMiddleware:
+    """Test server spans and propagation through a request."""
+
+    def test_continues_incoming_trace(self, client, exporter):
+        """Test the server span joins the caller's trace and children nest under it."""
+        response = client.get(
+            '/api/v1/projects/p1/calculate',
+            headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'},
+        )
+        child, server = exporter.spans
+        assert server['name'] == 'GET /api/v1/projects/<project_id>/calculate'
+        assert server['trace_id'] == TRACE_ID and server['parent_span_id'] == PARENT_ID
+        assert server['attributes']['gmc.project_id'] == 'p1'
+        assert server['attributes']['http.status_code'] == 200
+        assert child['parent_span_id'] == server['span_id']
+
+        downstream = parse_traceparent(response.get_json()['downstream']['traceparent'])
+        assert downstream.trace_id == TRACE_ID and downstream.span_id == child['parent_span_id']
+        assert response.headers['traceresponse'].split('-')[1] == TRACE_ID
+
+    def test_unsampled_trace_is_not_recorded(self, client, exporter):
+        """Test the caller's unsampled flag is honoured and propagated."""
+        response = client.get(
+            '/api/v1/projects/p1/calculate',
+            headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-00'},
+        )
+        assert exporter.spans == []
+        assert response.get_json()['downstream']['traceparent'].endswith('-00')
+
+    def test_errors_are_recorded(self, client, exporter):
+        """Test unhandled exceptions mark the server span as failed."""
+        assert client.get('/fail').status_code == 500
+        (span,) = exporter.spans
+        assert span['status'] == 'error' and 'boom' in span['status_message']
+        assert span['parent_span_id'] is None
+
+
+class TestSpans:
+    """Test instrumented queries and exporters."""
+
+    def test_project_scoped_sql_is_traced(self, exporter):
+        """Test queries through ProjectScopedQueries record a client span."""
+        session = sessionmaker(bind=create_engine('sqlite://'))()
+        queries = ProjectScopedQueries(session, 'p1')
+        with start_span('request') as parent:
+            queries.execute_project_scoped_query('SELECT :project_id AS project', read_only=True)
+        span = exporter.spans[0]
+        assert span['name'] == 'sql SELECT' and span['kind'] == 'client'
+        assert span['parent_span_id'] == parent.context.span_id
+        assert span['attributes']['gmc.project_id'] == 'p1'
+        assert span['attributes']['db.read_only'] is True
+
+    def test_file_exporter_writes_json_lines(self, tmp_path):
+        """Test batched spans are appended to the file on flush."""
+        path = tmp_path / 'traces.jsonl'
+        tracer = configure_tracer('test-service', FileSpanExporter(str(path)), sample_ratio=1.0)
+        with tracer.start_span('one'):
+            pass
+        with tracer.start_span('two'):
+            pass
+        tracer.flush()
+        spans = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [span['name'] for span in spans] == ['one', 'two']
+        configure_tracer('test-service', None)
+
+    def test_otlp_payload(self, exporter):
+        """Test spans are grouped by service in the OTLP/JSON body."""
+        with start_span('query', kind='client', attributes={'rows': 3}):
+            pass
+        payload = OTLPHttpExporter('http://collector:4318').payload(exporter.spans)
+        (resource,) = payload['resourceSpans']
+        (span,) = resource['scopeSpans'][0]['spans']
+        assert span['kind'] == 3
+        assert span['attributes'] == [{'key': 'rows', 'value': {'intValue': '3'}}]